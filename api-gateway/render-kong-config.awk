@@ -0,0 +1,30 @@
+# Renders kong.yml.template from the environment:
+#   awk -f render-kong-config.awk kong.yml.template > kong.yml
+#
+#   ${VAR}                  replaced with the value of VAR. A placeholder alone
+#                           on its line may hold a multi-line value (a PEM
+#                           key); every line keeps the placeholder's indent.
+#   # @if VAR ... # @endif  lines kept only when VAR is set and non-empty.
+/^[ \t]*# @if / { skip = (ENVIRON[$3] == ""); next }
+/^[ \t]*# @endif/ { skip = 0; next }
+skip { next }
+/^[ \t]*\$\{[A-Z0-9_]+\}[ \t]*$/ {
+    indent = $0
+    sub(/[^ \t].*$/, "", indent)
+    name = $0
+    gsub(/[ \t${}]/, "", name)
+    value = ENVIRON[name]
+    gsub(/\\n/, "\n", value)
+    n = split(value, lines, "\n")
+    for (i = 1; i <= n; i++) if (lines[i] != "") print indent lines[i]
+    next
+}
+{
+    line = $0
+    out = ""
+    while (match(line, /\$\{[A-Z0-9_]+\}/)) {
+        out = out substr(line, 1, RSTART - 1) ENVIRON[substr(line, RSTART + 2, RLENGTH - 3)]
+        line = substr(line, RSTART + RLENGTH)
+    }
+    print out line
+}
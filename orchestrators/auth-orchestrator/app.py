@@ -39,6 +39,10 @@ def create_app(test_config=None):
     }
     Swagger(app)    
 
+    if os.environ.get("REGISTRATION_JOB_WORKERS_ENABLED", "true").lower() == "true" and not app.config.get("TESTING"):
+        from registration_worker import start_registration_workers
+        start_registration_workers(app)
+
     from routes import bp
     app.register_blueprint(bp)
 
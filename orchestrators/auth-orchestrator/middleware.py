@@ -13,11 +13,23 @@ import sys
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'shared'))
 from token_blacklist import get_token_blacklist
 
+from signing_keys import decode_token
+
 
 def _error(code, message, status):
     return jsonify({"error": {"code": code, "message": message}}), status
 
 
+def _is_revoked(payload):
+    """Blacklisted jti, or issued before the user's last revoke-all."""
+    token_blacklist = get_token_blacklist()
+    jti = payload.get("jti")
+    if jti and token_blacklist.is_blacklisted(jti):
+        return True
+    user_id = payload.get("userId")
+    return bool(user_id) and not token_blacklist.is_generation_current(user_id, payload.get("gen", 0))
+
+
 def require_auth(f):
     @wraps(f)
     def decorated(*args, **kwargs):
@@ -26,12 +38,9 @@ def require_auth(f):
             return _error("AUTH_MISSING_TOKEN", "Authorization header missing or malformed.", 401)
         token = auth[len("Bearer "):]
         try:
-            payload = jwt.decode(token, os.environ["JWT_SECRET"], algorithms=["HS256"])
+            payload = decode_token(token)
             
-            # Check if token is blacklisted
-            token_blacklist = get_token_blacklist()
-            jti = payload.get("jti")
-            if jti and token_blacklist.is_blacklisted(jti):
+            if _is_revoked(payload):
                 return _error("AUTH_TOKEN_REVOKED", "Token has been revoked. Please login again.", 401)
             
             request.user = payload
@@ -51,12 +60,9 @@ def require_staff(f):
             return _error("AUTH_MISSING_TOKEN", "Authorization header missing or malformed.", 401)
         token = auth[len("Bearer "):]
         try:
-            payload = jwt.decode(token, os.environ["JWT_SECRET"], algorithms=["HS256"])
+            payload = decode_token(token)
             
-            # Check if token is blacklisted
-            token_blacklist = get_token_blacklist()
-            jti = payload.get("jti")
-            if jti and token_blacklist.is_blacklisted(jti):
+            if _is_revoked(payload):
                 return _error("AUTH_TOKEN_REVOKED", "Token has been revoked. Please login again.", 401)
             
             request.user = payload
@@ -93,3 +99,21 @@ def revoke_token(token: str) -> bool:
         return token_blacklist.blacklist_token(jti, exp, jti)
     except Exception:
         return False
+
+
+def revoke_all_tokens(user_id: str) -> bool:
+    """
+    Revoke every token issued to a user so far by bumping their token generation.
+
+    Args:
+        user_id: The user whose sessions should all end.
+
+    Returns:
+        True if successfully revoked, False otherwise.
+    """
+    return get_token_blacklist().revoke_all_user_tokens(user_id)
+
+
+def current_token_generation(user_id: str) -> int:
+    """Generation to embed in a newly issued token (0 if it cannot be read)."""
+    return get_token_blacklist().get_user_generation(user_id, fresh=True) or 0
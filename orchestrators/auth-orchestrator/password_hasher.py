@@ -0,0 +1,177 @@
+"""
+Bounded off-thread bcrypt for register and login.
+
+bcrypt is deliberately CPU-bound, so hashing inline lets a burst of logins
+occupy every gunicorn worker and queue unrelated requests (/auth/me) behind
+them. Here each gunicorn worker hands hashing to its own pool of
+PASSWORD_HASH_WORKERS processes. At most PASSWORD_HASH_QUEUE_LIMIT
+operations may wait for a free process; beyond that HashPoolBusy is raised
+at once so the route can answer 503 instead of stacking up requests.
+PASSWORD_HASH_WORKERS=0 hashes inline (tests, local runs).
+
+The limit only means something when a gunicorn worker serves requests on
+several threads (the image runs -k gthread --threads 16): with sync workers
+each process has one request in flight and the queue is never reached.
+Keep PASSWORD_HASH_WORKERS + PASSWORD_HASH_QUEUE_LIMIT well below --threads
+so sign-in bursts leave threads free for everything else.
+
+BCRYPT_ROUNDS sets the cost of new hashes. needs_rehash() tells login when
+a stored hash was made with a different cost, so it can be replaced with
+the password the user just proved.
+
+Hash and check latency (time spent in the worker process) plus queue
+rejections are counted; stats() returns them and a summary is logged every
+PASSWORD_HASH_STATS_LOG_SECONDS.
+"""
+import logging
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures import TimeoutError as FuturesTimeout
+
+import bcrypt
+
+logger = logging.getLogger(__name__)
+
+BCRYPT_ROUNDS = int(os.environ.get("BCRYPT_ROUNDS", "12"))
+PASSWORD_HASH_WORKERS = int(os.environ.get("PASSWORD_HASH_WORKERS", "2"))
+PASSWORD_HASH_QUEUE_LIMIT = int(os.environ.get("PASSWORD_HASH_QUEUE_LIMIT", "6"))
+PASSWORD_HASH_TIMEOUT_SECONDS = float(os.environ.get("PASSWORD_HASH_TIMEOUT_SECONDS", "10"))
+STATS_LOG_SECONDS = int(os.environ.get("PASSWORD_HASH_STATS_LOG_SECONDS", "60"))
+
+
+class HashPoolBusy(RuntimeError):
+    """The hashing queue is full or the hash did not finish in time."""
+
+
+# ── Worker-process functions (must be importable top-level callables) ────────
+
+def _hash(password, rounds):
+    started = time.perf_counter()
+    hashed = bcrypt.hashpw(password, bcrypt.gensalt(rounds=rounds))
+    return hashed, time.perf_counter() - started
+
+
+def _check(password, hashed):
+    started = time.perf_counter()
+    try:
+        ok = bcrypt.checkpw(password, hashed)
+    except ValueError:
+        # Not a bcrypt hash (e.g. a corrupt row) — treat as a mismatch
+        ok = False
+    return ok, time.perf_counter() - started
+
+
+# ── Pool ─────────────────────────────────────────────────────────────────────
+
+_pool = None
+_pool_lock = threading.Lock()
+_slots = threading.BoundedSemaphore(max(PASSWORD_HASH_WORKERS, 1) + PASSWORD_HASH_QUEUE_LIMIT)
+_stats_lock = threading.Lock()
+_stats = {
+    "hashes": 0,
+    "checks": 0,
+    "rejected": 0,
+    "timeouts": 0,
+    "secondsTotal": 0.0,
+    "secondsMax": 0.0,
+}
+_last_stats_log = time.monotonic()
+
+
+def _get_pool():
+    """One pool per gunicorn worker, created after fork on first use."""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            # spawn, not fork: the parent may already be running threads
+            _pool = ProcessPoolExecutor(
+                max_workers=PASSWORD_HASH_WORKERS,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return _pool
+
+
+def _run(fn, *args):
+    if PASSWORD_HASH_WORKERS <= 0:
+        return fn(*args)
+    if not _slots.acquire(blocking=False):
+        _count("rejected")
+        raise HashPoolBusy("Password hashing queue is full")
+    try:
+        future = _get_pool().submit(fn, *args)
+        try:
+            return future.result(timeout=PASSWORD_HASH_TIMEOUT_SECONDS)
+        except FuturesTimeout:
+            future.cancel()
+            _count("timeouts")
+            raise HashPoolBusy("Password hashing timed out")
+    finally:
+        _slots.release()
+
+
+def hash_password(password):
+    """(hash, salt) for a new password at the configured cost, as strings."""
+    hashed, seconds = _run(_hash, password.encode(), BCRYPT_ROUNDS)
+    _record("hashes", seconds)
+    hashed = hashed.decode()
+    # The salt is the first 29 characters of a bcrypt hash ($2b$RR$ + 22)
+    return hashed, hashed[:29]
+
+
+def check_password(password, hashed):
+    ok, seconds = _run(_check, password.encode(), hashed.encode())
+    _record("checks", seconds)
+    return ok
+
+
+def needs_rehash(hashed):
+    """True when a bcrypt hash was made with a cost other than BCRYPT_ROUNDS."""
+    try:
+        return int(hashed.split("$")[2]) != BCRYPT_ROUNDS
+    except (AttributeError, IndexError, ValueError):
+        return False
+
+
+# ── Instrumentation ──────────────────────────────────────────────────────────
+
+def _count(name):
+    with _stats_lock:
+        _stats[name] += 1
+    _maybe_log_stats()
+
+
+def _record(name, seconds):
+    with _stats_lock:
+        _stats[name] += 1
+        _stats["secondsTotal"] += seconds
+        _stats["secondsMax"] = max(_stats["secondsMax"], seconds)
+    _maybe_log_stats()
+
+
+def stats():
+    """Counters since start, plus the mean seconds per hash or check."""
+    with _stats_lock:
+        snapshot = dict(_stats)
+    done = snapshot["hashes"] + snapshot["checks"]
+    snapshot["secondsMean"] = snapshot["secondsTotal"] / done if done else 0.0
+    snapshot["rounds"] = BCRYPT_ROUNDS
+    return snapshot
+
+
+def _maybe_log_stats():
+    global _last_stats_log
+    now = time.monotonic()
+    with _stats_lock:
+        if now - _last_stats_log < STATS_LOG_SECONDS:
+            return
+        _last_stats_log = now
+    s = stats()
+    logger.info(
+        "Password hashing (cost %d): %d hashes, %d checks, mean %.3fs max %.3fs, "
+        "%d rejected, %d timeouts",
+        s["rounds"], s["hashes"], s["checks"], s["secondsMean"], s["secondsMax"],
+        s["rejected"], s["timeouts"],
+    )
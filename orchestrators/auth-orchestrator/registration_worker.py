@@ -0,0 +1,106 @@
+"""
+Post-registration workers.
+
+register commits the user and queues one message per side effect on
+registration_jobs_queue (OutSystems credit account, OTP send).
+REGISTRATION_JOB_WORKERS consumer threads here run them. A job that fails
+is republished with its attempt count raised after
+REGISTRATION_JOB_RETRY_DELAY_SECONDS, and is marked failed once
+REGISTRATION_JOB_MAX_ATTEMPTS have been used. verify-registration reads
+that status from Redis.
+"""
+import json
+import logging
+import os
+import threading
+import time
+
+import pika
+
+logger = logging.getLogger(__name__)
+
+REGISTRATION_JOB_WORKERS = int(os.environ.get("REGISTRATION_JOB_WORKERS", "2"))
+REGISTRATION_JOB_MAX_ATTEMPTS = int(os.environ.get("REGISTRATION_JOB_MAX_ATTEMPTS", "5"))
+REGISTRATION_JOB_RETRY_DELAY_SECONDS = float(os.environ.get("REGISTRATION_JOB_RETRY_DELAY_SECONDS", "5"))
+
+
+def _get_connection():
+    params = pika.ConnectionParameters(
+        host=os.environ.get("RABBITMQ_HOST", "rabbitmq"),
+        port=int(os.environ.get("RABBITMQ_PORT", "5672")),
+        credentials=pika.PlainCredentials(
+            username=os.environ.get("RABBITMQ_USER", "guest"),
+            password=os.environ.get("RABBITMQ_PASS", "guest"),
+        ),
+        connection_attempts=5,
+        retry_delay=3,
+    )
+    return pika.BlockingConnection(params)
+
+
+def handle_message(ch, method, body):
+    """Ack finished, exhausted or unusable jobs; republish the rest with attempt + 1."""
+    from routes import (
+        InvalidRegistrationJob,
+        _publish_registration_job,
+        process_registration_job,
+        set_registration_job_status,
+    )
+
+    message = {}
+    try:
+        message = json.loads(body)
+        process_registration_job(message)
+    except (InvalidRegistrationJob, json.JSONDecodeError, UnicodeDecodeError) as exc:
+        logger.error("Dropping registration job: %s", exc)
+        ch.basic_nack(delivery_tag=method.delivery_tag, requeue=False)
+        return
+    except Exception as exc:
+        attempt = int(message.get("attempt", 1))
+        if attempt >= REGISTRATION_JOB_MAX_ATTEMPTS:
+            logger.error("Registration job %s for %s failed after %d attempts: %s",
+                         message["job"], message["userId"], attempt, exc)
+            set_registration_job_status(message["userId"], message["job"], "failed", str(exc))
+            ch.basic_ack(delivery_tag=method.delivery_tag)
+            return
+        logger.warning("Registration job %s for %s failed (attempt %d), retrying: %s",
+                       message["job"], message["userId"], attempt, exc)
+        set_registration_job_status(message["userId"], message["job"], "retrying", str(exc))
+        time.sleep(REGISTRATION_JOB_RETRY_DELAY_SECONDS)
+        try:
+            _publish_registration_job({**message, "attempt": attempt + 1})
+        except Exception as publish_exc:
+            logger.warning("Could not republish registration job, requeueing: %s", publish_exc)
+            ch.basic_nack(delivery_tag=method.delivery_tag, requeue=True)
+            return
+    ch.basic_ack(delivery_tag=method.delivery_tag)
+
+
+def _consume(app):
+    """One blocking consumer; pika connections are not shared across threads."""
+    from routes import REGISTRATION_JOBS_QUEUE
+
+    while True:
+        try:
+            connection = _get_connection()
+            channel = connection.channel()
+            channel.queue_declare(queue=REGISTRATION_JOBS_QUEUE, durable=True)
+
+            def on_message(ch, method, _properties, body):
+                with app.app_context():
+                    handle_message(ch, method, body)
+
+            channel.basic_qos(prefetch_count=1)
+            channel.basic_consume(queue=REGISTRATION_JOBS_QUEUE, on_message_callback=on_message)
+            logger.info("Registration worker %s started on %s",
+                        threading.current_thread().name, REGISTRATION_JOBS_QUEUE)
+            channel.start_consuming()
+        except Exception as exc:
+            logger.warning("Registration worker disconnected: %s — retrying in 5s", exc)
+            time.sleep(5)
+
+
+def start_registration_workers(app):
+    for index in range(REGISTRATION_JOB_WORKERS):
+        t = threading.Thread(target=_consume, args=(app,), daemon=True, name=f"registration-worker-{index}")
+        t.start()
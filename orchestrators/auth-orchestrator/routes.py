@@ -1,22 +1,37 @@
+import json
+import logging
 import os
 import uuid
 from datetime import datetime, timedelta, timezone
 
-import bcrypt
-import jwt
+import pika
 import redis as redis_lib
 from flask import Blueprint, jsonify, request
 
-from middleware import require_auth, revoke_token
+from middleware import current_token_generation, require_auth, revoke_all_tokens, revoke_token
+from password_hasher import HashPoolBusy, check_password, hash_password, needs_rehash
+from signing_keys import jwks, sign
 from service_client import call_credit_service, call_service
+from user_profile_cache import UserProfileCache
 
 bp = Blueprint("auth", __name__)
+logger = logging.getLogger(__name__)
 
 USER_SERVICE = os.environ.get("USER_SERVICE_URL", "http://user-service:5000")
 OTP_WRAPPER  = os.environ.get("OTP_WRAPPER_URL",  "http://otp-wrapper:5000")
 REDIS_URL    = os.environ.get("REDIS_URL",         "redis://redis:6379/0")
 JWT_EXPIRY_HOURS = int(os.environ.get("JWT_EXPIRY_HOURS", "24"))
 _OTP_SID_TTL = 600  # 10 minutes
+REGISTRATION_JOBS_QUEUE = "registration_jobs_queue"
+REGISTRATION_STATUS_TTL_SECONDS = int(os.environ.get("REGISTRATION_STATUS_TTL_SECONDS", "86400"))
+# Job name -> field in the registration_jobs:{userId} status hash
+REGISTRATION_JOBS = {"credit_account": "creditAccount", "otp_send": "otp"}
+
+
+# Late-bound so the fetch can be swapped in tests; no password or salt is fetched
+user_profiles = UserProfileCache(
+    lambda user_id: call_service("GET", f"{USER_SERVICE}/users/{user_id}/profile")
+)
 
 
 def _get_redis():
@@ -27,19 +42,60 @@ def _error(code, message, status):
     return jsonify({"error": {"code": code, "message": message}}), status
 
 
+def _busy():
+    response, status = _error("SERVICE_BUSY", "Too many sign-ins right now. Please retry shortly.", 503)
+    response.headers["Retry-After"] = "1"
+    return response, status
+
+
+def _rehash_if_needed(user_data, password):
+    """Move a hash made at an older cost to BCRYPT_ROUNDS. Best-effort."""
+    if not needs_rehash(user_data["password"]):
+        return
+    try:
+        hashed, salt = hash_password(password)
+    except HashPoolBusy:
+        return  # next login tries again
+    _, err = call_service("PATCH", f"{USER_SERVICE}/users/{user_data['userId']}", json={
+        "password": hashed,
+        "salt": salt,
+    })
+    if err:
+        logger.warning("Could not store rehashed password for %s: %s", user_data["userId"], err)
+
+
 def _generate_token(user):
     payload = {
         "userId": user["userId"],
         "email": user["email"],
         "role": user["role"],
         "jti": str(uuid.uuid4()),  # JWT ID for token revocation
+        "gen": current_token_generation(user["userId"]),  # bumped by logout-all
         "exp": datetime.now(timezone.utc) + timedelta(hours=JWT_EXPIRY_HOURS),
     }
     # Staff users carry venueId so ticket-verification-orchestrator
     # can check venue without an extra lookup.
     if user.get("role") == "staff" and user.get("venueId"):
         payload["venueId"] = user["venueId"]
-    return jwt.encode(payload, os.environ["JWT_SECRET"], algorithm="HS256")
+    return sign(payload)
+
+
+# ── GET /.well-known/jwks.json ───────────────────────────────────────────────
+
+@bp.get("/.well-known/jwks.json")
+def get_jwks():
+    """
+    Public keys that verify issued tokens (RS256, selected by kid)
+    ---
+    tags:
+      - Auth
+    responses:
+      200:
+        description: JSON Web Key Set; empty while tokens are signed HS256
+    """
+    response = jsonify(jwks())
+    response.headers["Cache-Control"] = "public, max-age=300"
+    return response
 
 
 # ── POST /auth/register ──────────────────────────────────────────────────────
@@ -74,13 +130,16 @@ def register():
               description: Optional. Only for staff accounts.
     responses:
       201:
-        description: User registered successfully
+        description: >
+          User registered. Credit account creation and the OTP send run as
+          queued jobs; data.jobs gives their status, and verify-registration
+          reports it until the OTP arrives.
       400:
         description: Validation error or missing fields
       409:
         description: Email already registered
-      500:
-        description: Credit initialisation failed
+      503:
+        description: Password hashing is saturated — retry after Retry-After seconds
     """
     data = request.get_json(silent=True) or {}
     required = ("email", "password", "phoneNumber")
@@ -94,13 +153,15 @@ def register():
     if role == "staff" and not data.get("venueId"):
         return _error("VALIDATION_ERROR", "venueId is required for staff accounts.", 400)
 
-    salt = bcrypt.gensalt()
-    hashed = bcrypt.hashpw(data["password"].encode(), salt).decode()
+    try:
+        hashed, salt = hash_password(data["password"])
+    except HashPoolBusy:
+        return _busy()
 
     user_data, err = call_service("POST", f"{USER_SERVICE}/users", json={
         "email": data["email"],
         "password": hashed,
-        "salt": salt.decode(),
+        "salt": salt,
         "role": role,
         "phoneNumber": data["phoneNumber"],
         "venueId": data.get("venueId"),
@@ -110,37 +171,132 @@ def register():
     if err:
         return _error(err, "Could not create user account.", 400)
 
-    # Initialise credit balance in OutSystems (non-fatal — user can still register)
-    _, credit_err = call_credit_service("POST", "/credits", json={
-        "userId": user_data["userId"],
-        "creditBalance": 0,
-    })
-    if credit_err:
-        # Non-fatal: account is created, credit balance will be initialised on first use
-        pass
-
-    # Send OTP for phone verification
-    otp_data, otp_err = call_service("POST", f"{OTP_WRAPPER}/otp/send", json={
-        "phoneNumber": data["phoneNumber"],
-    })
-    if otp_err or not otp_data or not otp_data.get("sid"):
-        # Non-fatal: account is created, user can re-request OTP later via verify page
-        pass
-    else:
-        try:
-            r = _get_redis()
-            r.setex(f"pending_otp:{user_data['userId']}", _OTP_SID_TTL, otp_data["sid"])
-        except Exception:
-            pass
+    # Credit account and OTP are created by registration workers, so the
+    # response never waits on OutSystems or the SMS provider
+    jobs = _queue_registration_jobs(user_data["userId"], data["phoneNumber"])
 
     return jsonify({"data": {
         "userId": user_data["userId"],
         "email": user_data["email"],
         "role": user_data["role"],
         "createdAt": user_data["createdAt"],
+        "jobs": jobs,
     }}), 201
 
 
+# ── Registration jobs ────────────────────────────────────────────────────────
+
+def _publish_registration_job(message):
+    """Publish with confirms; raises unless the broker has taken the message."""
+    conn = pika.BlockingConnection(pika.ConnectionParameters(
+        host=os.environ.get("RABBITMQ_HOST", "rabbitmq"),
+        port=int(os.environ.get("RABBITMQ_PORT", "5672")),
+        credentials=pika.PlainCredentials(
+            os.environ.get("RABBITMQ_USER", "guest"),
+            os.environ.get("RABBITMQ_PASS", "guest"),
+        ),
+        connection_attempts=2,
+        retry_delay=1,
+    ))
+    try:
+        ch = conn.channel()
+        ch.confirm_delivery()
+        ch.basic_publish(
+            exchange="",
+            routing_key=REGISTRATION_JOBS_QUEUE,
+            body=json.dumps(message),
+            properties=pika.BasicProperties(delivery_mode=2, content_type="application/json"),
+            mandatory=True,
+        )
+    finally:
+        conn.close()
+
+
+def set_registration_job_status(user_id, job, status, error=None):
+    """Record queued / retrying / done / failed for verify-registration. Best-effort."""
+    field = REGISTRATION_JOBS[job]
+    try:
+        r = _get_redis()
+        key = f"registration_jobs:{user_id}"
+        pipe = r.pipeline()
+        pipe.hset(key, mapping={field: status, f"{field}Error": error or ""})
+        pipe.expire(key, REGISTRATION_STATUS_TTL_SECONDS)
+        pipe.execute()
+    except Exception as exc:
+        logger.warning("Could not record %s status for %s: %s", job, user_id, exc)
+
+
+def get_registration_job_status(user_id):
+    """{"creditAccount": ..., "otp": ...}, or None when nothing is recorded."""
+    try:
+        raw = _get_redis().hgetall(f"registration_jobs:{user_id}")
+    except Exception:
+        return None
+    if not raw:
+        return None
+    return {field: raw.get(field) for field in REGISTRATION_JOBS.values()}
+
+
+def _queue_registration_jobs(user_id, phone_number):
+    """
+    Queue every post-registration job. A job the broker did not take runs
+    inline instead, so a RabbitMQ outage slows registration but loses nothing.
+    "queued" is recorded before publishing so a fast worker's done/retrying is
+    never overwritten; the inline result replaces it if the publish fails.
+    """
+    statuses = {}
+    for job, field in REGISTRATION_JOBS.items():
+        message = {"job": job, "userId": user_id, "phoneNumber": phone_number, "attempt": 1}
+        set_registration_job_status(user_id, job, "queued")
+        try:
+            _publish_registration_job(message)
+            statuses[field] = "queued"
+        except Exception as exc:
+            logger.warning("Could not queue %s for %s, running inline: %s", job, user_id, exc)
+            try:
+                process_registration_job(message)
+                statuses[field] = "done"
+            except Exception as job_exc:
+                set_registration_job_status(user_id, job, "failed", str(job_exc))
+                statuses[field] = "failed"
+    return statuses
+
+
+class InvalidRegistrationJob(ValueError):
+    pass
+
+
+def process_registration_job(message):
+    """
+    Run one post-registration job and record it as done. Raises
+    InvalidRegistrationJob for a message that can never run and RuntimeError
+    when it should be retried.
+    """
+    try:
+        job = message["job"]
+        user_id = message["userId"]
+        phone_number = message["phoneNumber"]
+    except (KeyError, TypeError) as exc:
+        raise InvalidRegistrationJob(f"malformed registration job: {exc}") from exc
+    if job not in REGISTRATION_JOBS:
+        raise InvalidRegistrationJob(f"unknown registration job {job!r}")
+
+    if job == "credit_account":
+        _, err = call_credit_service("POST", "/credits", json={"userId": user_id, "creditBalance": 0})
+        if err:
+            raise RuntimeError(f"credit account creation failed: {err}")
+    else:
+        otp_data, err = call_service("POST", f"{OTP_WRAPPER}/otp/send", json={"phoneNumber": phone_number})
+        if err or not otp_data or not otp_data.get("sid"):
+            raise RuntimeError(f"OTP send failed: {err or 'no sid returned'}")
+        try:
+            _get_redis().setex(f"pending_otp:{user_id}", _OTP_SID_TTL, otp_data["sid"])
+        except Exception as exc:
+            raise RuntimeError(f"could not store OTP sid: {exc}") from exc
+
+    set_registration_job_status(user_id, job, "done")
+
+
 # ── POST /auth/verify-registration ──────────────────────────────────────────
 
 @bp.post("/auth/verify-registration")
@@ -156,29 +312,42 @@ def verify_registration():
         required: true
         schema:
           type: object
-          required: [userId, otpCode]
+          required: [userId]
           properties:
             userId:
               type: string
             otpCode:
               type: string
               example: "123456"
+              description: >
+                Omit to poll the registration jobs instead: data.jobs gives
+                creditAccount and otp as queued, retrying, done or failed.
     responses:
       200:
-        description: Verification successful — returns JWT token
+        description: Verification successful — returns JWT token (or job status when polling)
       400:
-        description: Missing fields or no pending verification
+        description: Missing userId or no pending verification
       401:
         description: Invalid OTP code
       404:
         description: User not found
+      409:
+        description: The OTP has not been sent yet — retry shortly
+      502:
+        description: Sending the OTP failed after every retry
     """
     data = request.get_json(silent=True) or {}
     user_id = data.get("userId")
     otp_code = data.get("otpCode")
 
-    if not user_id or not otp_code:
-        return _error("VALIDATION_ERROR", "userId and otpCode are required.", 400)
+    if not user_id:
+        return _error("VALIDATION_ERROR", "userId is required.", 400)
+
+    if not otp_code:
+        jobs = get_registration_job_status(user_id)
+        if jobs is None:
+            return _error("NO_PENDING_VERIFICATION", "No pending verification found. Please register again.", 400)
+        return jsonify({"data": {"userId": user_id, "jobs": jobs}}), 200
 
     try:
         r = _get_redis()
@@ -187,9 +356,14 @@ def verify_registration():
         return _error("SERVICE_UNAVAILABLE", "Verification service unavailable.", 503)
 
     if not sid:
+        otp_status = (get_registration_job_status(user_id) or {}).get("otp")
+        if otp_status in ("queued", "retrying"):
+            return _error("VERIFICATION_PENDING", "The verification code is still being sent. Please retry shortly.", 409)
+        if otp_status == "failed":
+            return _error("OTP_SEND_FAILED", "Could not send the verification code. Please register again.", 502)
         return _error("NO_PENDING_VERIFICATION", "No pending verification found. Please register again.", 400)
 
-    user_data, err = call_service("GET", f"{USER_SERVICE}/users/{user_id}")
+    user_data, err = user_profiles.get(user_id)
     if err:
         return _error("USER_NOT_FOUND", "User not found.", 404)
 
@@ -255,6 +429,8 @@ def login():
         description: Invalid credentials
       403:
         description: Account suspended
+      503:
+        description: Password hashing is saturated — retry after Retry-After seconds
     """
     data = request.get_json(silent=True) or {}
     if not data.get("email") or not data.get("password"):
@@ -268,8 +444,13 @@ def login():
     if user_data.get("isFlagged"):
         return _error("AUTH_FORBIDDEN", "Account has been suspended.", 403)
 
-    if not bcrypt.checkpw(data["password"].encode(), user_data["password"].encode()):
-        return _error("AUTH_INVALID_CREDENTIALS", "Invalid email or password.", 401)
+    try:
+        if not check_password(data["password"], user_data["password"]):
+            return _error("AUTH_INVALID_CREDENTIALS", "Invalid email or password.", 401)
+    except HashPoolBusy:
+        return _busy()
+
+    _rehash_if_needed(user_data, data["password"])
 
     token = _generate_token(user_data)
     expires_at = (datetime.now(timezone.utc) + timedelta(hours=JWT_EXPIRY_HOURS)).isoformat()
@@ -305,7 +486,7 @@ def me():
       404:
         description: User not found
     """
-    user_data, err = call_service("GET", f"{USER_SERVICE}/users/{request.user['userId']}")
+    user_data, err = user_profiles.get(request.user["userId"])
     if err:
         return _error("USER_NOT_FOUND", "User not found.", 404)
 
@@ -355,9 +536,7 @@ def logout():
 @require_auth
 def logout_all():
     """
-    Logout from all devices by revoking all tokens for this user
-    Note: Full implementation requires storing token-user mappings in Redis.
-    Currently, this is a placeholder that revokes the current token.
+    Logout from all devices by revoking every token issued to this user
     ---
     tags:
       - Auth
@@ -368,16 +547,9 @@ def logout_all():
         description: All tokens revoked
       401:
         description: Missing or invalid token
+      503:
+        description: Revocation store unavailable
     """
-    auth = request.headers.get("Authorization", "")
-    if not auth.startswith("Bearer "):
-        return _error("AUTH_MISSING_TOKEN", "Authorization header missing or malformed.", 401)
-    
-    token = auth[len("Bearer "):]
-    if revoke_token(token):
-        # TODO: Implement full logout-all by scanning Redis for all user tokens
-        return jsonify({"data": {
-            "message": "Current token revoked. Full logout-all requires additional implementation."
-        }}), 200
-    else:
-        return jsonify({"data": {"message": "Token revocation may be unavailable"}}), 200
+    if not revoke_all_tokens(request.user["userId"]):
+        return _error("SERVICE_UNAVAILABLE", "Could not revoke sessions. Please retry.", 503)
+    return jsonify({"data": {"message": "All sessions revoked"}}), 200
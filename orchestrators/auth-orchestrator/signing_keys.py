@@ -0,0 +1,91 @@
+"""
+JWT signing keys for auth-orchestrator.
+
+With JWT_SIGNING_KEY (an RSA private key in PEM) set, tokens are signed
+RS256 and carry the key id (JWT_SIGNING_KID, or the key's RFC 7638
+thumbprint) in their header. The public halves are published at
+/.well-known/jwks.json, which Kong and the other orchestrators verify
+against, so no service needs a shared secret.
+
+Rotation: generate a new key, move the current kid and public key to
+JWT_PREVIOUS_KID / JWT_PREVIOUS_PUBLIC_KEY (still published and accepted),
+switch JWT_SIGNING_KEY / JWT_SIGNING_KID to the new one, and drop the
+previous entry once JWT_EXPIRY_HOURS have passed.
+
+Without JWT_SIGNING_KEY tokens fall back to HS256 with JWT_SECRET (local
+development and tests).
+"""
+import base64
+import hashlib
+import json
+import os
+
+import jwt
+from jwt.algorithms import RSAAlgorithm
+
+_signing = None       # (kid, private_key) when RS256 is configured
+_public_keys = {}     # kid -> public key, every key we publish and accept
+
+
+def _thumbprint(public_key):
+    jwk = RSAAlgorithm.to_jwk(public_key, as_dict=True)
+    canonical = json.dumps({k: jwk[k] for k in ("e", "kty", "n")}, separators=(",", ":"), sort_keys=True)
+    return base64.urlsafe_b64encode(hashlib.sha256(canonical.encode()).digest()).rstrip(b"=").decode()
+
+
+def load_keys(private_pem=None, kid=None, previous_kid=None, previous_public_pem=None):
+    """(Re)load key material; arguments default to the environment."""
+    global _signing, _public_keys
+    private_pem = private_pem if private_pem is not None else os.environ.get("JWT_SIGNING_KEY", "")
+    kid = kid if kid is not None else os.environ.get("JWT_SIGNING_KID", "")
+    previous_kid = previous_kid if previous_kid is not None else os.environ.get("JWT_PREVIOUS_KID", "")
+    previous_public_pem = (
+        previous_public_pem if previous_public_pem is not None
+        else os.environ.get("JWT_PREVIOUS_PUBLIC_KEY", "")
+    )
+
+    # Single-line env values may carry the PEM newlines as "\n"
+    private_pem = private_pem.replace("\\n", "\n")
+    previous_public_pem = previous_public_pem.replace("\\n", "\n")
+
+    _signing, _public_keys = None, {}
+    if private_pem:
+        private_key = RSAAlgorithm(RSAAlgorithm.SHA256).prepare_key(private_pem)
+        kid = kid or _thumbprint(private_key.public_key())
+        _signing = (kid, private_key)
+        _public_keys[kid] = private_key.public_key()
+    if previous_kid and previous_public_pem:
+        _public_keys[previous_kid] = RSAAlgorithm(RSAAlgorithm.SHA256).prepare_key(previous_public_pem)
+
+
+def sign(payload):
+    if _signing is None:
+        return jwt.encode(payload, os.environ["JWT_SECRET"], algorithm="HS256")
+    kid, private_key = _signing
+    return jwt.encode(payload, private_key, algorithm="RS256", headers={"kid": kid})
+
+
+def decode_token(token):
+    """Verify a token this service issued (RS256 by kid, or HS256 while JWT_SECRET is set)."""
+    header = jwt.get_unverified_header(token)
+    if header.get("alg") == "RS256":
+        key = _public_keys.get(header.get("kid"))
+        if key is None:
+            raise jwt.InvalidTokenError("Unknown signing key")
+        return jwt.decode(token, key, algorithms=["RS256"])
+    secret = os.environ.get("JWT_SECRET")
+    if not secret:
+        raise jwt.InvalidTokenError("HS256 tokens are not accepted")
+    return jwt.decode(token, secret, algorithms=["HS256"])
+
+
+def jwks():
+    keys = []
+    for kid, public_key in _public_keys.items():
+        jwk = RSAAlgorithm.to_jwk(public_key, as_dict=True)
+        jwk.update({"kid": kid, "use": "sig", "alg": "RS256"})
+        keys.append(jwk)
+    return {"keys": keys}
+
+
+load_keys()
@@ -7,6 +7,11 @@ os.environ.setdefault("JWT_SECRET", "test-secret")
 os.environ.setdefault("OUTSYSTEMS_API_KEY", "test-key")
 os.environ.setdefault("CREDIT_SERVICE_URL", "http://credit-mock")
 os.environ.setdefault("USER_SERVICE_URL", "http://user-mock")
+# Hash inline; test_password_pool_* opt into the process pool
+os.environ.setdefault("PASSWORD_HASH_WORKERS", "0")
+os.environ.setdefault("REGISTRATION_JOB_WORKERS_ENABLED", "false")
+# No per-process profile copies, so mocked user lookups happen on every call
+os.environ.setdefault("USER_PROFILE_LOCAL_MAX_ENTRIES", "0")
 
 sys.path.insert(0, str(pathlib.Path(__file__).resolve().parents[1]))
 
@@ -1,6 +1,8 @@
+import json
 import os
+import time
 from datetime import datetime, timedelta, timezone
-from unittest.mock import patch
+from unittest.mock import MagicMock, patch
 
 import bcrypt
 import jwt
@@ -28,21 +30,26 @@ def test_health(client):
 
 # ── POST /auth/register ───────────────────────────────────────────────────────
 
+@patch("routes.set_registration_job_status")
+@patch("routes._publish_registration_job")
 @patch("routes.call_credit_service")
 @patch("routes.call_service")
-def test_register_success(mock_svc, mock_credit, client):
+def test_register_success(mock_svc, mock_credit, mock_publish, mock_status, client):
     mock_svc.return_value = (
         {"userId": "u1", "email": "a@b.com", "role": "user", "createdAt": "2025-01-01T00:00:00"},
         None,
     )
-    mock_credit.return_value = ({}, None)
 
     res = client.post("/auth/register", json={
         "email": "a@b.com", "password": "Pass1!", "phoneNumber": "+6591234567",
     })
     assert res.status_code == 201
     assert res.get_json()["data"]["email"] == "a@b.com"
-    assert mock_credit.call_args.kwargs["json"] == {"userId": "u1", "creditBalance": 0}
+    assert res.get_json()["data"]["jobs"] == {"creditAccount": "queued", "otp": "queued"}
+    # Only the user is created inline; OutSystems and the OTP send are queued
+    mock_svc.assert_called_once()
+    mock_credit.assert_not_called()
+    assert [c.args[0]["job"] for c in mock_publish.call_args_list] == ["credit_account", "otp_send"]
 
 
 @patch("routes.call_credit_service")
@@ -64,23 +71,90 @@ def test_register_email_exists(mock_svc, mock_credit, client):
     assert res.get_json()["error"]["code"] == "EMAIL_ALREADY_EXISTS"
 
 
+@patch("routes._get_redis")
 @patch("routes.call_service")
 @patch("routes.call_credit_service")
-def test_register_credit_failure_deletes_user(mock_credit, mock_svc, client):
-    """Credit init failure must trigger a compensating DELETE on the user."""
+def test_register_runs_jobs_inline_when_queue_is_down(mock_credit, mock_svc, mock_redis, client):
+    fake = _FakeRedis()
+    mock_redis.return_value = fake
     mock_svc.side_effect = [
         ({"userId": "u1", "email": "a@b.com", "role": "user", "createdAt": "2025-01-01"}, None),
-        (None, None),  # compensating DELETE
+        ({"sid": "VE_1"}, None),   # OTP send
     ]
     mock_credit.return_value = (None, "SERVICE_UNAVAILABLE")
 
-    res = client.post("/auth/register", json={
-        "email": "a@b.com", "password": "Pass1!", "phoneNumber": "+6591234567",
-    })
-    assert res.status_code == 500
-    # Verify DELETE was called as compensation
-    delete_call = mock_svc.call_args_list[1]
-    assert delete_call[0][0] == "DELETE"
+    with patch("routes._publish_registration_job", side_effect=ConnectionError("broker down")):
+        res = client.post("/auth/register", json={
+            "email": "a@b.com", "password": "Pass1!", "phoneNumber": "+6591234567",
+        })
+
+    assert res.status_code == 201
+    assert res.get_json()["data"]["jobs"] == {"creditAccount": "failed", "otp": "done"}
+    assert fake.values["pending_otp:u1"] == "VE_1"
+    assert mock_credit.call_args.kwargs["json"] == {"userId": "u1", "creditBalance": 0}
+
+
+@patch("routes._get_redis")
+@patch("routes.call_service")
+def test_register_does_not_overwrite_a_fast_workers_status(mock_svc, mock_redis, client):
+    import routes
+
+    fake = _FakeRedis()
+    mock_redis.return_value = fake
+    mock_svc.return_value = ({"userId": "u1", "email": "a@b.com", "role": "user", "createdAt": "2025-01-01"}, None)
+
+    def publish_and_finish(message):
+        # The worker picks the job up and finishes before publish returns
+        routes.set_registration_job_status(message["userId"], message["job"], "done")
+
+    with patch("routes._publish_registration_job", side_effect=publish_and_finish):
+        res = client.post("/auth/register", json={
+            "email": "a@b.com", "password": "Pass1!", "phoneNumber": "+6591234567",
+        })
+
+    assert res.status_code == 201
+    assert fake.hashes["registration_jobs:u1"]["creditAccount"] == "done"
+    assert fake.hashes["registration_jobs:u1"]["otp"] == "done"
+
+
+def test_registration_worker_drops_undecodable_message():
+    import registration_worker
+
+    ch, method = MagicMock(), MagicMock(delivery_tag=3)
+
+    registration_worker.handle_message(ch, method, b"\xff\xfe")
+
+    ch.basic_nack.assert_called_once_with(delivery_tag=3, requeue=False)
+
+
+@patch("routes._get_redis")
+@patch("routes.call_service")
+def test_registration_job_retries_then_reports_through_verify(mock_svc, mock_redis, client, monkeypatch):
+    import registration_worker
+
+    fake = _FakeRedis()
+    mock_redis.return_value = fake
+    monkeypatch.setattr(registration_worker, "REGISTRATION_JOB_RETRY_DELAY_SECONDS", 0)
+    monkeypatch.setattr(registration_worker, "REGISTRATION_JOB_MAX_ATTEMPTS", 2)
+    ch, method = MagicMock(), MagicMock(delivery_tag=7)
+    message = {"job": "otp_send", "userId": "u1", "phoneNumber": "+65", "attempt": 1}
+    mock_svc.return_value = (None, "SERVICE_UNAVAILABLE")
+
+    with patch("routes._publish_registration_job") as mock_publish:
+        registration_worker.handle_message(ch, method, json.dumps(message))
+    assert mock_publish.call_args.args[0]["attempt"] == 2
+    ch.basic_ack.assert_called_once_with(delivery_tag=7)
+    res = client.post("/auth/verify-registration", json={"userId": "u1", "otpCode": "123456"})
+    assert (res.status_code, res.get_json()["error"]["code"]) == (409, "VERIFICATION_PENDING")
+
+    registration_worker.handle_message(ch, method, json.dumps({**message, "attempt": 2}))
+    res = client.post("/auth/verify-registration", json={"userId": "u1"})
+    assert res.get_json()["data"]["jobs"]["otp"] == "failed"
+    res = client.post("/auth/verify-registration", json={"userId": "u1", "otpCode": "123456"})
+    assert res.status_code == 502
+
+    registration_worker.handle_message(ch, method, b"not json")
+    ch.basic_nack.assert_called_once_with(delivery_tag=7, requeue=False)
 
 
 # ── POST /auth/login ──────────────────────────────────────────────────────────
@@ -131,6 +205,112 @@ def test_login_flagged_account(mock_svc, client):
     assert res.get_json()["error"]["code"] == "AUTH_FORBIDDEN"
 
 
+@patch("routes.call_service")
+def test_login_rehashes_when_cost_changed(mock_svc, client, monkeypatch):
+    import password_hasher
+
+    monkeypatch.setattr(password_hasher, "BCRYPT_ROUNDS", 5)
+    pw = bcrypt.hashpw(b"Pass1!", bcrypt.gensalt(rounds=4)).decode()
+    mock_svc.side_effect = [
+        ({"userId": "u1", "email": "a@b.com", "password": pw, "role": "user", "isFlagged": False}, None),
+        ({}, None),  # PATCH with the new hash
+    ]
+
+    res = client.post("/auth/login", json={"email": "a@b.com", "password": "Pass1!"})
+    assert res.status_code == 200
+    method, url = mock_svc.call_args.args
+    stored = mock_svc.call_args.kwargs["json"]
+    assert (method, url) == ("PATCH", "http://user-mock/users/u1")
+    assert stored["password"].startswith("$2b$05$")
+    assert stored["salt"] == stored["password"][:29]
+    assert bcrypt.checkpw(b"Pass1!", stored["password"].encode())
+
+
+@patch("routes.call_service")
+def test_login_busy_when_hash_queue_full(mock_svc, client, monkeypatch):
+    import threading
+
+    import password_hasher
+
+    monkeypatch.setattr(password_hasher, "PASSWORD_HASH_WORKERS", 1)
+    monkeypatch.setattr(password_hasher, "_slots", threading.BoundedSemaphore(1))
+    password_hasher._slots.acquire()  # every slot taken
+    mock_svc.return_value = ({
+        "userId": "u1", "email": "a@b.com", "password": "$2b$12$" + "x" * 53,
+        "role": "user", "isFlagged": False,
+    }, None)
+    rejected = password_hasher.stats()["rejected"]
+
+    res = client.post("/auth/login", json={"email": "a@b.com", "password": "Pass1!"})
+    assert res.status_code == 503
+    assert res.headers["Retry-After"] == "1"
+    assert res.get_json()["error"]["code"] == "SERVICE_BUSY"
+    assert password_hasher.stats()["rejected"] == rejected + 1
+
+
+@patch("routes.call_service")
+def test_concurrent_logins_beyond_hash_capacity_fail_fast(mock_svc, app, monkeypatch):
+    """With threaded workers, requests past workers + queue limit get 503 while the rest wait."""
+    import threading
+    from concurrent.futures import Future, ThreadPoolExecutor
+
+    import password_hasher
+
+    release = threading.Event()
+    running = threading.Semaphore(0)
+
+    class SlowPool:
+        def submit(self, fn, *args):
+            future = Future()
+
+            def run():
+                running.release()
+                release.wait(5)
+                future.set_result(fn(*args))
+
+            threading.Thread(target=run, daemon=True).start()
+            return future
+
+    monkeypatch.setattr(password_hasher, "PASSWORD_HASH_WORKERS", 1)
+    monkeypatch.setattr(password_hasher, "BCRYPT_ROUNDS", 4)
+    monkeypatch.setattr(password_hasher, "_slots", threading.BoundedSemaphore(1 + 1))  # workers + queue limit
+    monkeypatch.setattr(password_hasher, "_get_pool", SlowPool)
+    mock_svc.return_value = ({
+        "userId": "u1", "email": "a@b.com", "role": "user", "isFlagged": False,
+        "password": bcrypt.hashpw(b"Pass1!", bcrypt.gensalt(rounds=4)).decode(),
+    }, None)
+
+    def login():
+        return app.test_client().post("/auth/login", json={"email": "a@b.com", "password": "Pass1!"})
+
+    with ThreadPoolExecutor(max_workers=2) as request_threads:
+        waiting = [request_threads.submit(login) for _ in range(2)]
+        assert running.acquire(timeout=5) and running.acquire(timeout=5)
+        busy = login()
+        release.set()
+        statuses = [future.result(timeout=10).status_code for future in waiting]
+
+    assert busy.status_code == 503
+    assert busy.get_json()["error"]["code"] == "SERVICE_BUSY"
+    assert statuses == [200, 200]
+
+
+def test_password_pool_hashes_and_checks_off_process(monkeypatch):
+    import password_hasher
+
+    monkeypatch.setattr(password_hasher, "PASSWORD_HASH_WORKERS", 1)
+    monkeypatch.setattr(password_hasher, "BCRYPT_ROUNDS", 4)
+    monkeypatch.setattr(password_hasher, "_pool", None)
+    try:
+        hashed, salt = password_hasher.hash_password("Pass1!")
+        assert hashed.startswith("$2b$04$") and hashed.startswith(salt)
+        assert password_hasher.check_password("Pass1!", hashed)
+        assert not password_hasher.check_password("Wrong!", hashed)
+        assert password_hasher.stats()["checks"] >= 2
+    finally:
+        password_hasher._pool.shutdown()
+
+
 def test_login_missing_fields(client):
     res = client.post("/auth/login", json={"email": "a@b.com"})
     assert res.status_code == 400
@@ -174,3 +354,180 @@ def test_staff_login_embeds_venue_id(mock_svc, client):
     token = res.get_json()["data"]["token"]
     decoded = jwt.decode(token, os.environ["JWT_SECRET"], algorithms=["HS256"])
     assert decoded["venueId"] == "ven_001"
+
+
+# ── Local token revocation copy ───────────────────────────────────────────────
+
+class _FakeRedis:
+    def __init__(self, keys=()):
+        self.keys = set(keys)
+        self.values = {}
+        self.hashes = {}
+        self.exists_calls = 0
+        self.published = []
+
+    def pipeline(self):
+        return _FakePipeline(self)
+
+    def setex(self, key, _ttl, value):
+        self.keys.add(key)
+        self.values[key] = value
+
+    def hset(self, key, mapping):
+        self.hashes.setdefault(key, {}).update(mapping)
+
+    def expire(self, key, _ttl):
+        pass
+
+    def incr(self, key):
+        self.values[key] = int(self.values.get(key, 0)) + 1
+        return self.values[key]
+
+    def get(self, key):
+        return self.values.get(key)
+
+    def hincrby(self, key, field, amount):
+        self.hashes.setdefault(key, {})
+        self.hashes[key][field] = self.hashes[key].get(field, 0) + amount
+
+    def hgetall(self, key):
+        return {k: str(v) for k, v in self.hashes.get(key, {}).items()}
+
+    def exists(self, key):
+        self.exists_calls += 1
+        return int(key in self.keys)
+
+    def publish(self, channel, message):
+        self.published.append((channel, message))
+
+    def scan_iter(self, match, count):
+        prefix = match.rstrip("*")
+        return [k for k in self.keys if k.startswith(prefix)]
+
+
+class _FakePipeline:
+    def __init__(self, redis):
+        self.redis, self.calls = redis, []
+
+    def __getattr__(self, name):
+        return lambda *args, **kwargs: self.calls.append((name, args, kwargs))
+
+    def execute(self):
+        return [getattr(self.redis, name)(*args, **kwargs) for name, args, kwargs in self.calls]
+
+
+def _synced_blacklist(fake):
+    from token_blacklist import TokenBlacklist
+
+    blacklist = TokenBlacklist(redis_url="redis://test", local_cache=True)
+    blacklist._sync_thread = object()  # no background subscriber in tests
+    blacklist._client, blacklist._connected = fake, True
+    blacklist.resync(fake)
+    blacklist._live = True
+    return blacklist
+
+
+def test_revocation_copy_answers_locally():
+    fake = _FakeRedis({"token_blacklist:jti-old"})
+    blacklist = _synced_blacklist(fake)
+
+    assert blacklist.is_blacklisted("jti-fresh") is False
+    assert blacklist.is_blacklisted("jti-old") is True
+    assert fake.exists_calls == 0
+
+    assert blacklist.blacklist_token("jti-new", int(time.time()) + 60) is True
+    assert fake.published == [("token_revocations", "jti-new")]
+    assert blacklist.is_blacklisted("jti-new") is True
+    assert fake.exists_calls == 0
+
+
+def test_revocation_copy_falls_back_to_redis():
+    fake = _FakeRedis({f"token_blacklist:jti-{i}" for i in range(3)})
+    blacklist = _synced_blacklist(fake)
+    blacklist._revoked.lru_size = 1
+    blacklist._revoked.add("jti-2")  # evicts the others from the exact LRU
+
+    assert blacklist.is_blacklisted("jti-0") is True  # bloom hit, confirmed by Redis
+    assert fake.exists_calls == 1
+
+    blacklist._live, blacklist._stale_after = False, 0.0  # subscription gone too long
+    assert blacklist.is_blacklisted("jti-unknown") is False
+    assert fake.exists_calls == 2
+
+
+def test_revoke_all_bumps_generation_and_counts():
+    fake = _FakeRedis()
+    blacklist = _synced_blacklist(fake)
+
+    assert blacklist.get_user_generation("u1") == 0
+    assert blacklist.is_generation_current("u1", 0) is True
+    assert blacklist.revoke_all_user_tokens("u1") is True
+
+    assert fake.published == [("token_generations", "u1:1")]
+    assert blacklist.is_generation_current("u1", 0) is False
+    assert blacklist.is_generation_current("u1", 1) is True
+    blacklist._on_message("token_generations", "u1:0")  # late message never rolls back
+    assert blacklist.get_user_generation("u1") == 1
+
+    blacklist.blacklist_token("jti-1", int(time.time()) + 60)
+    stats = blacklist.get_stats()
+    assert stats["blacklisted_total"] == 1 and stats["revoke_all_total"] == 1
+
+
+@patch("routes.call_service")
+def test_token_from_before_logout_all_is_rejected(mock_svc, client, monkeypatch):
+    import token_blacklist
+
+    blacklist = _synced_blacklist(_FakeRedis())
+    monkeypatch.setattr(token_blacklist, "_blacklist_instance", blacklist)
+    token = jwt.encode({
+        "userId": "usr_001", "email": "a@b.com", "role": "user", "jti": "j1", "gen": 0,
+        "exp": datetime.now(timezone.utc) + timedelta(hours=1),
+    }, os.environ["JWT_SECRET"], algorithm="HS256")
+    headers = {"Authorization": f"Bearer {token}"}
+
+    res = client.post("/auth/logout-all", headers=headers)
+    assert res.status_code == 200
+
+    res = client.get("/auth/me", headers=headers)
+    assert res.status_code == 401
+    assert res.get_json()["error"]["code"] == "AUTH_TOKEN_REVOKED"
+    mock_svc.assert_not_called()
+
+
+# ── RS256 signing and JWKS ────────────────────────────────────────────────────
+
+def _rsa_pem():
+    from cryptography.hazmat.primitives import serialization
+    from cryptography.hazmat.primitives.asymmetric import rsa
+
+    key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    return key.private_bytes(
+        serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8, serialization.NoEncryption(),
+    ).decode()
+
+
+@patch("routes.call_service")
+def test_rs256_tokens_verify_against_published_jwks(mock_svc, client):
+    import signing_keys
+
+    signing_keys.load_keys(_rsa_pem(), "k2", "k1", "")  # no previous key material → not published
+    try:
+        pw = bcrypt.hashpw(b"Pass1!", bcrypt.gensalt(rounds=4)).decode()
+        user = {"userId": "u1", "email": "a@b.com", "password": pw, "role": "user", "isFlagged": False,
+                "createdAt": "2025-01-01T00:00:00"}
+        mock_svc.return_value = (user, None)
+        with patch("routes.needs_rehash", return_value=False):
+            token = client.post("/auth/login", json={"email": "a@b.com", "password": "Pass1!"}).get_json()["data"]["token"]
+
+        assert jwt.get_unverified_header(token) == {"alg": "RS256", "kid": "k2", "typ": "JWT"}
+        keys = client.get("/.well-known/jwks.json").get_json()["keys"]
+        assert [k["kid"] for k in keys] == ["k2"]
+        public_key = jwt.PyJWK(keys[0]).key
+        assert jwt.decode(token, public_key, algorithms=["RS256"])["userId"] == "u1"
+        assert client.get("/auth/me", headers={"Authorization": f"Bearer {token}"}).status_code == 200
+
+        forged = jwt.encode({"userId": "u1", "exp": 9999999999}, _rsa_pem(), algorithm="RS256", headers={"kid": "k2"})
+        assert client.get("/auth/me", headers={"Authorization": f"Bearer {forged}"}).status_code == 401
+    finally:
+        signing_keys.load_keys("", "", "", "")
@@ -1,3 +1,6 @@
+import os
+import threading
+
 from flask import Flask, jsonify
 from dotenv import load_dotenv
 from flasgger import Swagger
@@ -25,6 +28,14 @@ def create_app(test_config=None):
     }
     Swagger(app)
 
+    if os.environ.get("BALANCE_SYNC_ENABLED", "true").lower() == "true" and not app.config.get("TESTING"):
+        from balance_sync import start_balance_sync
+        threading.Thread(target=start_balance_sync, daemon=True, name="balance-sync").start()
+
+    if os.environ.get("CREDIT_TOPUP_WORKERS_ENABLED", "true").lower() == "true" and not app.config.get("TESTING"):
+        from topup_worker import start_topup_workers
+        start_topup_workers(app)
+
     from routes import bp
     app.register_blueprint(bp)
 
@@ -0,0 +1,63 @@
+"""
+OutSystems balance reconciliation.
+
+credit-transaction-service owns the running balance; OutSystems keeps a copy
+for the systems that still read it. Every BALANCE_SYNC_INTERVAL_SECONDS this
+loop claims a batch of balances that changed since their last push, writes
+each one's latest absolute value to OutSystems, and records the version it
+pushed. A user with many ledger entries between runs costs one PATCH, and a
+balance that moves again mid-push stays unsynced for the next run.
+"""
+import logging
+import os
+import time
+
+from service_client import call_credit_service, call_service
+
+logger = logging.getLogger(__name__)
+
+CREDIT_TXN_SERVICE = os.environ.get("CREDIT_TRANSACTION_SERVICE_URL", "http://credit-transaction-service:5000")
+BALANCE_SYNC_INTERVAL_SECONDS = float(os.environ.get("BALANCE_SYNC_INTERVAL_SECONDS", "10"))
+BALANCE_SYNC_BATCH_SIZE = int(os.environ.get("BALANCE_SYNC_BATCH_SIZE", "100"))
+BALANCE_SYNC_LEASE_SECONDS = int(os.environ.get("BALANCE_SYNC_LEASE_SECONDS", "60"))
+
+
+def sync_balances_once(batch_size=BALANCE_SYNC_BATCH_SIZE):
+    """Push one batch to OutSystems. Returns the number of balances synced."""
+    batch, err = call_service("POST", f"{CREDIT_TXN_SERVICE}/balances/sync-batch", json={
+        "limit": batch_size,
+        "leaseSeconds": BALANCE_SYNC_LEASE_SECONDS,
+    })
+    if err:
+        logger.warning("Could not claim balances to sync: %s", err)
+        return 0
+
+    synced = []
+    for balance in batch.get("balances", []):
+        _, err = call_credit_service("PATCH", f"/credits/{balance['userId']}", json={
+            "creditBalance": balance["creditBalance"],
+        })
+        if err:
+            # Left leased; the next claim after the lease retries it
+            logger.warning("OutSystems sync failed for %s: %s", balance["userId"], err)
+            continue
+        synced.append({"userId": balance["userId"], "version": balance["version"]})
+
+    if synced:
+        _, err = call_service("POST", f"{CREDIT_TXN_SERVICE}/balances/synced", json={"balances": synced})
+        if err:
+            logger.warning("Could not record %d synced balances: %s", len(synced), err)
+            return 0
+    return len(synced)
+
+
+def start_balance_sync():
+    """Blocking sync loop — run in a daemon thread."""
+    while True:
+        try:
+            # Keep draining while full batches come back
+            while sync_balances_once() >= BALANCE_SYNC_BATCH_SIZE:
+                pass
+        except Exception as exc:
+            logger.warning("Balance sync run failed: %s", exc)
+        time.sleep(BALANCE_SYNC_INTERVAL_SECONDS)
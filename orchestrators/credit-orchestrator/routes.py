@@ -2,24 +2,82 @@
 Credit Orchestrator.
 Handles credit balance enquiry, Stripe top-up initiation, and webhook processing.
 The Stripe webhook endpoint is NOT protected by JWT — Stripe calls it directly.
+
+Balances live in credit-transaction-service: every ledger entry moves the
+user's running balance in the same transaction. A user's first balance read
+seeds it from OutSystems; afterwards OutSystems is only a mirror, updated in
+batches by balance_sync.
+
+Stripe webhooks are acknowledged as soon as the signature is verified and the
+top-up is durably queued on credit_topup_queue; topup_worker applies them.
 """
+import json
+import logging
 import os
 
+import pika
 from flask import Blueprint, jsonify, request
 
 from middleware import require_auth
 from service_client import call_credit_service, call_service
+from shared.credit_balance_cache import CreditBalanceCache
 
 bp = Blueprint("credits", __name__)
+logger = logging.getLogger(__name__)
 
 STRIPE_WRAPPER     = os.environ.get("STRIPE_WRAPPER_URL",              "http://stripe-wrapper:5000")
 CREDIT_TXN_SERVICE = os.environ.get("CREDIT_TRANSACTION_SERVICE_URL",  "http://credit-transaction-service:5000")
+CREDIT_TOPUP_QUEUE = "credit_topup_queue"
+CREDIT_TOPUP_DLQ = "credit_topup_dlq"
+# Ledger refusals a retry cannot change
+PERMANENT_LEDGER_ERRORS = ("REFERENCE_CONFLICT", "VALIDATION_ERROR")
 
 
 def _error(code, message, status):
     return jsonify({"error": {"code": code, "message": message}}), status
 
 
+def _get_balance(user_id):
+    """(balance, err) from the local ledger, seeding it from OutSystems on first use."""
+    data, err = call_service("GET", f"{CREDIT_TXN_SERVICE}/balances/{user_id}")
+    if err != "BALANCE_NOT_FOUND":
+        return data, err
+    credit_data, err = call_credit_service("GET", f"/credits/{user_id}")
+    if err:
+        return None, err
+    return call_service("POST", f"{CREDIT_TXN_SERVICE}/balances", json={
+        "userId": user_id,
+        "creditBalance": credit_data.get("creditBalance") or 0,
+    })
+
+
+# Late-bound so the fetch can be swapped in tests
+credit_balances = CreditBalanceCache(lambda user_id: _get_balance(user_id))
+
+
+def _credit_topup(user_id, credits, payment_intent_id):
+    """
+    Record the top-up; the ledger insert moves the balance. The ledger keeps
+    one entry per (referenceId, reason), so a repeat for the same payment
+    intent returns the recorded entry with created=False instead of crediting
+    twice. Returns (txn, err).
+    """
+    _, err = credit_balances.get(user_id)
+    if err:
+        return None, err
+    txn, err = call_service("POST", f"{CREDIT_TXN_SERVICE}/credit-transactions", json={
+        "userId":      user_id,
+        "delta":       credits,
+        "reason":      "topup",
+        "referenceId": payment_intent_id,
+    })
+    if err:
+        credit_balances.invalidate(user_id)
+        return None, err
+    credit_balances.put_ledger_entry(user_id, txn)
+    return txn, None
+
+
 # ── GET /credits/balance ──────────────────────────────────────────────────────
 
 @bp.get("/credits/balance")
@@ -34,13 +92,13 @@ def get_balance():
       - BearerAuth: []
     responses:
       200:
-        description: Credit balance from OutSystems
+        description: Credit balance (creditBalance) from the ledger
       401:
         description: Unauthorized
       503:
         description: Credit service unavailable
     """
-    data, err = call_credit_service("GET", f"/credits/{request.user['userId']}")
+    data, err = credit_balances.get(request.user["userId"])
     if err:
         return _error("SERVICE_UNAVAILABLE", "Could not retrieve balance.", 503)
     return jsonify({"data": data}), 200
@@ -172,30 +230,13 @@ def confirm_topup():
     if str(user_id) != str(request.user["userId"]):
         return _error("FORBIDDEN", "Payment does not belong to this user.", 403)
 
-    # Idempotency — guard against double credit
-    existing, _ = call_service("GET", f"{CREDIT_TXN_SERVICE}/credit-transactions/reference/{payment_intent_id}")
-    if existing:
-        return jsonify({"data": {"status": "already_processed"}}), 200
-
-    credit_data, err = call_credit_service("GET", f"/credits/{user_id}")
-    if err:
-        return _error("SERVICE_UNAVAILABLE", "Could not retrieve balance.", 503)
-
-    current_balance = credit_data.get("creditBalance") or 0
-    new_balance = current_balance + credits
-
-    _, err = call_credit_service("PATCH", f"/credits/{user_id}", json={"creditBalance": new_balance})
+    txn, err = _credit_topup(user_id, credits, payment_intent_id)
     if err:
         return _error("SERVICE_UNAVAILABLE", "Could not update balance.", 503)
+    if not txn.get("created", True):
+        return jsonify({"data": {"status": "already_processed"}}), 200
 
-    call_service("POST", f"{CREDIT_TXN_SERVICE}/credit-transactions", json={
-        "userId": user_id,
-        "delta": credits,
-        "reason": "topup",
-        "referenceId": payment_intent_id,
-    })
-
-    return jsonify({"data": {"status": "confirmed", "new_balance": new_balance}}), 200
+    return jsonify({"data": {"status": "confirmed", "new_balance": txn.get("balanceAfter")}}), 200
 
 
 # ── POST /credits/topup/webhook ───────────────────────────────────────────────
@@ -214,9 +255,11 @@ def stripe_webhook():
         type: string
     responses:
       200:
-        description: Webhook processed
+        description: Webhook verified and the top-up queued (or not a payment event)
       400:
         description: Invalid Stripe signature
+      503:
+        description: Top-up could not be queued; Stripe will redeliver
     """
     payload   = request.get_data(cache=False, as_text=False)
     signature = request.headers.get("Stripe-Signature", "")
@@ -234,45 +277,73 @@ def stripe_webhook():
     if not result.get("userId"):
         return jsonify({"received": True}), 200
 
-    user_id           = result["userId"]
-    credits           = int(result["credits"])
-    payment_intent_id = result["paymentIntentId"]
-    stripe_event_id   = result.get("eventId")  # Stripe event ID for idempotency
-
-    # Idempotency — guard against duplicate Stripe deliveries using Stripe event ID
-    # This prevents replay attacks where the same event is delivered multiple times
-    if stripe_event_id:
-        existing, _ = call_service("GET", f"{CREDIT_TXN_SERVICE}/credit-transactions/reference/{stripe_event_id}")
-        if existing:
-            return jsonify({"received": True}), 200
-    else:
-        # Fallback to payment_intent_id if event ID not available
-        existing, _ = call_service("GET", f"{CREDIT_TXN_SERVICE}/credit-transactions/reference/{payment_intent_id}")
-        if existing:
-            return jsonify({"received": True}), 200
-
-    # Fetch current balance from OutSystems
-    credit_data, err = call_credit_service("GET", f"/credits/{user_id}")
-    if err:
-        return _error("SERVICE_UNAVAILABLE", "Could not retrieve balance.", 503)
-
-    current_balance = credit_data.get("creditBalance") or 0
-    new_balance = current_balance + credits
+    try:
+        _publish_topup({
+            "userId":          result["userId"],
+            "credits":         result["credits"],
+            "paymentIntentId": result["paymentIntentId"],
+            "eventId":         result.get("eventId"),
+        })
+    except Exception as exc:
+        # Not acknowledged, so Stripe redelivers it later
+        logger.warning("Failed to enqueue Stripe event %s: %s", result.get("eventId"), exc)
+        return _error("SERVICE_UNAVAILABLE", "Could not queue top-up.", 503)
 
-    # Update balance in OutSystems
-    _, err = call_credit_service("PATCH", f"/credits/{user_id}", json={"creditBalance": new_balance})
-    if err:
-        return _error("SERVICE_UNAVAILABLE", "Could not update balance.", 503)
+    return jsonify({"received": True}), 200
 
-    # Log to Credit Transaction Service with Stripe event ID for idempotency
-    call_service("POST", f"{CREDIT_TXN_SERVICE}/credit-transactions", json={
-        "userId":      user_id,
-        "delta":       credits,
-        "reason":      "topup",
-        "referenceId": stripe_event_id or payment_intent_id,
-    })
 
-    return jsonify({"received": True}), 200
+def _publish_topup(message):
+    """Publish with confirms; raises unless the broker has taken the message."""
+    conn = pika.BlockingConnection(pika.ConnectionParameters(
+        host=os.environ.get("RABBITMQ_HOST", "rabbitmq"),
+        port=int(os.environ.get("RABBITMQ_PORT", "5672")),
+        credentials=pika.PlainCredentials(
+            os.environ.get("RABBITMQ_USER", "guest"),
+            os.environ.get("RABBITMQ_PASS", "guest"),
+        ),
+        connection_attempts=2,
+        retry_delay=1,
+    ))
+    try:
+        ch = conn.channel()
+        ch.confirm_delivery()
+        ch.basic_publish(
+            exchange="",
+            routing_key=CREDIT_TOPUP_QUEUE,
+            body=json.dumps(message),
+            properties=pika.BasicProperties(delivery_mode=2, content_type="application/json"),
+            mandatory=True,
+        )
+    finally:
+        conn.close()
+
+
+class InvalidTopup(ValueError):
+    pass
+
+
+def process_topup(message):
+    """
+    Apply one queued top-up. Redelivery is safe: the ledger keeps one entry
+    per payment intent. Raises InvalidTopup for a message that can never
+    apply (malformed, or refused by the ledger) and RuntimeError when it
+    should be retried.
+    """
+    try:
+        user_id = message["userId"]
+        credits = int(message["credits"])
+        payment_intent_id = message["paymentIntentId"]
+    except (KeyError, TypeError, ValueError) as exc:
+        raise InvalidTopup(f"Malformed top-up message: {exc}") from exc
+
+    txn, err = _credit_topup(user_id, credits, payment_intent_id)
+    if err in PERMANENT_LEDGER_ERRORS:
+        raise InvalidTopup(f"Top-up {payment_intent_id} for {user_id} refused by the ledger: {err}")
+    if err:
+        raise RuntimeError(f"Top-up {payment_intent_id} for {user_id} failed: {err}")
+    if txn.get("created", True):
+        logger.info("Applied top-up %s: %d credits for %s", payment_intent_id, credits, user_id)
+    return txn
 
 
 # ── GET /credits/transactions ─────────────────────────────────────────────────
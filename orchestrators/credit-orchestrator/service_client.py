@@ -5,10 +5,15 @@ import os
 
 import requests
 
+from shared.outbound_governor import GovernorSaturated, governor
+
 
 # Configurable timeout for OutSystems calls (default 5 seconds)
 OUTSYSTEMS_TIMEOUT = int(os.environ.get("OUTSYSTEMS_TIMEOUT_SECONDS", "5"))
 
+# OutSystems is external and rate limited; a stall there must not take every worker
+outsystems = governor("outsystems", max_concurrent=10, rate_per_second=50, queue_timeout_seconds=1)
+
 
 def call_service(method, url, **kwargs):
     """
@@ -40,10 +45,15 @@ def call_credit_service(method, path, **kwargs):
     Call the OutSystems Credit Service.
     Automatically injects the OUTSYSTEMS_API_KEY header.
     Uses configurable timeout from OUTSYSTEMS_TIMEOUT_SECONDS env var.
+    Fails fast with SERVICE_UNAVAILABLE when the outsystems governor is saturated.
     """
     headers = kwargs.pop("headers", {})
     headers["X-API-KEY"] = os.environ["OUTSYSTEMS_API_KEY"]
     base = os.environ["CREDIT_SERVICE_URL"].rstrip("/")
     # Apply OutSystems-specific timeout if not already set
     kwargs.setdefault("timeout", OUTSYSTEMS_TIMEOUT)
-    return call_service(method, f"{base}{path}", headers=headers, **kwargs)
+    try:
+        with outsystems.slot():
+            return call_service(method, f"{base}{path}", headers=headers, **kwargs)
+    except GovernorSaturated:
+        return None, "SERVICE_UNAVAILABLE"
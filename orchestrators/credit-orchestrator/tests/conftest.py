@@ -2,7 +2,11 @@ import os, sys, pathlib
 os.environ.setdefault("JWT_SECRET", "test-secret")
 os.environ.setdefault("OUTSYSTEMS_API_KEY", "test-key")
 os.environ.setdefault("CREDIT_SERVICE_URL", "http://credit-mock")
+os.environ.setdefault("BALANCE_SYNC_ENABLED", "false")
+os.environ.setdefault("CREDIT_TOPUP_WORKERS_ENABLED", "false")
 sys.path.insert(0, str(pathlib.Path(__file__).resolve().parents[1]))
+# Repo root, for `shared.*`
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parents[3]))
 import pytest
 from app import create_app
 
@@ -1,7 +1,7 @@
 """Tests for credit-orchestrator."""
 import os
 from datetime import datetime, timedelta, timezone
-from unittest.mock import patch
+from unittest.mock import MagicMock, patch
 
 import jwt
 
@@ -22,14 +22,89 @@ def test_health(client):
     assert client.get("/health").status_code == 200
 
 
+# ── RS256 tokens verified against the auth JWKS ───────────────────────────────
+
+@patch("middleware.requests.get")
+@patch("routes.call_service")
+def test_rs256_token_verified_with_cached_jwks(mock_svc, mock_jwks, client, monkeypatch):
+    import middleware
+    from cryptography.hazmat.primitives.asymmetric import rsa
+    from jwt.algorithms import RSAAlgorithm
+
+    key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    jwk = {**RSAAlgorithm.to_jwk(key.public_key(), as_dict=True), "kid": "k1", "alg": "RS256"}
+    mock_jwks.return_value = MagicMock(json=MagicMock(return_value={"keys": [jwk]}))
+    monkeypatch.setattr(middleware, "_jwks", {"keys": {}, "fetched": None})
+    mock_svc.return_value = ({"userId": "usr_001", "creditBalance": 100.0}, None)
+
+    def token(kid):
+        return jwt.encode({"userId": "usr_001", "role": "user",
+                           "exp": datetime.now(timezone.utc) + timedelta(hours=1)},
+                          key, algorithm="RS256", headers={"kid": kid})
+
+    for _ in range(3):
+        assert client.get("/credits/balance", headers={"Authorization": f"Bearer {token('k1')}"}).status_code == 200
+    # An unknown kid right after a fetch is refused without another fetch
+    assert client.get("/credits/balance", headers={"Authorization": f"Bearer {token('k9')}"}).status_code == 401
+    assert mock_jwks.call_count == 1
+
+
+def test_jwks_refetch_does_not_block_cached_keys(monkeypatch):
+    """A slow refetch for a new kid holds no lock that readers of a cached key need."""
+    import threading
+    import time
+
+    import middleware
+
+    fetching = threading.Event()
+    release = threading.Event()
+
+    def slow_get(url, timeout):
+        fetching.set()
+        release.wait(5)
+        return MagicMock(json=MagicMock(return_value={"keys": []}))
+
+    monkeypatch.setattr(middleware.requests, "get", slow_get)
+    # k1 cached a while ago: still valid, but old enough that an unknown kid refetches
+    stale = time.monotonic() - middleware.JWKS_MIN_REFRESH_SECONDS - 1
+    monkeypatch.setattr(middleware, "_jwks", {"keys": {"k1": "key-1"}, "fetched": stale})
+
+    refetch = threading.Thread(target=middleware._signing_key, args=("k9",))
+    refetch.start()
+    try:
+        assert fetching.wait(5)
+        started = time.monotonic()
+        assert middleware._signing_key("k1") == "key-1"
+        assert time.monotonic() - started < 1
+    finally:
+        release.set()
+        refetch.join(5)
+
+
 # ── GET /credits/balance ──────────────────────────────────────────────────────
 
 @patch("routes.call_credit_service")
-def test_balance_success(mock_credit, client):
-    mock_credit.return_value = ({"creditBalance": 100.0}, None)
+@patch("routes.call_service")
+def test_balance_success(mock_svc, mock_credit, client):
+    mock_svc.return_value = ({"userId": "usr_001", "creditBalance": 100.0}, None)
     res = client.get("/credits/balance", headers=_auth())
     assert res.status_code == 200
     assert res.get_json()["data"]["creditBalance"] == 100.0
+    mock_credit.assert_not_called()
+
+
+@patch("routes.call_credit_service")
+@patch("routes.call_service")
+def test_balance_seeded_from_outsystems_on_first_read(mock_svc, mock_credit, client):
+    mock_svc.side_effect = [
+        (None, "BALANCE_NOT_FOUND"),
+        ({"userId": "usr_001", "creditBalance": 75.0}, None),
+    ]
+    mock_credit.return_value = ({"creditBalance": 75.0}, None)
+    res = client.get("/credits/balance", headers=_auth())
+    assert res.status_code == 200
+    assert res.get_json()["data"]["creditBalance"] == 75.0
+    assert mock_svc.call_args_list[1][1]["json"] == {"userId": "usr_001", "creditBalance": 75.0}
 
 
 def test_balance_no_auth(client):
@@ -37,7 +112,9 @@ def test_balance_no_auth(client):
 
 
 @patch("routes.call_credit_service")
-def test_balance_outsystems_down(mock_credit, client):
+@patch("routes.call_service")
+def test_balance_outsystems_down(mock_svc, mock_credit, client):
+    mock_svc.return_value = (None, "BALANCE_NOT_FOUND")
     mock_credit.return_value = (None, "SERVICE_UNAVAILABLE")
     assert client.get("/credits/balance", headers=_auth()).status_code == 503
 
@@ -68,21 +145,49 @@ def test_topup_initiate_no_auth(client):
 
 # ── POST /credits/topup/webhook ───────────────────────────────────────────────
 
+@patch("routes._publish_topup")
 @patch("routes.call_credit_service")
 @patch("routes.call_service")
-def test_webhook_success(mock_svc, mock_credit, client):
-    mock_svc.side_effect = [
-        ({"userId": "usr_001", "credits": "50", "paymentIntentId": "pi_001"}, None),  # wrapper verify
-        (None, "TRANSACTION_NOT_FOUND"),   # idempotency check — not found
-        (None, None),                      # log transaction
-    ]
-    mock_credit.side_effect = [
-        ({"creditBalance": 100.0}, None),   # GET balance
-        ({}, None),                         # PATCH balance
-    ]
+def test_webhook_success(mock_svc, mock_credit, mock_publish, client):
+    mock_svc.return_value = (
+        {"userId": "usr_001", "credits": "50", "paymentIntentId": "pi_001", "eventId": "evt_001"}, None,
+    )
     res = client.post("/credits/topup/webhook",
                       data=b'{}', headers={"Stripe-Signature": "sig", "Content-Type": "application/json"})
     assert res.status_code == 200
+    mock_publish.assert_called_once_with(
+        {"userId": "usr_001", "credits": "50", "paymentIntentId": "pi_001", "eventId": "evt_001"},
+    )
+    mock_svc.assert_called_once()  # only the signature check runs inline
+    mock_credit.assert_not_called()
+
+
+@patch("routes._publish_topup", side_effect=ConnectionError("broker down"))
+@patch("routes.call_service")
+def test_webhook_queue_down_asks_for_retry(mock_svc, _mock_publish, client):
+    mock_svc.return_value = ({"userId": "usr_001", "credits": "50", "paymentIntentId": "pi_001"}, None)
+    res = client.post("/credits/topup/webhook",
+                      data=b'{}', headers={"Stripe-Signature": "sig", "Content-Type": "application/json"})
+    assert res.status_code == 503
+
+
+@patch("balance_sync.call_credit_service")
+@patch("balance_sync.call_service")
+def test_balance_sync_pushes_batch_and_records_versions(mock_svc, mock_credit):
+    from balance_sync import sync_balances_once
+
+    mock_svc.side_effect = [
+        ({"balances": [
+            {"userId": "usr_001", "creditBalance": 40.0, "version": 3},
+            {"userId": "usr_002", "creditBalance": 10.0, "version": 1},
+        ]}, None),
+        ({"synced": 1}, None),
+    ]
+    mock_credit.side_effect = [({}, None), (None, "SERVICE_UNAVAILABLE")]
+
+    assert sync_balances_once() == 1
+    assert mock_credit.call_args_list[0][1]["json"] == {"creditBalance": 40.0}
+    assert mock_svc.call_args_list[1][1]["json"] == {"balances": [{"userId": "usr_001", "version": 3}]}
 
 
 @patch("routes.call_service")
@@ -93,20 +198,119 @@ def test_webhook_invalid_signature(mock_svc, client):
     assert res.status_code == 400
 
 
+# ── Top-up workers ────────────────────────────────────────────────────────────
+
+TOPUP_MESSAGE = b'{"userId": "usr_001", "credits": "50", "paymentIntentId": "pi_001"}'
+
+
+def _delivery():
+    return MagicMock(), MagicMock(delivery_tag=7)
+
+
 @patch("routes.call_credit_service")
 @patch("routes.call_service")
-def test_webhook_idempotent(mock_svc, mock_credit, client):
-    """Duplicate webhook must not credit twice."""
+def test_topup_worker_credits_ledger_and_acks(mock_svc, mock_credit, app):
+    from topup_worker import handle_message
+
     mock_svc.side_effect = [
-        ({"userId": "usr_001", "credits": "50", "paymentIntentId": "pi_001"}, None),
-        ({"txnId": "existing"}, None),  # idempotency hit
+        ({"creditBalance": 100.0}, None),                    # local balance
+        ({"balanceAfter": 150.0, "created": True}, None),    # ledger credit
     ]
-    res = client.post("/credits/topup/webhook",
-                      data=b'{}', headers={"Stripe-Signature": "sig", "Content-Type": "application/json"})
-    assert res.status_code == 200
+    ch, method = _delivery()
+    handle_message(ch, method, TOPUP_MESSAGE)
+
+    ch.basic_ack.assert_called_once_with(delivery_tag=7)
+    assert mock_svc.call_args_list[1][1]["json"]["delta"] == 50
+    assert mock_svc.call_args_list[1][1]["json"]["referenceId"] == "pi_001"
+    mock_credit.assert_not_called()
+
+
+@patch("routes.call_credit_service")
+@patch("routes.call_service")
+def test_topup_worker_redelivery_is_idempotent(mock_svc, mock_credit, app):
+    """A redelivered top-up must not credit twice."""
+    from topup_worker import handle_message
+
+    mock_svc.side_effect = [
+        ({"creditBalance": 150.0}, None),
+        ({"txnId": "existing", "balanceAfter": 150.0, "created": False}, None),  # already recorded
+    ]
+    ch, method = _delivery()
+    handle_message(ch, method, TOPUP_MESSAGE)
+
+    ch.basic_ack.assert_called_once_with(delivery_tag=7)
     mock_credit.assert_not_called()  # balance must not be touched
 
 
+@patch("topup_worker.time.sleep")
+@patch("routes._publish_topup")
+@patch("routes.call_service")
+def test_topup_worker_retries_when_ledger_down(mock_svc, mock_publish, _mock_sleep, app):
+    from topup_worker import handle_message
+
+    mock_svc.side_effect = [({"creditBalance": 100.0}, None), (None, "SERVICE_UNAVAILABLE")]
+    ch, method = _delivery()
+    handle_message(ch, method, TOPUP_MESSAGE)
+
+    assert mock_publish.call_args[0][0]["attempt"] == 2
+    ch.basic_ack.assert_called_once_with(delivery_tag=7)
+    ch.basic_publish.assert_not_called()
+
+
+@patch("topup_worker.time.sleep")
+@patch("routes._publish_topup")
+@patch("routes.call_service")
+def test_topup_worker_dead_letters_after_max_attempts(mock_svc, mock_publish, _mock_sleep, app):
+    from topup_worker import CREDIT_TOPUP_MAX_ATTEMPTS, handle_message
+
+    mock_svc.side_effect = [({"creditBalance": 100.0}, None), (None, "SERVICE_UNAVAILABLE")]
+    body = TOPUP_MESSAGE[:-1] + b', "attempt": %d}' % CREDIT_TOPUP_MAX_ATTEMPTS
+    ch, method = _delivery()
+    handle_message(ch, method, body)
+
+    mock_publish.assert_not_called()
+    assert ch.basic_publish.call_args[1]["routing_key"] == "credit_topup_dlq"
+    ch.basic_ack.assert_called_once_with(delivery_tag=7)
+
+
+@patch("routes._publish_topup")
+@patch("routes.call_service")
+def test_topup_worker_dead_letters_ledger_refusal(mock_svc, mock_publish, app):
+    """A 4xx from the ledger will not change on retry, so it is not requeued."""
+    from topup_worker import handle_message
+
+    mock_svc.side_effect = [({"creditBalance": 100.0}, None), (None, "REFERENCE_CONFLICT")]
+    ch, method = _delivery()
+    handle_message(ch, method, TOPUP_MESSAGE)
+
+    mock_publish.assert_not_called()
+    assert ch.basic_publish.call_args[1]["routing_key"] == "credit_topup_dlq"
+    ch.basic_nack.assert_called_once_with(delivery_tag=7, requeue=False)
+
+
+@patch("routes.call_service")
+def test_topup_worker_drops_malformed_message(mock_svc, app):
+    from topup_worker import handle_message
+
+    ch, method = _delivery()
+    handle_message(ch, method, b'{"userId": "usr_001"}')
+
+    ch.basic_nack.assert_called_once_with(delivery_tag=7, requeue=False)
+    mock_svc.assert_not_called()
+
+
+@patch("routes.call_service")
+def test_confirm_topup_reports_already_processed(mock_svc, client):
+    mock_svc.side_effect = [
+        ({"userId": "usr_001", "credits": "50"}, None),  # Stripe verify
+        ({"creditBalance": 150.0}, None),
+        ({"txnId": "existing", "balanceAfter": 150.0, "created": False}, None),
+    ]
+    res = client.post("/credits/topup/confirm", json={"paymentIntentId": "pi_001"}, headers=_auth())
+    assert res.status_code == 200
+    assert res.get_json()["data"]["status"] == "already_processed"
+
+
 # ── GET /credits/transactions ─────────────────────────────────────────────────
 
 @patch("routes.call_service")
@@ -122,3 +326,126 @@ def test_transactions_success(mock_svc, client):
 
 def test_transactions_no_auth(client):
     assert client.get("/credits/transactions").status_code == 401
+
+
+# ── Credit balance cache ──────────────────────────────────────────────────────
+
+class _FakeRedis:
+    def __init__(self):
+        self.values = {}
+
+    def get(self, key):
+        return self.values.get(key)
+
+    def setex(self, key, _ttl, value):
+        self.values[key] = value
+
+    def delete(self, key):
+        self.values.pop(key, None)
+
+
+def test_balance_cache_serves_hits_and_writes_through():
+    from shared.credit_balance_cache import CreditBalanceCache
+
+    fetch = MagicMock(return_value=({"userId": "usr_001", "creditBalance": 100.0, "version": 4}, None))
+    cache = CreditBalanceCache(fetch, redis_url="redis://test")
+    cache._client = _FakeRedis()
+
+    assert cache.get("usr_001") == ({"userId": "usr_001", "creditBalance": 100.0}, None)
+    assert cache.get("usr_001")[0]["creditBalance"] == 100.0
+    cache.put("usr_001", 20.0)   # after a debit
+    assert cache.get("usr_001")[0]["creditBalance"] == 20.0
+    fetch.assert_called_once()
+
+    cache.invalidate("usr_001")
+    cache.get("usr_001")
+    assert fetch.call_count == 2
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"]) == (2, 2)
+    assert stats["hitRatio"] == 0.5
+
+
+def test_balance_cache_drops_balance_on_repeated_ledger_entry():
+    from shared.credit_balance_cache import CreditBalanceCache
+
+    fetch = MagicMock(return_value=({"creditBalance": 70.0}, None))
+    cache = CreditBalanceCache(fetch, redis_url="redis://test")
+    cache._client = _FakeRedis()
+
+    cache.put_ledger_entry("usr_001", {"balanceAfter": 80.0, "created": True})
+    assert cache.get("usr_001")[0]["creditBalance"] == 80.0
+    cache.put_ledger_entry("usr_001", {"balanceAfter": 50.0, "created": False})
+    assert cache.get("usr_001")[0]["creditBalance"] == 70.0
+    fetch.assert_called_once_with("usr_001")
+
+
+def test_balance_cache_single_flight():
+    import threading
+    import time
+    from concurrent.futures import ThreadPoolExecutor
+
+    from shared.credit_balance_cache import CreditBalanceCache
+
+    release = threading.Event()
+    calls = []
+
+    def slow_fetch(user_id):
+        calls.append(user_id)
+        release.wait(2)
+        return {"creditBalance": 55.0}, None
+
+    cache = CreditBalanceCache(slow_fetch, redis_url="")
+    with ThreadPoolExecutor(max_workers=5) as pool:
+        futures = [pool.submit(cache.get, "usr_001") for _ in range(5)]
+        while cache.stats()["shared"] + cache.stats()["misses"] < 5:
+            time.sleep(0.001)
+        release.set()
+        results = [f.result() for f in futures]
+
+    assert calls == ["usr_001"]
+    assert all(r == ({"userId": "usr_001", "creditBalance": 55.0}, None) for r in results)
+    assert cache.stats()["shared"] == 4
+
+
+@patch("routes.credit_balances")
+@patch("routes.call_service")
+def test_topup_writes_new_balance_through(mock_svc, mock_cache, app):
+    from routes import process_topup
+
+    mock_cache.get.return_value = ({"creditBalance": 100.0}, None)
+    mock_svc.return_value = ({"balanceAfter": 150.0, "created": True}, None)
+    process_topup({"userId": "usr_001", "credits": "50", "paymentIntentId": "pi_001"})
+    mock_cache.put_ledger_entry.assert_called_once_with("usr_001", {"balanceAfter": 150.0, "created": True})
+
+
+# ── Outbound governor ─────────────────────────────────────────────────────────
+
+def test_credit_service_fails_fast_when_outsystems_saturated(client):
+    import service_client
+    from shared.outbound_governor import OutboundGovernor
+
+    busy = OutboundGovernor("outsystems", max_concurrent=1, queue_timeout_seconds=0)
+    busy.acquire()
+    with patch.object(service_client, "outsystems", busy), \
+         patch("service_client.requests.request") as mock_request:
+        data, err = service_client.call_credit_service("GET", "/credits/usr_001")
+
+    assert (data, err) == (None, "SERVICE_UNAVAILABLE")
+    mock_request.assert_not_called()
+    assert busy.stats()["rejectedTimeout"] == 1
+
+
+def test_credit_service_releases_slot_after_call(client):
+    import service_client
+    from shared.outbound_governor import OutboundGovernor
+
+    governor = OutboundGovernor("outsystems", max_concurrent=1, queue_timeout_seconds=0)
+    response = MagicMock(status_code=200)
+    response.json.return_value = {"userId": "usr_001", "creditBalance": 10}
+    with patch.object(service_client, "outsystems", governor), \
+         patch("service_client.requests.request", return_value=response):
+        assert service_client.call_credit_service("GET", "/credits/usr_001")[1] is None
+        assert service_client.call_credit_service("GET", "/credits/usr_001")[1] is None
+
+    stats = governor.stats()
+    assert stats["admitted"] == 2 and stats["inFlight"] == 0
@@ -0,0 +1,117 @@
+"""
+Stripe top-up workers.
+
+The webhook only verifies the signature and queues the payment on
+credit_topup_queue. CREDIT_TOPUP_WORKERS consumer threads here apply each one
+(balance read, ledger credit), so at most that many top-ups touch the ledger
+or OutSystems at a time however fast Stripe delivers. A top-up that fails
+for a transient reason is republished with attempt + 1 after
+CREDIT_TOPUP_RETRY_DELAY_SECONDS; the ledger's (referenceId, reason) key makes
+the retry land once. A top-up that can never apply (malformed, or refused by
+the ledger) or that fails CREDIT_TOPUP_MAX_ATTEMPTS times has been paid for,
+so it is parked on credit_topup_dlq for manual reconciliation, not dropped.
+"""
+import json
+import logging
+import os
+import threading
+import time
+
+import pika
+
+logger = logging.getLogger(__name__)
+
+CREDIT_TOPUP_WORKERS = int(os.environ.get("CREDIT_TOPUP_WORKERS", "2"))
+CREDIT_TOPUP_RETRY_DELAY_SECONDS = float(os.environ.get("CREDIT_TOPUP_RETRY_DELAY_SECONDS", "5"))
+CREDIT_TOPUP_MAX_ATTEMPTS = int(os.environ.get("CREDIT_TOPUP_MAX_ATTEMPTS", "5"))
+
+
+def _get_connection():
+    params = pika.ConnectionParameters(
+        host=os.environ.get("RABBITMQ_HOST", "rabbitmq"),
+        port=int(os.environ.get("RABBITMQ_PORT", "5672")),
+        credentials=pika.PlainCredentials(
+            username=os.environ.get("RABBITMQ_USER", "guest"),
+            password=os.environ.get("RABBITMQ_PASS", "guest"),
+        ),
+        connection_attempts=5,
+        retry_delay=3,
+    )
+    return pika.BlockingConnection(params)
+
+
+def _dead_letter(ch, body, reason):
+    """Park a paid top-up that will not be applied on the reconciliation queue."""
+    from routes import CREDIT_TOPUP_DLQ
+
+    ch.basic_publish(
+        exchange="",
+        routing_key=CREDIT_TOPUP_DLQ,
+        body=body,
+        properties=pika.BasicProperties(
+            delivery_mode=2, content_type="application/json", headers={"reason": reason},
+        ),
+    )
+
+
+def handle_message(ch, method, body):
+    """Ack applied top-ups, dead-letter unusable or exhausted ones, republish the rest with attempt + 1."""
+    from routes import InvalidTopup, _publish_topup, process_topup
+
+    message = {}
+    try:
+        message = json.loads(body)
+        process_topup(message)
+    except (InvalidTopup, json.JSONDecodeError) as exc:
+        logger.error("Dead-lettering top-up message: %s", exc)
+        _dead_letter(ch, body, str(exc))
+        ch.basic_nack(delivery_tag=method.delivery_tag, requeue=False)
+        return
+    except Exception as exc:
+        attempt = int(message.get("attempt", 1))
+        if attempt >= CREDIT_TOPUP_MAX_ATTEMPTS:
+            logger.error("Top-up %s failed after %d attempts, dead-lettering: %s",
+                         message.get("paymentIntentId"), attempt, exc)
+            _dead_letter(ch, body, str(exc))
+            ch.basic_ack(delivery_tag=method.delivery_tag)
+            return
+        logger.warning("Top-up %s failed (attempt %d), retrying: %s",
+                       message.get("paymentIntentId"), attempt, exc)
+        time.sleep(CREDIT_TOPUP_RETRY_DELAY_SECONDS)
+        try:
+            _publish_topup({**message, "attempt": attempt + 1})
+        except Exception as publish_exc:
+            logger.warning("Could not republish top-up, requeueing: %s", publish_exc)
+            ch.basic_nack(delivery_tag=method.delivery_tag, requeue=True)
+            return
+    ch.basic_ack(delivery_tag=method.delivery_tag)
+
+
+def _consume(app):
+    """One blocking consumer; pika connections are not shared across threads."""
+    from routes import CREDIT_TOPUP_DLQ, CREDIT_TOPUP_QUEUE
+
+    while True:
+        try:
+            connection = _get_connection()
+            channel = connection.channel()
+            channel.queue_declare(queue=CREDIT_TOPUP_QUEUE, durable=True)
+            channel.queue_declare(queue=CREDIT_TOPUP_DLQ, durable=True)
+
+            def on_message(ch, method, _properties, body):
+                with app.app_context():
+                    handle_message(ch, method, body)
+
+            channel.basic_qos(prefetch_count=1)
+            channel.basic_consume(queue=CREDIT_TOPUP_QUEUE, on_message_callback=on_message)
+            logger.info("Top-up worker %s started on %s", threading.current_thread().name, CREDIT_TOPUP_QUEUE)
+            channel.start_consuming()
+        except Exception as exc:
+            logger.warning("Top-up worker disconnected: %s — retrying in 5s", exc)
+            time.sleep(5)
+
+
+def start_topup_workers(app):
+    for index in range(CREDIT_TOPUP_WORKERS):
+        t = threading.Thread(target=_consume, args=(app,), daemon=True, name=f"topup-worker-{index}")
+        t.start()
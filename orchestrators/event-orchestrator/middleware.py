@@ -2,9 +2,13 @@
 Shared JWT middleware for all TicketRemaster orchestrators.
 """
 import os
+import threading
+import time
 from functools import wraps
+from typing import Any
 
 import jwt
+import requests
 from flask import jsonify, request
 
 
@@ -12,6 +16,68 @@ def _error(code, message, status):
     return jsonify({"error": {"code": code, "message": message}}), status
 
 
+JWT_JWKS_URL = os.environ.get("JWT_JWKS_URL", "http://auth-orchestrator:5000/.well-known/jwks.json")
+JWKS_CACHE_SECONDS = int(os.environ.get("JWKS_CACHE_SECONDS", "300"))
+JWKS_MIN_REFRESH_SECONDS = int(os.environ.get("JWKS_MIN_REFRESH_SECONDS", "30"))
+
+_jwks: dict[str, Any] = {"keys": {}, "fetched": None}
+_jwks_lock = threading.Lock()        # guards _jwks; never held across the fetch
+_jwks_fetch_lock = threading.Lock()  # one JWKS fetch at a time per process
+
+
+def _cached_key(kid):
+    """(key, fresh) from the cached set; fresh is False when it should be refetched."""
+    with _jwks_lock:
+        key = _jwks["keys"].get(kid)
+        fetched = _jwks["fetched"]
+    age = time.monotonic() - fetched if fetched is not None else None
+    fresh = age is not None and (age < JWKS_MIN_REFRESH_SECONDS or (key is not None and age < JWKS_CACHE_SECONDS))
+    return key, fresh
+
+
+def _signing_key(kid):
+    """
+    Public key for kid from auth-orchestrator's JWKS. The set is cached for
+    JWKS_CACHE_SECONDS and refetched early for an unknown kid (a rotation),
+    but at most once per JWKS_MIN_REFRESH_SECONDS. Requests with a cached
+    key never wait on a refetch; those that need one share a single fetch.
+    """
+    key, fresh = _cached_key(kid)
+    if fresh:
+        return key
+    with _jwks_fetch_lock:
+        # Another thread may have refreshed the set while this one waited
+        key, fresh = _cached_key(kid)
+        if fresh:
+            return key
+        keys = None
+        try:
+            resp = requests.get(JWT_JWKS_URL, timeout=3)
+            resp.raise_for_status()
+            keys = {k["kid"]: jwt.PyJWK(k).key for k in resp.json().get("keys", [])}
+        except Exception:
+            pass  # keep verifying with the keys we already have
+        with _jwks_lock:
+            if keys is not None:
+                _jwks["keys"] = keys
+            _jwks["fetched"] = time.monotonic()
+            return _jwks["keys"].get(kid)
+
+
+def decode_token(token):
+    """Verify a bearer token: RS256 against the auth JWKS, or HS256 while JWT_SECRET is set."""
+    header = jwt.get_unverified_header(token)
+    if header.get("alg") == "RS256":
+        key = _signing_key(header.get("kid"))
+        if key is None:
+            raise jwt.InvalidTokenError("Unknown signing key")
+        return jwt.decode(token, key, algorithms=["RS256"])
+    secret = os.environ.get("JWT_SECRET")
+    if not secret:
+        raise jwt.InvalidTokenError("HS256 tokens are not accepted")
+    return jwt.decode(token, secret, algorithms=["HS256"])
+
+
 def require_auth(f):
     @wraps(f)
     def decorated(*args, **kwargs):
@@ -20,7 +86,7 @@ def require_auth(f):
             return _error("AUTH_MISSING_TOKEN", "Authorization header missing or malformed.", 401)
         token = auth[len("Bearer "):]
         try:
-            payload = jwt.decode(token, os.environ["JWT_SECRET"], algorithms=["HS256"])
+            payload = decode_token(token)
             request.user = payload
         except jwt.ExpiredSignatureError:
             return _error("AUTH_TOKEN_EXPIRED", "Token has expired.", 401)
@@ -38,7 +104,7 @@ def require_staff(f):
             return _error("AUTH_MISSING_TOKEN", "Authorization header missing or malformed.", 401)
         token = auth[len("Bearer "):]
         try:
-            payload = jwt.decode(token, os.environ["JWT_SECRET"], algorithms=["HS256"])
+            payload = decode_token(token)
             request.user = payload
         except jwt.ExpiredSignatureError:
             return _error("AUTH_TOKEN_EXPIRED", "Token has expired.", 401)
@@ -58,7 +124,7 @@ def require_admin(f):
             return _error("AUTH_MISSING_TOKEN", "Authorization header missing or malformed.", 401)
         token = auth[len("Bearer "):]
         try:
-            payload = jwt.decode(token, os.environ["JWT_SECRET"], algorithms=["HS256"])
+            payload = decode_token(token)
             request.user = payload
         except jwt.ExpiredSignatureError:
             return _error("AUTH_TOKEN_EXPIRED", "Token has expired.", 401)
@@ -8,6 +8,7 @@ from flask import Blueprint, jsonify, request
 
 from middleware import require_admin
 from service_client import call_service
+from user_profile_cache import UserProfileCache
 
 bp = Blueprint("events", __name__)
 
@@ -19,6 +20,12 @@ TICKET_SERVICE         = os.environ.get("TICKET_SERVICE_URL",          "http://t
 USER_SERVICE           = os.environ.get("USER_SERVICE_URL",            "http://user-service:5000")
 
 
+# Late-bound so the fetch can be swapped in tests; no password or salt is fetched
+user_profiles = UserProfileCache(
+    lambda user_id: call_service("GET", f"{USER_SERVICE}/users/{user_id}/profile")
+)
+
+
 def _error(code, message, status):
     return jsonify({"error": {"code": code, "message": message}}), status
 
@@ -324,7 +331,7 @@ def get_event_dashboard(event_id):
         ticket = inv_to_ticket.get(inv_item.get("inventoryId", ""))
         email = ""
         if ticket:
-            user, _ = call_service("GET", f"{USER_SERVICE}/users/{ticket['ownerId']}")
+            user, _ = user_profiles.get(ticket["ownerId"])
             email = user.get("email", "") if user else ""
         attendees.append({
             "seatId": seat_id,
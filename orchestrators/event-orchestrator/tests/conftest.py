@@ -2,6 +2,8 @@ import os, sys, pathlib
 os.environ.setdefault("JWT_SECRET", "test-secret")
 os.environ.setdefault("OUTSYSTEMS_API_KEY", "test-key")
 os.environ.setdefault("CREDIT_SERVICE_URL", "http://credit-mock")
+# No per-process profile copies, so mocked user lookups happen on every call
+os.environ.setdefault("USER_PROFILE_LOCAL_MAX_ENTRIES", "0")
 sys.path.insert(0, str(pathlib.Path(__file__).resolve().parents[1]))
 import pytest
 from app import create_app
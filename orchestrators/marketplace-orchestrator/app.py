@@ -1,7 +1,13 @@
+import os
+import sys
+
 from flask import Flask, jsonify
 from dotenv import load_dotenv
 from flasgger import Swagger
 
+# Add shared directory to path for imports
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..', 'shared'))
+
 def create_app(test_config=None):
     load_dotenv()
     app = Flask(__name__)
@@ -3,12 +3,17 @@ Marketplace Orchestrator.
 GET /marketplace is public (no JWT) — browse listings.
 POST /marketplace/list and DELETE /marketplace/<id> require JWT.
 """
+import logging
 import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
 
 from flask import Blueprint, jsonify, request
 
 from middleware import require_auth
 from service_client import call_service
+from user_profile_cache import UserProfileCache
 
 bp = Blueprint("marketplace", __name__)
 
@@ -16,8 +21,25 @@ TICKET_SERVICE      = os.environ.get("TICKET_SERVICE_URL",      "http://ticket-s
 MARKETPLACE_SERVICE = os.environ.get("MARKETPLACE_SERVICE_URL", "http://marketplace-service:5000")
 EVENT_SERVICE       = os.environ.get("EVENT_SERVICE_URL",       "http://event-service:5000")
 SEAT_INV_SERVICE    = os.environ.get("SEAT_INVENTORY_SERVICE_URL", "http://seat-inventory-service:5000")
+SEAT_SERVICE        = os.environ.get("SEAT_SERVICE_URL",        "http://seat-service:5000")
 USER_SERVICE        = os.environ.get("USER_SERVICE_URL",        "http://user-service:5000")
 
+# Incomplete read-model rows are re-enriched at most this often; the rest of the
+# time they are served as stored
+VIEW_FILL_RETRY_SECONDS = int(os.environ.get("LISTING_VIEW_FILL_RETRY_SECONDS", "3600"))
+VIEW_WRITEBACK_WORKERS  = int(os.environ.get("LISTING_VIEW_WRITEBACK_WORKERS", "4"))
+
+logger = logging.getLogger(__name__)
+
+_writeback_pool = None
+_writeback_pool_lock = threading.Lock()
+
+
+# Late-bound so the fetch can be swapped in tests; no password or salt is fetched
+user_profiles = UserProfileCache(
+    lambda user_id: call_service("GET", f"{USER_SERVICE}/users/{user_id}/profile")
+)
+
 
 def _error(code, message, status):
     return jsonify({"error": {"code": code, "message": message}}), status
@@ -33,29 +55,151 @@ def _parse_pagination_args():
     return page, min(limit, 100), None
 
 
-def _enrich_listing(listing):
-    ticket, _ = call_service("GET", f"{TICKET_SERVICE}/tickets/{listing.get('ticketId')}")
-    event = None
-    if isinstance(ticket, dict) and ticket.get("eventId"):
-        event, _ = call_service("GET", f"{EVENT_SERVICE}/events/{ticket['eventId']}")
-    seller, _ = call_service("GET", f"{USER_SERVICE}/users/{listing.get('sellerId')}")
-    seller_email = seller.get("email") if seller else None
-    seller_display = seller_email.split("@")[0] if seller_email else None
-
-    return {
-        "listingId": listing["listingId"],
-        "ticketId": listing["ticketId"],
-        "sellerId": listing["sellerId"],
-        "sellerName": seller_display,
-        "price": listing["price"],
-        "status": listing["status"],
-        "createdAt": listing["createdAt"],
-        "event": {
-            "eventId": event["eventId"],
-            "name": event["name"],
-            "date": event["date"],
-        } if event else None,
-    }
+def _enrich_listings(listings):
+    """
+    Enrich one page of listings. Each distinct ticket, event and seller is
+    fetched once per page; listings that already carry eventId skip the
+    ticket lookup entirely.
+    """
+    event_ids = {}
+    for listing in listings:
+        event_id = listing.get("eventId")
+        if not event_id:
+            ticket, _ = call_service("GET", f"{TICKET_SERVICE}/tickets/{listing.get('ticketId')}")
+            event_id = ticket.get("eventId") if isinstance(ticket, dict) else None
+        event_ids[listing["listingId"]] = event_id
+
+    events, sellers = {}, {}
+    for listing in listings:
+        event_id = event_ids[listing["listingId"]]
+        if event_id and event_id not in events:
+            events[event_id], _ = call_service("GET", f"{EVENT_SERVICE}/events/{event_id}")
+        seller_id = listing.get("sellerId")
+        if seller_id not in sellers:
+            sellers[seller_id], _ = user_profiles.get(seller_id)
+
+    enriched = []
+    for listing in listings:
+        event = events.get(event_ids[listing["listingId"]])
+        seller = sellers.get(listing.get("sellerId"))
+        seller_email = seller.get("email") if seller else None
+        seller_display = seller_email.split("@")[0] if seller_email else None
+        enriched.append({
+            "listingId": listing["listingId"],
+            "ticketId": listing["ticketId"],
+            "sellerId": listing["sellerId"],
+            "sellerName": seller_display,
+            "price": listing["price"],
+            "status": listing["status"],
+            "createdAt": listing["createdAt"],
+            "event": {
+                "eventId": event["eventId"],
+                "name": event["name"],
+                "date": event["date"],
+            } if event else None,
+        })
+    return enriched
+
+
+def _is_complete(row):
+    return bool(row.get("event") and row.get("sellerName"))
+
+
+def _fill_due(row):
+    """Incomplete and not filled in recently (rows that cannot complete stay incomplete)."""
+    if _is_complete(row):
+        return False
+    attempted = row.get("snapshotAttemptedAt")
+    if not attempted:
+        return True
+    try:
+        attempted_at = datetime.fromisoformat(attempted.replace("Z", "+00:00"))
+    except (AttributeError, ValueError):
+        return True
+    if attempted_at.tzinfo is None:
+        attempted_at = attempted_at.replace(tzinfo=timezone.utc)
+    return datetime.now(timezone.utc) - attempted_at >= timedelta(seconds=VIEW_FILL_RETRY_SECONDS)
+
+
+def _fill_incomplete_views(rows):
+    """
+    Read-model rows normally arrive complete. Rows created before the read model
+    existed (or whose snapshot lookups failed) are enriched the old way, and the
+    result is written back after the response. The write-back stamps the row as
+    attempted even when nothing was found, so it is retried only after
+    VIEW_FILL_RETRY_SECONDS rather than on every read.
+    """
+    due = [row for row in rows if _fill_due(row)]
+    if not due:
+        return rows
+
+    enriched = {listing["listingId"]: listing for listing in _enrich_listings(due)}
+    _run_after_response(_store_listing_views, list(enriched.values()))
+    return [
+        {**row, **enriched[row["listingId"]]} if row["listingId"] in enriched else row
+        for row in rows
+    ]
+
+
+def _store_listing_views(listings):
+    for listing in listings:
+        snapshot = {field: listing[field] for field in ("sellerName", "event") if listing.get(field)}
+        _, err = call_service("PUT", f"{MARKETPLACE_SERVICE}/listings/{listing['listingId']}/view", json=snapshot)
+        if err:
+            logger.warning("Could not store listing view for %s: %s", listing["listingId"], err)
+
+
+def _get_writeback_pool():
+    global _writeback_pool
+    with _writeback_pool_lock:
+        if _writeback_pool is None:
+            _writeback_pool = ThreadPoolExecutor(
+                max_workers=VIEW_WRITEBACK_WORKERS, thread_name_prefix="listing-view",
+            )
+        return _writeback_pool
+
+
+def _run_after_response(fn, *args):
+    """Run a best-effort side effect off the request path; failures are only logged."""
+    def run():
+        try:
+            fn(*args)
+        except Exception as exc:
+            logger.warning("Deferred marketplace side effect %s failed: %s", getattr(fn, "__name__", fn), exc)
+    _get_writeback_pool().submit(run)
+
+
+def _listing_snapshot(ticket, seller_id):
+    """
+    Event, seat and seller display data stored with a new listing so browse never
+    has to look them up. Every lookup is best-effort; gaps are filled on first read.
+    """
+    snapshot = {}
+    event_id = ticket.get("eventId")
+
+    event, _ = call_service("GET", f"{EVENT_SERVICE}/events/{event_id}") if event_id else (None, None)
+    if isinstance(event, dict):
+        snapshot["event"] = {
+            field: event.get(field) for field in ("eventId", "name", "date", "type", "image", "venueId")
+        }
+
+    seller, _ = user_profiles.get(seller_id)
+    if isinstance(seller, dict) and seller.get("email"):
+        snapshot["sellerName"] = seller["email"].split("@")[0]
+
+    inventory_id = ticket.get("inventoryId")
+    if inventory_id:
+        item, _ = call_service("GET", f"{SEAT_INV_SERVICE}/inventory/{inventory_id}")
+        if isinstance(item, dict) and item.get("seatId"):
+            seat, _ = call_service("GET", f"{SEAT_SERVICE}/seats/{item['seatId']}")
+            seat = seat if isinstance(seat, dict) else {}
+            snapshot["seat"] = {
+                "inventoryId": inventory_id,
+                "seatId":      item.get("seatId"),
+                "rowNumber":   seat.get("rowNumber"),
+                "seatNumber":  seat.get("seatNumber"),
+            }
+    return snapshot
 
 
 # ── GET /marketplace ──────────────────────────────────────────────────────────
@@ -73,53 +217,68 @@ def browse():
         type: string
         description: Filter listings by event
         example: evt_001
+      - in: query
+        name: eventType
+        type: string
+        description: Filter listings by event type
+      - in: query
+        name: minPrice
+        type: number
+      - in: query
+        name: maxPrice
+        type: number
+      - in: query
+        name: sort
+        type: string
+        enum: [newest, price_asc, price_desc, event_date]
+        default: newest
+      - in: query
+        name: cursor
+        type: string
+        description: >
+          Keyset cursor (pagination.nextCursor from the previous page). Pass an
+          empty value to start keyset paging.
+      - in: query
+        name: page
+        type: integer
+        default: 1
+      - in: query
+        name: limit
+        type: integer
+        default: 20
     responses:
       200:
         description: List of active listings enriched with event details
+      400:
+        description: Invalid pagination or filter parameters
     """
     page, limit, pagination_error = _parse_pagination_args()
     if pagination_error:
         return pagination_error
 
-    requested_event_id = request.args.get("eventId")
-    upstream_params = {"page": page, "limit": limit} if not requested_event_id else None
-    listings_data, err = call_service("GET", f"{MARKETPLACE_SERVICE}/listings", params=upstream_params)
+    # Filtering, sorting and paging happen on the marketplace-service read model;
+    # rows come back already carrying event and seller data.
+    upstream_params = {"page": page, "limit": limit}
+    for name in ("eventId", "eventType", "minPrice", "maxPrice", "sort", "cursor"):
+        if name in request.args:
+            upstream_params[name] = request.args[name]
+
+    listings_data, err = call_service("GET", f"{MARKETPLACE_SERVICE}/listings/browse", params=upstream_params)
+    if err == "VALIDATION_ERROR":
+        return _error("VALIDATION_ERROR", "Invalid filter, sort or cursor.", 400)
     if err:
         return _error("SERVICE_UNAVAILABLE", "Could not retrieve listings.", 503)
 
     listings_list = listings_data.get("listings", []) if isinstance(listings_data, dict) else []
-    
-    if listings_list:
-        # Validate listings_list contains dictionaries
-        listings_list = [l for l in listings_list if isinstance(l, dict)]
-        enriched = []
-        for listing in listings_list:
-            enriched_listing = _enrich_listing(listing)
-            
-            # Apply eventId filter if specified
-            event = enriched_listing.get("event")
-            if requested_event_id and (not event or str(event.get("eventId")) != str(requested_event_id)):
-                continue
-            
-            enriched.append(enriched_listing)
-    else:
-        enriched = []
-
-    if requested_event_id:
-        total = len(enriched)
-        start = (page - 1) * limit
-        enriched = enriched[start:start + limit]
-        pagination = {
-            "page": page,
-            "limit": limit,
-            "total": total,
-        }
-    else:
-        pagination = listings_data.get("pagination", {
-            "page": page,
-            "limit": limit,
-            "total": len(enriched),
-        })
+    # Validate listings_list contains dictionaries
+    listings_list = [l for l in listings_list if isinstance(l, dict)]
+    enriched = _fill_incomplete_views(listings_list)
+
+    pagination = listings_data.get("pagination", {
+        "page": page,
+        "limit": limit,
+        "total": len(enriched),
+    })
 
     return jsonify({"data": {
         "listings":   enriched,
@@ -149,13 +308,13 @@ def get_listing(listing_id):
       503:
         description: Listing service unavailable
     """
-    listing, err = call_service("GET", f"{MARKETPLACE_SERVICE}/listings/{listing_id}")
+    listing, err = call_service("GET", f"{MARKETPLACE_SERVICE}/listings/{listing_id}/view")
     if err == "LISTING_NOT_FOUND":
         return _error("LISTING_NOT_FOUND", "Listing not found.", 404)
     if err:
         return _error("SERVICE_UNAVAILABLE", "Could not retrieve listing.", 503)
 
-    return jsonify({"data": _enrich_listing(listing)}), 200
+    return jsonify({"data": _fill_incomplete_views([listing])[0]}), 200
 
 
 # ── POST /marketplace/list ────────────────────────────────────────────────────
@@ -218,11 +377,13 @@ def list_ticket():
     if err:
         return _error("SERVICE_UNAVAILABLE", "Could not update ticket status.", 503)
 
-    # Create listing
+    # Create listing together with its browse snapshot
     listing_data, err = call_service("POST", f"{MARKETPLACE_SERVICE}/listings", json={
         "ticketId": ticket_id,
         "sellerId": user_id,
+        "eventId":  ticket.get("eventId"),
         "price":    body.get("price") or ticket["price"],
+        **_listing_snapshot(ticket, user_id),
     })
     if err:
         # Compensate — revert ticket status
@@ -276,7 +437,11 @@ def delist(listing_id):
     if listing["status"] != "active":
         return _error("LISTING_NOT_FOUND", "Listing is not active.", 400)
 
-    _, err = call_service("PATCH", f"{MARKETPLACE_SERVICE}/listings/{listing_id}", json={"status": "cancelled"})
+    # Conditional so a buyer's concurrent claim can't be cancelled out from under them
+    _, err = call_service("PATCH", f"{MARKETPLACE_SERVICE}/listings/{listing_id}",
+                          json={"status": "cancelled", "fromStatus": "active"})
+    if err == "LISTING_STATUS_CONFLICT":
+        return _error("LISTING_NOT_FOUND", "Listing is not active.", 400)
     if err:
         return _error("SERVICE_UNAVAILABLE", "Could not cancel listing.", 503)
 
@@ -2,7 +2,11 @@ import os, sys, pathlib
 os.environ.setdefault("JWT_SECRET", "test-secret")
 os.environ.setdefault("OUTSYSTEMS_API_KEY", "test-key")
 os.environ.setdefault("CREDIT_SERVICE_URL", "http://credit-mock")
+# No per-process profile copies, so mocked user lookups happen on every call
+os.environ.setdefault("USER_PROFILE_LOCAL_MAX_ENTRIES", "0")
 sys.path.insert(0, str(pathlib.Path(__file__).resolve().parents[1]))
+from unittest.mock import patch
+
 import pytest
 from app import create_app
 
@@ -13,3 +17,10 @@ def app():
 @pytest.fixture()
 def client(app):
     return app.test_client()
+
+
+@pytest.fixture(autouse=True)
+def inline_deferred_side_effects():
+    """Run post-response work synchronously so call order stays deterministic."""
+    with patch("routes._run_after_response", side_effect=lambda fn, *args: fn(*args)):
+        yield
@@ -35,8 +35,17 @@ MOCK_LISTING = {
     "status":    "active",
     "createdAt": "2025-01-15T11:00:00",
 }
-MOCK_EVENT = {"eventId": "evt_001", "name": "Symphony Night", "date": "2025-03-20T19:30:00"}
+MOCK_EVENT = {"eventId": "evt_001", "name": "Symphony Night", "date": "2025-03-20T19:30:00", "venueId": "ven_001"}
 MOCK_SELLER = {"userId": "usr_001", "email": "usr_001@ticketremaster.local"}
+MOCK_VIEW = {
+    **MOCK_LISTING,
+    "eventId":    "evt_001",
+    "sellerName": "usr_001",
+    "event":      {"eventId": "evt_001", "name": "Symphony Night", "date": "2025-03-20T19:30:00"},
+    "seat":       {"inventoryId": "inv_001", "seatId": "seat_001", "rowNumber": "A", "seatNumber": "1"},
+}
+MOCK_INVENTORY = {"inventoryId": "inv_001", "eventId": "evt_001", "seatId": "seat_001", "status": "sold"}
+MOCK_SEAT = {"seatId": "seat_001", "venueId": "ven_001", "rowNumber": "A", "seatNumber": "1"}
 
 
 def test_health(client):
@@ -47,41 +56,105 @@ def test_health(client):
 
 @patch("routes.call_service")
 def test_browse_success(mock_svc, client):
-    mock_svc.side_effect = [
-        ({"listings": [MOCK_LISTING], "pagination": {}}, None),
-        (MOCK_TICKET, None),
-        (MOCK_EVENT, None),
-        (MOCK_SELLER, None),
-    ]
+    mock_svc.return_value = ({"listings": [MOCK_VIEW], "pagination": {}}, None)
+
     res = client.get("/marketplace")
+
     assert res.status_code == 200
     assert len(res.get_json()["data"]["listings"]) == 1
     assert res.get_json()["data"]["listings"][0]["event"]["name"] == "Symphony Night"
     assert res.get_json()["data"]["listings"][0]["sellerName"] == "usr_001"
+    # Complete read-model rows need no fan-out
+    assert mock_svc.call_count == 1
+    assert mock_svc.call_args_list[0][0][1].endswith("/listings/browse")
 
 
 @patch("routes.call_service")
-def test_browse_filters_by_event_id(mock_svc, client):
-    other_ticket = {**MOCK_TICKET, "ticketId": "tkt_002", "eventId": "evt_999"}
-    other_listing = {**MOCK_LISTING, "listingId": "lst_002", "ticketId": "tkt_002"}
-    other_event = {"eventId": "evt_999", "name": "Other Event", "date": "2025-04-01T20:00:00"}
+def test_browse_forwards_filters_and_sort(mock_svc, client):
+    mock_svc.return_value = ({"listings": [MOCK_VIEW], "pagination": {"page": 1, "limit": 20, "total": 1}}, None)
+
+    res = client.get("/marketplace?eventId=evt_001&eventType=concert&sort=price_asc")
+
+    assert res.status_code == 200
+    payload = res.get_json()["data"]
+    assert payload["pagination"] == {"page": 1, "limit": 20, "total": 1}
+    assert mock_svc.call_args_list[0][1]["params"] == {
+        "page": 1, "limit": 20, "eventId": "evt_001", "eventType": "concert", "sort": "price_asc",
+    }
+
 
+@patch("routes.call_service")
+def test_browse_fills_and_writes_back_incomplete_views(mock_svc, client):
+    rows = [
+        MOCK_VIEW,
+        *({**MOCK_VIEW, "listingId": f"lst_00{i}", "eventId": "evt_001", "event": None, "sellerName": None}
+          for i in (2, 3)),
+    ]
     mock_svc.side_effect = [
-        ({"listings": [MOCK_LISTING, other_listing], "pagination": {"page": 1, "limit": 20, "total": 2}}, None),
-        (MOCK_TICKET, None),
+        ({"listings": rows, "pagination": {"limit": 3, "nextCursor": "abc"}}, None),
         (MOCK_EVENT, None),
         (MOCK_SELLER, None),
-        (other_ticket, None),
-        (other_event, None),
-        (MOCK_SELLER, None),
+        ({}, None),   # PUT view lst_002
+        ({}, None),   # PUT view lst_003
     ]
 
-    res = client.get("/marketplace?eventId=evt_001")
+    res = client.get("/marketplace?limit=3&cursor=")
 
     assert res.status_code == 200
     payload = res.get_json()["data"]
-    assert payload["pagination"] == {"page": 1, "limit": 20, "total": 1}
-    assert [listing["listingId"] for listing in payload["listings"]] == ["lst_001"]
+    assert [listing["listingId"] for listing in payload["listings"]] == ["lst_001", "lst_002", "lst_003"]
+    assert all(listing["event"]["name"] == "Symphony Night" for listing in payload["listings"])
+    assert payload["pagination"]["nextCursor"] == "abc"
+    assert mock_svc.call_args_list[0][1]["params"]["cursor"] == ""
+    # Only the incomplete rows are enriched, with lookups deduplicated
+    assert not any("/tickets/" in c[0][1] for c in mock_svc.call_args_list)
+    puts = [c for c in mock_svc.call_args_list if c[0][0] == "PUT"]
+    assert [c[0][1].rsplit("/", 2)[-2] for c in puts] == ["lst_002", "lst_003"]
+    assert puts[0][1]["json"]["sellerName"] == "usr_001"
+
+
+@patch("routes.call_service")
+def test_browse_records_attempt_for_rows_that_cannot_complete(mock_svc, client):
+    row = {**MOCK_VIEW, "eventId": "evt_gone", "event": None, "sellerName": None, "snapshotAttemptedAt": None}
+    mock_svc.side_effect = [
+        ({"listings": [row], "pagination": {}}, None),
+        (None, "EVENT_NOT_FOUND"),
+        (None, "USER_NOT_FOUND"),
+        ({}, None),   # PUT view records the attempt
+    ]
+
+    res = client.get("/marketplace")
+
+    assert res.status_code == 200
+    assert res.get_json()["data"]["listings"][0]["event"] is None
+    puts = [c for c in mock_svc.call_args_list if c[0][0] == "PUT"]
+    assert len(puts) == 1
+    assert puts[0][1]["json"] == {}
+
+
+@patch("routes.call_service")
+def test_browse_skips_recently_attempted_incomplete_rows(mock_svc, client):
+    attempted = datetime.now(timezone.utc).replace(tzinfo=None).isoformat()
+    stale = (datetime.now(timezone.utc) - timedelta(days=2)).replace(tzinfo=None).isoformat()
+    rows = [
+        {**MOCK_VIEW, "listingId": "lst_002", "event": None, "sellerName": None, "snapshotAttemptedAt": attempted},
+        {**MOCK_VIEW, "listingId": "lst_003", "event": None, "sellerName": None, "snapshotAttemptedAt": stale},
+    ]
+    mock_svc.side_effect = [
+        ({"listings": rows, "pagination": {}}, None),
+        (MOCK_EVENT, None),
+        (MOCK_SELLER, None),
+        ({}, None),   # PUT view lst_003
+    ]
+
+    res = client.get("/marketplace")
+
+    assert res.status_code == 200
+    listings = res.get_json()["data"]["listings"]
+    assert listings[0]["event"] is None
+    assert listings[1]["event"]["name"] == "Symphony Night"
+    puts = [c for c in mock_svc.call_args_list if c[0][0] == "PUT"]
+    assert [c[0][1].rsplit("/", 2)[-2] for c in puts] == ["lst_003"]
 
 
 @patch("routes.call_service")
@@ -101,12 +174,7 @@ def test_browse_rejects_invalid_limit(mock_svc, client):
 
 @patch("routes.call_service")
 def test_get_listing_success(mock_svc, client):
-    mock_svc.side_effect = [
-        (MOCK_LISTING, None),
-        (MOCK_TICKET, None),
-        (MOCK_EVENT, None),
-        (MOCK_SELLER, None),
-    ]
+    mock_svc.return_value = (MOCK_VIEW, None)
 
     res = client.get("/marketplace/lst_001")
 
@@ -115,6 +183,8 @@ def test_get_listing_success(mock_svc, client):
     assert payload["listingId"] == "lst_001"
     assert payload["event"]["name"] == "Symphony Night"
     assert payload["sellerName"] == "usr_001"
+    assert payload["seat"]["rowNumber"] == "A"
+    assert mock_svc.call_count == 1
 
 
 @patch("routes.call_service")
@@ -134,11 +204,23 @@ def test_list_ticket_success(mock_svc, client):
     mock_svc.side_effect = [
         (MOCK_TICKET, None),    # GET ticket
         (None, None),           # PATCH ticket → listed
+        (MOCK_EVENT, None),     # GET event (snapshot)
+        (MOCK_SELLER, None),    # GET seller (snapshot)
+        (MOCK_INVENTORY, None), # GET inventory record (snapshot)
+        (MOCK_SEAT, None),      # GET seat (snapshot)
         (MOCK_LISTING, None),   # POST listing
     ]
     res = client.post("/marketplace/list", json={"ticketId": "tkt_001"}, headers=_auth())
     assert res.status_code == 201
     assert res.get_json()["data"]["listingId"] == "lst_001"
+    body = mock_svc.call_args_list[-1][1]["json"]
+    assert body["sellerName"] == "usr_001"
+    assert body["event"]["name"] == "Symphony Night"
+    assert body["seat"] == {"inventoryId": "inv_001", "seatId": "seat_001", "rowNumber": "A", "seatNumber": "1"}
+    # One record each, never the whole event inventory or venue seat map
+    urls = [c[0][1] for c in mock_svc.call_args_list]
+    assert any(url.endswith("/inventory/inv_001") for url in urls)
+    assert any(url.endswith("/seats/seat_001") for url in urls)
 
 
 @patch("routes.call_service")
@@ -178,6 +260,9 @@ def test_list_ticket_compensates_on_listing_failure(mock_svc, client):
     mock_svc.side_effect = [
         (MOCK_TICKET, None),        # GET ticket
         (None, None),               # PATCH → listed
+        (None, "SERVICE_UNAVAILABLE"),  # GET event (snapshot is best-effort)
+        (None, "SERVICE_UNAVAILABLE"),  # GET seller
+        (None, "SERVICE_UNAVAILABLE"),  # GET inventory record
         (None, "INTERNAL_ERROR"),   # POST listing fails
         (None, None),               # PATCH → active (compensation)
     ]
@@ -204,6 +289,18 @@ def test_delist_success(mock_svc, client):
     res = client.delete("/marketplace/lst_001", headers=_auth())
     assert res.status_code == 200
     assert res.get_json()["data"]["status"] == "cancelled"
+    assert mock_svc.call_args_list[1][1]["json"] == {"status": "cancelled", "fromStatus": "active"}
+
+
+@patch("routes.call_service")
+def test_delist_loses_race_to_buyer_claim(mock_svc, client):
+    mock_svc.side_effect = [
+        (MOCK_LISTING, None),                   # GET listing (still active)
+        (None, "LISTING_STATUS_CONFLICT"),      # claimed in between
+    ]
+    res = client.delete("/marketplace/lst_001", headers=_auth())
+    assert res.status_code == 400
+    assert mock_svc.call_count == 2
 
 
 @patch("routes.call_service")
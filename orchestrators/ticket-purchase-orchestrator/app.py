@@ -51,6 +51,13 @@ def create_app(test_config=None):
         t = threading.Thread(target=start_dlx_consumer, daemon=True, name="dlx-consumer")
         t.start()
 
+        from saga_recovery import start_saga_recovery
+        t2 = threading.Thread(target=start_saga_recovery, daemon=True, name="saga-recovery")
+        t2.start()
+
+        from purchase_worker import start_purchase_workers
+        start_purchase_workers(app)
+
     from routes import bp
     app.register_blueprint(bp)
 
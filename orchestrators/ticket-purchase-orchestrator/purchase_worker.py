@@ -0,0 +1,68 @@
+"""
+Async purchase confirmation workers.
+
+POST /purchase/confirm with async enabled validates the hold, queues the
+confirmation on purchase_confirm_queue and returns 202. A pool of consumer
+threads here completes each one (event, credits, SellSeat, ticket, debit)
+off the request path, so slow downstream or gRPC calls tie up these
+threads instead of gunicorn workers.
+"""
+import json
+import logging
+import os
+import threading
+import time
+
+import pika
+
+logger = logging.getLogger(__name__)
+
+PURCHASE_CONFIRM_WORKERS = int(os.environ.get("PURCHASE_CONFIRM_WORKERS", "4"))
+
+
+def _get_connection():
+    params = pika.ConnectionParameters(
+        host=os.environ.get("RABBITMQ_HOST", "rabbitmq"),
+        port=int(os.environ.get("RABBITMQ_PORT", "5672")),
+        credentials=pika.PlainCredentials(
+            username=os.environ.get("RABBITMQ_USER", "guest"),
+            password=os.environ.get("RABBITMQ_PASS", "guest"),
+        ),
+        connection_attempts=5,
+        retry_delay=3,
+    )
+    return pika.BlockingConnection(params)
+
+
+def _consume(app):
+    """One blocking consumer; pika connections are not shared across threads."""
+    from routes import PURCHASE_CONFIRM_QUEUE, process_purchase_confirmation
+
+    while True:
+        try:
+            connection = _get_connection()
+            channel = connection.channel()
+            channel.queue_declare(queue=PURCHASE_CONFIRM_QUEUE, durable=True)
+
+            def on_message(ch, method, _properties, body):
+                try:
+                    with app.app_context():
+                        process_purchase_confirmation(json.loads(body))
+                    ch.basic_ack(delivery_tag=method.delivery_tag)
+                except Exception as exc:
+                    logger.error("Purchase worker error: %s", exc)
+                    ch.basic_nack(delivery_tag=method.delivery_tag, requeue=False)
+
+            channel.basic_qos(prefetch_count=1)
+            channel.basic_consume(queue=PURCHASE_CONFIRM_QUEUE, on_message_callback=on_message)
+            logger.info("Purchase worker %s started on %s", threading.current_thread().name, PURCHASE_CONFIRM_QUEUE)
+            channel.start_consuming()
+        except Exception as exc:
+            logger.warning("Purchase worker disconnected: %s — retrying in 5s", exc)
+            time.sleep(5)
+
+
+def start_purchase_workers(app):
+    for index in range(PURCHASE_CONFIRM_WORKERS):
+        t = threading.Thread(target=_consume, args=(app,), daemon=True, name=f"purchase-worker-{index}")
+        t.start()
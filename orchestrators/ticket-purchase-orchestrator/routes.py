@@ -3,17 +3,26 @@ Ticket Purchase Orchestrator routes.
 
 Saga order for confirm:
   1. Validate seat is still held (gRPC GetSeatStatus)
-  2. Check credits (OutSystems)
+  2. Check credits (credit-transaction-service balance)
   3. Sell seat (gRPC SellSeat)          COMP: ReleaseSeat
-  4. Create ticket record               COMP: (no rollback needed — mark failed and return)
-  5. Deduct credits (OutSystems)
-  6. Log credit transaction
+  4. Create ticket record               COMP: mark ticket payment_failed
+  5. Debit credits (ledger entry; refused if the balance no longer covers it)
+
+The event fetch and the credit read (step 2) start before step 1 and run
+concurrently under one deadline. Steps 3-5 are journaled in Redis
+(shared/saga_journal.py); the response is sent once step 5 commits, and the
+journal close-out plus the purchase_update push run afterwards. saga_recovery
+finishes a purchase interrupted after step 5 and unwinds one interrupted
+earlier. OutSystems only mirrors balances (see credit-orchestrator balance_sync).
 """
 import json
 import logging
 import os
 import threading
 import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FuturesTimeout
 from datetime import datetime, timezone
 
 import grpc
@@ -25,6 +34,9 @@ from flask import Blueprint, jsonify, request
 
 from middleware import require_auth
 from service_client import call_credit_service, call_service
+from shared.credit_balance_cache import CreditBalanceCache
+from shared.rate_limiter import RateLimiter
+from shared.saga_journal import SagaJournal, SagaStep, SagaStepError, StepRefused, resume_saga, run_saga
 
 bp     = Blueprint("purchase", __name__)
 logger = logging.getLogger(__name__)
@@ -34,8 +46,27 @@ EVENT_SERVICE      = os.environ.get("EVENT_SERVICE_URL",              "http://ev
 SEAT_INV_REST      = os.environ.get("SEAT_INVENTORY_SERVICE_URL",     "http://seat-inventory-service:5000")
 CREDIT_TXN_SERVICE = os.environ.get("CREDIT_TRANSACTION_SERVICE_URL", "http://credit-transaction-service:5000")
 
+NOTIFICATION_SERVICE = os.environ.get("NOTIFICATION_SERVICE_URL",     "http://notification-service:8109")
+
 HOLD_SECONDS = int(os.environ.get("SEAT_HOLD_DURATION_SECONDS", "300"))
 
+# Per-user cap on hold attempts, so one client cannot sweep a section into holds
+SEAT_HOLD_RATE_LIMIT = int(os.environ.get("SEAT_HOLD_RATE_LIMIT", "20"))
+SEAT_HOLD_RATE_WINDOW_SECONDS = int(os.environ.get("SEAT_HOLD_RATE_WINDOW_SECONDS", "60"))
+hold_limiter = RateLimiter("seat_hold", SEAT_HOLD_RATE_LIMIT, SEAT_HOLD_RATE_WINDOW_SECONDS)
+
+# Async confirm: queue consumed by purchase_worker, status kept in Redis for polling
+PURCHASE_CONFIRM_QUEUE = "purchase_confirm_queue"
+PURCHASE_STATUS_PREFIX = "purchase_status:"
+PURCHASE_STATUS_TTL_SECONDS = int(os.environ.get("PURCHASE_STATUS_TTL_SECONDS", "3600"))
+
+# Independent confirm reads run concurrently under one deadline; post-commit
+# side effects (journal close-out, notifications) run on the same pool afterwards.
+CONFIRM_READ_DEADLINE_SECONDS = float(os.environ.get("CONFIRM_READ_DEADLINE_SECONDS", "5"))
+CONFIRM_POOL_WORKERS = int(os.environ.get("CONFIRM_POOL_WORKERS", "16"))
+_confirm_pool = None
+_confirm_pool_lock = threading.Lock()
+
 # Circuit breaker for Redis fallback
 REDIS_CB_FAILURE_THRESHOLD = int(os.environ.get("REDIS_CB_FAILURE_THRESHOLD", "3"))
 REDIS_CB_RECOVERY_SECONDS = int(os.environ.get("REDIS_CB_RECOVERY_SECONDS", "30"))
@@ -269,6 +300,500 @@ def _publish_hold_ttl(inventory_id, user_id, hold_token):
                 logger.error("RabbitMQ publish failed after %d attempts: %s", MAX_RETRIES, exc)
 
 
+def _publish_compensation_dlq(message):
+    """Hand a purchase that could not be unwound to manual reconciliation."""
+    try:
+        conn = pika.BlockingConnection(pika.ConnectionParameters(
+            host=os.environ.get("RABBITMQ_HOST", "rabbitmq"),
+            port=int(os.environ.get("RABBITMQ_PORT", "5672")),
+            credentials=pika.PlainCredentials(
+                os.environ.get("RABBITMQ_USER", "guest"),
+                os.environ.get("RABBITMQ_PASS", "guest"),
+            ),
+            connection_attempts=2,
+            retry_delay=1,
+        ))
+        ch = conn.channel()
+        ch.basic_publish(
+            exchange="",
+            routing_key="purchase_compensation_dlq",
+            body=json.dumps({**message, "timestamp": datetime.now(timezone.utc).isoformat()}),
+            properties=pika.BasicProperties(delivery_mode=2),
+        )
+        conn.close()
+        logger.info("Purchase compensation failure logged to DLQ for ticket %s", message.get("ticket_id"))
+    except Exception as dlq_err:
+        logger.error("Failed to log compensation failure to DLQ: %s", dlq_err)
+
+
+class _SeatNotSold(RuntimeError):
+    pass
+
+
+class _InsufficientCredits(StepRefused):
+    pass
+
+
+def _purchase_saga_steps(stub=None):
+    """
+    Steps 3-5 of confirm as a journaled saga. Recovery passes no stub, so
+    gRPC calls then borrow a pooled channel of their own.
+    """
+    def with_stub(call):
+        if stub is not None:
+            return call(stub)
+        own_stub, channel = _resolve_stub_and_channel(_grpc_stub())
+        try:
+            return call(own_stub)
+        finally:
+            _release_grpc_stub((own_stub, channel))
+
+    def sell_seat(i):
+        sell_resp = with_stub(lambda s: s.SellSeat(seat_inventory_pb2.SellSeatRequest(
+            inventory_id=i["inventoryId"],
+            user_id=i["userId"],
+            hold_token=i["holdToken"],
+        )))
+        if not sell_resp.success:
+            raise _SeatNotSold("SellSeat was rejected")
+
+    def release_seat(i):
+        try:
+            with_stub(lambda s: s.ReleaseSeat(seat_inventory_pb2.ReleaseSeatRequest(
+                inventory_id=i["inventoryId"],
+                user_id=i["userId"],
+                hold_token=i["holdToken"],
+            )))
+        except Exception as release_err:
+            return f"Failed to release seat: {release_err}"
+        return None
+
+    def create_ticket(i):
+        ticket_data, err = call_service("POST", f"{TICKET_SERVICE}/tickets", json={
+            "inventoryId": i["inventoryId"],
+            "ownerId":     i["userId"],
+            "venueId":     i["venueId"],
+            "eventId":     i["eventId"],
+            "price":       i["price"],
+            "status":      "active",
+        })
+        if err:
+            raise RuntimeError(f"Ticket creation failed: {err}")
+        return {"ticketId": ticket_data["ticketId"], "ticket": ticket_data}
+
+    def fail_ticket(i):
+        # Mark ticket as payment_failed for manual reconciliation
+        _, err = call_service("PATCH", f"{TICKET_SERVICE}/tickets/{i['ticketId']}", json={
+            "status": "payment_failed",
+        })
+        return f"Failed to mark ticket status: {err}" if err else None
+
+    def deduct_credits(i):
+        # The ledger insert is the debit: it moves the balance atomically and
+        # is refused if a concurrent spend left too little since step 2
+        txn, err = call_service("POST", f"{CREDIT_TXN_SERVICE}/credit-transactions", json={
+            "userId":      i["userId"],
+            "delta":       -i["price"],
+            "reason":      "ticket_purchase",
+            "referenceId": i["ticketId"],
+        })
+        if err:
+            credit_balances.invalidate(i["userId"])
+        if err == "INSUFFICIENT_CREDITS":
+            raise _InsufficientCredits("Balance no longer covers the price")
+        if err:
+            raise RuntimeError(f"Credit deduction failed: {err}")
+        credit_balances.put_ledger_entry(i["userId"], txn)
+
+    return [
+        SagaStep("seat_sold", sell_seat, release_seat),
+        SagaStep("ticket_created", create_ticket, fail_ticket),
+        # Keyed on (ticketId, ticket_purchase) in the ledger, so recovery can
+        # re-run it to learn whether an interrupted worker got the debit in
+        SagaStep("credits_deducted", deduct_credits, None, replayable=True),
+    ]
+
+
+# Once credits have moved the purchase stands; recovery only closes the journal.
+PURCHASE_SAGA_POINT_OF_NO_RETURN = "credits_deducted"
+
+purchase_saga_journal = SagaJournal("purchase")
+
+
+def _check_hold(stub, inventory_id, user_id, hold_token):
+    """Step 1: the seat must still be held by this user. Returns an error response or None."""
+    cached_hold = _get_cached_hold(inventory_id)
+    if isinstance(cached_hold, dict):
+        cached_user_id = cached_hold.get("heldByUserId")
+        cached_hold_token = cached_hold.get("holdToken")
+        if cached_user_id and cached_user_id != user_id:
+            return _error("SEAT_UNAVAILABLE", "Seat is no longer held. Please re-select.", 409)
+        if hold_token and cached_hold_token and cached_hold_token != hold_token:
+            return _error("SEAT_UNAVAILABLE", "Seat is no longer held. Please re-select.", 409)
+        validation_error = _validate_hold_state(
+            status=str(cached_hold.get("status", "")),
+            held_until=str(cached_hold.get("heldUntil", "")),
+        )
+        if validation_error:
+            return validation_error
+        logger.info("Purchase confirm using Redis hold cache for %s", inventory_id)
+    else:
+        try:
+            seat_status = stub.GetSeatStatus(
+                seat_inventory_pb2.GetSeatStatusRequest(inventory_id=inventory_id)
+            )
+        except grpc.RpcError as exc:
+            logger.error("gRPC GetSeatStatus error: %s", exc)
+            return _error("SERVICE_UNAVAILABLE", "Seat inventory service unavailable.", 503)
+        validation_error = _validate_hold_state(
+            status=seat_status.status,
+            held_until=seat_status.held_until,
+        )
+        if validation_error:
+            return validation_error
+        logger.info("Purchase confirm falling back to gRPC status for %s", inventory_id)
+    return None
+
+
+def _get_confirm_pool():
+    global _confirm_pool
+    with _confirm_pool_lock:
+        if _confirm_pool is None:
+            _confirm_pool = ThreadPoolExecutor(max_workers=CONFIRM_POOL_WORKERS, thread_name_prefix="confirm")
+        return _confirm_pool
+
+
+def _outsystems_balance(credit_data):
+    # Handle different possible field names from OutSystems
+    # and treat missing/zero balance as 0.0
+    raw_balance = (
+        credit_data.get("creditBalance")
+        if credit_data.get("creditBalance") is not None
+        else credit_data.get("CreditBalance")
+        if credit_data.get("CreditBalance") is not None
+        else credit_data.get("balance")
+        if credit_data.get("balance") is not None
+        else 0.0
+    )
+    return float(raw_balance)
+
+
+def _get_balance(user_id):
+    """(balance, err) from the local ledger, seeding it from OutSystems on first use."""
+    data, err = call_service("GET", f"{CREDIT_TXN_SERVICE}/balances/{user_id}")
+    if err != "BALANCE_NOT_FOUND":
+        return data, err
+    credit_data, err = call_credit_service("GET", f"/credits/{user_id}")
+    if err:
+        return None, err
+    return call_service("POST", f"{CREDIT_TXN_SERVICE}/balances", json={
+        "userId": user_id,
+        "creditBalance": _outsystems_balance(credit_data),
+    })
+
+
+# Late-bound so the fetch can be swapped in tests
+credit_balances = CreditBalanceCache(lambda user_id: _get_balance(user_id))
+
+
+def _start_confirm_reads(user_id, event_id):
+    """
+    Issue the event fetch and the balance read together. They do
+    not depend on each other or on hold validation, so the route starts them
+    before validating the hold.
+    """
+    pool = _get_confirm_pool()
+    return {
+        "event": pool.submit(call_service, "GET", f"{EVENT_SERVICE}/events/{event_id}"),
+        "credit": pool.submit(credit_balances.get, user_id),
+        "deadline": time.monotonic() + CONFIRM_READ_DEADLINE_SECONDS,
+    }
+
+
+def _await_read(reads, name):
+    """(data, err) for a prefetched read; anything past the shared deadline is unavailable."""
+    try:
+        return reads[name].result(timeout=max(0.0, reads["deadline"] - time.monotonic()))
+    except FuturesTimeout:
+        logger.warning("Confirm %s read missed the %.1fs deadline", name, CONFIRM_READ_DEADLINE_SECONDS)
+        return None, "SERVICE_UNAVAILABLE"
+    except Exception as exc:
+        logger.warning("Confirm %s read failed: %s", name, exc)
+        return None, "SERVICE_UNAVAILABLE"
+
+
+def _run_after_response(fn, *args):
+    """Run a post-commit side effect off the request path; failures are only logged."""
+    def run():
+        try:
+            fn(*args)
+        except Exception as exc:
+            logger.warning("Deferred purchase side effect %s failed: %s", getattr(fn, "__name__", fn), exc)
+    _get_confirm_pool().submit(run)
+
+
+def _finish_purchase_saga(inputs, done):
+    resume_saga(purchase_saga_journal, {
+        "sagaId": inputs["purchaseId"],
+        "inputs": inputs,
+        "steps": {name: None for name in done},
+    }, _purchase_saga_steps())
+
+
+def _complete_purchase(stub, user_id, event_id, inventory_id, hold_token, purchase_id=None, reads=None):
+    """
+    Steps 2-6 of confirm, shared by the inline route and the async workers.
+    `reads` are the already-started event/credit reads, if any.
+    """
+    reads = reads or _start_confirm_reads(user_id, event_id)
+
+    event_data, err = _await_read(reads, "event")
+    if err:
+        return _error("SERVICE_UNAVAILABLE", "Could not fetch event details.", 503)
+
+    venue_id     = event_data.get("venueId")
+    ticket_price = float(event_data["price"])
+
+    # 2. Check buyer credits
+    credit_data, err = _await_read(reads, "credit")
+    if err:
+        return _error("SERVICE_UNAVAILABLE", "Could not verify credit balance.", 503)
+
+    balance = float(credit_data.get("creditBalance") or 0.0)
+
+    if balance < ticket_price:
+        return _error("INSUFFICIENT_CREDITS", "Insufficient credits for this purchase.", 402)
+
+    inputs = {
+        "purchaseId":  purchase_id or str(uuid.uuid4()),
+        "userId":      user_id,
+        "eventId":     event_id,
+        "venueId":     venue_id,
+        "inventoryId": inventory_id,
+        "holdToken":   hold_token,
+        "price":       ticket_price,
+    }
+    try:
+        # The purchase stands once credits are deducted; the journal is closed
+        # after the response (or by saga recovery if this worker dies)
+        done = run_saga(purchase_saga_journal, inputs["purchaseId"], _purchase_saga_steps(stub), inputs,
+                        stop_after=PURCHASE_SAGA_POINT_OF_NO_RETURN)
+    except SagaStepError as exc:
+        if exc.compensation_errors:
+            logger.error(
+                "Compensation incomplete for purchase failure. Ticket: %s, Errors: %s",
+                inputs.get("ticketId"),
+                "; ".join(exc.compensation_errors)
+            )
+            # Journaled sagas are retried by saga recovery and only reach
+            # the DLQ once abandoned; without the journal this is the last chance.
+            if not exc.journaled:
+                _publish_compensation_dlq({
+                    "event": "purchase_compensation_failed",
+                    "ticket_id": inputs.get("ticketId"),
+                    "inventory_id": inventory_id,
+                    "user_id": user_id,
+                    "errors": exc.compensation_errors,
+                })
+        if exc.step == "seat_sold":
+            if isinstance(exc.cause, grpc.RpcError):
+                logger.error("gRPC SellSeat error: %s", exc.cause)
+                return _error("SERVICE_UNAVAILABLE", "Seat inventory service unavailable.", 503)
+            return _error("SEAT_UNAVAILABLE", "Could not confirm seat as sold.", 409)
+        if exc.step == "ticket_created":
+            return _error("INTERNAL_ERROR", "Could not create ticket record.", 500)
+        if isinstance(exc.cause, _InsufficientCredits):
+            return _error("INSUFFICIENT_CREDITS", "Insufficient credits for this purchase.", 402)
+        logger.error("Credit deduction failed for user %s — ticket %s created but credits not deducted",
+                     user_id, inputs.get("ticketId"))
+        return _error("CREDIT_DEDUCTION_FAILED", "Ticket created but credit deduction failed. Please contact support.", 500)
+
+    _run_after_response(_finish_purchase_saga, dict(inputs), list(done))
+
+    ticket_id = inputs["ticketId"]
+    ticket_data = inputs["ticket"]
+
+    return jsonify({"data": {
+        "ticketId":    ticket_id,
+        "eventId":     event_id,
+        "venueId":     venue_id,
+        "inventoryId": inventory_id,
+        "price":       ticket_price,
+        "status":      "active",
+        "createdAt":   ticket_data.get("createdAt"),
+    }}), 201
+
+
+def _wants_async(body):
+    prefer = request.headers.get("Prefer", "")
+    return bool(body.get("async")) or "respond-async" in prefer.lower()
+
+
+def _save_purchase_status(record):
+    client = _get_redis_client()
+    if client is None:
+        return False
+    try:
+        client.set(
+            f"{PURCHASE_STATUS_PREFIX}{record['purchaseId']}",
+            json.dumps(record),
+            ex=PURCHASE_STATUS_TTL_SECONDS,
+        )
+        return True
+    except Exception as exc:
+        logger.warning("Failed to store status for purchase %s: %s", record["purchaseId"], exc)
+        return False
+
+
+def _load_purchase_status(purchase_id):
+    client = _get_redis_client()
+    if client is None:
+        return None
+    try:
+        raw = client.get(f"{PURCHASE_STATUS_PREFIX}{purchase_id}")
+    except Exception as exc:
+        logger.warning("Failed to read status for purchase %s: %s", purchase_id, exc)
+        return None
+    return json.loads(raw) if raw else None
+
+
+def _broadcast_purchase_update(record):
+    """Push the outcome to notification-service without failing the worker."""
+    try:
+        _, err = call_service("POST", f"{NOTIFICATION_SERVICE}/broadcast", json={
+            "type": "purchase_update",
+            "payload": record,
+        })
+        if err:
+            logger.warning("Failed to broadcast purchase_update for %s: %s", record["purchaseId"], err)
+    except Exception as exc:
+        logger.warning("Failed to broadcast purchase_update for %s: %s", record["purchaseId"], exc)
+
+
+def _publish_purchase_confirmation(message):
+    conn = pika.BlockingConnection(pika.ConnectionParameters(
+        host=os.environ.get("RABBITMQ_HOST", "rabbitmq"),
+        port=int(os.environ.get("RABBITMQ_PORT", "5672")),
+        credentials=pika.PlainCredentials(
+            os.environ.get("RABBITMQ_USER", "guest"),
+            os.environ.get("RABBITMQ_PASS", "guest"),
+        ),
+        connection_attempts=2,
+        retry_delay=1,
+    ))
+    try:
+        ch = conn.channel()
+        ch.basic_publish(
+            exchange="",
+            routing_key=PURCHASE_CONFIRM_QUEUE,
+            body=json.dumps(message),
+            properties=pika.BasicProperties(delivery_mode=2),
+        )
+    finally:
+        conn.close()
+
+
+def _enqueue_purchase(user_id, event_id, inventory_id, hold_token):
+    """
+    Accept a validated confirm for background completion. Returns a 202
+    response, or None if the status store or queue is unavailable.
+    """
+    purchase_id = str(uuid.uuid4())
+    record = {
+        "purchaseId":  purchase_id,
+        "userId":      user_id,
+        "eventId":     event_id,
+        "inventoryId": inventory_id,
+        "status":      "pending",
+        "createdAt":   datetime.now(timezone.utc).isoformat(),
+    }
+    if not _save_purchase_status(record):
+        return None
+    try:
+        _publish_purchase_confirmation({
+            "purchaseId":  purchase_id,
+            "userId":      user_id,
+            "eventId":     event_id,
+            "inventoryId": inventory_id,
+            "holdToken":   hold_token,
+        })
+    except Exception as exc:
+        logger.warning("Failed to enqueue purchase %s: %s", purchase_id, exc)
+        client = _get_redis_client()
+        if client is not None:
+            try:
+                client.delete(f"{PURCHASE_STATUS_PREFIX}{purchase_id}")
+            except Exception:
+                pass
+        return None
+
+    status_url = f"/purchase/confirm/status/{purchase_id}"
+    return jsonify({"data": {
+        "purchaseId": purchase_id,
+        "status":     "pending",
+        "statusUrl":  status_url,
+    }}), 202, {"Location": status_url}
+
+
+def finish_purchase(record, http_status, payload):
+    """Record the outcome of an async purchase and push it to the buyer."""
+    record = {**record, "completedAt": datetime.now(timezone.utc).isoformat()}
+    if http_status == 201:
+        record["status"] = "completed"
+        record["ticket"] = payload.get("data")
+    else:
+        record["status"] = "failed"
+        record["error"] = payload.get("error")
+        record["httpStatus"] = http_status
+    _save_purchase_status(record)
+    _run_after_response(_broadcast_purchase_update, record)
+    return record
+
+
+def process_purchase_confirmation(message):
+    """
+    Complete one queued confirm. Must run inside an app context. Redeliveries
+    of a purchase whose saga already began are skipped — a worker that died
+    mid-saga is finished or unwound by saga recovery instead. A purchase left
+    "processing" with no saga journal died before anything was written
+    downstream, so its redelivery takes it over.
+    """
+    purchase_id = message["purchaseId"]
+    record = _load_purchase_status(purchase_id) or {
+        "purchaseId":  purchase_id,
+        "userId":      message["userId"],
+        "eventId":     message["eventId"],
+        "inventoryId": message["inventoryId"],
+    }
+    status = record.get("status")
+    if status == "processing" and purchase_saga_journal.load(purchase_id) is None:
+        logger.info("Purchase %s was interrupted before its saga began — taking it over", purchase_id)
+    elif status not in (None, "pending"):
+        logger.info("Purchase %s already %s — skipping redelivery", purchase_id, status)
+        return record
+    record["status"] = "processing"
+    _save_purchase_status(record)
+
+    stub, channel = _resolve_stub_and_channel(_grpc_stub())
+    try:
+        response, http_status = _complete_purchase(
+            stub,
+            message["userId"],
+            message["eventId"],
+            message["inventoryId"],
+            message.get("holdToken", ""),
+            purchase_id=purchase_id,
+        )
+    except Exception as exc:
+        logger.error("Async purchase %s failed: %s", purchase_id, exc)
+        return finish_purchase(record, 500, {"error": {
+            "code": "INTERNAL_ERROR", "message": "Purchase could not be completed.",
+        }})
+    finally:
+        _release_grpc_stub((stub, channel))
+    return finish_purchase(record, http_status, response.get_json())
+
+
 # ── POST /purchase/hold/<inventory_id> ───────────────────────────────────────
 
 @bp.post("/purchase/hold/<inventory_id>")
@@ -296,11 +821,21 @@ def hold_seat(inventory_id):
         description: Seat not found
       409:
         description: Seat already held or sold
+      429:
+        description: Too many hold attempts — retry after the Retry-After header
       503:
         description: Seat inventory service unavailable
     """
     user_id = request.user["userId"]
 
+    decision = hold_limiter.hit(user_id)
+    if not decision.allowed:
+        response, status = _error(
+            "RATE_LIMITED", f"Too many seat holds. Try again in {decision.retry_after} seconds.", 429,
+        )
+        response.headers["Retry-After"] = str(decision.retry_after)
+        return response, status
+
     stub = None
     channel = None
     try:
@@ -440,9 +975,19 @@ def confirm_purchase(inventory_id):
             holdToken:
               type: string
               example: c378f45d-4236-4d49-8d93-d5e965964ada
+            async:
+              type: boolean
+              description: >
+                Validate the hold, then complete in the background (also
+                enabled by the header "Prefer: respond-async"). Falls back to
+                an inline confirm if the queue or status store is unavailable.
     responses:
       201:
         description: Ticket created successfully
+      202:
+        description: >
+          Accepted for async completion. Returns purchaseId and statusUrl; the
+          outcome is pushed as a purchase_update notification and can be polled.
       400:
         description: Missing eventId or validation error
       402:
@@ -467,203 +1012,55 @@ def confirm_purchase(inventory_id):
     channel = None
     try:
         stub, channel = _resolve_stub_and_channel(_grpc_stub())
-        cached_hold = _get_cached_hold(inventory_id)
-        if isinstance(cached_hold, dict):
-            cached_user_id = cached_hold.get("heldByUserId")
-            cached_hold_token = cached_hold.get("holdToken")
-            if cached_user_id and cached_user_id != user_id:
-                return _error("SEAT_UNAVAILABLE", "Seat is no longer held. Please re-select.", 409)
-            if hold_token and cached_hold_token and cached_hold_token != hold_token:
-                return _error("SEAT_UNAVAILABLE", "Seat is no longer held. Please re-select.", 409)
-            validation_error = _validate_hold_state(
-                status=str(cached_hold.get("status", "")),
-                held_until=str(cached_hold.get("heldUntil", "")),
-            )
-            if validation_error:
-                return validation_error
-            logger.info("Purchase confirm using Redis hold cache for %s", inventory_id)
-        else:
-            try:
-                seat_status = stub.GetSeatStatus(
-                    seat_inventory_pb2.GetSeatStatusRequest(inventory_id=inventory_id)
-                )
-            except grpc.RpcError as exc:
-                logger.error("gRPC GetSeatStatus error: %s", exc)
-                return _error("SERVICE_UNAVAILABLE", "Seat inventory service unavailable.", 503)
-            validation_error = _validate_hold_state(
-                status=seat_status.status,
-                held_until=seat_status.held_until,
-            )
-            if validation_error:
-                return validation_error
-            logger.info("Purchase confirm falling back to gRPC status for %s", inventory_id)
-
-        event_data, err = call_service("GET", f"{EVENT_SERVICE}/events/{event_id}")
-        if err:
-            return _error("SERVICE_UNAVAILABLE", "Could not fetch event details.", 503)
-
-        venue_id     = event_data.get("venueId")
-        ticket_price = float(event_data["price"])
-
-        # 2. Check buyer credits (OutSystems)
-        credit_data, err = call_credit_service("GET", f"/credits/{user_id}")
-        if err:
-            return _error("SERVICE_UNAVAILABLE", "Could not verify credit balance.", 503)
-
-        logger.info("Credit data response: %s", credit_data)
-
-        # Handle different possible field names from OutSystems
-        # and treat missing/zero balance as 0.0
-        raw_balance = (
-            credit_data.get("creditBalance")
-            if credit_data.get("creditBalance") is not None
-            else credit_data.get("CreditBalance")
-            if credit_data.get("CreditBalance") is not None
-            else credit_data.get("balance")
-            if credit_data.get("balance") is not None
-            else 0.0
-        )
-        balance = float(raw_balance)
-
-        if balance < ticket_price:
-            return _error("INSUFFICIENT_CREDITS", "Insufficient credits for this purchase.", 402)
-
-        # 3. Sell seat via gRPC
-        try:
-            sell_resp = stub.SellSeat(seat_inventory_pb2.SellSeatRequest(
-                inventory_id=inventory_id,
-                user_id=user_id,
-                hold_token=hold_token,
-            ))
-            if not sell_resp.success:
-                return _error("SEAT_UNAVAILABLE", "Could not confirm seat as sold.", 409)
-        except grpc.RpcError as exc:
-            logger.error("gRPC SellSeat error: %s", exc)
-            return _error("SERVICE_UNAVAILABLE", "Seat inventory service unavailable.", 503)
-
-        # 4. Create ticket record
-        ticket_data, err = call_service("POST", f"{TICKET_SERVICE}/tickets", json={
-            "inventoryId": inventory_id,
-            "ownerId":     user_id,
-            "venueId":     venue_id,
-            "eventId":     event_id,
-            "price":       ticket_price,
-            "status":      "active",
-        })
-        if err:
-            # Compensate: release seat back
-            try:
-                stub.ReleaseSeat(seat_inventory_pb2.ReleaseSeatRequest(
-                    inventory_id=inventory_id,
-                    user_id=user_id,
-                    hold_token=hold_token,
-                ))
-            except Exception:
-                pass
-            return _error("INTERNAL_ERROR", "Could not create ticket record.", 500)
-
-        ticket_id = ticket_data["ticketId"]
-
-        # 5. Deduct credits (OutSystems)
-        _, err = call_credit_service("PATCH", f"/credits/{user_id}", json={
-            "creditBalance": balance - ticket_price,
-        })
-        if err:
-            # Compensating action: mark ticket as payment_failed and release seat
-            logger.error("Credit deduction failed for user %s — ticket %s created but credits not deducted", user_id, ticket_id)
-            compensation_errors = []
-            
-            try:
-                # Mark ticket as payment_failed for manual reconciliation
-                _, patch_err = call_service("PATCH", f"{TICKET_SERVICE}/tickets/{ticket_id}", json={
-                    "status": "payment_failed",
-                })
-                if patch_err:
-                    compensation_errors.append(f"Failed to mark ticket status: {patch_err}")
-                    logger.error("Failed to mark ticket %s as payment_failed: %s", ticket_id, patch_err)
-            except Exception as patch_err:
-                compensation_errors.append(f"Exception marking ticket status: {str(patch_err)}")
-                logger.error("Failed to mark ticket %s as payment_failed: %s", ticket_id, patch_err)
-            
-            try:
-                # Release the seat back to available
-                stub.ReleaseSeat(seat_inventory_pb2.ReleaseSeatRequest(
-                    inventory_id=inventory_id,
-                    user_id=user_id,
-                    hold_token=hold_token,
-                ))
-            except Exception as release_err:
-                compensation_errors.append(f"Failed to release seat: {str(release_err)}")
-                logger.error("Failed to release seat %s after credit deduction failure: %s", inventory_id, release_err)
-            
-            # Log compensation failures to DLQ for manual intervention
-            if compensation_errors:
-                logger.error(
-                    "Compensation incomplete for purchase failure. Ticket: %s, Errors: %s",
-                    ticket_id,
-                    "; ".join(compensation_errors)
-                )
-                # Send to DLQ for manual reconciliation
-                try:
-                    import pika
-                    import json as json_module
-                    from datetime import UTC
-                    
-                    message = json_module.dumps({
-                        "event": "purchase_compensation_failed",
-                        "ticket_id": ticket_id,
-                        "inventory_id": inventory_id,
-                        "user_id": user_id,
-                        "errors": compensation_errors,
-                        "timestamp": datetime.now(UTC).isoformat(),
-                    })
-                    
-                    conn = pika.BlockingConnection(pika.ConnectionParameters(
-                        host=os.environ.get("RABBITMQ_HOST", "rabbitmq"),
-                        port=int(os.environ.get("RABBITMQ_PORT", "5672")),
-                        credentials=pika.PlainCredentials(
-                            os.environ.get("RABBITMQ_USER", "guest"),
-                            os.environ.get("RABBITMQ_PASS", "guest"),
-                        ),
-                        connection_attempts=2,
-                        retry_delay=1,
-                    ))
-                    ch = conn.channel()
-                    ch.basic_publish(
-                        exchange="",
-                        routing_key="purchase_compensation_dlq",
-                        body=message,
-                        properties=pika.BasicProperties(delivery_mode=2),
-                    )
-                    conn.close()
-                    logger.info("Purchase compensation failure logged to DLQ for ticket %s", ticket_id)
-                except Exception as dlq_err:
-                    logger.error("Failed to log compensation failure to DLQ: %s", dlq_err)
-            
-            return _error("CREDIT_DEDUCTION_FAILED", "Ticket created but credit deduction failed. Please contact support.", 500)
-
-        # 6. Log credit transaction
-        call_service("POST", f"{CREDIT_TXN_SERVICE}/credit-transactions", json={
-            "userId":      user_id,
-            "delta":       -ticket_price,
-            "reason":      "ticket_purchase",
-            "referenceId": ticket_id,
-        })
-
-        return jsonify({"data": {
-            "ticketId":    ticket_id,
-            "eventId":     event_id,
-            "venueId":     venue_id,
-            "inventoryId": inventory_id,
-            "price":       ticket_price,
-            "status":      "active",
-            "createdAt":   ticket_data.get("createdAt"),
-        }}), 201
+        # Async confirms re-read in the worker, so only prefetch when inline
+        reads = None if _wants_async(body) else _start_confirm_reads(user_id, event_id)
+        hold_error = _check_hold(stub, inventory_id, user_id, hold_token)
+        if hold_error:
+            return hold_error
+
+        if _wants_async(body):
+            accepted = _enqueue_purchase(user_id, event_id, inventory_id, hold_token)
+            if accepted:
+                return accepted
+            logger.warning("Async confirm unavailable for %s — completing inline", inventory_id)
+
+        return _complete_purchase(stub, user_id, event_id, inventory_id, hold_token, reads=reads)
     finally:
         if stub is not None:
             _release_grpc_stub((stub, channel))
 
 
+# ── GET /purchase/confirm/status/<purchase_id> ──────────────────────────────
+
+@bp.get("/purchase/confirm/status/<purchase_id>")
+@require_auth
+def get_purchase_status(purchase_id):
+    """
+    Poll the outcome of an async purchase confirmation
+    ---
+    tags:
+      - Purchase
+    security:
+      - BearerAuth: []
+    parameters:
+      - in: path
+        name: purchase_id
+        required: true
+        type: string
+    responses:
+      200:
+        description: >
+          Purchase status — pending, processing, completed (with ticket) or
+          failed (with error)
+      404:
+        description: Unknown or expired purchase
+    """
+    record = _load_purchase_status(purchase_id)
+    if not record or record.get("userId") != request.user["userId"]:
+        return _error("PURCHASE_NOT_FOUND", "Purchase not found.", 404)
+    return jsonify({"data": record}), 200
+
+
 # ── GET /purchase/hold/resume/<event_id> ─────────────────────────────────────
 
 @bp.get("/purchase/hold/resume/<event_id>")
@@ -0,0 +1,84 @@
+"""
+Purchase saga recovery.
+
+Runs in a daemon thread and picks up confirm sagas whose worker stopped
+journaling before they finished, plus sagas whose compensation failed and
+needs another try. An interrupted debit is replayed first (the ledger entry
+is keyed on the ticket) to learn whether it went through. A purchase whose
+credits were deducted is finished; anything earlier is unwound — the ticket is marked
+payment_failed and the seat released.
+"""
+import logging
+
+from shared.saga_journal import (
+    COMPENSATING,
+    COMPENSATION_FAILED,
+    compensate_saga,
+    resume_saga,
+    run_recovery_loop,
+    settle_interrupted_step,
+)
+
+logger = logging.getLogger(__name__)
+
+
+def recover_purchase_saga(saga):
+    from routes import (
+        PURCHASE_SAGA_POINT_OF_NO_RETURN,
+        _load_purchase_status,
+        _purchase_saga_steps,
+        finish_purchase,
+        purchase_saga_journal,
+    )
+
+    saga_id = saga["sagaId"]
+    inputs = saga["inputs"]
+    steps = _purchase_saga_steps()
+    # The worker may have died between the debit and its journal entry
+    settle_interrupted_step(purchase_saga_journal, saga, steps)
+    done = list(saga["steps"])
+    # Async purchases (saga id == purchaseId) also get their status settled
+    record = _load_purchase_status(saga_id)
+
+    if saga["status"] not in (COMPENSATING, COMPENSATION_FAILED) and PURCHASE_SAGA_POINT_OF_NO_RETURN in done:
+        logger.info("Resuming purchase saga %s after %s", saga_id, ", ".join(done))
+        resume_saga(purchase_saga_journal, saga, steps)
+        if record:
+            finish_purchase(record, 201, {"data": {
+                "ticketId":    inputs.get("ticketId"),
+                "eventId":     inputs.get("eventId"),
+                "venueId":     inputs.get("venueId"),
+                "inventoryId": inputs.get("inventoryId"),
+                "price":       inputs.get("price"),
+                "status":      "active",
+                "createdAt":   (inputs.get("ticket") or {}).get("createdAt"),
+            }})
+        return
+
+    logger.info("Compensating purchase saga %s (%s completed)", saga_id, ", ".join(done) or "nothing")
+    compensate_saga(purchase_saga_journal, saga_id, steps, inputs, done, saga["compensations"])
+    if record and record.get("status") not in ("completed", "failed"):
+        finish_purchase(record, 500, {"error": {
+            "code": "PURCHASE_FAILED", "message": "Purchase was interrupted and has been rolled back.",
+        }})
+
+
+def _abandon_purchase_saga(saga):
+    from routes import _publish_compensation_dlq
+
+    _publish_compensation_dlq({
+        "event": "purchase_compensation_failed",
+        "ticket_id": saga["inputs"].get("ticketId"),
+        "inventory_id": saga["inputs"].get("inventoryId"),
+        "user_id": saga["inputs"].get("userId"),
+        "completed_steps": list(saga["steps"]),
+        "compensated_steps": list(saga["compensations"]),
+        "attempts": saga["attempts"],
+    })
+
+
+def start_saga_recovery():
+    """Blocking recovery loop — run in a daemon thread."""
+    from routes import purchase_saga_journal
+
+    run_recovery_loop(purchase_saga_journal, recover_purchase_saga, on_abandon=_abandon_purchase_saga)
@@ -10,6 +10,8 @@ from threading import Lock
 
 import requests
 
+from shared.outbound_governor import GovernorSaturated, governor
+
 logger = logging.getLogger(__name__)
 
 # Timeout configuration (in seconds)
@@ -119,6 +121,9 @@ class CircuitBreakerOpenError(Exception):
 # Configurable timeout for OutSystems calls (default 5 seconds)
 OUTSYSTEMS_TIMEOUT = int(os.environ.get("OUTSYSTEMS_TIMEOUT_SECONDS", "5"))
 
+# OutSystems is external and rate limited; a stall there must not take every worker
+outsystems = governor("outsystems", max_concurrent=10, rate_per_second=50, queue_timeout_seconds=1)
+
 
 def call_service(method, url, **kwargs):
     """
@@ -142,11 +147,15 @@ def call_service(method, url, **kwargs):
             
             def make_request():
                 resp = requests.request(method, url, **kwargs)
-                resp.raise_for_status()
-                return resp.json()
-            
-            result = cb.call(make_request)
-            return result, None
+                if resp.status_code >= 500:
+                    resp.raise_for_status()
+                return resp
+
+            resp = cb.call(make_request)
+            # A 4xx (e.g. BALANCE_NOT_FOUND) is an answer, not an outage, so
+            # it is raised outside the breaker and never trips it
+            resp.raise_for_status()
+            return resp.json(), None
             
         except CircuitBreakerOpenError:
             logger.warning("Circuit breaker open for service %s", service_name)
@@ -194,10 +203,15 @@ def call_credit_service(method, path, **kwargs):
     Call the OutSystems Credit Service.
     Automatically injects the OUTSYSTEMS_API_KEY header.
     Uses configurable timeout from OUTSYSTEMS_TIMEOUT_SECONDS env var.
+    Fails fast with SERVICE_UNAVAILABLE when the outsystems governor is saturated.
     """
     headers = kwargs.pop("headers", {})
     headers["X-API-KEY"] = os.environ["OUTSYSTEMS_API_KEY"]
     base = os.environ["CREDIT_SERVICE_URL"].rstrip("/")
     # Apply OutSystems-specific timeout if not already set
     kwargs.setdefault("timeout", OUTSYSTEMS_TIMEOUT)
-    return call_service(method, f"{base}{path}", headers=headers, **kwargs)
+    try:
+        with outsystems.slot():
+            return call_service(method, f"{base}{path}", headers=headers, **kwargs)
+    except GovernorSaturated:
+        return None, "SERVICE_UNAVAILABLE"
@@ -30,4 +30,20 @@ def app():
 
 @pytest.fixture()
 def client(app):
-    return app.test_client()
\ No newline at end of file
+    return app.test_client()
+
+@pytest.fixture(autouse=True)
+def inline_deferred_side_effects():
+    """Run post-response work synchronously so call order stays deterministic."""
+    with patch("routes._run_after_response", side_effect=lambda fn, *args: fn(*args)):
+        yield
+
+
+@pytest.fixture(autouse=True)
+def fresh_credit_balance_cache():
+    """A per-test balance cache, so no test joins another test's in-flight fetch."""
+    import routes
+    from shared.credit_balance_cache import CreditBalanceCache
+
+    with patch("routes.credit_balances", CreditBalanceCache(lambda user_id: routes._get_balance(user_id), redis_url="")):
+        yield
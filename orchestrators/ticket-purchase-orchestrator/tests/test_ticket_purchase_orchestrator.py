@@ -1,5 +1,7 @@
 """Tests for ticket-purchase-orchestrator."""
 import os
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
 from datetime import datetime, timedelta, timezone
 from unittest.mock import MagicMock, patch
 
@@ -18,6 +20,15 @@ def _auth(user_id="usr_001"):
     return {"Authorization": f"Bearer {_token(user_id)}"}
 
 
+@contextmanager
+def _drained_confirm_pool():
+    """Route prefetches to a private pool and wait for it while mocks are still active."""
+    pool = ThreadPoolExecutor(max_workers=4)
+    with patch("routes._confirm_pool", pool):
+        yield
+    pool.shutdown(wait=True)
+
+
 def test_health(client):
     assert client.get("/health").status_code == 200
 
@@ -54,8 +65,23 @@ def test_hold_seat_unavailable(mock_stub, client):
     assert res.get_json()["error"]["code"] == "SEAT_NOT_AVAILABLE"
 
 
+@patch("routes._grpc_stub")
+def test_hold_rate_limited(mock_stub, client):
+    from shared.rate_limiter import Decision
+
+    with patch("routes.hold_limiter") as limiter:
+        limiter.hit.return_value = Decision(False, 0, 42, 20)
+        res = client.post("/purchase/hold/inv_001", headers=_auth())
+
+    assert res.status_code == 429
+    assert res.headers["Retry-After"] == "42"
+    assert res.get_json()["error"]["code"] == "RATE_LIMITED"
+    limiter.hit.assert_called_once_with("usr_001")
+    mock_stub.assert_not_called()
+
+
 @patch("routes.call_service")
-@patch("routes.call_credit_service")
+@patch("routes._get_balance")
 @patch("routes._get_cached_hold")
 @patch("routes._grpc_stub")
 def test_confirm_success(mock_stub, mock_cached_hold, mock_credit, mock_svc, client):
@@ -69,10 +95,7 @@ def test_confirm_success(mock_stub, mock_cached_hold, mock_credit, mock_svc, cli
     mock_stub.return_value = stub
     mock_cached_hold.return_value = None
 
-    mock_credit.side_effect = [
-        ({"creditBalance": 200.0}, None),
-        ({}, None),
-    ]
+    mock_credit.return_value = ({"creditBalance": 200.0}, None)
     mock_svc.side_effect = [
         ({"eventId": "evt_001", "venueId": "ven_001", "price": 80.0}, None),
         ({"ticketId": "tkt_001", "createdAt": "2025-01-01"}, None),
@@ -84,10 +107,14 @@ def test_confirm_success(mock_stub, mock_cached_hold, mock_credit, mock_svc, cli
                       headers=_auth())
     assert res.status_code == 201
     assert res.get_json()["data"]["ticketId"] == "tkt_001"
+    # The ledger entry is the debit; OutSystems is not written inline
+    debit = mock_svc.call_args_list[2]
+    assert debit[0][1].endswith("/credit-transactions")
+    assert debit[1]["json"]["delta"] == -80.0
 
 
 @patch("routes.call_service")
-@patch("routes.call_credit_service")
+@patch("routes._get_balance")
 @patch("routes._get_cached_hold")
 @patch("routes._grpc_stub")
 def test_confirm_success_uses_cached_hold(mock_stub, mock_cached_hold, mock_credit, mock_svc, client):
@@ -101,10 +128,7 @@ def test_confirm_success_uses_cached_hold(mock_stub, mock_cached_hold, mock_cred
         "heldUntil": (datetime.now(timezone.utc) + timedelta(minutes=5)).isoformat(),
     }
 
-    mock_credit.side_effect = [
-        ({"creditBalance": 200.0}, None),
-        ({}, None),
-    ]
+    mock_credit.return_value = ({"creditBalance": 200.0}, None)
     mock_svc.side_effect = [
         ({"eventId": "evt_001", "venueId": "ven_001", "price": 80.0}, None),
         ({"ticketId": "tkt_001", "createdAt": "2025-01-01"}, None),
@@ -144,8 +168,11 @@ def test_confirm_requires_event_id(mock_stub, mock_credit, mock_svc, client):
     mock_svc.assert_not_called()
 
 
+@patch("routes.call_service", return_value=({}, None))
+@patch("routes.call_credit_service", return_value=({}, None))
 @patch("routes._grpc_stub")
-def test_confirm_hold_expired(mock_stub, client):
+@_drained_confirm_pool()
+def test_confirm_hold_expired(mock_stub, _credit, _svc, client):
     stub = MagicMock()
     stub.GetSeatStatus.return_value = MagicMock(
         status="held",
@@ -157,9 +184,12 @@ def test_confirm_hold_expired(mock_stub, client):
     assert res.get_json()["error"]["code"] == "PAYMENT_HOLD_EXPIRED"
 
 
+@patch("routes.call_service", return_value=({}, None))
+@patch("routes.call_credit_service", return_value=({}, None))
 @patch("routes._get_cached_hold")
 @patch("routes._grpc_stub")
-def test_confirm_cached_hold_token_mismatch(mock_stub, mock_cached_hold, client):
+@_drained_confirm_pool()
+def test_confirm_cached_hold_token_mismatch(mock_stub, mock_cached_hold, _credit, _svc, client):
     mock_stub.return_value = MagicMock()
     mock_cached_hold.return_value = {
         "status": "held",
@@ -178,8 +208,35 @@ def test_confirm_cached_hold_token_mismatch(mock_stub, mock_cached_hold, client)
     assert res.get_json()["error"]["code"] == "SEAT_UNAVAILABLE"
 
 
+@patch("routes.CONFIRM_READ_DEADLINE_SECONDS", 0.2)
 @patch("routes.call_service")
-@patch("routes.call_credit_service")
+@patch("routes._get_balance")
+@patch("routes._get_cached_hold")
+@patch("routes._grpc_stub")
+def test_confirm_reads_share_one_deadline(mock_stub, mock_cached_hold, mock_credit, mock_svc, client):
+    import threading
+    import time
+
+    released = threading.Event()
+    mock_stub.return_value = _held_stub()
+    mock_cached_hold.return_value = None
+    # The event read is issued while the balance read is still blocked
+    mock_credit.side_effect = lambda *a, **kw: (released.wait(2), ({"creditBalance": 200.0}, None))[1]
+    mock_svc.return_value = ({"eventId": "evt_001", "venueId": "ven_001", "price": 80.0}, None)
+
+    started = time.monotonic()
+    res = client.post("/purchase/confirm/inv_001", json={"eventId": "evt_001"}, headers=_auth())
+    elapsed = time.monotonic() - started
+    released.set()
+
+    assert res.status_code == 503
+    assert elapsed < 1
+    mock_svc.assert_called_once()
+    mock_stub.return_value.SellSeat.assert_not_called()
+
+
+@patch("routes.call_service")
+@patch("routes._get_balance")
 @patch("routes._get_cached_hold")
 @patch("routes._grpc_stub")
 def test_confirm_insufficient_credits(mock_stub, mock_cached_hold, mock_credit, mock_svc, client):
@@ -200,7 +257,7 @@ def test_confirm_insufficient_credits(mock_stub, mock_cached_hold, mock_credit,
 
 
 @patch("routes.call_service")
-@patch("routes.call_credit_service")
+@patch("routes._get_balance")
 @patch("routes._get_cached_hold")
 @patch("routes._grpc_stub")
 def test_confirm_ticket_failure_releases_seat(mock_stub, mock_cached_hold, mock_credit, mock_svc, client):
@@ -263,3 +320,271 @@ def test_resume_hold_unwraps_enriched_event_and_seat_payloads(mock_svc, client):
     assert payload["seat"]["price"] == 248.0
     assert payload["event"]["name"] == "Taylor Swift | The Eras Tour"
     assert payload["event"]["venueName"] == "National Stadium"
+
+
+@patch("routes.call_service")
+@patch("routes._get_balance")
+@patch("routes._get_cached_hold")
+@patch("routes._grpc_stub")
+def test_confirm_credit_failure_compensates(mock_stub, mock_cached_hold, mock_credit, mock_svc, client):
+    stub = MagicMock()
+    stub.GetSeatStatus.return_value = MagicMock(
+        status="held",
+        held_until=(datetime.now(timezone.utc) + timedelta(minutes=5)).isoformat(),
+    )
+    stub.SellSeat.return_value = MagicMock(success=True)
+    mock_stub.return_value = stub
+    mock_cached_hold.return_value = None
+    mock_credit.return_value = ({"creditBalance": 200.0}, None)
+    mock_svc.side_effect = [
+        ({"eventId": "evt_001", "venueId": "ven_001", "price": 80.0}, None),
+        ({"ticketId": "tkt_001"}, None),
+        (None, "SERVICE_UNAVAILABLE"),      # ledger debit fails
+        ({}, None),                         # COMP: mark ticket payment_failed
+    ]
+
+    res = client.post("/purchase/confirm/inv_001", json={"eventId": "evt_001"}, headers=_auth())
+
+    assert res.status_code == 500
+    assert res.get_json()["error"]["code"] == "CREDIT_DEDUCTION_FAILED"
+    assert mock_svc.call_args_list[3][0][:2] == ("PATCH", "http://ticket-service:5000/tickets/tkt_001")
+    stub.ReleaseSeat.assert_called_once()
+
+
+@patch("routes.call_service")
+@patch("routes._get_balance")
+@patch("routes._get_cached_hold", return_value=None)
+@patch("routes._grpc_stub")
+def test_confirm_concurrent_spend_refused_by_ledger(mock_stub, _cached, mock_credit, mock_svc, client):
+    stub = _held_stub()
+    stub.SellSeat.return_value = MagicMock(success=True)
+    mock_stub.return_value = stub
+    mock_credit.return_value = ({"creditBalance": 100.0}, None)
+    mock_svc.side_effect = [
+        ({"eventId": "evt_001", "venueId": "ven_001", "price": 80.0}, None),
+        ({"ticketId": "tkt_001"}, None),
+        (None, "INSUFFICIENT_CREDITS"),     # another purchase spent the balance first
+        ({}, None),
+    ]
+
+    res = client.post("/purchase/confirm/inv_001", json={"eventId": "evt_001"}, headers=_auth())
+
+    assert res.status_code == 402
+    assert res.get_json()["error"]["code"] == "INSUFFICIENT_CREDITS"
+    assert mock_svc.call_args_list[3][1]["json"] == {"status": "payment_failed"}
+    stub.ReleaseSeat.assert_called_once()
+
+
+@patch("routes.call_service")
+@patch("routes.call_credit_service")
+def test_balance_seeded_from_outsystems_once(mock_credit, mock_svc):
+    from routes import _get_balance
+
+    mock_svc.side_effect = [
+        (None, "BALANCE_NOT_FOUND"),
+        ({"userId": "usr_001", "creditBalance": 60.0}, None),
+    ]
+    mock_credit.return_value = ({"CreditBalance": 60.0}, None)
+
+    assert _get_balance("usr_001") == ({"userId": "usr_001", "creditBalance": 60.0}, None)
+    assert mock_svc.call_args[1]["json"] == {"userId": "usr_001", "creditBalance": 60.0}
+
+
+def _journaled_purchase(*steps):
+    return {
+        "sagaId": "pur_001",
+        "status": "running",
+        "inputs": {
+            "purchaseId": "pur_001", "userId": "usr_001", "eventId": "evt_001",
+            "venueId": "ven_001", "inventoryId": "inv_001", "holdToken": "tok",
+            "price": 80.0, "ticketId": "tkt_001",
+        },
+        "steps": {step: {"result": None} for step in steps},
+        "compensations": {},
+        "attempts": 1,
+    }
+
+
+@patch("routes.purchase_saga_journal")
+@patch("routes.call_service")
+def test_recovery_finishes_purchase_after_credit_deduction(mock_svc, mock_journal):
+    from saga_recovery import recover_purchase_saga
+
+    mock_svc.return_value = ({}, None)
+    recover_purchase_saga(_journaled_purchase("seat_sold", "ticket_created", "credits_deducted"))
+
+    # The debit was the last step, so nothing is called again
+    mock_svc.assert_not_called()
+    mock_journal.finish.assert_called_once_with("pur_001", "completed")
+
+
+@patch("routes.purchase_saga_journal")
+@patch("routes._grpc_stub")
+@patch("routes.call_service")
+def test_recovery_unwinds_purchase_before_credit_deduction(mock_svc, mock_stub, mock_journal):
+    from saga_recovery import recover_purchase_saga
+
+    stub = MagicMock()
+    mock_stub.return_value = stub
+    mock_svc.side_effect = lambda method, url, **kw: (
+        (None, "INSUFFICIENT_CREDITS") if "credit-transactions" in url else ({}, None)
+    )
+    recover_purchase_saga(_journaled_purchase("seat_sold", "ticket_created"))
+
+    assert mock_svc.call_args[1]["json"] == {"status": "payment_failed"}
+    stub.ReleaseSeat.assert_called_once()
+    mock_journal.finish.assert_called_once_with("pur_001", "compensated", [])
+
+
+@patch("routes.purchase_saga_journal")
+@patch("routes._grpc_stub")
+@patch("routes.call_service")
+def test_recovery_finishes_purchase_debited_before_crash(mock_svc, mock_stub, mock_journal):
+    """The worker died after the debit went through but before step_done."""
+    from saga_recovery import recover_purchase_saga
+
+    stub = MagicMock()
+    mock_stub.return_value = stub
+    mock_svc.return_value = (
+        {"txnId": "txn_1", "userId": "usr_001", "delta": -80.0, "created": False}, None,
+    )
+    recover_purchase_saga(_journaled_purchase("seat_sold", "ticket_created"))
+
+    mock_svc.assert_called_once()
+    assert mock_svc.call_args[1]["json"]["referenceId"] == "tkt_001"
+    stub.ReleaseSeat.assert_not_called()
+    mock_journal.step_done.assert_called_once_with("pur_001", "credits_deducted", None)
+    mock_journal.finish.assert_called_once_with("pur_001", "completed")
+
+
+def _held_stub():
+    stub = MagicMock()
+    stub.GetSeatStatus.return_value = MagicMock(
+        status="held",
+        held_until=(datetime.now(timezone.utc) + timedelta(minutes=5)).isoformat(),
+    )
+    return stub
+
+
+@patch("routes._publish_purchase_confirmation")
+@patch("routes._save_purchase_status", return_value=True)
+@patch("routes.call_service")
+@patch("routes._get_cached_hold", return_value=None)
+@patch("routes._grpc_stub")
+def test_confirm_async_returns_202(mock_stub, _cached, mock_svc, mock_save, mock_publish, client):
+    mock_stub.return_value = _held_stub()
+
+    res = client.post("/purchase/confirm/inv_001",
+                      json={"eventId": "evt_001", "holdToken": "tok_abc", "async": True},
+                      headers=_auth())
+
+    assert res.status_code == 202
+    data = res.get_json()["data"]
+    assert data["status"] == "pending"
+    assert res.headers["Location"] == data["statusUrl"]
+    assert mock_save.call_args[0][0]["purchaseId"] == data["purchaseId"]
+    assert mock_publish.call_args[0][0]["holdToken"] == "tok_abc"
+    mock_svc.assert_not_called()   # nothing past hold validation runs inline
+
+
+@patch("routes._save_purchase_status", return_value=False)
+@patch("routes.call_service")
+@patch("routes._get_balance")
+@patch("routes._get_cached_hold", return_value=None)
+@patch("routes._grpc_stub")
+def test_confirm_async_falls_back_inline(mock_stub, _cached, mock_credit, mock_svc, _save, client):
+    stub = _held_stub()
+    stub.SellSeat.return_value = MagicMock(success=True)
+    mock_stub.return_value = stub
+    mock_credit.return_value = ({"creditBalance": 200.0}, None)
+    mock_svc.side_effect = [
+        ({"eventId": "evt_001", "venueId": "ven_001", "price": 80.0}, None),
+        ({"ticketId": "tkt_001"}, None),
+        (None, None),
+    ]
+
+    res = client.post("/purchase/confirm/inv_001", json={"eventId": "evt_001"},
+                      headers={**_auth(), "Prefer": "respond-async"})
+
+    assert res.status_code == 201
+
+
+@patch("routes._save_purchase_status", return_value=True)
+@patch("routes._load_purchase_status")
+@patch("routes._complete_purchase")
+@patch("routes._grpc_stub")
+@patch("routes.call_service")
+def test_purchase_worker_records_and_pushes_result(mock_svc, _stub, mock_complete, mock_load, mock_save, app):
+    from flask import jsonify
+
+    from routes import process_purchase_confirmation
+
+    mock_load.return_value = {"purchaseId": "pur_001", "userId": "usr_001", "status": "pending"}
+    mock_svc.return_value = ({}, None)
+    with app.app_context():
+        mock_complete.return_value = (jsonify({"data": {"ticketId": "tkt_001"}}), 201)
+        record = process_purchase_confirmation({
+            "purchaseId": "pur_001", "userId": "usr_001", "eventId": "evt_001",
+            "inventoryId": "inv_001", "holdToken": "tok",
+        })
+
+    assert record["status"] == "completed"
+    assert record["ticket"] == {"ticketId": "tkt_001"}
+    assert mock_complete.call_args[1]["purchase_id"] == "pur_001"
+    assert [c[0][0]["status"] for c in mock_save.call_args_list] == ["processing", "completed"]
+    broadcast = mock_svc.call_args[1]["json"]
+    assert broadcast["type"] == "purchase_update"
+    assert broadcast["payload"]["status"] == "completed"
+
+    # A redelivery of a purchase that already started is not run twice
+    mock_load.return_value = record
+    mock_complete.reset_mock()
+    with app.app_context():
+        process_purchase_confirmation({"purchaseId": "pur_001", "userId": "usr_001",
+                                       "eventId": "evt_001", "inventoryId": "inv_001"})
+    mock_complete.assert_not_called()
+
+
+@patch("routes.purchase_saga_journal")
+@patch("routes._save_purchase_status", return_value=True)
+@patch("routes._load_purchase_status")
+@patch("routes._complete_purchase")
+@patch("routes._grpc_stub")
+@patch("routes.call_service")
+def test_redelivery_takes_over_purchase_that_died_before_its_saga(
+    mock_svc, _stub, mock_complete, mock_load, mock_save, mock_journal, app,
+):
+    from flask import jsonify
+
+    from routes import process_purchase_confirmation
+
+    message = {"purchaseId": "pur_001", "userId": "usr_001", "eventId": "evt_001",
+               "inventoryId": "inv_001", "holdToken": "tok"}
+    mock_load.return_value = {"purchaseId": "pur_001", "userId": "usr_001", "status": "processing"}
+    mock_svc.return_value = ({}, None)
+
+    # A saga was journaled: recovery owns it, the redelivery is skipped
+    mock_journal.load.return_value = {"sagaId": "pur_001", "status": "running"}
+    with app.app_context():
+        process_purchase_confirmation(message)
+    mock_complete.assert_not_called()
+
+    # No journal: the worker died before touching anything, so run it again
+    mock_journal.load.return_value = None
+    with app.app_context():
+        mock_complete.return_value = (jsonify({"data": {"ticketId": "tkt_001"}}), 201)
+        record = process_purchase_confirmation(message)
+
+    mock_complete.assert_called_once()
+    assert record["status"] == "completed"
+
+
+@patch("routes._load_purchase_status")
+def test_purchase_status_visible_to_owner_only(mock_load, client):
+    mock_load.return_value = {"purchaseId": "pur_001", "userId": "usr_001", "status": "processing"}
+
+    res = client.get("/purchase/confirm/status/pur_001", headers=_auth())
+    assert res.status_code == 200
+    assert res.get_json()["data"]["status"] == "processing"
+
+    assert client.get("/purchase/confirm/status/pur_001", headers=_auth("usr_other")).status_code == 404
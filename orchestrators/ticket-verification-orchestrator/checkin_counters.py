@@ -0,0 +1,183 @@
+"""
+Live per-event check-in counters backed by Redis.
+
+Every verification outcome that is written to ticket-log-service is also
+counted here so staff dashboards never have to aggregate the log table:
+
+  checkin:{eventId}:totals          hash  status -> count
+  checkin:{eventId}:staff           hash  "<staffId>|<status>" -> count
+  checkin:{eventId}:venue           hash  "<venueId>|<status>" -> count
+  checkin:{eventId}:rate:{minute}   int   successful entries in that minute
+
+Per-minute keys expire on their own, so the entry-rate series is a rolling
+window without any trimming job. All writes are best-effort: a Redis outage
+never blocks a scan.
+"""
+import logging
+import os
+import time
+from datetime import datetime, timezone
+
+import redis
+
+logger = logging.getLogger(__name__)
+
+REDIS_URL = os.environ.get("REDIS_URL", "redis://redis:6379/0")
+COUNTER_PREFIX = os.environ.get("CHECKIN_COUNTER_PREFIX", "checkin:")
+COUNTER_TTL_SECONDS = int(os.environ.get("CHECKIN_COUNTER_TTL_SECONDS", str(7 * 24 * 3600)))
+RATE_WINDOW_MINUTES = int(os.environ.get("CHECKIN_RATE_WINDOW_MINUTES", "60"))
+PUSH_INTERVAL_SECONDS = int(os.environ.get("CHECKIN_PUSH_INTERVAL_SECONDS", "2"))
+RECONNECT_BACKOFF_SECONDS = 30
+
+TRACKED_STATUSES = ("checked_in", "duplicate", "wrong_venue", "wrong_event", "expired", "invalid")
+
+_client = None
+_retry_after = 0.0
+
+
+def _get_client():
+    """Reuse one pooled client; back off for a while after a failed connect."""
+    global _client, _retry_after
+    if _client is not None:
+        return _client
+    if time.monotonic() < _retry_after:
+        return None
+    try:
+        client = redis.from_url(
+            REDIS_URL,
+            decode_responses=True,
+            socket_connect_timeout=2,
+            socket_timeout=2,
+        )
+        client.ping()
+        _client = client
+        return _client
+    except Exception as exc:
+        logger.warning("Redis unavailable for check-in counters: %s", exc)
+        _retry_after = time.monotonic() + RECONNECT_BACKOFF_SECONDS
+        return None
+
+
+def _reset_client():
+    global _client, _retry_after
+    _client = None
+    _retry_after = time.monotonic() + RECONNECT_BACKOFF_SECONDS
+
+
+def _key(event_id, suffix):
+    return f"{COUNTER_PREFIX}{event_id}:{suffix}"
+
+
+def _minute(at):
+    return int(at.timestamp()) // 60
+
+
+def record_outcomes(outcomes):
+    """
+    Count a list of (eventId, staffId, venueId, status, scannedAt) tuples in one
+    pipeline. Returns the set of event IDs that were updated (empty on failure).
+    """
+    outcomes = [o for o in outcomes if o[0] and o[3] in TRACKED_STATUSES]
+    if not outcomes:
+        return set()
+    client = _get_client()
+    if client is None:
+        return set()
+
+    rate_ttl = (RATE_WINDOW_MINUTES + 1) * 60
+    try:
+        pipe = client.pipeline(transaction=False)
+        touched = set()
+        for event_id, staff_id, venue_id, status, scanned_at in outcomes:
+            pipe.hincrby(_key(event_id, "totals"), status, 1)
+            if staff_id:
+                pipe.hincrby(_key(event_id, "staff"), f"{staff_id}|{status}", 1)
+            if venue_id:
+                pipe.hincrby(_key(event_id, "venue"), f"{venue_id}|{status}", 1)
+            if status == "checked_in":
+                at = scanned_at or datetime.now(timezone.utc)
+                rate_key = _key(event_id, f"rate:{_minute(at)}")
+                pipe.incr(rate_key)
+                pipe.expire(rate_key, rate_ttl)
+            touched.add(event_id)
+        for event_id in touched:
+            for suffix in ("totals", "staff", "venue"):
+                pipe.expire(_key(event_id, suffix), COUNTER_TTL_SECONDS)
+        pipe.execute()
+        return touched
+    except Exception as exc:
+        logger.warning("Failed to update check-in counters: %s", exc)
+        _reset_client()
+        return set()
+
+
+def _split_breakdown(raw):
+    breakdown = {}
+    for field, count in raw.items():
+        owner, _, status = field.rpartition("|")
+        breakdown.setdefault(owner, {})[status] = int(count)
+    return breakdown
+
+
+def get_snapshot(event_id, minutes=RATE_WINDOW_MINUTES, include_breakdown=True):
+    """
+    Read the live counters for an event. Returns None if Redis is unavailable.
+    The entry-rate series is oldest-first and includes empty minutes.
+    """
+    client = _get_client()
+    if client is None:
+        return None
+
+    minutes = max(1, min(minutes, RATE_WINDOW_MINUTES))
+    now = datetime.now(timezone.utc)
+    current = _minute(now)
+    buckets = list(range(current - minutes + 1, current + 1))
+
+    try:
+        pipe = client.pipeline(transaction=False)
+        pipe.hgetall(_key(event_id, "totals"))
+        if include_breakdown:
+            pipe.hgetall(_key(event_id, "staff"))
+            pipe.hgetall(_key(event_id, "venue"))
+        pipe.mget([_key(event_id, f"rate:{bucket}") for bucket in buckets])
+        replies = pipe.execute()
+    except Exception as exc:
+        logger.warning("Failed to read check-in counters for event %s: %s", event_id, exc)
+        _reset_client()
+        return None
+
+    totals = {status: 0 for status in TRACKED_STATUSES}
+    totals.update({status: int(count) for status, count in replies[0].items()})
+    rates = replies[-1]
+
+    snapshot = {
+        "eventId": event_id,
+        "totals": totals,
+        "entryRate": [
+            {
+                "minute": datetime.fromtimestamp(bucket * 60, timezone.utc).isoformat(),
+                "count": int(count or 0),
+            }
+            for bucket, count in zip(buckets, rates)
+        ],
+        "generatedAt": now.isoformat(),
+    }
+    if include_breakdown:
+        snapshot["byStaff"] = _split_breakdown(replies[1])
+        snapshot["byVenue"] = _split_breakdown(replies[2])
+    return snapshot
+
+
+def should_push(event_id):
+    """
+    Throttle live pushes to one per PUSH_INTERVAL_SECONDS per event across all
+    workers, so a busy gate doesn't turn every scan into a broadcast.
+    """
+    client = _get_client()
+    if client is None:
+        return False
+    try:
+        return bool(client.set(_key(event_id, "push_lock"), "1", nx=True, ex=PUSH_INTERVAL_SECONDS))
+    except Exception as exc:
+        logger.warning("Failed to check check-in push throttle: %s", exc)
+        return False
@@ -11,6 +11,10 @@ Check order (must not be changed):
   6. Duplicate scan check            → log duplicate
   7. Venue match check               → log wrong_venue, return redirect
   8. All pass → mark used, log checked_in
+
+/verify/scan/batch applies the same order per item, with tickets, events,
+inventory and prior check-ins resolved in bulk and QR age measured against
+each item's client scannedAt.
 """
 import logging
 import os
@@ -21,6 +25,7 @@ from datetime import datetime, timedelta, timezone
 import redis
 from flask import Blueprint, jsonify, request
 
+import checkin_counters
 from middleware import require_staff
 from service_client import call_service
 
@@ -32,6 +37,7 @@ TICKET_LOG_SERVICE     = os.environ.get("TICKET_LOG_SERVICE_URL",      "http://t
 EVENT_SERVICE          = os.environ.get("EVENT_SERVICE_URL",           "http://event-service:5000")
 VENUE_SERVICE          = os.environ.get("VENUE_SERVICE_URL",           "http://venue-service:5000")
 SEAT_INV_SERVICE       = os.environ.get("SEAT_INVENTORY_SERVICE_URL",  "http://seat-inventory-service:5000")
+NOTIFICATION_SERVICE   = os.environ.get("NOTIFICATION_SERVICE_URL",    "http://notification-service:8109")
 
 QR_TTL_SECONDS = int(os.environ.get("QR_TTL_SECONDS", "60"))
 CLOCK_SKEW_SECONDS = int(os.environ.get("CLOCK_SKEW_SECONDS", "300"))
@@ -42,6 +48,10 @@ LOCK_TTL_SECONDS = int(os.environ.get("SCAN_LOCK_TTL_SECONDS", "5"))
 LOCK_RETRY_DELAY_MS = int(os.environ.get("SCAN_LOCK_RETRY_DELAY_MS", "100"))
 MAX_LOCK_RETRIES = int(os.environ.get("SCAN_LOCK_MAX_RETRIES", "3"))
 
+# Offline-buffered batch scans
+BATCH_SCAN_MAX_ITEMS = int(os.environ.get("BATCH_SCAN_MAX_ITEMS", "200"))
+BATCH_SCAN_MAX_OFFLINE_SECONDS = int(os.environ.get("BATCH_SCAN_MAX_OFFLINE_SECONDS", "3600"))
+
 
 def _get_redis_client():
     """Get Redis client for distributed locks."""
@@ -59,12 +69,13 @@ def _get_redis_client():
         return None
 
 
-def _acquire_scan_lock(ticket_id):
+def _acquire_scan_lock(ticket_id, client=None):
     """
     Acquire distributed lock for ticket scan to prevent concurrent scans.
     Returns lock token if acquired, None otherwise.
+    Pass an existing client to avoid reconnecting when locking many tickets.
     """
-    client = _get_redis_client()
+    client = client or _get_redis_client()
     if client is None:
         # Redis unavailable, allow operation but log warning
         logger.warning("Redis unavailable, proceeding without distributed lock for ticket %s", ticket_id)
@@ -95,12 +106,12 @@ def _acquire_scan_lock(ticket_id):
     return None
 
 
-def _release_scan_lock(ticket_id, lock_token):
+def _release_scan_lock(ticket_id, lock_token, client=None):
     """Release distributed lock for ticket scan."""
     if lock_token == "no-lock":
         return
     
-    client = _get_redis_client()
+    client = client or _get_redis_client()
     if client is None:
         logger.warning("Redis unavailable, cannot release scan lock for ticket %s", ticket_id)
         return
@@ -127,12 +138,32 @@ def _error(code, message, status, **extra):
     return jsonify(body), status
 
 
-def _log(ticket_id, staff_id, status):
+def _count(outcomes):
+    """
+    Update live check-in counters and push a throttled snapshot to dashboards.
+    Best-effort — never affects the scan result.
+    """
+    for event_id in checkin_counters.record_outcomes(outcomes):
+        if not checkin_counters.should_push(event_id):
+            continue
+        snapshot = checkin_counters.get_snapshot(event_id, minutes=5, include_breakdown=False)
+        if snapshot is None:
+            continue
+        _, err = call_service("POST", f"{NOTIFICATION_SERVICE}/broadcast", json={
+            "type":    "checkin_update",
+            "payload": snapshot,
+        })
+        if err:
+            logger.warning("Failed to broadcast checkin_update for event %s: %s", event_id, err)
+
+
+def _log(ticket, staff_id, status):
     call_service("POST", f"{TICKET_LOG_SERVICE}/ticket-logs", json={
-        "ticketId": ticket_id,
+        "ticketId": ticket["ticketId"],
         "staffId":  staff_id,
         "status":   status,
     })
+    _count([(ticket.get("eventId"), staff_id, request.user.get("venueId"), status, None)])
 
 # ── POST /verify/scan ─────────────────────────────────────────────────────────
 
@@ -210,19 +241,19 @@ def scan():
                     ts_dt = ts_dt.replace(tzinfo=timezone.utc)
                 # Also check if timestamp is in the future (clock skew attack)
                 if ts_dt > datetime.now(timezone.utc) + timedelta(seconds=CLOCK_SKEW_SECONDS):
-                    _log(ticket_id, staff_id, "invalid")
+                    _log(ticket, staff_id, "invalid")
                     return _error("QR_INVALID", "QR timestamp is in the future.", 400)
                 if datetime.now(timezone.utc) - ts_dt > timedelta(seconds=QR_TTL_SECONDS):
-                    _log(ticket_id, staff_id, "expired")
+                    _log(ticket, staff_id, "expired")
                     return _error("QR_EXPIRED", "QR code has expired — ask the attendee to refresh.", 400)
         except (ValueError, TypeError):
-            _log(ticket_id, staff_id, "expired")
+            _log(ticket, staff_id, "expired")
             return _error("QR_EXPIRED", "Could not parse QR timestamp.", 400)
 
         # 3. Validate event
         event, err = call_service("GET", f"{EVENT_SERVICE}/events/{ticket['eventId']}")
         if err:
-            _log(ticket_id, staff_id, "invalid")
+            _log(ticket, staff_id, "invalid")
             return _error("TICKET_NOT_FOUND", "Associated event not found.", 400)
 
         # 4. Seat status = sold
@@ -232,12 +263,12 @@ def scan():
             None,
         )
         if not seat or seat.get("status") != "sold":
-            _log(ticket_id, staff_id, "invalid")
+            _log(ticket, staff_id, "invalid")
             return _error("TICKET_NOT_FOUND", "Seat is not marked as sold.", 400)
 
         # 5. Ticket status = active
         if ticket["status"] != "active":
-            _log(ticket_id, staff_id, "invalid")
+            _log(ticket, staff_id, "invalid")
             return _error("QR_INVALID", f"Ticket status is '{ticket['status']}' — not valid for entry.", 400)
 
         # 6. Duplicate scan check
@@ -247,13 +278,13 @@ def scan():
             for log in (logs_data or {}).get("logs", [])
         )
         if already_in:
-            _log(ticket_id, staff_id, "duplicate")
+            _log(ticket, staff_id, "duplicate")
             return _error("ALREADY_CHECKED_IN", "This ticket has already been used.", 409)
 
         # 7. Venue match (venueId from JWT, never from request body)
         if staff_venue_id and ticket.get("venueId") != staff_venue_id:
             correct_venue, _ = call_service("GET", f"{VENUE_SERVICE}/venues/{ticket['venueId']}")
-            _log(ticket_id, staff_id, "wrong_venue")
+            _log(ticket, staff_id, "wrong_venue")
             return _error(
                 "WRONG_HALL",
                 "This ticket is for a different venue.",
@@ -263,7 +294,7 @@ def scan():
         
         # 7.5 Selected event match (if provided)
         if selected_event_id and ticket.get("eventId") != selected_event_id:
-            _log(ticket_id, staff_id, "wrong_event")
+            _log(ticket, staff_id, "wrong_event")
             return _error(
                 "WRONG_EVENT",
                 "This ticket is for a different event.",
@@ -274,7 +305,7 @@ def scan():
 
         # 8. All checks passed
         call_service("PATCH", f"{TICKET_SERVICE}/tickets/{ticket_id}", json={"status": "used"})
-        _log(ticket_id, staff_id, "checked_in")
+        _log(ticket, staff_id, "checked_in")
 
         return jsonify({"data": {
             "result":    "SUCCESS",
@@ -355,7 +386,7 @@ def manual_verify():
     # 2. Validate event
     event, err = call_service("GET", f"{EVENT_SERVICE}/events/{ticket['eventId']}")
     if err:
-        _log(ticket_id, staff_id, "invalid")
+        _log(ticket, staff_id, "invalid")
         return _error("TICKET_NOT_FOUND", "Associated event not found.", 400)
 
     # 3. Seat status = sold
@@ -365,12 +396,12 @@ def manual_verify():
         None,
     )
     if not seat or seat.get("status") != "sold":
-        _log(ticket_id, staff_id, "invalid")
+        _log(ticket, staff_id, "invalid")
         return _error("TICKET_NOT_FOUND", "Seat is not marked as sold.", 400)
 
     # 4. Ticket status = active
     if ticket["status"] != "active":
-        _log(ticket_id, staff_id, "invalid")
+        _log(ticket, staff_id, "invalid")
         return _error("QR_INVALID", f"Ticket status is '{ticket['status']}' — not valid for entry.", 400)
 
     # 5. Duplicate scan check
@@ -380,13 +411,13 @@ def manual_verify():
         for log in (logs_data or {}).get("logs", [])
     )
     if already_in:
-        _log(ticket_id, staff_id, "duplicate")
+        _log(ticket, staff_id, "duplicate")
         return _error("ALREADY_CHECKED_IN", "This ticket has already been used.", 409)
 
     # 6. Venue match (venueId from JWT, never from request body)
     if staff_venue_id and ticket.get("venueId") != staff_venue_id:
         correct_venue, _ = call_service("GET", f"{VENUE_SERVICE}/venues/{ticket['venueId']}")
-        _log(ticket_id, staff_id, "wrong_venue")
+        _log(ticket, staff_id, "wrong_venue")
         return _error(
             "WRONG_HALL",
             "This ticket is for a different venue.",
@@ -396,7 +427,7 @@ def manual_verify():
     
     # 6.5 Selected event match (if provided)
     if selected_event_id and ticket.get("eventId") != selected_event_id:
-        _log(ticket_id, staff_id, "wrong_event")
+        _log(ticket, staff_id, "wrong_event")
         return _error(
             "WRONG_EVENT",
             "This ticket is for a different event.",
@@ -407,7 +438,7 @@ def manual_verify():
 
     # 7. All checks passed
     call_service("PATCH", f"{TICKET_SERVICE}/tickets/{ticket_id}", json={"status": "used"})
-    _log(ticket_id, staff_id, "checked_in")
+    _log(ticket, staff_id, "checked_in")
 
     return jsonify({"data": {
         "result":    "SUCCESS",
@@ -421,4 +452,339 @@ def manual_verify():
             "seatId": seat.get("seatId"),
         },
         "owner": {"userId": ticket["ownerId"]},
-    }}), 200
\ No newline at end of file
+    }}), 200
+
+
+# ── POST /verify/scan/batch ───────────────────────────────────────────────────
+
+def _parse_timestamp(value):
+    ts_dt = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    if ts_dt.tzinfo is None:
+        ts_dt = ts_dt.replace(tzinfo=timezone.utc)
+    return ts_dt
+
+
+def _rejected(code, message, log_status=None, **extra):
+    error = {"code": code, "message": message}
+    error.update(extra)
+    return {"result": "REJECTED", "error": error}, log_status
+
+
+def _check_batch_item(ticket, scanned_at, event, seat, checked_in, staff_venue_id,
+                      selected_event_id, venues):
+    """
+    Run the /verify/scan checks (2–7.5) for one buffered scan, using data that
+    was resolved in bulk up front. Returns (result_dict, log_status_or_None).
+    QR age is measured against the client scan time, not the upload time.
+    """
+    # 2. QR TTL check
+    try:
+        ts = ticket.get("qrTimestamp", "")
+        if ts:
+            ts_dt = _parse_timestamp(ts)
+            if ts_dt > scanned_at + timedelta(seconds=CLOCK_SKEW_SECONDS):
+                return _rejected("QR_INVALID", "QR timestamp is in the future.", "invalid")
+            if scanned_at - ts_dt > timedelta(seconds=QR_TTL_SECONDS):
+                return _rejected("QR_EXPIRED", "QR code had expired when it was scanned.", "expired")
+    except (ValueError, TypeError):
+        return _rejected("QR_EXPIRED", "Could not parse QR timestamp.", "expired")
+
+    # 3. Validate event
+    if event is None:
+        return _rejected("TICKET_NOT_FOUND", "Associated event not found.", "invalid")
+
+    # 4. Seat status = sold
+    if not seat or seat.get("status") != "sold":
+        return _rejected("TICKET_NOT_FOUND", "Seat is not marked as sold.", "invalid")
+
+    # 5. Ticket status = active
+    if ticket["status"] != "active":
+        return _rejected("QR_INVALID", f"Ticket status is '{ticket['status']}' — not valid for entry.", "invalid")
+
+    # 6. Duplicate scan check (includes earlier items in this batch)
+    if ticket["ticketId"] in checked_in:
+        return _rejected("ALREADY_CHECKED_IN", "This ticket has already been used.", "duplicate")
+
+    # 7. Venue match (venueId from JWT, never from request body)
+    if staff_venue_id and ticket.get("venueId") != staff_venue_id:
+        if ticket["venueId"] not in venues:
+            venues[ticket["venueId"]], _ = call_service("GET", f"{VENUE_SERVICE}/venues/{ticket['venueId']}")
+        return _rejected(
+            "WRONG_HALL",
+            "This ticket is for a different venue.",
+            "wrong_venue",
+            correctVenue=venues[ticket["venueId"]],
+        )
+
+    # 7.5 Selected event match (if provided)
+    if selected_event_id and ticket.get("eventId") != selected_event_id:
+        return _rejected(
+            "WRONG_EVENT",
+            "This ticket is for a different event.",
+            "wrong_event",
+            ticketEventId=ticket.get("eventId"),
+            selectedEventId=selected_event_id,
+        )
+
+    return {
+        "result": "SUCCESS",
+        "event": {"name": event["name"], "date": event["date"]},
+        "seat": {"seatId": seat.get("seatId")},
+        "owner": {"userId": ticket["ownerId"]},
+    }, "checked_in"
+
+
+@bp.post("/verify/scan/batch")
+@require_staff
+def scan_batch():
+    """
+    Replay QR scans buffered by an offline scanner (staff only)
+    ---
+    tags:
+      - Verification
+    security:
+      - BearerAuth: []
+    description: >
+      Runs the same checks as /verify/scan for every item, but resolves tickets,
+      events, seat inventory and prior check-ins in bulk and applies check-ins and
+      logs in one call each. QR expiry is evaluated against each item's scannedAt.
+      Results are returned in request order; one rejected item never fails the batch.
+    parameters:
+      - in: body
+        name: body
+        required: true
+        schema:
+          type: object
+          required: [scans]
+          properties:
+            scans:
+              type: array
+              items:
+                type: object
+                required: [qrHash]
+                properties:
+                  qrHash:
+                    type: string
+                  scannedAt:
+                    type: string
+                    format: date-time
+                    description: Client time of the scan (defaults to now)
+            selectedEventId:
+              type: string
+              example: evt_001
+    responses:
+      200:
+        description: Per-item results in request order
+      400:
+        description: scans missing, empty, or too large
+      401:
+        description: Unauthorized
+      403:
+        description: Staff role required
+      503:
+        description: Ticket lookup unavailable
+    """
+    body  = request.get_json(silent=True) or {}
+    scans = body.get("scans")
+    if not isinstance(scans, list) or not scans:
+        return _error("VALIDATION_ERROR", "scans must be a non-empty list.", 400)
+    if len(scans) > BATCH_SCAN_MAX_ITEMS:
+        return _error("VALIDATION_ERROR", f"scans cannot exceed {BATCH_SCAN_MAX_ITEMS} items.", 400)
+
+    selected_event_id = body.get("selectedEventId")
+    staff_id          = request.user["userId"]
+    staff_venue_id    = request.user.get("venueId")   # from JWT only
+    now               = datetime.now(timezone.utc)
+
+    # 1. Resolve every QR hash in one query
+    qr_hashes = list({
+        item["qrHash"] for item in scans
+        if isinstance(item, dict) and isinstance(item.get("qrHash"), str) and item["qrHash"]
+    })
+    tickets_by_qr = {}
+    if qr_hashes:
+        ticket_data, err = call_service("POST", f"{TICKET_SERVICE}/tickets/qr/batch", json={"qrHashes": qr_hashes})
+        if err:
+            return _error("SERVICE_UNAVAILABLE", "Could not resolve tickets.", 503)
+        tickets_by_qr = {t["qrHash"]: t for t in (ticket_data or {}).get("tickets", [])}
+
+    tickets = {t["ticketId"]: t for t in tickets_by_qr.values()}
+    event_ids = {t["eventId"] for t in tickets.values()}
+
+    # Events and inventory are shared by every ticket of the same event
+    events, seats_by_inventory = {}, {}
+    for event_id in event_ids:
+        events[event_id], _ = call_service("GET", f"{EVENT_SERVICE}/events/{event_id}")
+        inv_data, _ = call_service("GET", f"{SEAT_INV_SERVICE}/inventory/event/{event_id}")
+        for s in (inv_data or {}).get("inventory", []):
+            seats_by_inventory[s["inventoryId"]] = s
+
+    checked_in = set()
+    if tickets:
+        logs_data, _ = call_service(
+            "POST",
+            f"{TICKET_LOG_SERVICE}/ticket-logs/ticket/batch",
+            json={"ticketIds": list(tickets), "status": "checked_in"},
+        )
+        checked_in = {log["ticketId"] for log in (logs_data or {}).get("logs", [])}
+
+    redis_client = _get_redis_client() if tickets else None
+    lock_tokens  = {}
+    results, logs, to_check_in = [], [], {}
+    venues = {}
+
+    try:
+        for index, item in enumerate(scans):
+            item = item if isinstance(item, dict) else {}
+            qr_hash = item.get("qrHash")
+            entry = {"index": index, "qrHash": qr_hash}
+
+            if not qr_hash:
+                entry.update(_rejected("VALIDATION_ERROR", "qrHash is required.")[0])
+                results.append(entry)
+                continue
+
+            try:
+                scanned_at = _parse_timestamp(item["scannedAt"]) if item.get("scannedAt") else now
+            except (ValueError, TypeError, AttributeError):
+                entry.update(_rejected("VALIDATION_ERROR", "scannedAt must be an ISO-8601 timestamp.")[0])
+                results.append(entry)
+                continue
+
+            ticket = tickets_by_qr.get(qr_hash)
+            if ticket is None:
+                entry.update(_rejected("TICKET_NOT_FOUND", "No ticket matches this QR code.")[0])
+                results.append(entry)
+                continue
+
+            ticket_id = ticket["ticketId"]
+            entry["ticketId"] = ticket_id
+
+            if ticket_id not in lock_tokens:
+                if redis_client is None:
+                    lock_tokens[ticket_id] = "no-lock"
+                else:
+                    lock_tokens[ticket_id] = _acquire_scan_lock(ticket_id, redis_client)
+            if lock_tokens[ticket_id] is None:
+                entry.update(_rejected("CONCURRENT_SCAN", "Another scan is in progress. Please try again.")[0])
+                results.append(entry)
+                continue
+
+            # Buffered scans can't be backdated beyond the offline window or forward-dated
+            if scanned_at > now + timedelta(seconds=CLOCK_SKEW_SECONDS):
+                outcome, log_status = _rejected("QR_INVALID", "scannedAt is in the future.", "invalid")
+            elif now - scanned_at > timedelta(seconds=BATCH_SCAN_MAX_OFFLINE_SECONDS):
+                outcome, log_status = _rejected("QR_EXPIRED", "Scan is older than the offline replay window.", "expired")
+            else:
+                outcome, log_status = _check_batch_item(
+                    ticket,
+                    scanned_at,
+                    events.get(ticket["eventId"]),
+                    seats_by_inventory.get(ticket["inventoryId"]),
+                    checked_in,
+                    staff_venue_id,
+                    selected_event_id,
+                    venues,
+                )
+
+            entry.update(outcome)
+            entry["scannedAt"] = scanned_at.isoformat()
+            results.append(entry)
+            if log_status == "checked_in":
+                checked_in.add(ticket_id)
+                to_check_in[ticket_id] = (entry, len(logs))
+            if log_status:
+                logs.append({
+                    "ticketId":  ticket_id,
+                    "staffId":   staff_id,
+                    "status":    log_status,
+                    "timestamp": scanned_at.isoformat(),
+                })
+
+        # 8. Apply every check-in in one conditional update; a ticket that changed
+        #    status since it was read (e.g. scanned at another gate) becomes a duplicate.
+        if to_check_in:
+            updated, err = call_service(
+                "POST",
+                f"{TICKET_SERVICE}/tickets/batch/status",
+                json={"ticketIds": list(to_check_in), "status": "used", "fromStatus": "active"},
+            )
+            updated_ids = set((updated or {}).get("updatedTicketIds", [])) if not err else set()
+            for ticket_id, (entry, log_index) in to_check_in.items():
+                if ticket_id in updated_ids:
+                    continue
+                if err:
+                    outcome, _ = _rejected("SERVICE_UNAVAILABLE", "Could not record check-in. Please rescan.")
+                    logs[log_index] = None
+                else:
+                    outcome, _ = _rejected("ALREADY_CHECKED_IN", "This ticket has already been used.")
+                    logs[log_index]["status"] = "duplicate"
+                for key in ("event", "seat", "owner"):
+                    entry.pop(key, None)
+                entry.update(outcome)
+
+        logs = [log for log in logs if log is not None]
+        if logs:
+            call_service("POST", f"{TICKET_LOG_SERVICE}/ticket-logs/batch", json={"logs": logs})
+            _count([
+                (tickets[log["ticketId"]]["eventId"], staff_id, staff_venue_id, log["status"],
+                 _parse_timestamp(log["timestamp"]))
+                for log in logs
+            ])
+    finally:
+        for ticket_id, lock_token in lock_tokens.items():
+            if lock_token is not None:
+                _release_scan_lock(ticket_id, lock_token, redis_client)
+
+    succeeded = sum(1 for entry in results if entry["result"] == "SUCCESS")
+    return jsonify({"data": {
+        "results": results,
+        "summary": {
+            "total":     len(results),
+            "succeeded": succeeded,
+            "rejected":  len(results) - succeeded,
+        },
+    }}), 200
+
+
+# ── GET /verify/events/<event_id>/checkins ────────────────────────────────────
+
+@bp.get("/verify/events/<event_id>/checkins")
+@require_staff
+def get_checkin_stats(event_id):
+    """
+    Live check-in counters and entry rate for an event (staff/admin)
+    ---
+    tags:
+      - Verification
+    security:
+      - BearerAuth: []
+    description: >
+      Served from incrementally maintained Redis counters — never aggregates
+      ticket logs. The same totals are pushed on the notification-service
+      checkin_update channel while scanning is in progress.
+    parameters:
+      - in: path
+        name: event_id
+        required: true
+        type: string
+      - in: query
+        name: minutes
+        type: integer
+        default: 60
+        description: Length of the per-minute entry-rate series
+    responses:
+      200:
+        description: Totals, per-staff and per-venue breakdowns, and entry-rate series
+      401:
+        description: Unauthorized
+      403:
+        description: Staff role required
+      503:
+        description: Counter store unavailable
+    """
+    minutes = request.args.get("minutes", checkin_counters.RATE_WINDOW_MINUTES, type=int)
+    snapshot = checkin_counters.get_snapshot(event_id, minutes=minutes)
+    if snapshot is None:
+        return _error("SERVICE_UNAVAILABLE", "Check-in counters are unavailable.", 503)
+    return jsonify({"data": snapshot}), 200
@@ -544,3 +544,162 @@ def test_manual_no_ttl_check(mock_svc, client):
     res = client.post("/verify/manual", json={"ticketId": "tkt_001"}, headers=_staff_headers())
     assert res.status_code == 200
     assert res.get_json()["data"]["result"] == "SUCCESS"
+
+
+# ═════════════════════════════════════════════════════════════════════════════
+# POST /verify/scan/batch
+# ═════════════════════════════════════════════════════════════════════════════
+
+def _batch_router(tickets, checked_in=(), updated=None):
+    """Route call_service by URL so bulk calls can be asserted independently."""
+    calls = []
+
+    def route(method, url, **kwargs):
+        calls.append((method, url, kwargs))
+        if url.endswith("/tickets/qr/batch"):
+            return {"tickets": tickets}, None
+        if "/events/" in url:
+            return MOCK_EVENT, None
+        if "/inventory/event/" in url:
+            return MOCK_INV_LIST, None
+        if url.endswith("/ticket-logs/ticket/batch"):
+            return {"logs": [{"ticketId": t, "status": "checked_in"} for t in checked_in]}, None
+        if url.endswith("/tickets/batch/status"):
+            ids = kwargs["json"]["ticketIds"] if updated is None else updated
+            return {"updatedTicketIds": ids}, None
+        if url.endswith("/ticket-logs/batch"):
+            return {"logs": kwargs["json"]["logs"]}, None
+        if "/venues/" in url:
+            return MOCK_VENUE, None
+        raise AssertionError(f"unexpected call {method} {url}")
+
+    return route, calls
+
+
+def test_scan_batch_requires_scans(client):
+    res = client.post("/verify/scan/batch", json={"scans": []}, headers=_staff_headers())
+    assert res.status_code == 400
+    assert res.get_json()["error"]["code"] == "VALIDATION_ERROR"
+
+
+def test_scan_batch_user_role_rejected(client):
+    res = client.post("/verify/scan/batch", json={"scans": [{"qrHash": "a"}]}, headers=_user_headers())
+    assert res.status_code == 403
+
+
+@patch("routes.call_service")
+def test_scan_batch_results_in_order_with_bulk_writes(mock_svc, client):
+    second = {**MOCK_TICKET, "ticketId": "tkt_002", "qrHash": "hash_b", "inventoryId": "inv_001"}
+    first = {**MOCK_TICKET, "qrHash": "hash_a"}
+    route, calls = _batch_router([first, second], checked_in=["tkt_002"])
+    mock_svc.side_effect = route
+
+    res = client.post("/verify/scan/batch", json={"scans": [
+        {"qrHash": "hash_a", "scannedAt": FRESH_TS},
+        {"qrHash": "missing"},
+        {"qrHash": "hash_b", "scannedAt": FRESH_TS},
+        {"qrHash": "hash_a", "scannedAt": FRESH_TS},
+    ]}, headers=_staff_headers())
+
+    assert res.status_code == 200
+    data = res.get_json()["data"]
+    assert [r["result"] for r in data["results"]] == ["SUCCESS", "REJECTED", "REJECTED", "REJECTED"]
+    assert data["results"][1]["error"]["code"] == "TICKET_NOT_FOUND"
+    assert data["results"][2]["error"]["code"] == "ALREADY_CHECKED_IN"
+    assert data["results"][3]["error"]["code"] == "ALREADY_CHECKED_IN"
+    assert data["summary"] == {"total": 4, "succeeded": 1, "rejected": 3}
+
+    urls = [url for _, url, _ in calls]
+    assert sum(u.endswith("/events/evt_001") for u in urls) == 1
+    status_call = next(kw for _, url, kw in calls if url.endswith("/tickets/batch/status"))
+    assert status_call["json"]["ticketIds"] == ["tkt_001"]
+    log_call = next(kw for _, url, kw in calls if url.endswith("/ticket-logs/batch"))
+    assert [log["status"] for log in log_call["json"]["logs"]] == ["checked_in", "duplicate", "duplicate"]
+
+
+@patch("routes.call_service")
+def test_scan_batch_ttl_uses_client_scan_time(mock_svc, client):
+    qr_ts = datetime.now(timezone.utc) - timedelta(minutes=10)
+    ticket = {**MOCK_TICKET, "qrHash": "hash_a", "qrTimestamp": qr_ts.isoformat()}
+    route, _ = _batch_router([ticket])
+    mock_svc.side_effect = route
+
+    scanned_at = (qr_ts + timedelta(seconds=10)).isoformat()
+    res = client.post("/verify/scan/batch", json={"scans": [
+        {"qrHash": "hash_a", "scannedAt": scanned_at},
+    ]}, headers=_staff_headers())
+
+    assert res.get_json()["data"]["results"][0]["result"] == "SUCCESS"
+
+
+@patch("routes.call_service")
+def test_scan_batch_lost_update_becomes_duplicate(mock_svc, client):
+    ticket = {**MOCK_TICKET, "qrHash": "hash_a"}
+    route, calls = _batch_router([ticket], updated=[])
+    mock_svc.side_effect = route
+
+    res = client.post("/verify/scan/batch", json={"scans": [{"qrHash": "hash_a"}]}, headers=_staff_headers())
+
+    result = res.get_json()["data"]["results"][0]
+    assert result["error"]["code"] == "ALREADY_CHECKED_IN"
+    assert "event" not in result
+    log_call = next(kw for _, url, kw in calls if url.endswith("/ticket-logs/batch"))
+    assert log_call["json"]["logs"][0]["status"] == "duplicate"
+
+
+# ═════════════════════════════════════════════════════════════════════════════
+# Live check-in counters
+# ═════════════════════════════════════════════════════════════════════════════
+
+@patch("routes.checkin_counters.record_outcomes", return_value=set())
+@patch("routes.call_service")
+def test_scan_success_records_checkin_counter(mock_svc, mock_record, client):
+    mock_svc.side_effect = [
+        (MOCK_TICKET, None),
+        (MOCK_EVENT, None),
+        (MOCK_INV_LIST, None),
+        ({"logs": []}, None),
+        (None, None),   # PATCH ticket used
+        (None, None),   # log checked_in
+    ]
+    res = client.post("/verify/scan", json={"qrHash": "abc"}, headers=_staff_headers())
+    assert res.status_code == 200
+    mock_record.assert_called_once_with([("evt_001", "staff_001", "ven_001", "checked_in", None)])
+
+
+@patch("routes.checkin_counters.should_push", return_value=True)
+@patch("routes.checkin_counters.get_snapshot")
+@patch("routes.checkin_counters.record_outcomes", return_value={"evt_001"})
+@patch("routes.call_service")
+def test_scan_pushes_throttled_checkin_update(mock_svc, mock_record, mock_snapshot, mock_push, client):
+    mock_snapshot.return_value = {"eventId": "evt_001", "totals": {"checked_in": 1}}
+    mock_svc.return_value = (None, None)
+    from routes import _count
+
+    with client.application.test_request_context():
+        _count([("evt_001", "staff_001", "ven_001", "checked_in", None)])
+
+    broadcast = mock_svc.call_args
+    assert broadcast[0][1].endswith("/broadcast")
+    assert broadcast[1]["json"]["type"] == "checkin_update"
+    assert broadcast[1]["json"]["payload"]["totals"] == {"checked_in": 1}
+
+
+@patch("routes.checkin_counters.get_snapshot")
+def test_get_checkin_stats(mock_snapshot, client):
+    mock_snapshot.return_value = {"eventId": "evt_001", "totals": {"checked_in": 12}, "entryRate": []}
+    res = client.get("/verify/events/evt_001/checkins?minutes=15", headers=_staff_headers())
+    assert res.status_code == 200
+    assert res.get_json()["data"]["totals"]["checked_in"] == 12
+    mock_snapshot.assert_called_once_with("evt_001", minutes=15)
+
+
+@patch("routes.checkin_counters.get_snapshot", return_value=None)
+def test_get_checkin_stats_redis_unavailable(mock_snapshot, client):
+    res = client.get("/verify/events/evt_001/checkins", headers=_staff_headers())
+    assert res.status_code == 503
+
+
+def test_get_checkin_stats_requires_staff(client):
+    res = client.get("/verify/events/evt_001/checkins", headers=_user_headers())
+    assert res.status_code == 403
@@ -55,6 +55,10 @@ def create_app(test_config=None):
         t2 = threading.Thread(target=start_transfer_timeout_consumer, daemon=True, name="timeout-consumer")
         t2.start()
 
+        from saga_recovery import start_saga_recovery
+        t3 = threading.Thread(target=start_saga_recovery, daemon=True, name="saga-recovery")
+        t3.start()
+
     from routes import bp
     app.register_blueprint(bp)
 
@@ -0,0 +1,133 @@
+"""
+Dependency-aware concurrent loader for transfer enrichment.
+
+A ContextLoader covers one response. Every GET goes through fetch(url), which
+returns a Future and is memoized by URL (load() does the same for any other
+lookup), so an event, venue or seat map shared
+by many transfers is requested once. Dependent lookups are chained with
+after(): the next request is submitted from the completion callback of its
+inputs, so nothing waits on a stage barrier and no worker thread ever blocks
+on another. collect() waits for everything against a single deadline; any
+lookup still outstanding at the deadline resolves to None, matching the
+tolerate-partial-failure behaviour of the serial enrichment it replaces.
+"""
+import logging
+import os
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+
+logger = logging.getLogger(__name__)
+
+ENRICHMENT_MAX_WORKERS = int(os.environ.get("ENRICHMENT_MAX_WORKERS", "16"))
+ENRICHMENT_DEADLINE_SECONDS = float(os.environ.get("ENRICHMENT_DEADLINE_SECONDS", "4"))
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def _get_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ThreadPoolExecutor(max_workers=ENRICHMENT_MAX_WORKERS, thread_name_prefix="enrich")
+        return _pool
+
+
+def resolved(value):
+    future = Future()
+    future.set_result(value)
+    return future
+
+
+class ContextLoader:
+    def __init__(self, get, deadline_seconds=ENRICHMENT_DEADLINE_SECONDS):
+        """get(url, timeout=...) must return data or None and never raise."""
+        self._get = get
+        self._deadline = time.monotonic() + deadline_seconds
+        self._futures = {}
+        self._lock = threading.Lock()
+
+    def remaining(self):
+        return max(0.0, self._deadline - time.monotonic())
+
+    def fetch(self, url):
+        """Future for GET url, shared by every caller in this loader."""
+        if not url:
+            return resolved(None)
+        return self.load(url, lambda timeout: self._get(url, timeout=timeout))
+
+    def load(self, key, fn):
+        """
+        Future for fn(timeout), memoized by key like fetch(). For lookups that
+        do not go through get, e.g. cached reads. fn must not raise.
+        """
+        with self._lock:
+            future = self._futures.get(key)
+            if future is None:
+                future = _get_pool().submit(self._run, fn)
+                self._futures[key] = future
+        return future
+
+    def _run(self, fn):
+        remaining = self.remaining()
+        if remaining <= 0:
+            return None
+        return fn(remaining)
+
+    def after(self, inputs, fn):
+        """
+        Future for fn(*input_results), called as soon as every input is done.
+        fn may return a plain value or another Future (e.g. from fetch()).
+        """
+        out = Future()
+        inputs = list(inputs)
+        pending = [len(inputs)]
+        lock = threading.Lock()
+
+        def chain(result_future):
+            try:
+                out.set_result(result_future.result())
+            except Exception as exc:
+                logger.warning("Enrichment lookup failed: %s", exc)
+                out.set_result(None)
+
+        def fire():
+            try:
+                value = fn(*[_value(f) for f in inputs])
+            except Exception as exc:
+                logger.warning("Enrichment step failed: %s", exc)
+                out.set_result(None)
+                return
+            if isinstance(value, Future):
+                value.add_done_callback(chain)
+            else:
+                out.set_result(value)
+
+        def on_done(_future):
+            with lock:
+                pending[0] -= 1
+                ready = pending[0] == 0
+            if ready:
+                fire()
+
+        if not inputs:
+            fire()
+        for future in inputs:
+            future.add_done_callback(on_done)
+        return out
+
+    def collect(self, futures):
+        """Wait for futures until the shared deadline; unfinished ones yield None."""
+        futures = list(futures)
+        _, not_done = wait(futures, timeout=self.remaining())
+        if not_done:
+            logger.warning("Enrichment deadline reached with %d lookups outstanding", len(not_done))
+        return [None if f in not_done else _value(f) for f in futures]
+
+
+def _value(future):
+    try:
+        return future.result(timeout=0)
+    except Exception:
+        return None
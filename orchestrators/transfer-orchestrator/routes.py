@@ -2,33 +2,44 @@
 Transfer Orchestrator routes.
 
 P2P transfer flow:
-  POST /transfer/initiate            buyer initiates
+  POST /transfer/initiate            buyer claims the listing and initiates
   POST /transfer/<id>/buyer-verify   buyer submits OTP → seller OTP sent
   POST /transfer/<id>/seller-verify  seller submits OTP → saga executes
   POST /transfer/<id>/seller-accept  legacy seller acceptance → seller OTP sent
   GET  /transfer/<id>                poll status (buyer or seller)
   POST /transfer/<id>/cancel         cancel in-progress transfer
 
-Saga on seller-verify:
-  1. Deduct buyer credits (OutSystems)     COMP: restore buyer
-  2. Credit seller (OutSystems)            COMP: restore buyer + seller
-  3. Log buyer credit txn
-  4. Log seller credit txn
-  5. Transfer ticket ownership
-  6. Mark listing completed
-  7. Mark transfer completed
+Saga on seller-verify (journaled in Redis, see shared/saga_journal.py):
+  1. Debit buyer (ledger entry)            COMP: log reversing entry
+  2. Credit seller (ledger entry)          COMP: log reversing entry
+  3. Transfer ticket ownership             COMP: return ticket to seller
+  4. Mark listing completed                COMP: reactivate listing
+  5. Mark transfer completed
+
+Balances live in credit-transaction-service and move with each ledger entry;
+the buyer debit is refused there if the balance no longer covers it.
+OutSystems only mirrors them (see credit-orchestrator balance_sync).
+
+A saga interrupted mid-way (worker crash, deploy) is picked up by
+saga_recovery: past step 3 it is resumed, otherwise compensated.
 """
 import json
 import logging
 import os
+import threading
 import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timezone
 
 import pika
 from flask import Blueprint, jsonify, request
 
+from context_loader import ContextLoader, resolved
 from middleware import require_auth
 from service_client import call_credit_service, call_service
+from shared.credit_balance_cache import CreditBalanceCache
+from shared.saga_journal import SagaJournal, SagaStep, SagaStepError, StepRefused, run_saga
+from shared.user_profile_cache import UserProfileCache
 
 bp     = Blueprint("transfer", __name__)
 logger = logging.getLogger(__name__)
@@ -45,13 +56,18 @@ SEAT_INV_SERVICE    = os.environ.get("SEAT_INVENTORY_SERVICE_URL",     "http://s
 SEAT_SERVICE        = os.environ.get("SEAT_SERVICE_URL",               "http://seat-service:5000")
 NOTIFICATION_SERVICE = os.environ.get("NOTIFICATION_SERVICE_URL",      "http://notification-service:8109")
 
+# Snapshot write-backs run after the response on a small pool of their own
+SNAPSHOT_WRITEBACK_WORKERS = int(os.environ.get("SNAPSHOT_WRITEBACK_WORKERS", "2"))
+_writeback_pool = None
+_writeback_pool_lock = threading.Lock()
+
 
 def _error(code, message, status):
     return jsonify({"error": {"code": code, "message": message}}), status
 
 
 def _get_credit_balance(credit_data):
-    """Safely extract credit balance from OutSystems response regardless of field name."""
+    """Safely extract credit balance from a balance response regardless of field name."""
     raw = (
         credit_data.get("creditBalance")
         if credit_data.get("creditBalance") is not None
@@ -64,6 +80,48 @@ def _get_credit_balance(credit_data):
     return float(raw)
 
 
+def _get_balance(user_id):
+    """(balance, err) from the local ledger, seeding it from OutSystems on first use."""
+    data, err = call_service("GET", f"{CREDIT_TXN_SERVICE}/balances/{user_id}")
+    if err != "BALANCE_NOT_FOUND":
+        return data, err
+    credit_data, err = call_credit_service("GET", f"/credits/{user_id}")
+    if err:
+        return None, err
+    return call_service("POST", f"{CREDIT_TXN_SERVICE}/balances", json={
+        "userId": user_id,
+        "creditBalance": _get_credit_balance(credit_data),
+    })
+
+
+# Late-bound so the fetch can be swapped in tests
+credit_balances = CreditBalanceCache(lambda user_id: _get_balance(user_id))
+# Buyer and seller phone numbers for OTP, names for enrichment; no password or salt
+user_profiles = UserProfileCache(
+    lambda user_id: call_service("GET", f"{USER_SERVICE}/users/{user_id}/profile")
+)
+
+
+def _release_listing(listing_id):
+    """
+    Return a claimed listing to active. Best-effort and conditional on the
+    listing still being pending_transfer, so it never reopens a sold listing.
+    Returns the released listing, or None.
+    """
+    listing, err = call_service("POST", f"{MARKETPLACE_SERVICE}/listings/{listing_id}/release")
+    if err:
+        if err != "LISTING_NOT_CLAIMED":
+            logger.warning("Failed to release listing %s: %s", listing_id, err)
+        return None
+    return listing
+
+
+def _abandon_initiate(transfer_id, listing_id):
+    """Undo a half-started initiate so the listing can be bought by someone else."""
+    call_service("PATCH", f"{TRANSFER_SERVICE}/transfers/{transfer_id}", json={"status": "cancelled"})
+    _release_listing(listing_id)
+
+
 def _safe_get(url, **kwargs):
     """Return service data or None without failing the caller."""
     data, err = call_service("GET", url, **kwargs)
@@ -73,6 +131,21 @@ def _safe_get(url, **kwargs):
     return data
 
 
+def _safe_profile(user_id):
+    """Cached user profile or None, for enrichment."""
+    profile, err = user_profiles.get(user_id)
+    if err:
+        logger.warning("Downstream enrichment lookup failed for user %s: %s", user_id, err)
+        return None
+    return profile
+
+
+def _load_profile(loader, user_id):
+    if not user_id:
+        return resolved(None)
+    return loader.load(("user", user_id), lambda _timeout: _safe_profile(user_id))
+
+
 def _first_present(*values):
     for value in values:
         if value is not None:
@@ -80,72 +153,118 @@ def _first_present(*values):
     return None
 
 
-def _build_transfer_context(transfer):
-    """Load related transfer resources while tolerating partial failures."""
-    listing = _safe_get(f"{MARKETPLACE_SERVICE}/listings/{transfer['listingId']}") if transfer.get("listingId") else None
+def _plan_transfer_context(loader, transfer):
+    """
+    Wire up the lookups for one transfer as a dependency graph:
 
-    ticket_id = _first_present(
-        transfer.get("ticketId"),
-        (listing or {}).get("ticketId"),
-    )
-    ticket = _safe_get(f"{TICKET_SERVICE}/tickets/{ticket_id}") if ticket_id else None
+      listing -> ticket -> event -> venue --+
+                       +-> inventory -------+-> venue seat map
+      buyer, seller (independent)
 
-    event_id = _first_present(
-        transfer.get("eventId"),
-        (ticket or {}).get("eventId"),
+    Returns {field: Future}. Lookups start as soon as their inputs resolve and
+    are shared with every other transfer planned on the same loader.
+    """
+    listing_f = loader.fetch(
+        f"{MARKETPLACE_SERVICE}/listings/{transfer['listingId']}" if transfer.get("listingId") else None
     )
-    event = _safe_get(f"{EVENT_SERVICE}/events/{event_id}") if event_id else None
 
-    venue_id = _first_present(
-        (event or {}).get("venueId"),
-        (ticket or {}).get("venueId"),
-        transfer.get("venueId"),
-    )
-    venue = _safe_get(f"{VENUE_SERVICE}/venues/{venue_id}") if venue_id else None
+    def ticket_id_of(listing):
+        return _first_present(transfer.get("ticketId"), (listing or {}).get("ticketId"))
 
-    seller = _safe_get(f"{USER_SERVICE}/users/{transfer['sellerId']}") if transfer.get("sellerId") else None
-    buyer = _safe_get(f"{USER_SERVICE}/users/{transfer['buyerId']}") if transfer.get("buyerId") else None
+    def fetch_ticket(listing):
+        ticket_id = ticket_id_of(listing)
+        return loader.fetch(f"{TICKET_SERVICE}/tickets/{ticket_id}" if ticket_id else None)
 
-    seat = None
-    inventory_id = _first_present(
-        (ticket or {}).get("inventoryId"),
-        transfer.get("inventoryId"),
-    )
-    if event_id and inventory_id:
-        inv_data = _safe_get(f"{SEAT_INV_SERVICE}/inventory/event/{event_id}")
+    if transfer.get("ticketId"):
+        # Known up front — don't wait for the listing
+        ticket_f = loader.fetch(f"{TICKET_SERVICE}/tickets/{transfer['ticketId']}")
+    else:
+        ticket_f = loader.after([listing_f], fetch_ticket)
+
+    def event_id_of(ticket):
+        return _first_present(transfer.get("eventId"), (ticket or {}).get("eventId"))
+
+    event_f = loader.after([ticket_f], lambda ticket: loader.fetch(
+        f"{EVENT_SERVICE}/events/{event_id_of(ticket)}" if event_id_of(ticket) else None
+    ))
+
+    def venue_id_of(ticket, event):
+        return _first_present(
+            (event or {}).get("venueId"),
+            (ticket or {}).get("venueId"),
+            transfer.get("venueId"),
+        )
+
+    venue_f = loader.after([ticket_f, event_f], lambda ticket, event: loader.fetch(
+        f"{VENUE_SERVICE}/venues/{venue_id_of(ticket, event)}" if venue_id_of(ticket, event) else None
+    ))
+
+    def inventory_id_of(ticket):
+        return _first_present((ticket or {}).get("inventoryId"), transfer.get("inventoryId"))
+
+    def fetch_inventory(ticket):
+        if not (event_id_of(ticket) and inventory_id_of(ticket)):
+            return None
+        return loader.fetch(f"{SEAT_INV_SERVICE}/inventory/event/{event_id_of(ticket)}")
+
+    inventory_f = loader.after([ticket_f], fetch_inventory)
+
+    def seat_id_of(ticket, inv_data):
         inventory_item = next(
             (
                 item
                 for item in (inv_data or {}).get("inventory", [])
-                if item.get("inventoryId") == inventory_id
+                if item.get("inventoryId") == inventory_id_of(ticket)
             ),
             None,
         )
-        seat_id = (inventory_item or {}).get("seatId")
-        if venue_id and seat_id:
-            seats_data = _safe_get(f"{SEAT_SERVICE}/seats/venue/{venue_id}")
-            seat = next(
-                (
-                    item
-                    for item in (seats_data or {}).get("seats", [])
-                    if item.get("seatId") == seat_id
-                ),
-                None,
-            )
+        return (inventory_item or {}).get("seatId")
+
+    def fetch_seats(ticket, event, inv_data):
+        venue_id = venue_id_of(ticket, event)
+        if not (venue_id and seat_id_of(ticket, inv_data)):
+            return None
+        return loader.fetch(f"{SEAT_SERVICE}/seats/venue/{venue_id}")
+
+    seats_f = loader.after([ticket_f, event_f, inventory_f], fetch_seats)
+
+    def find_seat(ticket, inv_data, seats_data):
+        seat_id = seat_id_of(ticket, inv_data)
+        return next(
+            (item for item in (seats_data or {}).get("seats", []) if item.get("seatId") == seat_id),
+            None,
+        ) if seat_id else None
 
     return {
-        "buyer": buyer,
-        "seller": seller,
-        "listing": listing,
-        "ticket": ticket,
-        "ticketId": ticket_id,
-        "event": event,
-        "eventId": event_id,
-        "venue": venue,
-        "seat": seat,
+        "listing": listing_f,
+        "ticket": ticket_f,
+        "ticketId": loader.after([listing_f], ticket_id_of),
+        "event": event_f,
+        "eventId": loader.after([ticket_f], event_id_of),
+        "venue": venue_f,
+        "seat": loader.after([ticket_f, inventory_f, seats_f], find_seat),
+        "seller": _load_profile(loader, transfer.get("sellerId")),
+        "buyer": _load_profile(loader, transfer.get("buyerId")),
     }
 
 
+def _build_transfer_contexts(transfers):
+    """
+    Load related resources for every transfer in one response concurrently,
+    deduplicating identical lookups and bounding the whole batch by one
+    deadline. Partial failures leave the affected fields as None.
+    """
+    loader = ContextLoader(_safe_get)
+    plans = [_plan_transfer_context(loader, transfer) for transfer in transfers]
+    keys = [(index, field) for index, plan in enumerate(plans) for field in plan]
+    values = loader.collect(plans[index][field] for index, field in keys)
+
+    contexts = [{} for _ in transfers]
+    for (index, field), value in zip(keys, values):
+        contexts[index][field] = value
+    return contexts
+
+
 def _build_event_payload(context):
     event = context["event"] or {}
     venue = context["venue"]
@@ -207,13 +326,13 @@ def _build_transfer_notification_payload(event_type, transfer_data):
     return {key: value for key, value in payload.items() if value is not None}
 
 
-def _load_enriched_transfer(transfer_id, fallback=None):
+def _load_enriched_transfer(transfer_id, fallback=None, refresh=False):
     """Reload the latest transfer state and enrich it for UI responses."""
     transfer, err = call_service("GET", f"{TRANSFER_SERVICE}/transfers/{transfer_id}")
     if err:
         logger.warning("Failed to reload transfer %s after update: %s", transfer_id, err)
-        return _enrich_transfer(fallback) if fallback else None
-    return _enrich_transfer(transfer)
+        return _enrich_transfer(fallback, refresh=refresh) if fallback else None
+    return _enrich_transfer(transfer, refresh=refresh)
 
 
 def _broadcast_notification(notification_type, payload):
@@ -343,168 +462,164 @@ def _publish_transfer_timeout(transfer_id, listing_id, buyer_id, seller_id):
                 logger.error("RabbitMQ timeout publish failed after %d attempts: %s", MAX_RETRIES, exc)
 
 
-def _execute_saga(transfer_id, buyer_id, seller_id, credit_amount, ticket_id, listing_id,
-                  buyer_balance, seller_balance):
-    completed = []
-    compensation_errors = []
-    try:
-        # 1. Deduct buyer
-        _, err = call_credit_service("PATCH", f"/credits/{buyer_id}",
-                            json={"creditBalance": buyer_balance - credit_amount})
-        if err:
-            raise RuntimeError(f"Credit deduction for buyer failed: {err}")
-        completed.append("buyer_deducted")
+def _saga_call(method, url, failure, **kwargs):
+    _, err = call_service(method, url, **kwargs)
+    if err:
+        raise RuntimeError(f"{failure}: {err}")
 
-        # 2. Credit seller
-        _, err = call_credit_service("PATCH", f"/credits/{seller_id}",
-                            json={"creditBalance": seller_balance + credit_amount})
-        if err:
-            raise RuntimeError(f"Credit addition for seller failed: {err}")
-        completed.append("seller_credited")
 
-        # 3. Log buyer txn
-        _, err = call_service("POST", f"{CREDIT_TXN_SERVICE}/credit-transactions", json={
-            "userId": buyer_id, "delta": -credit_amount,
-            "reason": "p2p_sent", "referenceId": transfer_id,
-        })
-        if err:
-            raise RuntimeError(f"Buyer transaction log failed: {err}")
-        completed.append("buyer_txn_logged")
+def _compensate_call(method, url, **kwargs):
+    _, err = call_service(method, url, **kwargs)
+    return str(err) if err else None
 
-        # 4. Log seller txn
-        _, err = call_service("POST", f"{CREDIT_TXN_SERVICE}/credit-transactions", json={
-            "userId": seller_id, "delta": credit_amount,
-            "reason": "p2p_received", "referenceId": transfer_id,
-        })
-        if err:
-            raise RuntimeError(f"Seller transaction log failed: {err}")
-        completed.append("seller_txn_logged")
 
-        # 5. Transfer ticket
-        _, err = call_service("PATCH", f"{TICKET_SERVICE}/tickets/{ticket_id}", json={
-            "ownerId": buyer_id, "status": "active",
-        })
-        if err:
-            raise RuntimeError(f"Ticket transfer failed: {err}")
-        completed.append("ticket_transferred")
+class _InsufficientCredits(StepRefused):
+    pass
 
-        # 6. Complete listing
-        _, err = call_service("PATCH", f"{MARKETPLACE_SERVICE}/listings/{listing_id}", json={"status": "completed"})
-        if err:
-            raise RuntimeError(f"Listing completion failed: {err}")
-        completed.append("listing_completed")
 
-        # 7. Complete transfer
-        _, err = call_service("PATCH", f"{TRANSFER_SERVICE}/transfers/{transfer_id}", json={
-            "status": "completed",
-            "completedAt": datetime.now(timezone.utc).isoformat(),
-        })
-        if err:
-            raise RuntimeError(f"Transfer record completion failed: {err}")
-        completed.append("transfer_completed")
+def _move_credits(user_id, delta, reason, reference_id):
+    # The ledger entry moves the balance in the same transaction; a debit the
+    # balance no longer covers is refused there
+    txn, err = call_service("POST", f"{CREDIT_TXN_SERVICE}/credit-transactions", json={
+        "userId": user_id, "delta": delta,
+        "reason": reason, "referenceId": reference_id,
+    })
+    if err:
+        credit_balances.invalidate(user_id)
+    if err == "INSUFFICIENT_CREDITS":
+        raise _InsufficientCredits(f"Balance of {user_id} no longer covers {-delta}")
+    if err:
+        raise RuntimeError(f"Credit transaction ({reason}) failed: {err}")
+    credit_balances.put_ledger_entry(user_id, txn)
 
-    except Exception as exc:
-        logger.error("Saga failed at step %d (%s completed): %s", len(completed), ", ".join(completed), exc)
-        
-        # Reverse compensation in reverse order
-        try:
-            if "listing_completed" in completed:
-                _, err = call_service("PATCH", f"{MARKETPLACE_SERVICE}/listings/{listing_id}",
-                                     json={"status": "active"})
-                if err:
-                    compensation_errors.append(f"Failed to revert listing status: {err}")
-                    logger.error("Failed to revert listing %s status: %s", listing_id, err)
-
-            if "ticket_transferred" in completed:
-                _, err = call_service("PATCH", f"{TICKET_SERVICE}/tickets/{ticket_id}",
-                                     json={"ownerId": seller_id, "status": "sold"})
-                if err:
-                    compensation_errors.append(f"Failed to revert ticket ownership: {err}")
-                    logger.error("Failed to revert ticket %s ownership: %s", ticket_id, err)
-
-            if "seller_credited" in completed:
-                _, err = call_credit_service("PATCH", f"/credits/{seller_id}",
-                                            json={"creditBalance": seller_balance})
-                if err:
-                    compensation_errors.append(f"Failed to restore seller balance: {err}")
-                    logger.error("Failed to restore seller %s balance: %s", seller_id, err)
-            
-            if "buyer_deducted" in completed:
-                _, err = call_credit_service("PATCH", f"/credits/{buyer_id}",
-                                            json={"creditBalance": buyer_balance})
-                if err:
-                    compensation_errors.append(f"Failed to restore buyer balance: {err}")
-                    logger.error("Failed to restore buyer %s balance: {err}", buyer_id, err)
-            
-            # Reverse transaction logs if they were created
-            if "seller_txn_logged" in completed:
-                # Mark seller transaction as reversed
-                _, err = call_service("PATCH", f"{CREDIT_TXN_SERVICE}/credit-transactions/reference/{transfer_id}",
-                                     json={"status": "reversed", "reason": "transfer_failed"})
-                if err:
-                    compensation_errors.append(f"Failed to reverse seller transaction log: {err}")
-                    logger.error("Failed to reverse seller transaction log: %s", err)
-            
-            if "buyer_txn_logged" in completed:
-                # Mark buyer transaction as reversed
-                _, err = call_service("PATCH", f"{CREDIT_TXN_SERVICE}/credit-transactions/reference/{transfer_id}",
-                                     json={"status": "reversed", "reason": "transfer_failed"})
-                if err:
-                    compensation_errors.append(f"Failed to reverse buyer transaction log: {err}")
-                    logger.error("Failed to reverse buyer transaction log: %s", err)
-        except Exception as comp_err:
-            compensation_errors.append(f"Compensation exception: {str(comp_err)}")
-            logger.error("Exception during compensation: %s", comp_err)
-        
+
+def _reverse_credit_txn(user_id, delta, reason, reference_id):
+    # The ledger is append-only, so a logged entry is undone by its opposite
+    txn, err = call_service("POST", f"{CREDIT_TXN_SERVICE}/credit-transactions", json={
+        "userId": user_id, "delta": -delta,
+        "reason": f"{reason}_reversal", "referenceId": reference_id,
+    })
+    if err:
+        credit_balances.invalidate(user_id)
+        return str(err)
+    credit_balances.put_ledger_entry(user_id, txn)
+    return None
+
+
+# Every action/compensation takes the journaled saga inputs, so recovery can
+# replay them without the original request. All actions are idempotent (ledger
+# entries are keyed on transferId + reason, the rest are PATCHes to a target
+# state), so recovery may re-run an interrupted one to learn its outcome.
+TRANSFER_SAGA_STEPS = [
+    SagaStep(
+        "buyer_deducted",
+        lambda i: _move_credits(i["buyerId"], -i["creditAmount"], "p2p_sent", i["transferId"]),
+        lambda i: _reverse_credit_txn(i["buyerId"], -i["creditAmount"], "p2p_sent", i["transferId"]),
+        replayable=True,
+    ),
+    SagaStep(
+        "seller_credited",
+        lambda i: _move_credits(i["sellerId"], i["creditAmount"], "p2p_received", i["transferId"]),
+        lambda i: _reverse_credit_txn(i["sellerId"], i["creditAmount"], "p2p_received", i["transferId"]),
+        replayable=True,
+    ),
+    SagaStep(
+        "ticket_transferred",
+        lambda i: _saga_call("PATCH", f"{TICKET_SERVICE}/tickets/{i['ticketId']}", "Ticket transfer failed",
+                             json={"ownerId": i["buyerId"], "status": "active"}),
+        lambda i: _compensate_call("PATCH", f"{TICKET_SERVICE}/tickets/{i['ticketId']}",
+                                   json={"ownerId": i["sellerId"], "status": "sold"}),
+        replayable=True,
+    ),
+    SagaStep(
+        "listing_completed",
+        lambda i: _saga_call("PATCH", f"{MARKETPLACE_SERVICE}/listings/{i['listingId']}",
+                             "Listing completion failed", json={"status": "completed"}),
+        lambda i: _compensate_call("PATCH", f"{MARKETPLACE_SERVICE}/listings/{i['listingId']}",
+                                   json={"status": "active"}),
+        replayable=True,
+    ),
+    SagaStep(
+        "transfer_completed",
+        lambda i: _saga_call("PATCH", f"{TRANSFER_SERVICE}/transfers/{i['transferId']}",
+                             "Transfer record completion failed", json={
+                                 "status": "completed",
+                                 "completedAt": datetime.now(timezone.utc).isoformat(),
+                             }),
+        None,
+        replayable=True,
+    ),
+]
+# Once ownership has moved only idempotent status updates remain, so a
+# recovered saga past this step is resumed rather than unwound.
+TRANSFER_SAGA_POINT_OF_NO_RETURN = "ticket_transferred"
+
+transfer_saga_journal = SagaJournal("transfer")
+
+
+def _publish_compensation_dlq(message):
+    """Hand a saga that could not be unwound to manual reconciliation."""
+    try:
+        conn = pika.BlockingConnection(pika.ConnectionParameters(
+            host=os.environ.get("RABBITMQ_HOST", "rabbitmq"),
+            port=int(os.environ.get("RABBITMQ_PORT", "5672")),
+            credentials=pika.PlainCredentials(
+                os.environ.get("RABBITMQ_USER", "guest"),
+                os.environ.get("RABBITMQ_PASS", "guest"),
+            ),
+            connection_attempts=2,
+            retry_delay=1,
+        ))
+        ch = conn.channel()
+        ch.basic_publish(
+            exchange="",
+            routing_key="transfer_compensation_dlq",
+            body=json.dumps({**message, "timestamp": datetime.now(timezone.utc).isoformat()}),
+            properties=pika.BasicProperties(delivery_mode=2),
+        )
+        conn.close()
+        logger.info("Transfer compensation failure logged to DLQ for transfer %s", message.get("transfer_id"))
+    except Exception as dlq_err:
+        logger.error("Failed to log compensation failure to DLQ: %s", dlq_err)
+
+
+def _execute_saga(transfer_id, buyer_id, seller_id, credit_amount, ticket_id, listing_id):
+    inputs = {
+        "transferId": transfer_id,
+        "buyerId": buyer_id,
+        "sellerId": seller_id,
+        "creditAmount": credit_amount,
+        "ticketId": ticket_id,
+        "listingId": listing_id,
+    }
+    try:
+        run_saga(transfer_saga_journal, transfer_id, TRANSFER_SAGA_STEPS, inputs)
+    except SagaStepError as exc:
         # Mark transfer as failed
         call_service("PATCH", f"{TRANSFER_SERVICE}/transfers/{transfer_id}", json={"status": "failed"})
-        
-        # Log compensation failures to DLQ for manual intervention
-        if compensation_errors:
+        # Fully unwound, so the listing can be bought again; after a failed
+        # compensation it stays claimed until recovery finishes the unwind
+        if not exc.compensation_errors:
+            _release_listing(listing_id)
+
+        if exc.compensation_errors:
             logger.error(
                 "Transfer saga compensation incomplete. Transfer: %s, Errors: %s",
                 transfer_id,
-                "; ".join(compensation_errors)
+                "; ".join(exc.compensation_errors)
             )
-            # Send to DLQ for manual reconciliation
-            try:
-                import pika
-                import json as json_module
-                from datetime import UTC
-                
-                message = json_module.dumps({
+            # Journaled sagas are retried by saga recovery and only reach the
+            # DLQ once abandoned; without the journal this is the last chance.
+            if not exc.journaled:
+                _publish_compensation_dlq({
                     "event": "transfer_compensation_failed",
                     "transfer_id": transfer_id,
                     "buyer_id": buyer_id,
                     "seller_id": seller_id,
-                    "completed_steps": completed,
-                    "errors": compensation_errors,
-                    "timestamp": datetime.now(UTC).isoformat(),
+                    "failed_step": exc.step,
+                    "errors": exc.compensation_errors,
                 })
-                
-                conn = pika.BlockingConnection(pika.ConnectionParameters(
-                    host=os.environ.get("RABBITMQ_HOST", "rabbitmq"),
-                    port=int(os.environ.get("RABBITMQ_PORT", "5672")),
-                    credentials=pika.PlainCredentials(
-                        os.environ.get("RABBITMQ_USER", "guest"),
-                        os.environ.get("RABBITMQ_PASS", "guest"),
-                    ),
-                    connection_attempts=2,
-                    retry_delay=1,
-                ))
-                ch = conn.channel()
-                ch.basic_publish(
-                    exchange="",
-                    routing_key="transfer_compensation_dlq",
-                    body=message,
-                    properties=pika.BasicProperties(delivery_mode=2),
-                )
-                conn.close()
-                logger.info("Transfer compensation failure logged to DLQ for transfer %s", transfer_id)
-            except Exception as dlq_err:
-                logger.error("Failed to log compensation failure to DLQ: %s", dlq_err)
-        
-        raise exc
+        raise exc.cause
 
 
 # ── POST /transfer/initiate ───────────────────────────────────────────────────
@@ -534,7 +649,7 @@ def initiate():
       201:
         description: Transfer created — status pending_buyer_otp
       400:
-        description: Listing not active
+        description: Listing not active or already claimed by another buyer
       401:
         description: Unauthorized
       402:
@@ -563,15 +678,25 @@ def initiate():
     if seller_id == buyer_id:
         return _error("AUTH_FORBIDDEN", "You cannot purchase your own listing.", 403)
 
+    # Claim the listing before any credit lookup or OTP send; concurrent buyers
+    # lose here instead of each starting a transfer that can never complete.
+    listing, err = call_service("POST", f"{MARKETPLACE_SERVICE}/listings/{body['listingId']}/claim")
+    if err in ("LISTING_UNAVAILABLE", "LISTING_NOT_FOUND"):
+        return _error("LISTING_NOT_FOUND", "Listing is no longer available.", 400)
+    if err:
+        return _error("SERVICE_UNAVAILABLE", "Could not reserve listing.", 503)
+
     credit_amount = listing["price"]
 
     # Check buyer has sufficient credits
-    credit_data, err = call_credit_service("GET", f"/credits/{buyer_id}")
+    credit_data, err = credit_balances.get(buyer_id)
     if err:
+        _release_listing(body["listingId"])
         return _error("SERVICE_UNAVAILABLE", "Could not verify balance.", 503)
 
     buyer_balance = _get_credit_balance(credit_data)
     if buyer_balance < credit_amount:
+        _release_listing(body["listingId"])
         return _error("INSUFFICIENT_CREDITS", "Please top up your balance to buy this ticket.", 402)
 
     transfer, err = call_service("POST", f"{TRANSFER_SERVICE}/transfers", json={
@@ -581,15 +706,18 @@ def initiate():
         "creditAmount": credit_amount,
     })
     if err:
+        _release_listing(body["listingId"])
         return _error("INTERNAL_ERROR", "Could not create transfer record.", 500)
 
-    buyer, err = call_service("GET", f"{USER_SERVICE}/users/{buyer_id}")
+    buyer, err = user_profiles.get(buyer_id)
     if err:
+        _abandon_initiate(transfer["transferId"], body["listingId"])
         return _error("SERVICE_UNAVAILABLE", "Could not retrieve buyer details.", 503)
 
     buyer_otp, err = call_service("POST", f"{OTP_WRAPPER}/otp/send",
                                   json={"phoneNumber": buyer["phoneNumber"]})
     if err:
+        _abandon_initiate(transfer["transferId"], body["listingId"])
         return _error("SERVICE_UNAVAILABLE", "Could not send OTP to buyer.", 503)
 
     call_service("PATCH", f"{TRANSFER_SERVICE}/transfers/{transfer['transferId']}", json={
@@ -686,7 +814,7 @@ def buyer_verify(transfer_id):
     ):
         return _error("VALIDATION_ERROR", "Transfer is not awaiting buyer OTP.", 400)
 
-    buyer, err = call_service("GET", f"{USER_SERVICE}/users/{transfer['buyerId']}")
+    buyer, err = user_profiles.get(transfer['buyerId'])
     if err:
         return _error("SERVICE_UNAVAILABLE", "Could not retrieve buyer details.", 503)
 
@@ -703,7 +831,7 @@ def buyer_verify(transfer_id):
     })
 
     seller_id = transfer["sellerId"]
-    seller, err = call_service("GET", f"{USER_SERVICE}/users/{seller_id}")
+    seller, err = user_profiles.get(seller_id)
     if err:
         return _error("SERVICE_UNAVAILABLE", "Could not retrieve seller details.", 503)
 
@@ -780,7 +908,7 @@ def seller_accept(transfer_id):
     if transfer["status"] != "pending_seller_acceptance":
         return _error("VALIDATION_ERROR", "Transfer is not awaiting seller acceptance.", 400)
 
-    buyer, err = call_service("GET", f"{USER_SERVICE}/users/{transfer['buyerId']}")
+    buyer, err = user_profiles.get(transfer['buyerId'])
     if err:
         return _error("SERVICE_UNAVAILABLE", "Could not retrieve buyer details.", 503)
 
@@ -871,10 +999,8 @@ def seller_reject(transfer_id):
         return _error("VALIDATION_ERROR", "Transfer is not awaiting seller acceptance.", 400)
 
     call_service("PATCH", f"{TRANSFER_SERVICE}/transfers/{transfer_id}", json={"status": "cancelled"})
-    listing, _ = call_service("GET", f"{MARKETPLACE_SERVICE}/listings/{transfer['listingId']}")
+    listing = _release_listing(transfer["listingId"])
     if listing:
-        call_service("PATCH", f"{MARKETPLACE_SERVICE}/listings/{transfer['listingId']}",
-                     json={"status": "active"})
         call_service("PATCH", f"{TICKET_SERVICE}/tickets/{listing['ticketId']}",
                      json={"status": "listed"})
     
@@ -948,7 +1074,7 @@ def seller_verify(transfer_id):
     ):
         return _error("VALIDATION_ERROR", "Transfer is not awaiting seller OTP.", 400)
 
-    seller, err = call_service("GET", f"{USER_SERVICE}/users/{transfer['sellerId']}")
+    seller, err = user_profiles.get(transfer['sellerId'])
     if err:
         return _error("SERVICE_UNAVAILABLE", "Could not retrieve seller details.", 503)
 
@@ -970,20 +1096,24 @@ def seller_verify(transfer_id):
     listing, _ = call_service("GET", f"{MARKETPLACE_SERVICE}/listings/{transfer['listingId']}")
     ticket_id = listing["ticketId"] if listing else None
 
-    buyer_credit, err = call_credit_service("GET", f"/credits/{buyer_id}")
+    buyer_credit, err = credit_balances.get(buyer_id)
     if err:
         call_service("PATCH", f"{TRANSFER_SERVICE}/transfers/{transfer_id}", json={"status": "failed"})
+        _release_listing(transfer["listingId"])
         return _error("SERVICE_UNAVAILABLE", "Could not verify buyer balance.", 503)
 
     buyer_balance = _get_credit_balance(buyer_credit)
     if buyer_balance < credit_amount:
         call_service("PATCH", f"{TRANSFER_SERVICE}/transfers/{transfer_id}", json={"status": "failed"})
+        _release_listing(transfer["listingId"])
         return _error("INSUFFICIENT_CREDITS", "Buyer no longer has sufficient credits.", 402)
 
-    seller_credit, seller_err = call_credit_service("GET", f"/credits/{seller_id}")
+    # The seller's ledger balance must exist before the saga credits it
+    _, seller_err = credit_balances.get(seller_id)
     if seller_err:
+        call_service("PATCH", f"{TRANSFER_SERVICE}/transfers/{transfer_id}", json={"status": "failed"})
+        _release_listing(transfer["listingId"])
         return _error("SERVICE_UNAVAILABLE", "Could not verify seller balance.", 503)
-    seller_balance = _get_credit_balance(seller_credit)
 
     try:
         _execute_saga(
@@ -993,8 +1123,6 @@ def seller_verify(transfer_id):
             credit_amount=credit_amount,
             ticket_id=ticket_id,
             listing_id=transfer["listingId"],
-            buyer_balance=buyer_balance,
-            seller_balance=seller_balance,
         )
 
         completed_transfer = {
@@ -1022,10 +1150,13 @@ def seller_verify(transfer_id):
             "ticket_update",
             {key: value for key, value in ticket_payload.items() if value is not None},
         )
+    except _InsufficientCredits:
+        return _error("INSUFFICIENT_CREDITS", "Buyer no longer has sufficient credits.", 402)
     except Exception:
         return _error("INTERNAL_ERROR", "Transfer failed — no credits were charged.", 500)
 
     completed_at = datetime.now(timezone.utc).isoformat()
+    # Re-capture the display snapshot as of completion for history views
     updated_transfer = _load_enriched_transfer(transfer_id, {
         **transfer,
         "buyerId": buyer_id,
@@ -1035,7 +1166,7 @@ def seller_verify(transfer_id):
         "sellerOtpVerified": True,
         "status": "completed",
         "completedAt": completed_at,
-    })
+    }, refresh=True)
 
     return jsonify({"data": {
         **(updated_transfer or {}),
@@ -1048,51 +1179,165 @@ def seller_verify(transfer_id):
 
 # ── Helper: Enrich Transfer ──────────────────────────────────────────────────
 
-def _enrich_transfer(transfer):
+def _enrich_transfers(transfers, refresh=False):
     """
-    Enrich a transfer record with seller name, ticket, event, and seat details.
+    Enrich transfer records with buyer/seller names and event, venue, and
+    seat details. Transfers that already carry a display snapshot from
+    transfer-service are served from it without any downstream lookups; the
+    rest share one concurrent, deduplicated lookup batch, and their snapshots
+    are written back after the response so the next read is a single query.
+    Either way the result has the shape _apply_transfer_snapshot documents.
     Tolerates partial downstream failures without collapsing the full response.
     """
-    enriched = transfer.copy()
+    enriched = [None] * len(transfers)
+    to_load = []
+    for index, transfer in enumerate(transfers):
+        snapshot = transfer.get("snapshot") or {}
+        # Snapshots stored before the records were captured are reloaded once
+        if snapshot.get("eventName") and snapshot.get("listing") and not refresh:
+            enriched[index] = _apply_transfer_snapshot(transfer, snapshot)
+        else:
+            to_load.append(index)
+
+    if to_load:
+        contexts = _build_transfer_contexts([transfers[index] for index in to_load])
+        writebacks = []
+        for index, context in zip(to_load, contexts):
+            snapshot = _snapshot_from_context(context)
+            enriched[index] = _apply_transfer_snapshot(transfers[index], snapshot)
+            writebacks.append((transfers[index], snapshot))
+        _run_after_response(_store_transfer_snapshots, writebacks)
+
+    return enriched
+
+
+def _enrich_transfer(transfer, refresh=False):
+    return _enrich_transfers([transfer], refresh=refresh)[0]
 
-    context = _build_transfer_context(transfer)
+
+def _get_writeback_pool():
+    global _writeback_pool
+    with _writeback_pool_lock:
+        if _writeback_pool is None:
+            _writeback_pool = ThreadPoolExecutor(
+                max_workers=SNAPSHOT_WRITEBACK_WORKERS, thread_name_prefix="snapshot",
+            )
+        return _writeback_pool
+
+
+def _run_after_response(fn, *args):
+    """Run a best-effort side effect off the request path; failures are only logged."""
+    def run():
+        try:
+            fn(*args)
+        except Exception as exc:
+            logger.warning("Deferred transfer side effect %s failed: %s", getattr(fn, "__name__", fn), exc)
+    _get_writeback_pool().submit(run)
+
+
+def _snapshot_from_context(context):
+    """Flatten a loaded context into the snapshot shape transfer-service stores."""
     buyer = context["buyer"] or {}
     seller = context["seller"] or {}
-    event_payload = _build_event_payload(context)
-    seat_payload = _build_seat_payload(context)
-    venue = context["venue"]
+    venue = context["venue"] or {}
+    event_payload = _build_event_payload(context) or {}
+    seat_payload = _build_seat_payload(context) or {}
+
+    snapshot = {
+        "ticketId": context["ticketId"],
+        "eventId": event_payload.get("eventId"),
+        "eventName": event_payload.get("name"),
+        "eventDate": event_payload.get("date"),
+        "eventImage": event_payload.get("image"),
+        "venueId": venue.get("venueId"),
+        "venueName": venue.get("name"),
+        "seatId": seat_payload.get("seatId"),
+        "seatSection": seat_payload.get("section"),
+        "seatRow": seat_payload.get("row"),
+        "seatNumber": seat_payload.get("seat"),
+        "seatGate": seat_payload.get("gate"),
+        "buyerName": _first_present(buyer.get("name"), buyer.get("fullName"), buyer.get("email")),
+        "sellerName": _first_present(seller.get("name"), seller.get("fullName"), seller.get("email")),
+        "listing": context["listing"] or None,
+        "ticket": context["ticket"] or None,
+        "venue": context["venue"] or None,
+    }
+    return {key: value for key, value in snapshot.items() if value is not None}
+
+
+def _store_transfer_snapshots(writebacks):
+    """Best-effort write-back; only complete snapshots are worth persisting."""
+    for transfer, snapshot in writebacks:
+        if not (transfer.get("transferId") and snapshot.get("eventName")):
+            continue
+        _, err = call_service(
+            "PATCH",
+            f"{TRANSFER_SERVICE}/transfers/{transfer['transferId']}",
+            json={"snapshot": snapshot},
+        )
+        if err:
+            logger.warning("Failed to store display snapshot for transfer %s: %s", transfer["transferId"], err)
 
-    enriched["buyerName"] = _first_present(
-        buyer.get("name"),
-        buyer.get("fullName"),
-        buyer.get("email"),
-        "Buyer",
-    )
-    enriched["sellerName"] = _first_present(
-        seller.get("name"),
-        seller.get("fullName"),
-        seller.get("email"),
-        "Seller",
-    )
-    enriched["ticketId"] = context["ticketId"]
-    if context["listing"]:
-        enriched["listing"] = context["listing"]
-    if context["ticket"]:
-        enriched["ticket"] = context["ticket"]
+
+def _apply_transfer_snapshot(transfer, snapshot):
+    """
+    The enriched transfer every read endpoint returns, built from a display
+    snapshot (stored, or freshly flattened by _snapshot_from_context):
+
+        buyerName, sellerName, ticketId
+        listing, ticket                                          when known
+        venue     (venue record), venueName                      when known
+        event     {id, eventId, name, date, image, venue},
+                  eventName, eventDate, eventImage               when known
+        seat      {seatId, section, row, rowNumber, seat, seatNumber, gate},
+                  seatSection, seatRow, seatNumber, seatGate     when known
+
+    listing, ticket and venue are the records as of the snapshot.
+    """
+    enriched = {key: value for key, value in transfer.items() if key != "snapshot"}
+
+    enriched["buyerName"] = _first_present(snapshot.get("buyerName"), "Buyer")
+    enriched["sellerName"] = _first_present(snapshot.get("sellerName"), "Seller")
+    enriched["ticketId"] = _first_present(snapshot.get("ticketId"), transfer.get("ticketId"))
+    if snapshot.get("listing"):
+        enriched["listing"] = snapshot["listing"]
+    if snapshot.get("ticket"):
+        enriched["ticket"] = snapshot["ticket"]
+
+    venue = snapshot.get("venue")
+    if not venue and (snapshot.get("venueId") or snapshot.get("venueName")):
+        venue = {"venueId": snapshot.get("venueId"), "name": snapshot.get("venueName")}
     if venue:
         enriched["venue"] = venue
         enriched["venueName"] = venue.get("name")
-    if event_payload:
-        enriched["event"] = event_payload
-        enriched["eventName"] = event_payload.get("name")
-        enriched["eventDate"] = event_payload.get("date")
-        enriched["eventImage"] = event_payload.get("image")
-    if seat_payload:
-        enriched["seat"] = seat_payload
-        enriched["seatSection"] = seat_payload.get("section")
-        enriched["seatRow"] = seat_payload.get("row")
-        enriched["seatNumber"] = seat_payload.get("seat")
-        enriched["seatGate"] = seat_payload.get("gate")
+
+    if any((snapshot.get("eventId"), snapshot.get("eventName"), snapshot.get("eventDate"), venue)):
+        enriched["event"] = {
+            "id": snapshot.get("eventId"),
+            "eventId": snapshot.get("eventId"),
+            "name": snapshot.get("eventName"),
+            "date": snapshot.get("eventDate"),
+            "image": snapshot.get("eventImage"),
+            "venue": venue,
+        }
+        enriched["eventName"] = snapshot.get("eventName")
+        enriched["eventDate"] = snapshot.get("eventDate")
+        enriched["eventImage"] = snapshot.get("eventImage")
+
+    if any(snapshot.get(field) for field in ("seatId", "seatSection", "seatRow", "seatNumber", "seatGate")):
+        enriched["seat"] = {
+            "seatId": snapshot.get("seatId"),
+            "section": snapshot.get("seatSection"),
+            "row": snapshot.get("seatRow"),
+            "rowNumber": snapshot.get("seatRow"),
+            "seat": snapshot.get("seatNumber"),
+            "seatNumber": snapshot.get("seatNumber"),
+            "gate": snapshot.get("seatGate"),
+        }
+        enriched["seatSection"] = snapshot.get("seatSection")
+        enriched["seatRow"] = snapshot.get("seatRow")
+        enriched["seatNumber"] = snapshot.get("seatNumber")
+        enriched["seatGate"] = snapshot.get("seatGate")
 
     return enriched
 
@@ -1152,17 +1397,16 @@ def get_pending_transfers():
     """
     seller_id = request.user["userId"]
     pending_statuses = ["pending_seller_otp", "pending_seller_acceptance"]
-    transfers = []
-    for pending_status in pending_statuses:
-        result, err = call_service("GET", f"{TRANSFER_SERVICE}/transfers",
-                                   params={"sellerId": seller_id, "status": pending_status})
-        if err:
-            return _error("SERVICE_UNAVAILABLE", "Could not retrieve transfers.", 503)
-        transfers.extend(result.get("transfers", []))
+    result, err = call_service("GET", f"{TRANSFER_SERVICE}/transfers", params={
+        "userId": seller_id,
+        "role": "seller",
+        "status": ",".join(pending_statuses),
+    })
+    if err:
+        return _error("SERVICE_UNAVAILABLE", "Could not retrieve transfers.", 503)
+
+    enriched_transfers = _enrich_transfers(result.get("transfers", []))
 
-    unique_transfers = {transfer["transferId"]: transfer for transfer in transfers}
-    enriched_transfers = [_enrich_transfer(t) for t in unique_transfers.values()]
-    
     return jsonify({"data": {"transfers": enriched_transfers}}), 200
 
 
@@ -1227,7 +1471,7 @@ def get_my_pending_transfers():
     
     # Enrich each transfer
     transfers = result.get("transfers", [])
-    enriched_transfers = [_enrich_transfer(t) for t in transfers]
+    enriched_transfers = _enrich_transfers(transfers)
     
     return jsonify({"data": {"transfers": enriched_transfers}}), 200
 
@@ -1244,6 +1488,17 @@ def get_transfer_history():
       - Transfer
     security:
       - BearerAuth: []
+    parameters:
+      - in: query
+        name: cursor
+        type: string
+        required: false
+        description: Opaque cursor from pagination.nextCursor. Pass an empty value for the first page; omit to get the full history.
+      - in: query
+        name: limit
+        type: integer
+        required: false
+        description: Page size when paging by cursor (default 20, max 100)
     responses:
       200:
         description: List of enriched completed transfers for seller archive/history views
@@ -1253,18 +1508,22 @@ def get_transfer_history():
         description: Transfer service unavailable
     """
     seller_id = request.user["userId"]
-    result, err = call_service(
-        "GET",
-        f"{TRANSFER_SERVICE}/transfers",
-        params={"sellerId": seller_id, "status": "completed"},
-    )
+    params = {"sellerId": seller_id, "status": "completed"}
+    if "cursor" in request.args:
+        params["cursor"] = request.args.get("cursor", "")
+        if request.args.get("limit"):
+            params["limit"] = request.args.get("limit")
+    result, err = call_service("GET", f"{TRANSFER_SERVICE}/transfers", params=params)
     if err:
         return _error("SERVICE_UNAVAILABLE", "Could not retrieve transfer history.", 503)
 
     transfers = result.get("transfers", [])
-    enriched_transfers = [_enrich_transfer(t) for t in transfers]
+    enriched_transfers = _enrich_transfers(transfers)
 
-    return jsonify({"data": {"transfers": enriched_transfers}}), 200
+    data = {"transfers": enriched_transfers}
+    if "pagination" in result:
+        data["pagination"] = result["pagination"]
+    return jsonify({"data": data}), 200
 
 
 # ── GET /transfer/<id> ────────────────────────────────────────────────────────
@@ -1359,7 +1618,7 @@ def resend_otp(transfer_id):
     status = transfer.get("status")
 
     if status == "pending_buyer_otp" and transfer["buyerId"] == user_id:
-        buyer, err = call_service("GET", f"{USER_SERVICE}/users/{transfer['buyerId']}")
+        buyer, err = user_profiles.get(transfer['buyerId'])
         if err:
             return _error("SERVICE_UNAVAILABLE", "Could not retrieve user details.", 503)
         otp_result, err = call_service("POST", f"{OTP_WRAPPER}/otp/send",
@@ -1371,7 +1630,7 @@ def resend_otp(transfer_id):
         return jsonify({"data": {"message": "OTP resent to your phone."}}), 200
 
     elif status == "pending_seller_otp" and transfer["sellerId"] == user_id:
-        seller, err = call_service("GET", f"{USER_SERVICE}/users/{transfer['sellerId']}")
+        seller, err = user_profiles.get(transfer['sellerId'])
         if err:
             return _error("SERVICE_UNAVAILABLE", "Could not retrieve user details.", 503)
         otp_result, err = call_service("POST", f"{OTP_WRAPPER}/otp/send",
@@ -1425,10 +1684,8 @@ def cancel_transfer(transfer_id):
 
     call_service("PATCH", f"{TRANSFER_SERVICE}/transfers/{transfer_id}", json={"status": "cancelled"})
 
-    listing, _ = call_service("GET", f"{MARKETPLACE_SERVICE}/listings/{transfer['listingId']}")
+    listing = _release_listing(transfer["listingId"])
     if listing:
-        call_service("PATCH", f"{MARKETPLACE_SERVICE}/listings/{transfer['listingId']}",
-                     json={"status": "active"})
         call_service("PATCH", f"{TICKET_SERVICE}/tickets/{listing['ticketId']}",
                      json={"status": "listed"})
     
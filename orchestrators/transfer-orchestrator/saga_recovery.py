@@ -0,0 +1,71 @@
+"""
+Transfer saga recovery.
+
+Runs in a daemon thread and picks up seller-verify sagas whose worker stopped
+journaling (crash, OOM kill, deploy) before they finished, plus sagas whose
+compensation failed and needs another try. The step the worker was on is
+re-run first (every step is idempotent) so the journal reflects what really
+happened; a saga that has moved the ticket is then resumed to completion and
+anything earlier is unwound.
+"""
+import logging
+
+from service_client import call_service
+from shared.saga_journal import (
+    COMPENSATING,
+    COMPENSATION_FAILED,
+    compensate_saga,
+    resume_saga,
+    run_recovery_loop,
+    settle_interrupted_step,
+)
+
+logger = logging.getLogger(__name__)
+
+
+def recover_transfer_saga(saga):
+    from routes import (
+        TRANSFER_SAGA_POINT_OF_NO_RETURN,
+        TRANSFER_SAGA_STEPS,
+        TRANSFER_SERVICE,
+        _release_listing,
+        transfer_saga_journal,
+    )
+
+    saga_id = saga["sagaId"]
+    inputs = saga["inputs"]
+    # The worker may have died between a step's effect and its journal entry
+    settle_interrupted_step(transfer_saga_journal, saga, TRANSFER_SAGA_STEPS)
+    done = list(saga["steps"])
+
+    if saga["status"] not in (COMPENSATING, COMPENSATION_FAILED) and TRANSFER_SAGA_POINT_OF_NO_RETURN in done:
+        logger.info("Resuming transfer saga %s after %s", saga_id, ", ".join(done))
+        resume_saga(transfer_saga_journal, saga, TRANSFER_SAGA_STEPS)
+        return
+
+    logger.info("Compensating transfer saga %s (%s completed)", saga_id, ", ".join(done) or "nothing")
+    errors = compensate_saga(transfer_saga_journal, saga_id, TRANSFER_SAGA_STEPS, inputs, done, saga["compensations"])
+    call_service("PATCH", f"{TRANSFER_SERVICE}/transfers/{inputs['transferId']}", json={"status": "failed"})
+    if not errors:
+        _release_listing(inputs["listingId"])
+
+
+def _abandon_transfer_saga(saga):
+    from routes import _publish_compensation_dlq
+
+    _publish_compensation_dlq({
+        "event": "transfer_compensation_failed",
+        "transfer_id": saga["inputs"].get("transferId"),
+        "buyer_id": saga["inputs"].get("buyerId"),
+        "seller_id": saga["inputs"].get("sellerId"),
+        "completed_steps": list(saga["steps"]),
+        "compensated_steps": list(saga["compensations"]),
+        "attempts": saga["attempts"],
+    })
+
+
+def start_saga_recovery():
+    """Blocking recovery loop — run in a daemon thread."""
+    from routes import transfer_saga_journal
+
+    run_recovery_loop(transfer_saga_journal, recover_transfer_saga, on_abandon=_abandon_transfer_saga)
@@ -4,6 +4,8 @@ os.environ.setdefault("JWT_SECRET", "test-secret")
 os.environ.setdefault("OUTSYSTEMS_API_KEY", "test-key")
 os.environ.setdefault("CREDIT_SERVICE_URL", "http://credit-mock")
 os.environ.setdefault("RABBITMQ_HOST", "localhost")
+# No per-process profile copies, so mocked user lookups happen on every call
+os.environ.setdefault("USER_PROFILE_LOCAL_MAX_ENTRIES", "0")
 
 # Orchestrator root — transfer-orchestrator/
 _orch_root = pathlib.Path(__file__).resolve().parents[1]
@@ -29,4 +31,10 @@ def app():
 
 @pytest.fixture()
 def client(app):
-    return app.test_client()
\ No newline at end of file
+    return app.test_client()
+
+@pytest.fixture(autouse=True)
+def inline_deferred_side_effects():
+    """Run post-response work synchronously so call order stays deterministic."""
+    with patch("routes._run_after_response", side_effect=lambda fn, *args: fn(*args)):
+        yield
@@ -1,7 +1,7 @@
 """Tests for transfer-orchestrator."""
 import os
 from datetime import datetime, timedelta, timezone
-from unittest.mock import patch
+from unittest.mock import MagicMock, patch
 
 import jwt
 
@@ -65,6 +65,37 @@ MOCK_SEATS = {
 }
 
 
+def _enrichment_router(transfer_service_responses, overrides=None):
+    """
+    call_service stand-in for enrichment, which fetches concurrently and so in
+    no fixed order. Transfer-service calls are answered in sequence; every other
+    lookup is answered by URL.
+    """
+    queue = list(transfer_service_responses)
+    routes = {
+        "/listings/": MOCK_LISTING,
+        "/tickets/": MOCK_TICKET,
+        "/events/": MOCK_EVENT,
+        "/venues/": MOCK_VENUE,
+        "/users/": {},
+        "/inventory/event/": MOCK_INVENTORY,
+        "/seats/venue/": MOCK_SEATS,
+        **(overrides or {}),
+    }
+
+    def route(method, url, **kwargs):
+        if "transfer-service" in url:
+            if method == "PATCH":
+                return {}, None
+            return queue.pop(0), None
+        for fragment, response in routes.items():
+            if fragment in url:
+                return (response, None) if response is not None else (None, "SERVICE_UNAVAILABLE")
+        raise AssertionError(f"Unexpected call {method} {url}")
+
+    return route
+
+
 def assert_enriched_transfer(payload):
     assert payload["sellerName"] == "Seller"
     assert payload["ticketId"] == "tkt_001"
@@ -89,11 +120,12 @@ def test_health(client):
 @patch("routes._publish_seller_notification")
 @patch("routes._enrich_transfer")
 @patch("routes.call_service")
-@patch("routes.call_credit_service")
+@patch("routes._get_balance")
 def test_initiate_success(mock_credit, mock_svc, mock_enrich, mock_notify, mock_timeout, mock_broadcast, client):
     mock_credit.return_value = ({"creditBalance": 200.0}, None)
     mock_svc.side_effect = [
         (MOCK_LISTING, None),
+        ({**MOCK_LISTING, "status": "pending_transfer"}, None),   # POST claim
         ({"transferId": "txr_001", "status": "pending_seller_acceptance"}, None),
         (MOCK_BUYER_USER, None),
         ({"sid": "VE_buyer"}, None),
@@ -113,6 +145,21 @@ def test_initiate_success(mock_credit, mock_svc, mock_enrich, mock_notify, mock_
     mock_timeout.assert_called_once_with("txr_001", "lst_001", BUYER, SELLER)
     mock_broadcast.assert_called_once()
     assert mock_broadcast.call_args.args[0] == "transfer_initiated"
+    assert mock_svc.call_args_list[1][0][:2] == ("POST", "http://marketplace-service:5000/listings/lst_001/claim")
+
+
+@patch("routes.call_service")
+@patch("routes.call_credit_service")
+def test_initiate_losing_claim_stops_before_credit_check(mock_credit, mock_svc, client):
+    mock_svc.side_effect = [
+        (MOCK_LISTING, None),
+        (None, "LISTING_UNAVAILABLE"),   # another buyer claimed it first
+    ]
+    res = client.post("/transfer/initiate", json={"listingId": "lst_001"}, headers=_auth(BUYER))
+    assert res.status_code == 400
+    assert res.get_json()["error"]["code"] == "LISTING_NOT_FOUND"
+    mock_credit.assert_not_called()
+    assert mock_svc.call_count == 2
 
 
 @patch("routes.call_service")
@@ -133,6 +180,8 @@ def test_initiate_insufficient_credits(mock_credit, mock_svc, client):
     res = client.post("/transfer/initiate", json={"listingId": "lst_001"}, headers=_auth(BUYER))
     assert res.status_code == 402
     assert res.get_json()["error"]["code"] == "INSUFFICIENT_CREDITS"
+    # The claim is released so other buyers can still purchase
+    assert mock_svc.call_args_list[-1][0][1].endswith("/listings/lst_001/release")
 
 
 @patch("routes.call_service")
@@ -293,7 +342,7 @@ def test_seller_accept_wrong_status(mock_svc, client):
     "event": {"id": "evt_001", "name": "Symphony Night"},
 })
 @patch("routes._broadcast_notification")
-@patch("routes.call_credit_service")
+@patch("routes._get_balance")
 @patch("routes.call_service")
 def test_seller_verify_success(mock_svc, mock_credit, mock_broadcast, _mock_payload, client):
     transfer = {
@@ -309,8 +358,8 @@ def test_seller_verify_success(mock_svc, mock_credit, mock_broadcast, _mock_payl
         ({"verified": True}, None),         # POST otp/verify
         (None, None),                       # PATCH sellerOtpVerified
         (MOCK_LISTING, None),               # GET listing
-        (None, None),                       # POST buyer txn
-        (None, None),                       # POST seller txn
+        ({"balanceAfter": 120.0}, None),    # POST buyer debit
+        ({"balanceAfter": 130.0}, None),    # POST seller credit
         (None, None),                       # PATCH ticket
         (None, None),                       # PATCH listing
         (None, None),                       # PATCH transfer completed
@@ -337,12 +386,13 @@ def test_seller_verify_success(mock_svc, mock_credit, mock_broadcast, _mock_payl
     mock_credit.side_effect = [
         ({"creditBalance": 200.0}, None),   # GET buyer balance
         ({"creditBalance": 50.0}, None),    # GET seller balance
-        ({}, None),                         # PATCH buyer deduct
-        ({}, None),                         # PATCH seller credit
     ]
     res = client.post("/transfer/txr_001/seller-verify",
                       json={"otp": "654321"}, headers=_auth(SELLER))
     assert res.status_code == 200
+    debit, credit = mock_svc.call_args_list[5], mock_svc.call_args_list[6]
+    assert (debit[1]["json"]["delta"], debit[1]["json"]["reason"]) == (-80.0, "p2p_sent")
+    assert (credit[1]["json"]["delta"], credit[1]["json"]["reason"]) == (80.0, "p2p_received")
     assert res.get_json()["data"]["status"] == "completed"
     assert res.get_json()["data"]["sellerOtpVerified"] is True
     assert res.get_json()["data"]["ticket"]["newOwnerId"] == BUYER
@@ -365,7 +415,7 @@ def test_seller_verify_wrong_otp(mock_svc, client):
     assert res.status_code == 400
 
 
-@patch("routes.call_credit_service")
+@patch("routes._get_balance")
 @patch("routes.call_service")
 def test_seller_verify_insufficient_credits_at_execution(mock_svc, mock_credit, client):
     """Buyer drained credits between buyer OTP and seller completion."""
@@ -383,6 +433,7 @@ def test_seller_verify_insufficient_credits_at_execution(mock_svc, mock_credit,
         (None, None),               # PATCH sellerOtpVerified
         (MOCK_LISTING, None),       # GET listing
         (None, None),               # PATCH transfer → failed  ← this was missing
+        (MOCK_LISTING, None),       # POST listing release
     ]
     mock_credit.return_value = ({"creditBalance": 5.0}, None)   # insufficient now
     res = client.post("/transfer/txr_001/seller-verify",
@@ -391,10 +442,10 @@ def test_seller_verify_insufficient_credits_at_execution(mock_svc, mock_credit,
     assert res.get_json()["error"]["code"] == "INSUFFICIENT_CREDITS"
 
 
-@patch("routes.call_credit_service")
+@patch("routes._get_balance")
 @patch("routes.call_service")
 def test_seller_verify_saga_compensation_on_failure(mock_svc, mock_credit, client):
-    """If saga fails after credits deducted, OutSystems balances must be restored."""
+    """If saga fails after credits moved, reversing ledger entries restore both balances."""
     transfer = {
         **MOCK_TRANSFER,
         "status": "pending_seller_otp",
@@ -408,39 +459,129 @@ def test_seller_verify_saga_compensation_on_failure(mock_svc, mock_credit, clien
         ({"verified": True}, None),
         (None, None),           # PATCH sellerOtpVerified
         (MOCK_LISTING, None),   # GET listing
-        Exception("ticket service down"),   # step 5 fails
+        ({}, None),             # POST buyer debit   (step 1)
+        ({}, None),             # POST seller credit (step 2)
+        Exception("ticket service down"),   # step 3 fails
+        ({}, None),             # COMP: reverse seller credit
+        ({}, None),             # COMP: reverse buyer debit
+        (None, None),           # PATCH transfer → failed
+        (MOCK_LISTING, None),   # POST listing release
     ]
     mock_credit.side_effect = [
         ({"creditBalance": 200.0}, None),   # GET buyer
         ({"creditBalance": 50.0}, None),    # GET seller
-        ({}, None),                         # PATCH buyer deduct   (step 1)
-        ({}, None),                         # PATCH seller credit  (step 2)
-        ({}, None),                         # COMP: restore seller
-        ({}, None),                         # COMP: restore buyer
     ]
     res = client.post("/transfer/txr_001/seller-verify",
                       json={"otp": "654321"}, headers=_auth(SELLER))
     assert res.status_code == 500
     assert res.get_json()["error"]["code"] == "INTERNAL_ERROR"
-    # 4 credit calls: 2 deduct/credit + 2 compensations
-    assert mock_credit.call_count == 6
+    reversals = [c[1]["json"] for c in mock_svc.call_args_list[8:10]]
+    assert [(r["delta"], r["reason"]) for r in reversals] == [
+        (-80.0, "p2p_received_reversal"),
+        (80.0, "p2p_sent_reversal"),
+    ]
+    assert mock_svc.call_args_list[-1][0][1].endswith("/listings/lst_001/release")
 
 
-# ── GET /transfer/<id> ────────────────────────────────────────────────────────
+@patch("routes._get_balance")
+@patch("routes.call_service")
+def test_seller_verify_releases_listing_when_debit_fails(mock_svc, mock_credit, client):
+    """A saga that fails at buyer_deducted must not leave the listing claimed."""
+    transfer = {
+        **MOCK_TRANSFER,
+        "status": "pending_seller_otp",
+        "buyerOtpVerified": True,
+        "sellerOtpVerified": False,
+        "sellerVerificationSid": "VE_seller",
+    }
+    mock_svc.side_effect = [
+        (transfer, None),
+        (MOCK_SELLER_USER, None),
+        ({"verified": True}, None),
+        (None, None),                       # PATCH sellerOtpVerified
+        (MOCK_LISTING, None),               # GET listing
+        (None, "SERVICE_UNAVAILABLE"),      # POST buyer debit fails (RuntimeError)
+        (None, None),                       # PATCH transfer → failed
+        (MOCK_LISTING, None),               # POST listing release
+    ]
+    mock_credit.side_effect = [
+        ({"creditBalance": 200.0}, None),
+        ({"creditBalance": 50.0}, None),
+    ]
+    res = client.post("/transfer/txr_001/seller-verify",
+                      json={"otp": "654321"}, headers=_auth(SELLER))
+
+    assert res.status_code == 500
+    assert mock_svc.call_args_list[-2][1]["json"] == {"status": "failed"}
+    assert mock_svc.call_args_list[-1][0] == ("POST", "http://marketplace-service:5000/listings/lst_001/release")
+
 
+@patch("routes._get_balance")
 @patch("routes.call_service")
-def test_get_transfer_buyer(mock_svc, client):
+def test_seller_verify_fails_transfer_when_seller_balance_unavailable(mock_svc, mock_credit, client):
+    transfer = {
+        **MOCK_TRANSFER,
+        "status": "pending_seller_otp",
+        "buyerOtpVerified": True,
+        "sellerOtpVerified": False,
+        "sellerVerificationSid": "VE_seller",
+    }
     mock_svc.side_effect = [
-        (MOCK_TRANSFER, None),
-        (MOCK_LISTING, None),
-        (MOCK_TICKET, None),
-        (MOCK_EVENT, None),
-        (MOCK_VENUE, None),
-        ({}, None),
-        ({}, None),
-        (MOCK_INVENTORY, None),
-        (MOCK_SEATS, None),
+        (transfer, None),
+        (MOCK_SELLER_USER, None),
+        ({"verified": True}, None),
+        (None, None),                       # PATCH sellerOtpVerified
+        (MOCK_LISTING, None),               # GET listing
+        (None, None),                       # PATCH transfer → failed
+        (MOCK_LISTING, None),               # POST listing release
+    ]
+    mock_credit.side_effect = [
+        ({"creditBalance": 200.0}, None),
+        (None, "SERVICE_UNAVAILABLE"),
+    ]
+    res = client.post("/transfer/txr_001/seller-verify",
+                      json={"otp": "654321"}, headers=_auth(SELLER))
+
+    assert res.status_code == 503
+    assert mock_svc.call_args_list[-2][1]["json"] == {"status": "failed"}
+    assert mock_svc.call_args_list[-1][0][1].endswith("/listings/lst_001/release")
+
+
+@patch("routes._release_listing")
+@patch("routes._get_balance")
+@patch("routes.call_service")
+def test_seller_verify_debit_refused_by_ledger(mock_svc, mock_credit, mock_release, client):
+    """A concurrent spend after the balance read is caught by the conditional debit."""
+    transfer = {
+        **MOCK_TRANSFER,
+        "status": "pending_seller_otp",
+        "buyerOtpVerified": True,
+        "sellerOtpVerified": False,
+        "sellerVerificationSid": "VE_seller",
+    }
+    mock_svc.side_effect = [
+        (transfer, None),
+        (MOCK_SELLER_USER, None),
+        ({"verified": True}, None),
+        (None, None),                       # PATCH sellerOtpVerified
+        (MOCK_LISTING, None),               # GET listing
+        (None, "INSUFFICIENT_CREDITS"),     # POST buyer debit refused
+        (None, None),                       # PATCH transfer → failed
     ]
+    mock_credit.return_value = ({"creditBalance": 200.0}, None)
+    res = client.post("/transfer/txr_001/seller-verify",
+                      json={"otp": "654321"}, headers=_auth(SELLER))
+    assert res.status_code == 402
+    assert res.get_json()["error"]["code"] == "INSUFFICIENT_CREDITS"
+    assert mock_svc.call_args[1]["json"] == {"status": "failed"}
+    mock_release.assert_called_once_with("lst_001")
+
+
+# ── GET /transfer/<id> ────────────────────────────────────────────────────────
+
+@patch("routes.call_service")
+def test_get_transfer_buyer(mock_svc, client):
+    mock_svc.side_effect = _enrichment_router([MOCK_TRANSFER])
     res = client.get("/transfer/txr_001", headers=_auth(BUYER))
     assert res.status_code == 200
     assert_enriched_transfer(res.get_json()["data"])
@@ -448,17 +589,7 @@ def test_get_transfer_buyer(mock_svc, client):
 
 @patch("routes.call_service")
 def test_get_transfer_seller(mock_svc, client):
-    mock_svc.side_effect = [
-        (MOCK_TRANSFER, None),
-        (MOCK_LISTING, None),
-        (MOCK_TICKET, None),
-        (MOCK_EVENT, None),
-        (MOCK_VENUE, None),
-        ({}, None),
-        ({}, None),
-        (MOCK_INVENTORY, None),
-        (MOCK_SEATS, None),
-    ]
+    mock_svc.side_effect = _enrichment_router([MOCK_TRANSFER])
     res = client.get("/transfer/txr_001", headers=_auth(SELLER))
     assert res.status_code == 200
     assert_enriched_transfer(res.get_json()["data"])
@@ -478,10 +609,9 @@ def test_get_transfer_third_party_denied(mock_svc, client):
 def test_cancel_success(mock_svc, mock_broadcast, client):
     mock_svc.side_effect = [
         (MOCK_TRANSFER, None),
-        (None, None),
-        (MOCK_LISTING, None),
-        (None, None),
-        (None, None),
+        (None, None),           # PATCH transfer → cancelled
+        (MOCK_LISTING, None),   # POST listing release
+        (None, None),           # PATCH ticket → listed
     ]
     res = client.post("/transfer/txr_001/cancel", headers=_auth(BUYER))
     assert res.status_code == 200
@@ -500,39 +630,25 @@ def test_cancel_completed_transfer(mock_svc, client):
 @patch("routes.call_service")
 def test_get_pending_transfers_enriched(mock_svc, client):
     pending = [{**MOCK_TRANSFER, "status": "pending_seller_otp", "buyerOtpVerified": True, "sellerVerificationSid": "VE_seller"}]
-    mock_svc.side_effect = [
-        ({"transfers": pending}, None),
-        ({"transfers": []}, None),
-        (MOCK_LISTING, None),
-        (MOCK_TICKET, None),
-        (MOCK_EVENT, None),
-        (MOCK_VENUE, None),
-        ({}, None),
-        ({}, None),
-        (MOCK_INVENTORY, None),
-        (MOCK_SEATS, None),
-    ]
+    mock_svc.side_effect = _enrichment_router([{"transfers": pending}])
     res = client.get("/transfer/pending", headers=_auth(SELLER))
     assert res.status_code == 200
     transfers = res.get_json()["data"]["transfers"]
     assert len(transfers) == 1
     assert_enriched_transfer(transfers[0])
+    lists = [c for c in mock_svc.call_args_list if c[0][1].endswith("/transfers")]
+    assert len(lists) == 1
+    assert lists[0][1]["params"] == {
+        "userId": SELLER,
+        "role": "seller",
+        "status": "pending_seller_otp,pending_seller_acceptance",
+    }
 
 
 @patch("routes.call_service")
 def test_get_my_pending_transfers_enriched(mock_svc, client):
     pending = [{**MOCK_TRANSFER, "status": "pending_buyer_otp"}]
-    mock_svc.side_effect = [
-        ({"transfers": pending}, None),
-        (MOCK_LISTING, None),
-        (MOCK_TICKET, None),
-        (MOCK_EVENT, None),
-        (MOCK_VENUE, None),
-        ({}, None),
-        ({}, None),
-        (MOCK_INVENTORY, None),
-        (MOCK_SEATS, None),
-    ]
+    mock_svc.side_effect = _enrichment_router([{"transfers": pending}])
     res = client.get("/transfer/my-pending", headers=_auth(BUYER))
     assert res.status_code == 200
     transfers = res.get_json()["data"]["transfers"]
@@ -543,17 +659,7 @@ def test_get_my_pending_transfers_enriched(mock_svc, client):
 @patch("routes.call_service")
 def test_get_transfer_history_enriched(mock_svc, client):
     completed = [{**MOCK_TRANSFER, "status": "completed", "completedAt": "2026-03-20T12:30:00Z"}]
-    mock_svc.side_effect = [
-        ({"transfers": completed}, None),
-        (MOCK_LISTING, None),
-        (MOCK_TICKET, None),
-        (MOCK_EVENT, None),
-        (MOCK_VENUE, None),
-        ({}, None),
-        ({}, None),
-        (MOCK_INVENTORY, None),
-        (MOCK_SEATS, None),
-    ]
+    mock_svc.side_effect = _enrichment_router([{"transfers": completed}])
     res = client.get("/transfer/history", headers=_auth(SELLER))
     assert res.status_code == 200
     transfers = res.get_json()["data"]["transfers"]
@@ -561,3 +667,300 @@ def test_get_transfer_history_enriched(mock_svc, client):
     assert transfers[0]["status"] == "completed"
     assert transfers[0]["completedAt"] == "2026-03-20T12:30:00Z"
     assert_enriched_transfer(transfers[0])
+
+
+@patch("routes.call_service")
+def test_history_deduplicates_shared_lookups(mock_svc, client):
+    completed = [
+        {**MOCK_TRANSFER, "transferId": f"txr_00{i}", "status": "completed"}
+        for i in range(5)
+    ]
+    mock_svc.side_effect = _enrichment_router([{"transfers": completed}])
+
+    res = client.get("/transfer/history", headers=_auth(SELLER))
+
+    assert res.status_code == 200
+    transfers = res.get_json()["data"]["transfers"]
+    assert len(transfers) == 5
+    for transfer in transfers:
+        assert_enriched_transfer(transfer)
+    urls = [c[0][1] for c in mock_svc.call_args_list]
+    # Every transfer shares the listing, event, venue, seat map and users
+    assert len(urls) == len(set(urls))
+
+
+@patch("routes.call_service")
+def test_enrichment_tolerates_failed_lookup(mock_svc, client):
+    mock_svc.side_effect = _enrichment_router([MOCK_TRANSFER], overrides={"/events/": None})
+
+    res = client.get("/transfer/txr_001", headers=_auth(BUYER))
+
+    assert res.status_code == 200
+    payload = res.get_json()["data"]
+    assert payload["ticketId"] == "tkt_001"
+    assert payload["venueName"] == "Esplanade Concert Hall"   # falls back to the ticket's venueId
+    assert payload["seat"]["seatNumber"] == "12"
+    assert payload["event"]["name"] is None
+
+
+@patch("routes.call_service")
+def test_history_served_from_snapshot_without_fan_out(mock_svc, client):
+    snapshot = {
+        "ticketId": "tkt_001", "eventId": "evt_001", "eventName": "Symphony Night",
+        "eventDate": "2026-06-01T20:00:00+00:00", "eventImage": "https://cdn.example.test/symphony.jpg",
+        "venueId": "ven_001", "venueName": "Esplanade Concert Hall",
+        "seatId": "seat_001", "seatRow": "A", "seatNumber": "12",
+        "listing": MOCK_LISTING, "ticket": MOCK_TICKET, "venue": MOCK_VENUE,
+        "updatedAt": "2026-03-20T12:30:00+00:00",
+    }
+    completed = [{**MOCK_TRANSFER, "status": "completed", "snapshot": snapshot}]
+    mock_svc.return_value = ({"transfers": completed}, None)
+
+    res = client.get("/transfer/history", headers=_auth(SELLER))
+
+    assert res.status_code == 200
+    transfer = res.get_json()["data"]["transfers"][0]
+    assert_enriched_transfer(transfer)
+    assert transfer["listing"] == MOCK_LISTING
+    assert transfer["ticket"] == MOCK_TICKET
+    assert transfer["venue"] == MOCK_VENUE
+    assert "snapshot" not in transfer
+    assert mock_svc.call_count == 1
+
+
+@patch("routes.call_service")
+def test_snapshot_without_records_is_reloaded_and_stored(mock_svc, client):
+    legacy = {
+        "ticketId": "tkt_001", "eventId": "evt_001", "eventName": "Symphony Night",
+        "venueId": "ven_001", "venueName": "Esplanade Concert Hall",
+        "listing": None, "ticket": None, "venue": None,
+        "updatedAt": "2026-03-20T12:30:00+00:00",
+    }
+    mock_svc.side_effect = _enrichment_router([{**MOCK_TRANSFER, "snapshot": legacy}])
+
+    res = client.get("/transfer/txr_001", headers=_auth(BUYER))
+
+    assert res.status_code == 200
+    payload = res.get_json()["data"]
+    assert payload["listing"] == MOCK_LISTING
+    assert payload["venue"]["address"] == "1 Esplanade Drive"
+    stored = next(c for c in mock_svc.call_args_list if c[0][0] == "PATCH")[1]["json"]["snapshot"]
+    assert (stored["listing"], stored["ticket"], stored["venue"]) == (MOCK_LISTING, MOCK_TICKET, MOCK_VENUE)
+
+
+@patch("routes.call_service")
+def test_enrichment_stores_snapshot(mock_svc, client):
+    mock_svc.side_effect = _enrichment_router([MOCK_TRANSFER])
+
+    res = client.get("/transfer/txr_001", headers=_auth(BUYER))
+
+    assert res.status_code == 200
+    patches = [c for c in mock_svc.call_args_list if c[0][0] == "PATCH"]
+    assert len(patches) == 1
+    assert patches[0][0][1].endswith("/transfers/txr_001")
+    snapshot = patches[0][1]["json"]["snapshot"]
+    assert snapshot["eventName"] == "Symphony Night"
+    assert snapshot["venueName"] == "Esplanade Concert Hall"
+    assert snapshot["seatRow"] == "A"
+    assert snapshot["seatNumber"] == "12"
+    assert "sellerName" not in snapshot   # no placeholder names are persisted
+
+
+@patch("routes.call_service")
+def test_fresh_and_stored_snapshots_have_the_same_shape(mock_svc, client):
+    gated_seats = {"seats": [{**MOCK_SEATS["seats"][0], "gate": "G3"}]}
+    mock_svc.side_effect = _enrichment_router([MOCK_TRANSFER], overrides={"/seats/venue/": gated_seats})
+
+    fresh = client.get("/transfer/txr_001", headers=_auth(BUYER)).get_json()["data"]
+    stored = next(c for c in mock_svc.call_args_list if c[0][0] == "PATCH")[1]["json"]["snapshot"]
+
+    mock_svc.side_effect = None
+    mock_svc.return_value = ({**MOCK_TRANSFER, "snapshot": stored}, None)
+    cached = client.get("/transfer/txr_001", headers=_auth(BUYER)).get_json()["data"]
+
+    assert fresh["seat"]["gate"] == fresh["seatGate"] == "G3"
+    assert fresh["listing"] == MOCK_LISTING
+    assert fresh["ticket"] == MOCK_TICKET
+    assert fresh["venue"] == fresh["event"]["venue"] == MOCK_VENUE
+    assert cached == fresh
+
+
+@patch("routes.call_service")
+def test_incomplete_snapshot_not_stored(mock_svc, client):
+    mock_svc.side_effect = _enrichment_router([MOCK_TRANSFER], overrides={"/events/": None})
+
+    res = client.get("/transfer/txr_001", headers=_auth(BUYER))
+
+    assert res.status_code == 200
+    assert not [c for c in mock_svc.call_args_list if c[0][0] == "PATCH"]
+
+
+def test_context_loader_shares_one_deadline():
+    import time
+
+    from context_loader import ContextLoader
+
+    def slow_get(url, timeout):
+        time.sleep(0.5 if "slow" in url else 0)
+        return {"url": url}
+
+    loader = ContextLoader(slow_get, deadline_seconds=0.2)
+    fast = loader.fetch("http://svc/fast")
+    chained = loader.after([fast], lambda data: loader.fetch(data["url"] + "/child"))
+    slow = loader.fetch("http://svc/slow")
+
+    assert loader.fetch("http://svc/fast") is fast
+    assert loader.collect([fast, chained, slow]) == [
+        {"url": "http://svc/fast"},
+        {"url": "http://svc/fast/child"},
+        None,
+    ]
+
+
+def _journaled_transfer(*steps, status="running"):
+    return {
+        "sagaId": "txr_001",
+        "status": status,
+        "inputs": {
+            "transferId": "txr_001", "buyerId": BUYER, "sellerId": SELLER,
+            "creditAmount": 80.0, "ticketId": "tkt_001", "listingId": "lst_001",
+        },
+        "steps": {step: {"result": None} for step in steps},
+        "compensations": {},
+        "attempts": 1,
+    }
+
+
+@patch("routes.transfer_saga_journal")
+@patch("routes.call_service")
+def test_recovery_resumes_transfer_after_ticket_moved(mock_svc, mock_journal):
+    from saga_recovery import recover_transfer_saga
+
+    mock_svc.return_value = ({}, None)
+    recover_transfer_saga(_journaled_transfer(
+        "buyer_deducted", "seller_credited", "ticket_transferred",
+    ))
+
+    urls = [c[0][1] for c in mock_svc.call_args_list]
+    assert urls == [
+        "http://marketplace-service:5000/listings/lst_001",
+        "http://transfer-service:5000/transfers/txr_001",
+    ]
+    assert mock_svc.call_args[1]["json"]["status"] == "completed"
+    mock_journal.finish.assert_called_once_with("txr_001", "completed")
+
+
+@patch("routes.transfer_saga_journal")
+@patch("routes.call_service")
+@patch("saga_recovery.call_service")
+def test_recovery_retries_failed_transfer_compensation(mock_svc, mock_ledger, mock_journal):
+    from saga_recovery import recover_transfer_saga
+
+    mock_svc.return_value = ({}, None)
+    mock_ledger.return_value = ({}, None)
+    recover_transfer_saga(_journaled_transfer("buyer_deducted", "seller_credited", status="compensation_failed"))
+
+    assert [(c[1]["json"]["userId"], c[1]["json"]["delta"]) for c in mock_ledger.call_args_list[:2]] == [
+        (SELLER, -80.0),    # reverse seller credit
+        (BUYER, 80.0),      # reverse buyer debit
+    ]
+    assert mock_ledger.call_args_list[2][0][1].endswith("/listings/lst_001/release")
+    mock_svc.assert_called_once_with(
+        "PATCH", "http://transfer-service:5000/transfers/txr_001", json={"status": "failed"},
+    )
+    mock_journal.finish.assert_called_once_with("txr_001", "compensated", [])
+
+
+@patch("routes.transfer_saga_journal")
+@patch("routes.call_service")
+@patch("saga_recovery.call_service")
+def test_recovery_settles_debit_made_before_crash(mock_svc, mock_ledger, mock_journal):
+    """The worker died after the buyer debit went through but before step_done."""
+    from saga_recovery import recover_transfer_saga
+
+    mock_svc.return_value = ({}, None)
+    mock_ledger.side_effect = [
+        ({"txnId": "txn_1", "userId": BUYER, "delta": -80.0, "created": False}, None),  # already recorded
+        ({"txnId": "txn_2", "userId": BUYER, "delta": 80.0, "created": True}, None),
+        (MOCK_LISTING, None),   # POST listing release
+    ]
+    recover_transfer_saga(_journaled_transfer())
+
+    assert [(c[1]["json"]["reason"], c[1]["json"]["delta"]) for c in mock_ledger.call_args_list[:2]] == [
+        ("p2p_sent", -80.0),            # replayed to learn the debit went through
+        ("p2p_sent_reversal", 80.0),    # so it is refunded, not left behind
+    ]
+    mock_journal.step_done.assert_called_once_with("txr_001", "buyer_deducted", None)
+    mock_journal.finish.assert_called_once_with("txr_001", "compensated", [])
+
+
+def test_recovery_abandons_saga_after_max_attempts():
+    from shared.saga_journal import recover_stalled_sagas
+
+    journal = MagicMock(saga_type="transfer")
+    journal.stalled.return_value = ["txr_001"]
+    journal.claim.return_value = True
+    journal.load.return_value = {**_journaled_transfer("buyer_deducted"), "attempts": 6}
+    recover = MagicMock()
+    on_abandon = MagicMock()
+
+    assert recover_stalled_sagas(journal, recover, max_attempts=5, on_abandon=on_abandon) == 1
+
+    recover.assert_not_called()
+    journal.finish.assert_called_once_with("txr_001", "abandoned")
+    on_abandon.assert_called_once()
+
+
+# ── User profile cache ────────────────────────────────────────────────────────
+
+class _FakeRedis:
+    def __init__(self):
+        self.values = {}
+
+    def get(self, key):
+        return self.values.get(key)
+
+    def setex(self, key, _ttl, value):
+        self.values[key] = value
+
+    def delete(self, key):
+        self.values.pop(key, None)
+
+
+def test_profile_cache_strips_credentials_and_serves_from_redis():
+    from shared.user_profile_cache import UserProfileCache
+
+    fetch = MagicMock(return_value=({**MOCK_BUYER_USER, "password": "h", "salt": "s"}, None))
+    redis = _FakeRedis()
+    writer = UserProfileCache(fetch, redis_url="redis://test", local_max_entries=0)
+    writer._client = redis
+    assert writer.get(BUYER) == (MOCK_BUYER_USER, None)
+
+    # Another process finds it in Redis; an invalidation sends it back upstream
+    reader = UserProfileCache(fetch, redis_url="redis://test", local_max_entries=0)
+    reader._client = redis
+    assert reader.get(BUYER) == (MOCK_BUYER_USER, None)
+    assert "password" not in redis.values[f"user_profile:{BUYER}"]
+    fetch.assert_called_once()
+
+    reader.invalidate(BUYER)
+    reader.get(BUYER)
+    assert fetch.call_count == 2
+
+
+def test_profile_cache_serves_stale_copy_while_user_service_is_down():
+    from shared.user_profile_cache import UserProfileCache
+
+    fetch = MagicMock(return_value=(MOCK_SELLER_USER, None))
+    cache = UserProfileCache(fetch, redis_url="", ttl_seconds=0, local_max_entries=10)
+    with patch("shared.user_profile_cache.LOCAL_TTL_SECONDS", 0):
+        assert cache.get(SELLER) == (MOCK_SELLER_USER, None)
+
+        fetch.return_value = (None, "SERVICE_UNAVAILABLE")
+        assert cache.get(SELLER) == (MOCK_SELLER_USER, None)
+        assert cache.stats()["stale"] == 1
+
+        fetch.return_value = (None, "USER_NOT_FOUND")
+        assert cache.get(SELLER) == (None, "USER_NOT_FOUND")
+        fetch.return_value = (None, "SERVICE_UNAVAILABLE")
+        assert cache.get(SELLER) == (None, "SERVICE_UNAVAILABLE")
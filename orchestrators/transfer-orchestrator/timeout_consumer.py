@@ -46,10 +46,8 @@ def _cancel_transfer(transfer_id, listing_id):
             "cancelReason": "timeout",
         })
 
-        # Return listing to active status
-        call_service("PATCH", f"{MARKETPLACE_SERVICE}/listings/{listing_id}", json={
-            "status": "active",
-        })
+        # Release the listing claim; no-op if the listing is no longer pending_transfer
+        call_service("POST", f"{MARKETPLACE_SERVICE}/listings/{listing_id}/release")
         
         logger.info("Auto-cancelled transfer %s and reactivated listing %s", transfer_id, listing_id)
         return True
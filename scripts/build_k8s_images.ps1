@@ -16,14 +16,14 @@ $imageDefinitions = @(
     @{ Name = "ticketremaster/seat-inventory-service"; Context = "."; Dockerfile = "services/seat-inventory-service/Dockerfile" },
     @{ Name = "ticketremaster/ticket-service"; Context = "."; Dockerfile = "services/ticket-service/Dockerfile" },
     @{ Name = "ticketremaster/ticket-log-service"; Context = "services/ticket-log-service" },
-    @{ Name = "ticketremaster/marketplace-service"; Context = "services/marketplace-service" },
-    @{ Name = "ticketremaster/transfer-service"; Context = "services/transfer-service" },
+    @{ Name = "ticketremaster/marketplace-service"; Context = "."; Dockerfile = "services/marketplace-service/Dockerfile" },
+    @{ Name = "ticketremaster/transfer-service"; Context = "."; Dockerfile = "services/transfer-service/Dockerfile" },
     @{ Name = "ticketremaster/credit-transaction-service"; Context = "services/credit-transaction-service" },
-    @{ Name = "ticketremaster/stripe-wrapper"; Context = "services/stripe-wrapper" },
-    @{ Name = "ticketremaster/otp-wrapper"; Context = "services/otp-wrapper" },
+    @{ Name = "ticketremaster/stripe-wrapper"; Context = "."; Dockerfile = "services/stripe-wrapper/Dockerfile" },
+    @{ Name = "ticketremaster/otp-wrapper"; Context = "."; Dockerfile = "services/otp-wrapper/Dockerfile" },
     @{ Name = "ticketremaster/auth-orchestrator"; Context = "."; Dockerfile = "orchestrators/auth-orchestrator/Dockerfile" },
     @{ Name = "ticketremaster/event-orchestrator"; Context = "."; Dockerfile = "orchestrators/event-orchestrator/Dockerfile" },
-    @{ Name = "ticketremaster/credit-orchestrator"; Context = "orchestrators/credit-orchestrator" },
+    @{ Name = "ticketremaster/credit-orchestrator"; Context = "."; Dockerfile = "orchestrators/credit-orchestrator/Dockerfile" },
     @{ Name = "ticketremaster/ticket-purchase-orchestrator"; Context = "."; Dockerfile = "orchestrators/ticket-purchase-orchestrator/Dockerfile" },
     @{ Name = "ticketremaster/qr-orchestrator"; Context = "orchestrators/qr-orchestrator" },
     @{ Name = "ticketremaster/marketplace-orchestrator"; Context = "orchestrators/marketplace-orchestrator" },
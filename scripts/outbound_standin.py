@@ -0,0 +1,226 @@
+#!/usr/bin/env python3
+"""
+Local stand-in for the external APIs (SMU OTP, OutSystems credits, Stripe)
+and a small load driver, for exercising shared/outbound_governor.py.
+
+Serve slow, flaky stand-ins on one port:
+    python scripts/outbound_standin.py serve --port 9900 --latency-ms 800 --jitter-ms 400 --error-rate 0.05
+
+Point the services at it (e.g. in .env, then `docker compose up`):
+    SMU_API_URL=http://host.docker.internal:9900/Notification
+    CREDIT_SERVICE_URL=http://host.docker.internal:9900
+    STRIPE_API_BASE=http://host.docker.internal:9900
+
+Drive load through a service and watch how the governor sheds it:
+    python scripts/outbound_standin.py load --url http://localhost:5012/otp/send \\
+        --json '{"phoneNumber": "+6591234567"}' --concurrency 50 --requests 500
+    curl http://localhost:5012/stats        # saturation as seen by the service
+    curl http://localhost:9900/__stats      # concurrency as seen by the stand-in
+
+The stand-in answers:
+    POST /Notification/SendOTP, POST /Notification/VerifyOTP (code 000000 is wrong)
+    GET|POST|PATCH /credits[/<userId>]
+    POST /v1/payment_intents, GET /v1/payment_intents/<id>
+With --max-concurrent set it returns 429 beyond that many requests in flight,
+like a provider enforcing its own limit.
+"""
+import argparse
+import json
+import random
+import statistics
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+import uuid
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs
+
+
+class StandInState:
+    def __init__(self, latency_ms, jitter_ms, error_rate, max_concurrent):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.max_concurrent = max_concurrent
+        self.lock = threading.Lock()
+        self.in_flight = 0
+        self.stats = Counter()
+        self.intents = {}
+
+    def enter(self):
+        with self.lock:
+            if self.max_concurrent and self.in_flight >= self.max_concurrent:
+                self.stats["throttled"] += 1
+                return False
+            self.in_flight += 1
+            self.stats["inFlightPeak"] = max(self.stats["inFlightPeak"], self.in_flight)
+            return True
+
+    def leave(self):
+        with self.lock:
+            self.in_flight -= 1
+
+    def snapshot(self):
+        with self.lock:
+            return {**self.stats, "inFlight": self.in_flight}
+
+
+def make_handler(state):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, *args):
+            pass
+
+        def _send(self, status, body):
+            raw = json.dumps(body).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(raw)))
+            self.end_headers()
+            self.wfile.write(raw)
+
+        def _body(self):
+            raw = self.rfile.read(int(self.headers.get("Content-Length") or 0))
+            if not raw:
+                return {}
+            if self.headers.get("Content-Type", "").startswith("application/x-www-form-urlencoded"):
+                return {key: values[0] for key, values in parse_qs(raw.decode()).items()}
+            return json.loads(raw)
+
+        def _handle(self):
+            path = self.path.split("?", 1)[0].rstrip("/")
+            if path == "/__stats":
+                return self._send(200, state.snapshot())
+
+            body = self._body()
+            if not state.enter():
+                return self._send(429, {"error": {"code": "RATE_LIMITED", "message": "Stand-in concurrency limit"}})
+            try:
+                time.sleep(max(0.0, state.latency_ms + random.uniform(-state.jitter_ms, state.jitter_ms)) / 1000)
+                with state.lock:
+                    state.stats["requests"] += 1
+                if random.random() < state.error_rate:
+                    with state.lock:
+                        state.stats["injectedErrors"] += 1
+                    return self._send(503, {"error": {"code": "SERVICE_UNAVAILABLE", "message": "Injected failure"}})
+                return self._route(path, body)
+            finally:
+                state.leave()
+
+        def _route(self, path, body):
+            if path.endswith("/SendOTP"):
+                return self._send(200, {"VerificationSid": f"VE{uuid.uuid4().hex}"})
+            if path.endswith("/VerifyOTP"):
+                if body.get("Code") == "000000":
+                    return self._send(400, {"Errors": ["invalid code"]})
+                return self._send(200, {"Success": True})
+            if path.startswith("/credits"):
+                user_id = path[len("/credits/"):] or body.get("userId", "usr_standin")
+                return self._send(200, {"userId": user_id, "creditBalance": body.get("creditBalance", 100)})
+            if path == "/v1/payment_intents" and self.command == "POST":
+                intent_id = f"pi_{uuid.uuid4().hex[:24]}"
+                intent = {
+                    "id": intent_id,
+                    "object": "payment_intent",
+                    "amount": int(body.get("amount", 0)),
+                    "currency": body.get("currency", "sgd"),
+                    "client_secret": f"{intent_id}_secret_standin",
+                    "status": "succeeded",
+                    "metadata": {
+                        key[len("metadata["):-1]: value
+                        for key, value in body.items() if key.startswith("metadata[")
+                    },
+                }
+                with state.lock:
+                    state.intents[intent_id] = intent
+                return self._send(200, intent)
+            if path.startswith("/v1/payment_intents/"):
+                with state.lock:
+                    intent = state.intents.get(path.rsplit("/", 1)[1])
+                if intent is None:
+                    return self._send(404, {"error": {"type": "invalid_request_error", "message": "No such payment_intent"}})
+                return self._send(200, intent)
+            return self._send(404, {"error": {"code": "NOT_FOUND", "message": path}})
+
+        do_GET = do_POST = do_PATCH = do_PUT = _handle
+
+    return Handler
+
+
+def serve(args):
+    state = StandInState(args.latency_ms, args.jitter_ms, args.error_rate, args.max_concurrent)
+    server = ThreadingHTTPServer(("0.0.0.0", args.port), make_handler(state))
+    server.daemon_threads = True
+    print(f"Stand-in listening on :{args.port} (latency {args.latency_ms}±{args.jitter_ms}ms, "
+          f"error rate {args.error_rate:.0%}, max concurrent {args.max_concurrent or 'unlimited'})")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    print(json.dumps(state.snapshot(), indent=2))
+
+
+def load(args):
+    payload = args.json.encode() if args.json else None
+
+    def one(_):
+        request = urllib.request.Request(
+            args.url, data=payload, method=args.method,
+            headers={"Content-Type": "application/json"} if payload else {},
+        )
+        started = time.monotonic()
+        try:
+            with urllib.request.urlopen(request, timeout=args.timeout) as response:
+                status = response.status
+        except urllib.error.HTTPError as exc:
+            status = exc.code
+        except Exception as exc:
+            status = type(exc).__name__
+        return status, time.monotonic() - started
+
+    started = time.monotonic()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+        results = list(pool.map(one, range(args.requests)))
+    elapsed = time.monotonic() - started
+
+    latencies = sorted(seconds for _, seconds in results)
+    quantiles = statistics.quantiles(latencies, n=100) if len(latencies) > 1 else latencies * 99
+    print(f"{len(results)} requests in {elapsed:.1f}s ({len(results) / elapsed:.1f}/s), concurrency {args.concurrency}")
+    for status, count in sorted(Counter(status for status, _ in results).items(), key=str):
+        print(f"  {status}: {count}")
+    print(f"  latency p50 {quantiles[49]:.3f}s  p95 {quantiles[94]:.3f}s  p99 {quantiles[98]:.3f}s  max {latencies[-1]:.3f}s")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    serve_parser = commands.add_parser("serve", help="run the stand-in external APIs")
+    serve_parser.add_argument("--port", type=int, default=9900)
+    serve_parser.add_argument("--latency-ms", type=float, default=200)
+    serve_parser.add_argument("--jitter-ms", type=float, default=50)
+    serve_parser.add_argument("--error-rate", type=float, default=0.0)
+    serve_parser.add_argument("--max-concurrent", type=int, default=0)
+    serve_parser.set_defaults(func=serve)
+
+    load_parser = commands.add_parser("load", help="fire concurrent requests at a URL")
+    load_parser.add_argument("--url", required=True)
+    load_parser.add_argument("--method", default="POST")
+    load_parser.add_argument("--json", default="")
+    load_parser.add_argument("--concurrency", type=int, default=20)
+    load_parser.add_argument("--requests", type=int, default=200)
+    load_parser.add_argument("--timeout", type=float, default=30)
+    load_parser.set_defaults(func=load)
+
+    args = parser.parse_args(argv)
+    args.func(args)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
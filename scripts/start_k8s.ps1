@@ -96,7 +96,7 @@ function Get-ImageDefinitions {
         @{ Name = "ticketremaster/otp-wrapper"; Context = "services/otp-wrapper"; ComponentPath = "services/otp-wrapper" },
         @{ Name = "ticketremaster/auth-orchestrator"; Context = "."; Dockerfile = "orchestrators/auth-orchestrator/Dockerfile"; ComponentPath = "orchestrators/auth-orchestrator" },
         @{ Name = "ticketremaster/event-orchestrator"; Context = "."; Dockerfile = "orchestrators/event-orchestrator/Dockerfile"; ComponentPath = "orchestrators/event-orchestrator" },
-        @{ Name = "ticketremaster/credit-orchestrator"; Context = "orchestrators/credit-orchestrator"; ComponentPath = "orchestrators/credit-orchestrator" },
+        @{ Name = "ticketremaster/credit-orchestrator"; Context = "."; Dockerfile = "orchestrators/credit-orchestrator/Dockerfile"; ComponentPath = "orchestrators/credit-orchestrator" },
         @{ Name = "ticketremaster/ticket-purchase-orchestrator"; Context = "."; Dockerfile = "orchestrators/ticket-purchase-orchestrator/Dockerfile"; ComponentPath = "orchestrators/ticket-purchase-orchestrator" },
         @{ Name = "ticketremaster/qr-orchestrator"; Context = "orchestrators/qr-orchestrator"; ComponentPath = "orchestrators/qr-orchestrator" },
         @{ Name = "ticketremaster/marketplace-orchestrator"; Context = "orchestrators/marketplace-orchestrator"; ComponentPath = "orchestrators/marketplace-orchestrator" },
@@ -125,7 +125,7 @@ def create_app(test_config=None):
     db.init_app(app)
     migrate.init_app(app, db)
 
-    from models import CreditTransaction  # noqa: F401
+    from models import CreditBalance, CreditTransaction  # noqa: F401
     from routes import bp as credit_transactions_bp
 
     app.register_blueprint(credit_transactions_bp)
@@ -136,6 +136,7 @@ def create_app(test_config=None):
         "tags": [
             {"name": "Health"},
             {"name": "Credit Transactions"},
+            {"name": "Credit Balances"},
         ],
     })
 
@@ -0,0 +1,42 @@
+"""add credit_balances and balanceAfter
+
+Revision ID: 6a3d9e1f7b42
+Revises: 4f6c2a3e9d10
+Create Date: 2026-10-19 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '6a3d9e1f7b42'
+down_revision = '4f6c2a3e9d10'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'credit_balances',
+        sa.Column('userId', sa.String(length=36), nullable=False),
+        sa.Column('balance', sa.Float(), nullable=False),
+        sa.Column('version', sa.Integer(), nullable=False),
+        sa.Column('syncedVersion', sa.Integer(), nullable=False),
+        sa.Column('syncLeaseUntil', sa.DateTime(), nullable=True),
+        sa.Column('updatedAt', sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint('userId'),
+    )
+    op.create_index(
+        'ix_credit_balances_unsynced', 'credit_balances', ['updatedAt'], unique=False,
+        postgresql_where=sa.text('"version" > "syncedVersion"'),
+    )
+    with op.batch_alter_table('credit_txns') as batch_op:
+        batch_op.add_column(sa.Column('balanceAfter', sa.Float(), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table('credit_txns') as batch_op:
+        batch_op.drop_column('balanceAfter')
+    op.drop_index('ix_credit_balances_unsynced', table_name='credit_balances')
+    op.drop_table('credit_balances')
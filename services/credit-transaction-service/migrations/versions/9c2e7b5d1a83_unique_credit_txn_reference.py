@@ -0,0 +1,43 @@
+"""unique (referenceId, reason) on credit_txns
+
+Revision ID: 9c2e7b5d1a83
+Revises: 6a3d9e1f7b42
+Create Date: 2026-10-19 00:00:00.000000
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '9c2e7b5d1a83'
+down_revision = '6a3d9e1f7b42'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Rows written twice by the old check-then-insert race would block the
+    # constraint. Keep the earliest entry's referenceId and tag the later
+    # ones so the ledger history is preserved.
+    op.execute(
+        """
+        UPDATE credit_txns SET "referenceId" = LEFT("referenceId", 59) || '#dup-' || "txnId"
+        WHERE "txnId" IN (
+            SELECT "txnId" FROM (
+                SELECT "txnId", ROW_NUMBER() OVER (
+                    PARTITION BY "referenceId", reason ORDER BY "createdAt", "txnId"
+                ) AS rn
+                FROM credit_txns
+                WHERE "referenceId" IS NOT NULL
+            ) ranked
+            WHERE rn > 1
+        )
+        """
+    )
+    with op.batch_alter_table('credit_txns') as batch_op:
+        batch_op.create_unique_constraint('uq_credit_txns_reference_reason', ['referenceId', 'reason'])
+
+
+def downgrade():
+    with op.batch_alter_table('credit_txns') as batch_op:
+        batch_op.drop_constraint('uq_credit_txns_reference_reason', type_='unique')
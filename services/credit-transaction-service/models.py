@@ -5,13 +5,22 @@ from app import db
 
 
 class CreditTransaction(db.Model):
+    """
+    One ledger entry. (referenceId, reason) is unique so a retried or
+    redelivered write for the same payment, ticket or transfer lands once;
+    entries without a referenceId are never deduplicated.
+    """
     __tablename__ = 'credit_txns'
+    __table_args__ = (
+        db.UniqueConstraint('referenceId', 'reason', name='uq_credit_txns_reference_reason'),
+    )
 
     txnId = db.Column(db.String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
     userId = db.Column(db.String(36), nullable=False, index=True)
     delta = db.Column(db.Float, nullable=False)
     reason = db.Column(db.String(50), nullable=False)
     referenceId = db.Column(db.String(100), nullable=True, index=True)
+    balanceAfter = db.Column(db.Float, nullable=True)
     createdAt = db.Column(db.DateTime, nullable=False, default=lambda: datetime.now(UTC))
 
     def to_dict(self):
@@ -21,5 +30,38 @@ class CreditTransaction(db.Model):
             'delta': self.delta,
             'reason': self.reason,
             'referenceId': self.referenceId,
+            'balanceAfter': self.balanceAfter,
             'createdAt': self.createdAt.isoformat(),
         }
+
+
+class CreditBalance(db.Model):
+    """
+    Running balance per user, moved in the same transaction as each ledger
+    insert. `version` counts balance changes; `syncedVersion` is the last one
+    pushed to OutSystems, so rows with version > syncedVersion are unsynced.
+    `syncLeaseUntil` keeps two reconcilers from pushing the same row at once.
+    """
+    __tablename__ = 'credit_balances'
+    __table_args__ = (
+        db.Index(
+            'ix_credit_balances_unsynced', 'updatedAt',
+            postgresql_where=db.text('"version" > "syncedVersion"'),
+            sqlite_where=db.text('"version" > "syncedVersion"'),
+        ),
+    )
+
+    userId = db.Column(db.String(36), primary_key=True)
+    balance = db.Column(db.Float, nullable=False, default=0.0)
+    version = db.Column(db.Integer, nullable=False, default=0)
+    syncedVersion = db.Column(db.Integer, nullable=False, default=0)
+    syncLeaseUntil = db.Column(db.DateTime, nullable=True)
+    updatedAt = db.Column(db.DateTime, nullable=False, default=lambda: datetime.now(UTC))
+
+    def to_dict(self):
+        return {
+            'userId': self.userId,
+            'creditBalance': self.balance,
+            'version': self.version,
+            'updatedAt': self.updatedAt.isoformat(),
+        }
@@ -1,7 +1,14 @@
+import uuid
+from datetime import UTC, datetime, timedelta
+
 from flask import Blueprint, jsonify, request
+from sqlalchemy import update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.exc import IntegrityError
 
 from app import db
-from models import CreditTransaction
+from models import CreditBalance, CreditTransaction
 
 bp = Blueprint('credit_transactions', __name__)
 
@@ -13,6 +20,51 @@ def error_response(status_code, code, message):
     return jsonify({'error': {'code': code, 'message': message}}), status_code
 
 
+def _parse_amount(value):
+    if isinstance(value, bool):
+        return None
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def move_balance(user_id, delta):
+    """
+    Apply delta to the user's running balance in the current transaction and
+    return the new balance. The debit is conditional on the balance covering
+    it, so concurrent debits can never overdraw. Returns None when nothing
+    matched; the caller tells a missing balance from insufficient funds.
+    """
+    return db.session.execute(
+        update(CreditBalance)
+        .where(CreditBalance.userId == user_id, CreditBalance.balance + delta >= 0)
+        .values(
+            balance=CreditBalance.balance + delta,
+            version=CreditBalance.version + 1,
+            updatedAt=datetime.now(UTC),
+        )
+        .returning(CreditBalance.balance)
+        .execution_options(synchronize_session=False)
+    ).scalar_one_or_none()
+
+
+def insert_transaction(values):
+    """
+    Insert a ledger row unless one with the same (referenceId, reason) exists,
+    in one statement (INSERT ... ON CONFLICT DO NOTHING RETURNING). Returns the
+    new txnId, or None when the entry was already recorded; a concurrent
+    writer for the same reference waits on the unique index and gets None.
+    """
+    insert = sqlite_insert if db.engine.dialect.name == 'sqlite' else pg_insert
+    return db.session.execute(
+        insert(CreditTransaction)
+        .values(**values)
+        .on_conflict_do_nothing(index_elements=['referenceId', 'reason'])
+        .returning(CreditTransaction.txnId)
+    ).scalar_one_or_none()
+
+
 @bp.get('/health')
 def health_check():
     """
@@ -58,28 +110,68 @@ def create_credit_transaction():
               type: string
             referenceId:
               type: string
+              description: >
+                Idempotency key together with reason; a repeat returns the
+                recorded entry without moving the balance again
     responses:
+      200:
+        description: Entry already recorded for this (referenceId, reason); returned with created=false
+        schema:
+          $ref: '#/definitions/CreditTransaction'
       201:
-        description: Transaction created
+        description: Transaction created and balance moved (balanceAfter), created=true
         schema:
           $ref: '#/definitions/CreditTransaction'
       400:
         description: Missing required fields
+      404:
+        description: No materialized balance for this user yet (seed it via POST /balances)
+      409:
+        description: >
+          Debit exceeds the current balance, or referenceId is already recorded
+          for this reason with a different user or delta
     """
     data = request.get_json(silent=True)
     if not data or any(field not in data for field in REQUIRED_FIELDS):
         return error_response(400, 'VALIDATION_ERROR', 'Missing required fields')
 
-    transaction = CreditTransaction(
-        userId=data['userId'],
-        delta=data['delta'],
-        reason=data['reason'],
-        referenceId=data.get('referenceId'),
-    )
-    db.session.add(transaction)
+    delta = _parse_amount(data['delta'])
+    if delta is None:
+        return error_response(400, 'VALIDATION_ERROR', 'delta must be a number')
+
+    txn_id = insert_transaction({
+        'txnId': str(uuid.uuid4()),
+        'userId': data['userId'],
+        'delta': delta,
+        'reason': data['reason'],
+        'referenceId': data.get('referenceId'),
+        'createdAt': datetime.now(UTC),
+    })
+    if txn_id is None:
+        db.session.rollback()
+        existing = CreditTransaction.query.filter_by(
+            referenceId=data.get('referenceId'), reason=data['reason'],
+        ).one()
+        if existing.userId != data['userId'] or existing.delta != delta:
+            return error_response(
+                409,
+                'REFERENCE_CONFLICT',
+                f"referenceId {existing.referenceId} is already recorded with different values",
+            )
+        return jsonify({**existing.to_dict(), 'created': False}), 200
+
+    balance_after = move_balance(data['userId'], delta)
+    if balance_after is None:
+        db.session.rollback()
+        if db.session.get(CreditBalance, data['userId']) is None:
+            return error_response(404, 'BALANCE_NOT_FOUND', f"No credit balance for user: {data['userId']}")
+        return error_response(409, 'INSUFFICIENT_CREDITS', 'Insufficient credits for this debit')
+
+    transaction = db.session.get(CreditTransaction, txn_id)
+    transaction.balanceAfter = balance_after
     db.session.commit()
 
-    return jsonify(transaction.to_dict()), 201
+    return jsonify({**transaction.to_dict(), 'created': True}), 201
 
 
 @bp.get('/credit-transactions/user/<user_id>')
@@ -184,9 +276,24 @@ def get_credit_transaction_by_reference(reference_id):
             type: string
           referenceId:
             type: string
+          balanceAfter:
+            type: number
           createdAt:
             type: string
             format: date-time
+      CreditBalance:
+        type: object
+        properties:
+          userId:
+            type: string
+            format: uuid
+          creditBalance:
+            type: number
+          version:
+            type: integer
+          updatedAt:
+            type: string
+            format: date-time
       Pagination:
         type: object
         properties:
@@ -210,3 +317,189 @@ def get_credit_transaction_by_reference(reference_id):
         )
 
     return jsonify(transaction.to_dict()), 200
+
+
+@bp.get('/balances/<user_id>')
+def get_balance(user_id):
+    """
+    Get a user's running credit balance
+    ---
+    tags:
+      - Credit Balances
+    parameters:
+      - in: path
+        name: user_id
+        type: string
+        required: true
+    responses:
+      200:
+        description: Balance found
+        schema:
+          $ref: '#/definitions/CreditBalance'
+      404:
+        description: Balance not materialized yet
+    """
+    balance = db.session.get(CreditBalance, user_id)
+    if not balance:
+        return error_response(404, 'BALANCE_NOT_FOUND', f'No credit balance for user: {user_id}')
+    return jsonify(balance.to_dict()), 200
+
+
+@bp.post('/balances')
+def seed_balance():
+    """
+    Seed a user's balance (from OutSystems or at registration) if it does not exist yet
+    ---
+    tags:
+      - Credit Balances
+    parameters:
+      - in: body
+        name: body
+        required: true
+        schema:
+          type: object
+          required: [userId, creditBalance]
+          properties:
+            userId:
+              type: string
+              format: uuid
+            creditBalance:
+              type: number
+    responses:
+      201:
+        description: Balance created
+        schema:
+          $ref: '#/definitions/CreditBalance'
+      200:
+        description: Balance already existed and was left untouched
+        schema:
+          $ref: '#/definitions/CreditBalance'
+      400:
+        description: Missing or invalid fields
+    """
+    data = request.get_json(silent=True) or {}
+    amount = _parse_amount(data.get('creditBalance'))
+    if not data.get('userId') or amount is None or amount < 0:
+        return error_response(400, 'VALIDATION_ERROR', 'userId and a non-negative creditBalance are required')
+
+    existing = db.session.get(CreditBalance, data['userId'])
+    if existing:
+        return jsonify(existing.to_dict()), 200
+
+    # Seeded balances already match OutSystems, so they start synced
+    balance = CreditBalance(userId=data['userId'], balance=amount, version=0, syncedVersion=0)
+    db.session.add(balance)
+    try:
+        db.session.commit()
+    except IntegrityError:
+        db.session.rollback()
+        return jsonify(db.session.get(CreditBalance, data['userId']).to_dict()), 200
+    return jsonify(balance.to_dict()), 201
+
+
+@bp.post('/balances/sync-batch')
+def claim_sync_batch():
+    """
+    Claim a batch of balances changed since they were last pushed to OutSystems
+    ---
+    tags:
+      - Credit Balances
+    parameters:
+      - in: body
+        name: body
+        schema:
+          type: object
+          properties:
+            limit:
+              type: integer
+              default: 100
+            leaseSeconds:
+              type: integer
+              default: 60
+              description: Other reconcilers skip these rows until the lease ends
+    responses:
+      200:
+        description: Claimed balances, oldest change first
+        schema:
+          type: object
+          properties:
+            balances:
+              type: array
+              items:
+                $ref: '#/definitions/CreditBalance'
+      400:
+        description: Invalid limit or leaseSeconds
+    """
+    data = request.get_json(silent=True) or {}
+    limit = data.get('limit', 100)
+    lease_seconds = data.get('leaseSeconds', 60)
+    if not isinstance(limit, int) or isinstance(limit, bool) or limit < 1:
+        return error_response(400, 'VALIDATION_ERROR', 'limit must be an integer greater than or equal to 1')
+    if not isinstance(lease_seconds, int) or isinstance(lease_seconds, bool) or lease_seconds < 1:
+        return error_response(400, 'VALIDATION_ERROR', 'leaseSeconds must be an integer greater than or equal to 1')
+
+    now = datetime.now(UTC)
+    balances = (
+        CreditBalance.query.filter(
+            CreditBalance.version > CreditBalance.syncedVersion,
+            db.or_(CreditBalance.syncLeaseUntil.is_(None), CreditBalance.syncLeaseUntil < now),
+        )
+        .order_by(CreditBalance.updatedAt.asc())
+        .limit(min(limit, 500))
+        .with_for_update(skip_locked=True)
+        .all()
+    )
+    for balance in balances:
+        balance.syncLeaseUntil = now + timedelta(seconds=lease_seconds)
+    db.session.commit()
+    return jsonify({'balances': [balance.to_dict() for balance in balances]}), 200
+
+
+@bp.post('/balances/synced')
+def mark_balances_synced():
+    """
+    Record which balance versions OutSystems now holds
+    ---
+    tags:
+      - Credit Balances
+    parameters:
+      - in: body
+        name: body
+        required: true
+        schema:
+          type: object
+          required: [balances]
+          properties:
+            balances:
+              type: array
+              items:
+                type: object
+                properties:
+                  userId:
+                    type: string
+                  version:
+                    type: integer
+    responses:
+      200:
+        description: Number of balances marked synced
+      400:
+        description: Invalid body
+    """
+    data = request.get_json(silent=True) or {}
+    entries = data.get('balances')
+    if not isinstance(entries, list) or not all(
+        isinstance(e, dict) and e.get('userId') and isinstance(e.get('version'), int) for e in entries
+    ):
+        return error_response(400, 'VALIDATION_ERROR', 'balances must be a list of {userId, version}')
+
+    updated = 0
+    for entry in entries:
+        # A balance that moved again after the push stays unsynced
+        updated += db.session.execute(
+            update(CreditBalance)
+            .where(CreditBalance.userId == entry['userId'], CreditBalance.syncedVersion < entry['version'])
+            .values(syncedVersion=entry['version'], syncLeaseUntil=None)
+            .execution_options(synchronize_session=False)
+        ).rowcount
+    db.session.commit()
+    return jsonify({'synced': updated}), 200
@@ -1,10 +1,17 @@
+def seed_balance(client, user_id='user-1', balance=100.0):
+    return client.post('/balances', json={'userId': user_id, 'creditBalance': balance})
+
+
 def create_transaction(
     client,
     user_id='user-1',
     delta=10.0,
     reason='topup',
     reference_id=None,
+    seed=True,
 ):
+    if seed:
+        seed_balance(client, user_id)
     payload = {
         'userId': user_id,
         'delta': delta,
@@ -119,3 +126,102 @@ def test_create_credit_transaction_missing_fields(client):
     assert response.status_code == 400
     payload = response.get_json()
     assert payload['error']['code'] == 'VALIDATION_ERROR'
+
+
+def test_transactions_move_the_running_balance(client):
+    assert seed_balance(client, 'u-bal', 50.0).status_code == 201
+
+    credit = create_transaction(client, user_id='u-bal', delta=30.0, reason='topup', seed=False)
+    debit = create_transaction(client, user_id='u-bal', delta=-80.0, reason='ticket_purchase', seed=False)
+
+    assert credit.get_json()['balanceAfter'] == 80.0
+    assert debit.status_code == 201
+    assert debit.get_json()['balanceAfter'] == 0.0
+    balance = client.get('/balances/u-bal').get_json()
+    assert balance['creditBalance'] == 0.0
+    assert balance['version'] == 2
+
+
+def test_debit_beyond_balance_is_rejected_without_a_ledger_row(client):
+    seed_balance(client, 'u-poor', 20.0)
+
+    response = create_transaction(client, user_id='u-poor', delta=-20.5, reason='ticket_purchase', seed=False)
+
+    assert response.status_code == 409
+    assert response.get_json()['error']['code'] == 'INSUFFICIENT_CREDITS'
+    assert client.get('/balances/u-poor').get_json()['creditBalance'] == 20.0
+    assert client.get('/credit-transactions/user/u-poor').get_json()['pagination']['total'] == 0
+
+
+def test_transaction_requires_a_seeded_balance(client):
+    response = create_transaction(client, user_id='u-new', seed=False)
+
+    assert response.status_code == 404
+    assert response.get_json()['error']['code'] == 'BALANCE_NOT_FOUND'
+    assert client.get('/balances/u-new').status_code == 404
+
+
+def test_seed_balance_never_overwrites(client):
+    assert seed_balance(client, 'u-seed', 40.0).status_code == 201
+    create_transaction(client, user_id='u-seed', delta=-15.0, reason='ticket_purchase', seed=False)
+
+    again = seed_balance(client, 'u-seed', 40.0)
+
+    assert again.status_code == 200
+    assert again.get_json()['creditBalance'] == 25.0
+    assert seed_balance(client, 'u-seed-bad', -1).status_code == 400
+
+
+def test_repeated_reference_is_recorded_once(client):
+    seed_balance(client, 'u-idem', 10.0)
+
+    first = create_transaction(client, user_id='u-idem', delta=40.0, reference_id='pi_1', seed=False)
+    again = create_transaction(client, user_id='u-idem', delta=40.0, reference_id='pi_1', seed=False)
+    other_reason = create_transaction(
+        client, user_id='u-idem', delta=-5.0, reason='topup_reversal', reference_id='pi_1', seed=False,
+    )
+
+    assert first.status_code == 201
+    assert first.get_json()['created'] is True
+    assert again.status_code == 200
+    assert again.get_json()['created'] is False
+    assert again.get_json()['txnId'] == first.get_json()['txnId']
+    assert again.get_json()['balanceAfter'] == 50.0
+    assert other_reason.status_code == 201
+    assert client.get('/balances/u-idem').get_json()['creditBalance'] == 45.0
+
+
+def test_reused_reference_with_different_values_is_rejected(client):
+    seed_balance(client, 'u-ref', 10.0)
+    create_transaction(client, user_id='u-ref', delta=5.0, reference_id='pi_2', seed=False)
+
+    response = create_transaction(client, user_id='u-ref', delta=7.0, reference_id='pi_2', seed=False)
+
+    assert response.status_code == 409
+    assert response.get_json()['error']['code'] == 'REFERENCE_CONFLICT'
+    assert client.get('/balances/u-ref').get_json()['creditBalance'] == 15.0
+
+
+def claim(client, **body):
+    return [(b['userId'], b['version']) for b in client.post('/balances/sync-batch', json=body).get_json()['balances']]
+
+
+def test_sync_batches_claim_changed_balances(client):
+    seed_balance(client, 'u-a', 10.0)
+    seed_balance(client, 'u-b', 10.0)
+    create_transaction(client, user_id='u-a', delta=5.0, seed=False)
+
+    assert claim(client) == [('u-a', 1)]
+    # Leased rows are skipped by other reconcilers until synced or expired
+    assert claim(client) == []
+
+    # A change after the push leaves the balance unsynced
+    create_transaction(client, user_id='u-a', delta=5.0, seed=False)
+    marked = client.post('/balances/synced', json={'balances': [{'userId': 'u-a', 'version': 1}]})
+    assert marked.get_json() == {'synced': 1}
+    assert claim(client) == [('u-a', 2)]
+
+    client.post('/balances/synced', json={'balances': [{'userId': 'u-a', 'version': 2}]})
+    assert claim(client) == []
+    assert client.post('/balances/synced', json={'balances': 'u-a'}).status_code == 400
+    assert client.post('/balances/sync-batch', json={'limit': 0}).status_code == 400
@@ -4,6 +4,7 @@ from typing import Optional, Tuple
 from flask import Blueprint, jsonify, request
 
 from app import db
+from change_events import publish_change
 from models import Event
 
 bp = Blueprint('events', __name__)
@@ -613,6 +614,7 @@ def update_event(event_id):
         setattr(event, field, value)
 
     db.session.commit()
+    publish_change('event', 'updated', event.eventId, event.to_dict(summary=True))
     return jsonify(event.to_dict()), 200
 
 
@@ -653,6 +655,7 @@ def delete_event(event_id):
 
     event.cancelledAt = datetime.now(datetime.timezone.utc)
     db.session.commit()
+    publish_change('event', 'cancelled', event.eventId, event.to_dict(summary=True))
 
     return jsonify({
         'message': 'Event cancelled successfully',
@@ -709,6 +712,7 @@ def cancel_event(event_id):
 
     event.cancelledAt = datetime.now(datetime.timezone.utc)
     db.session.commit()
+    publish_change('event', 'cancelled', event.eventId, event.to_dict(summary=True))
 
     response = {
         'message': 'Event cancelled successfully',
@@ -1,5 +1,7 @@
 import json
 import os
+import sys
+import threading
 import traceback
 import uuid
 from datetime import datetime, timezone
@@ -14,6 +16,9 @@ from werkzeug.exceptions import HTTPException
 
 load_dotenv()
 
+# Add shared directory to path for imports
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..', 'shared'))
+
 db = SQLAlchemy()
 migrate = Migrate()
 
@@ -125,12 +130,20 @@ def create_app(test_config=None):
     db.init_app(app)
     migrate.init_app(app, db)
 
-    from models import Listing  # noqa: F401
+    from models import Listing, ListingView  # noqa: F401
     from routes import bp as listings_bp
 
     app.register_blueprint(listings_bp)
     _register_error_handlers(app)
 
+    from backfill import register_commands
+    register_commands(app)
+
+    if not app.config.get("TESTING"):
+        from change_consumer import start_change_consumer
+        t = threading.Thread(target=start_change_consumer, args=(app,), daemon=True, name="change-consumer")
+        t.start()
+
     @app.get("/health")
     def health_check():
         return jsonify({"status": "ok"}), 200
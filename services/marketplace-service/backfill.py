@@ -0,0 +1,86 @@
+"""
+Backfill listings.eventId for listings created before the column existed.
+
+Event-filtered listing queries filter on listings.eventId in SQL, so a
+listing with no eventId never matches ?eventId=. This looks each such
+listing's ticket up in ticket-service and copies its eventId onto the
+listing (and onto its listing_views row if that is missing it too).
+
+Run as `flask backfill-listing-event-ids`, as a one-off job after
+`flask db upgrade` (the backfill-listing-event-ids Job in k8s, the
+marketplace-backfill service in docker compose), never in the serving
+container. Listings it cannot resolve are stamped with
+eventIdBackfillAttemptedAt and skipped by later runs unless
+--retry-unresolved is given.
+"""
+import logging
+import os
+from datetime import UTC, datetime
+
+import click
+import requests
+
+from app import db
+from models import Listing, ListingView
+
+logger = logging.getLogger(__name__)
+
+TICKET_SERVICE_URL = os.environ.get('TICKET_SERVICE_URL', 'http://ticket-service:5000')
+BACKFILL_BATCH_SIZE = 200
+
+
+def fetch_ticket(ticket_id):
+    """The ticket from ticket-service, or None if it no longer exists."""
+    response = requests.get(f'{TICKET_SERVICE_URL.rstrip("/")}/tickets/{ticket_id}', timeout=5)
+    if response.status_code == 404:
+        return None
+    response.raise_for_status()
+    return response.json()
+
+
+def backfill_listing_event_ids(fetch=fetch_ticket, batch_size=BACKFILL_BATCH_SIZE, retry_unresolved=False):
+    """
+    Fill in eventId for every listing without one. Returns (updated, unresolved).
+
+    Listings whose ticket is gone or has no eventId are left NULL, stamped as
+    attempted and counted as unresolved; previously attempted listings are only
+    looked at again with retry_unresolved. Errors from ticket-service propagate
+    so the run can be retried.
+    """
+    updated = unresolved = 0
+    skipped = set()
+    while True:
+        query = Listing.query.filter(Listing.eventId.is_(None))
+        if not retry_unresolved:
+            query = query.filter(Listing.eventIdBackfillAttemptedAt.is_(None))
+        if skipped:
+            query = query.filter(Listing.listingId.notin_(skipped))
+        batch = query.order_by(Listing.listingId).limit(batch_size).all()
+        if not batch:
+            break
+        for listing in batch:
+            ticket = fetch(listing.ticketId)
+            event_id = (ticket or {}).get('eventId')
+            if not event_id:
+                listing.eventIdBackfillAttemptedAt = datetime.now(UTC)
+                skipped.add(listing.listingId)
+                unresolved += 1
+                continue
+            listing.eventId = event_id
+            ListingView.query.filter(
+                ListingView.listingId == listing.listingId,
+                ListingView.eventId.is_(None),
+            ).update({'eventId': event_id}, synchronize_session=False)
+            updated += 1
+        db.session.commit()
+    return updated, unresolved
+
+
+def register_commands(app):
+    @app.cli.command('backfill-listing-event-ids')
+    @click.option('--retry-unresolved', is_flag=True,
+                  help='Also retry listings a previous run could not resolve.')
+    def backfill_listing_event_ids_command(retry_unresolved):
+        """Copy each listing's eventId from ticket-service where it is missing."""
+        updated, unresolved = backfill_listing_event_ids(retry_unresolved=retry_unresolved)
+        click.echo(f'Backfilled eventId on {updated} listings; {unresolved} could not be resolved.')
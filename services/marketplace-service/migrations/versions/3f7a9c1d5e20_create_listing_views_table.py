@@ -0,0 +1,72 @@
+"""create listing_views read model
+
+Revision ID: 3f7a9c1d5e20
+Revises: 8d41e0b7c2a5
+Create Date: 2026-10-18 12:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3f7a9c1d5e20'
+down_revision = '8d41e0b7c2a5'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'listing_views',
+        sa.Column('listingId', sa.String(length=36), nullable=False),
+        sa.Column('ticketId', sa.String(length=36), nullable=False),
+        sa.Column('sellerId', sa.String(length=36), nullable=False),
+        sa.Column('price', sa.Float(), nullable=False),
+        sa.Column('status', sa.String(length=20), nullable=False),
+        sa.Column('createdAt', sa.DateTime(), nullable=False),
+        sa.Column('sellerName', sa.String(length=255), nullable=True),
+        sa.Column('eventId', sa.String(length=36), nullable=True),
+        sa.Column('eventName', sa.String(length=255), nullable=True),
+        sa.Column('eventDate', sa.DateTime(), nullable=True),
+        sa.Column('eventType', sa.String(length=50), nullable=True),
+        sa.Column('eventImage', sa.String(length=500), nullable=True),
+        sa.Column('venueId', sa.String(length=36), nullable=True),
+        sa.Column('inventoryId', sa.String(length=36), nullable=True),
+        sa.Column('seatId', sa.String(length=36), nullable=True),
+        sa.Column('rowNumber', sa.String(length=5), nullable=True),
+        sa.Column('seatNumber', sa.String(length=10), nullable=True),
+        sa.Column('updatedAt', sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint('listingId'),
+    )
+    op.create_index(op.f('ix_listing_views_ticketId'), 'listing_views', ['ticketId'], unique=False)
+    op.create_index(op.f('ix_listing_views_sellerId'), 'listing_views', ['sellerId'], unique=False)
+    op.create_index(op.f('ix_listing_views_eventId'), 'listing_views', ['eventId'], unique=False)
+    op.create_index('ix_listing_views_status_createdAt', 'listing_views',
+                    ['status', 'createdAt', 'listingId'], unique=False)
+    op.create_index('ix_listing_views_status_price', 'listing_views',
+                    ['status', 'price', 'listingId'], unique=False)
+    op.create_index('ix_listing_views_status_eventDate', 'listing_views',
+                    ['status', 'eventDate', 'listingId'], unique=False)
+    op.create_index('ix_listing_views_status_eventType_createdAt', 'listing_views',
+                    ['status', 'eventType', 'createdAt', 'listingId'], unique=False)
+
+    # Seed listing columns for existing listings; snapshots are backfilled via
+    # PUT /listings/<id>/view or filled in by the next change event.
+    op.execute(
+        'INSERT INTO listing_views ("listingId", "ticketId", "sellerId", "price", "status", '
+        '"createdAt", "eventId", "updatedAt") '
+        'SELECT "listingId", "ticketId", "sellerId", "price", "status", "createdAt", "eventId", '
+        'CURRENT_TIMESTAMP FROM listings'
+    )
+
+
+def downgrade():
+    op.drop_index('ix_listing_views_status_eventType_createdAt', table_name='listing_views')
+    op.drop_index('ix_listing_views_status_eventDate', table_name='listing_views')
+    op.drop_index('ix_listing_views_status_price', table_name='listing_views')
+    op.drop_index('ix_listing_views_status_createdAt', table_name='listing_views')
+    op.drop_index(op.f('ix_listing_views_eventId'), table_name='listing_views')
+    op.drop_index(op.f('ix_listing_views_sellerId'), table_name='listing_views')
+    op.drop_index(op.f('ix_listing_views_ticketId'), table_name='listing_views')
+    op.drop_table('listing_views')
@@ -0,0 +1,43 @@
+"""add eventId and browse indexes to listings
+
+Revision ID: 8d41e0b7c2a5
+Revises: 6c2b6f22d919
+Create Date: 2026-10-18 09:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8d41e0b7c2a5'
+down_revision = '6c2b6f22d919'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Existing rows start NULL; `flask backfill-listing-event-ids` (backfill.py)
+    # copies their eventId from ticket-service and runs after this on startup.
+    with op.batch_alter_table('listings', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('eventId', sa.String(length=36), nullable=True))
+
+    op.create_index(
+        'ix_listings_status_createdAt',
+        'listings',
+        ['status', 'createdAt', 'listingId'],
+        unique=False,
+    )
+    op.create_index(
+        'ix_listings_status_eventId_createdAt',
+        'listings',
+        ['status', 'eventId', 'createdAt', 'listingId'],
+        unique=False,
+    )
+
+
+def downgrade():
+    op.drop_index('ix_listings_status_eventId_createdAt', table_name='listings')
+    op.drop_index('ix_listings_status_createdAt', table_name='listings')
+    with op.batch_alter_table('listings', schema=None) as batch_op:
+        batch_op.drop_column('eventId')
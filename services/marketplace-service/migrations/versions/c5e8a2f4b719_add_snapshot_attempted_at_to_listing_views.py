@@ -0,0 +1,26 @@
+"""add snapshotAttemptedAt to listing_views
+
+Revision ID: c5e8a2f4b719
+Revises: 3f7a9c1d5e20
+Create Date: 2026-10-19 12:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c5e8a2f4b719'
+down_revision = '3f7a9c1d5e20'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('listing_views', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('snapshotAttemptedAt', sa.DateTime(), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table('listing_views', schema=None) as batch_op:
+        batch_op.drop_column('snapshotAttemptedAt')
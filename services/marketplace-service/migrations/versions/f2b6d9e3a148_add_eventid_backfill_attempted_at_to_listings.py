@@ -0,0 +1,26 @@
+"""add eventIdBackfillAttemptedAt to listings
+
+Revision ID: f2b6d9e3a148
+Revises: c5e8a2f4b719
+Create Date: 2026-10-19 16:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f2b6d9e3a148'
+down_revision = 'c5e8a2f4b719'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('listings', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('eventIdBackfillAttemptedAt', sa.DateTime(), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table('listings', schema=None) as batch_op:
+        batch_op.drop_column('eventIdBackfillAttemptedAt')
@@ -10,16 +10,99 @@ class Listing(db.Model):
     listingId = db.Column(db.String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
     ticketId = db.Column(db.String(36), nullable=False, index=True)
     sellerId = db.Column(db.String(36), nullable=False, index=True)
+    eventId = db.Column(db.String(36), nullable=True)
     price = db.Column(db.Float, nullable=False)
     status = db.Column(db.String(20), nullable=False, default='active')
     createdAt = db.Column(db.DateTime, nullable=False, default=lambda: datetime.now(UTC))
+    # Set when the eventId backfill could not resolve this listing, so later runs skip it
+    eventIdBackfillAttemptedAt = db.Column(db.DateTime, nullable=True)
+
+    __table_args__ = (
+        # Browse is always "status = active ORDER BY createdAt DESC, listingId DESC",
+        # optionally narrowed to one event, so both shapes get a covering keyset index.
+        db.Index('ix_listings_status_createdAt', 'status', 'createdAt', 'listingId'),
+        db.Index('ix_listings_status_eventId_createdAt', 'status', 'eventId', 'createdAt', 'listingId'),
+    )
+
+    def to_dict(self):
+        return {
+            'listingId': self.listingId,
+            'ticketId': self.ticketId,
+            'sellerId': self.sellerId,
+            'eventId': self.eventId,
+            'price': self.price,
+            'status': self.status,
+            'createdAt': self.createdAt.isoformat(),
+        }
+
+
+class ListingView(db.Model):
+    """
+    Denormalized browse row: one per listing, carrying the event, seat and
+    seller display data that would otherwise be fetched from three services.
+    Listing columns are written with the listing; snapshot columns are set when
+    the listing is created and refreshed from entity change events.
+    """
+    __tablename__ = 'listing_views'
+
+    listingId = db.Column(db.String(36), primary_key=True)
+    ticketId = db.Column(db.String(36), nullable=False, index=True)
+    sellerId = db.Column(db.String(36), nullable=False, index=True)
+    price = db.Column(db.Float, nullable=False)
+    status = db.Column(db.String(20), nullable=False)
+    createdAt = db.Column(db.DateTime, nullable=False)
+    sellerName = db.Column(db.String(255), nullable=True)
+    eventId = db.Column(db.String(36), nullable=True, index=True)
+    eventName = db.Column(db.String(255), nullable=True)
+    eventDate = db.Column(db.DateTime, nullable=True)
+    eventType = db.Column(db.String(50), nullable=True)
+    eventImage = db.Column(db.String(500), nullable=True)
+    venueId = db.Column(db.String(36), nullable=True)
+    inventoryId = db.Column(db.String(36), nullable=True)
+    seatId = db.Column(db.String(36), nullable=True)
+    rowNumber = db.Column(db.String(5), nullable=True)
+    seatNumber = db.Column(db.String(10), nullable=True)
+    # Last orchestrator fill of an incomplete snapshot, so rows that cannot be
+    # completed are not re-enriched on every read
+    snapshotAttemptedAt = db.Column(db.DateTime, nullable=True)
+    updatedAt = db.Column(
+        db.DateTime,
+        nullable=False,
+        default=lambda: datetime.now(UTC),
+        onupdate=lambda: datetime.now(UTC),
+    )
+
+    __table_args__ = (
+        # One keyset index per supported sort, each led by status = 'active'
+        db.Index('ix_listing_views_status_createdAt', 'status', 'createdAt', 'listingId'),
+        db.Index('ix_listing_views_status_price', 'status', 'price', 'listingId'),
+        db.Index('ix_listing_views_status_eventDate', 'status', 'eventDate', 'listingId'),
+        db.Index('ix_listing_views_status_eventType_createdAt', 'status', 'eventType', 'createdAt', 'listingId'),
+    )
 
     def to_dict(self):
         return {
             'listingId': self.listingId,
             'ticketId': self.ticketId,
             'sellerId': self.sellerId,
+            'sellerName': self.sellerName,
+            'eventId': self.eventId,
             'price': self.price,
             'status': self.status,
             'createdAt': self.createdAt.isoformat(),
+            'event': {
+                'eventId': self.eventId,
+                'name': self.eventName,
+                'date': self.eventDate.isoformat() if self.eventDate else None,
+                'type': self.eventType,
+                'image': self.eventImage,
+                'venueId': self.venueId,
+            } if self.eventName else None,
+            'seat': {
+                'inventoryId': self.inventoryId,
+                'seatId': self.seatId,
+                'rowNumber': self.rowNumber,
+                'seatNumber': self.seatNumber,
+            } if self.seatId else None,
+            'snapshotAttemptedAt': self.snapshotAttemptedAt.isoformat() if self.snapshotAttemptedAt else None,
         }
@@ -0,0 +1,120 @@
+"""
+Listing read model maintenance.
+
+`listing_views` mirrors every listing together with the event, seat and
+seller display data browse needs. Listing columns are copied whenever the
+listing is written; snapshot columns are supplied by the orchestrator when the
+listing is created (or backfilled) and kept fresh from entity change events:
+
+  event.updated / event.cancelled  -> event columns, matched by eventId
+  user.updated                     -> sellerName, matched by sellerId
+
+A listing's ticket keeps its eventId and inventoryId for life, so tickets
+publish no changes; those columns come from the listing and its snapshot.
+
+Every update is an idempotent overwrite, so redelivered or reordered events
+converge on the owner's latest state.
+"""
+import logging
+from datetime import UTC, datetime
+
+from app import db
+from models import ListingView
+
+logger = logging.getLogger(__name__)
+
+EVENT_FIELDS = {
+    'name': 'eventName',
+    'type': 'eventType',
+    'image': 'eventImage',
+    'venueId': 'venueId',
+}
+SEAT_FIELDS = ('inventoryId', 'seatId', 'rowNumber', 'seatNumber')
+
+
+def _parse_datetime(value):
+    """Parse an ISO timestamp into the naive-UTC form the DateTime columns store."""
+    if not value:
+        return None
+    try:
+        parsed = datetime.fromisoformat(str(value).replace('Z', '+00:00'))
+    except ValueError:
+        return None
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone(UTC).replace(tzinfo=None)
+    return parsed
+
+
+def display_name(email):
+    return email.split('@')[0] if email else None
+
+
+def _apply_event(view, event):
+    if event.get('eventId'):
+        view.eventId = event['eventId']
+    for source, column in EVENT_FIELDS.items():
+        if source in event:
+            setattr(view, column, event[source])
+    if 'date' in event:
+        view.eventDate = _parse_datetime(event['date'])
+
+
+def apply_snapshot(view, snapshot):
+    """Copy the optional sellerName / event / seat snapshot onto a view row."""
+    if snapshot.get('sellerName'):
+        view.sellerName = snapshot['sellerName']
+    if isinstance(snapshot.get('event'), dict):
+        _apply_event(view, snapshot['event'])
+    if isinstance(snapshot.get('seat'), dict):
+        for field in SEAT_FIELDS:
+            if field in snapshot['seat']:
+                setattr(view, field, snapshot['seat'][field])
+
+
+def sync_listing(listing, snapshot=None):
+    """
+    Upsert the view row for `listing` in the current session. The caller
+    commits, so the listing and its view row are written atomically.
+    """
+    view = db.session.get(ListingView, listing.listingId)
+    if view is None:
+        view = ListingView(listingId=listing.listingId)
+        db.session.add(view)
+    view.ticketId = listing.ticketId
+    view.sellerId = listing.sellerId
+    view.price = listing.price
+    view.status = listing.status
+    view.createdAt = listing.createdAt
+    if listing.eventId:
+        view.eventId = listing.eventId
+    if snapshot:
+        apply_snapshot(view, snapshot)
+    return view
+
+
+def apply_change(message):
+    """Apply one entity change event. Returns the number of view rows touched."""
+    entity = message.get('entity')
+    entity_id = message.get('id')
+    data = message.get('data') or {}
+    if not entity_id:
+        return 0
+
+    if entity == 'event':
+        views = ListingView.query.filter_by(eventId=entity_id).all()
+        for view in views:
+            _apply_event(view, data)
+    elif entity == 'user':
+        if 'email' not in data:
+            return 0
+        views = ListingView.query.filter_by(sellerId=entity_id).all()
+        for view in views:
+            view.sellerName = display_name(data['email'])
+    else:
+        return 0
+
+    db.session.commit()
+    if views:
+        logger.info('Applied %s.%s for %s to %d listing views',
+                    entity, message.get('action'), entity_id, len(views))
+    return len(views)
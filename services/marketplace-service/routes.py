@@ -1,20 +1,92 @@
+import base64
+import binascii
+import json
+from datetime import UTC, datetime
+
 from flask import Blueprint, jsonify, request
+from sqlalchemy import and_, or_, update
 
 from app import db
-from models import Listing
+from models import Listing, ListingView
+from projection import sync_listing
 
 bp = Blueprint('listings', __name__)
 
 
 REQUIRED_FIELDS = ('ticketId', 'sellerId', 'price')
-UPDATABLE_FIELDS = {'status'}
-ALLOWED_STATUSES = {'active', 'completed', 'cancelled'}
+UPDATABLE_FIELDS = {'status', 'fromStatus'}
+# pending_transfer: held by an in-flight transfer (see /claim and /release)
+ALLOWED_STATUSES = {'active', 'pending_transfer', 'completed', 'cancelled'}
+
+# sort name -> (view column, descending); listingId breaks ties in the same direction
+BROWSE_SORTS = {
+    'newest': (ListingView.createdAt, True),
+    'price_asc': (ListingView.price, False),
+    'price_desc': (ListingView.price, True),
+    'event_date': (ListingView.eventDate, False),
+}
 
 
 def error_response(status_code, code, message):
     return jsonify({'error': {'code': code, 'message': message}}), status_code
 
 
+def encode_cursor(listing):
+    raw = json.dumps([listing.createdAt.isoformat(), listing.listingId])
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def decode_cursor(cursor):
+    """Return (createdAt, listingId) from an opaque cursor, or None if malformed."""
+    try:
+        created_at, listing_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        return datetime.fromisoformat(created_at), str(listing_id)
+    except (ValueError, TypeError, binascii.Error, json.JSONDecodeError):
+        return None
+
+
+def _cursor_value(value):
+    return value.isoformat() if isinstance(value, datetime) else value
+
+
+def encode_browse_cursor(sort, view):
+    column, _ = BROWSE_SORTS[sort]
+    raw = json.dumps([sort, _cursor_value(getattr(view, column.key)), view.listingId])
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def transition_status(listing_id, from_status, to_status):
+    """
+    Move a listing from one status to another in a single conditional UPDATE, so
+    concurrent callers can never both win. Returns the updated listing, or None
+    if the listing was not in from_status. The caller commits.
+    """
+    result = db.session.execute(
+        update(Listing)
+        .where(Listing.listingId == listing_id, Listing.status == from_status)
+        .values(status=to_status)
+        .returning(Listing.listingId)
+    )
+    if result.scalar_one_or_none() is None:
+        return None
+    listing = db.session.get(Listing, listing_id)
+    sync_listing(listing)
+    return listing
+
+
+def decode_browse_cursor(sort, cursor):
+    """Return (sortValue, listingId) from a browse cursor, or None if malformed or for another sort."""
+    try:
+        cursor_sort, value, listing_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        if cursor_sort != sort:
+            return None
+        if sort in ('price_asc', 'price_desc'):
+            return float(value), str(listing_id)
+        return datetime.fromisoformat(value), str(listing_id)
+    except (ValueError, TypeError, binascii.Error, json.JSONDecodeError):
+        return None
+
+
 @bp.get('/health')
 def health():
     """
@@ -56,12 +128,23 @@ def create_listing():
             sellerId:
               type: string
               format: uuid
+            eventId:
+              type: string
+              format: uuid
+              description: Event of the listed ticket, used for event-filtered browse
             price:
               type: number
             status:
               type: string
-              enum: [active, completed, cancelled]
+              enum: [active, pending_transfer, completed, cancelled]
               default: active
+            sellerName:
+              type: string
+              description: Seller display name for the browse read model
+            event:
+              $ref: '#/definitions/ListingEventSnapshot'
+            seat:
+              $ref: '#/definitions/ListingSeatSnapshot'
     responses:
       201:
         description: Listing created
@@ -82,11 +165,14 @@ def create_listing():
           sellerId:
             type: string
             format: uuid
+          eventId:
+            type: string
+            format: uuid
           price:
             type: number
           status:
             type: string
-            enum: [active, completed, cancelled]
+            enum: [active, pending_transfer, completed, cancelled]
           createdAt:
             type: string
             format: date-time
@@ -102,6 +188,65 @@ def create_listing():
             type: integer
           total:
             type: integer
+            description: Offset mode only
+          nextCursor:
+            type: string
+            description: Keyset mode only — pass as cursor for the next page; null on the last page
+      ListingEventSnapshot:
+        type: object
+        properties:
+          eventId:
+            type: string
+          name:
+            type: string
+          date:
+            type: string
+            format: date-time
+          type:
+            type: string
+          image:
+            type: string
+          venueId:
+            type: string
+      ListingSeatSnapshot:
+        type: object
+        properties:
+          inventoryId:
+            type: string
+          seatId:
+            type: string
+          rowNumber:
+            type: string
+          seatNumber:
+            type: string
+      ListingView:
+        type: object
+        properties:
+          listingId:
+            type: string
+          ticketId:
+            type: string
+          sellerId:
+            type: string
+          sellerName:
+            type: string
+          eventId:
+            type: string
+          price:
+            type: number
+          status:
+            type: string
+          createdAt:
+            type: string
+            format: date-time
+          event:
+            $ref: '#/definitions/ListingEventSnapshot'
+          seat:
+            $ref: '#/definitions/ListingSeatSnapshot'
+          snapshotAttemptedAt:
+            type: string
+            format: date-time
+            description: When an incomplete snapshot was last filled in, if ever
     """
     data = request.get_json(silent=True)
     if not data or any(field not in data for field in REQUIRED_FIELDS):
@@ -114,10 +259,13 @@ def create_listing():
     listing = Listing(
         ticketId=data['ticketId'],
         sellerId=data['sellerId'],
+        eventId=data.get('eventId'),
         price=data['price'],
         status=status,
     )
     db.session.add(listing)
+    db.session.flush()
+    sync_listing(listing, data)
     db.session.commit()
     return jsonify(listing.to_dict()), 201
 
@@ -130,6 +278,22 @@ def list_active_listings():
     tags:
       - Listings
     parameters:
+      - in: query
+        name: eventId
+        type: string
+        description: Only listings for this event
+      - in: query
+        name: minPrice
+        type: number
+      - in: query
+        name: maxPrice
+        type: number
+      - in: query
+        name: cursor
+        type: string
+        description: >
+          Keyset cursor from a previous page. Pass an empty value to start keyset
+          paging; when present, page is ignored and no total is computed.
       - in: query
         name: page
         type: integer
@@ -150,31 +314,196 @@ def list_active_listings():
                 $ref: '#/definitions/Listing'
             pagination:
               $ref: '#/definitions/Pagination'
+      400:
+        description: Invalid pagination, price filter, or cursor
     """
     page = request.args.get('page', default=1, type=int)
     limit = request.args.get('limit', default=20, type=int)
+    min_price = request.args.get('minPrice', type=float)
+    max_price = request.args.get('maxPrice', type=float)
+    event_id = request.args.get('eventId')
+    cursor = request.args.get('cursor')
 
     if page is None or page < 1:
         return error_response(400, 'VALIDATION_ERROR', 'page must be an integer greater than or equal to 1')
     if limit is None or limit < 1:
         return error_response(400, 'VALIDATION_ERROR', 'limit must be an integer greater than or equal to 1')
+    if ('minPrice' in request.args and min_price is None) or ('maxPrice' in request.args and max_price is None):
+        return error_response(400, 'VALIDATION_ERROR', 'minPrice and maxPrice must be numbers')
 
     limit = min(limit, 100)
 
     query = Listing.query.filter_by(status='active')
-    total = query.count()
-    listings = (
-        query.order_by(Listing.createdAt.desc(), Listing.listingId.desc())
-        .offset((page - 1) * limit)
-        .limit(limit)
-        .all()
-    )
+    if event_id:
+        query = query.filter(Listing.eventId == event_id)
+    if min_price is not None:
+        query = query.filter(Listing.price >= min_price)
+    if max_price is not None:
+        query = query.filter(Listing.price <= max_price)
+
+    order = (Listing.createdAt.desc(), Listing.listingId.desc())
+    if 'cursor' not in request.args:
+        total = query.count()
+        listings = query.order_by(*order).offset((page - 1) * limit).limit(limit).all()
+        return jsonify({
+            'listings': [listing.to_dict() for listing in listings],
+            'pagination': {
+                'page': page,
+                'limit': limit,
+                'total': total,
+            },
+        }), 200
+
+    # Keyset mode: an empty cursor starts from the newest listing; no COUNT(*).
+    if cursor:
+        position = decode_cursor(cursor)
+        if position is None:
+            return error_response(400, 'VALIDATION_ERROR', 'cursor is invalid')
+        created_at, listing_id = position
+        query = query.filter(or_(
+            Listing.createdAt < created_at,
+            and_(Listing.createdAt == created_at, Listing.listingId < listing_id),
+        ))
+    rows = query.order_by(*order).limit(limit + 1).all()
+    listings = rows[:limit]
     return jsonify({
         'listings': [listing.to_dict() for listing in listings],
         'pagination': {
-            'page': page,
             'limit': limit,
-            'total': total,
+            'nextCursor': encode_cursor(listings[-1]) if len(rows) > limit else None,
+        },
+    }), 200
+
+
+@bp.get('/listings/browse')
+def browse_listings():
+    """
+    Browse active listings from the denormalized read model
+    ---
+    tags:
+      - Listings
+    description: >
+      Single indexed read over listing_views — rows already carry event, seat
+      and seller display data. Paging follows GET /listings: offset by default,
+      keyset when cursor is present.
+    parameters:
+      - in: query
+        name: eventId
+        type: string
+      - in: query
+        name: eventType
+        type: string
+      - in: query
+        name: minPrice
+        type: number
+      - in: query
+        name: maxPrice
+        type: number
+      - in: query
+        name: sort
+        type: string
+        enum: [newest, price_asc, price_desc, event_date]
+        default: newest
+        description: event_date only returns listings whose event snapshot is known
+      - in: query
+        name: cursor
+        type: string
+        description: >
+          pagination.nextCursor from the previous page, for the same sort. Pass an
+          empty value to start keyset paging.
+      - in: query
+        name: page
+        type: integer
+        default: 1
+      - in: query
+        name: limit
+        type: integer
+        default: 20
+    responses:
+      200:
+        description: One page of listing views
+        schema:
+          type: object
+          properties:
+            listings:
+              type: array
+              items:
+                $ref: '#/definitions/ListingView'
+            pagination:
+              $ref: '#/definitions/Pagination'
+      400:
+        description: Invalid sort, filter, or cursor
+    """
+    page = request.args.get('page', default=1, type=int)
+    limit = request.args.get('limit', default=20, type=int)
+    min_price = request.args.get('minPrice', type=float)
+    max_price = request.args.get('maxPrice', type=float)
+    sort = request.args.get('sort', 'newest')
+    cursor = request.args.get('cursor')
+
+    if page is None or page < 1:
+        return error_response(400, 'VALIDATION_ERROR', 'page must be an integer greater than or equal to 1')
+    if limit is None or limit < 1:
+        return error_response(400, 'VALIDATION_ERROR', 'limit must be an integer greater than or equal to 1')
+    if ('minPrice' in request.args and min_price is None) or ('maxPrice' in request.args and max_price is None):
+        return error_response(400, 'VALIDATION_ERROR', 'minPrice and maxPrice must be numbers')
+    if sort not in BROWSE_SORTS:
+        return error_response(400, 'VALIDATION_ERROR', f"sort must be one of: {', '.join(BROWSE_SORTS)}")
+
+    limit = min(limit, 100)
+    column, descending = BROWSE_SORTS[sort]
+
+    query = ListingView.query.filter(ListingView.status == 'active')
+    if request.args.get('eventId'):
+        query = query.filter(ListingView.eventId == request.args['eventId'])
+    if request.args.get('eventType'):
+        query = query.filter(ListingView.eventType == request.args['eventType'])
+    if min_price is not None:
+        query = query.filter(ListingView.price >= min_price)
+    if max_price is not None:
+        query = query.filter(ListingView.price <= max_price)
+    if sort == 'event_date':
+        query = query.filter(ListingView.eventDate.isnot(None))
+
+    if descending:
+        order = (column.desc(), ListingView.listingId.desc())
+    else:
+        order = (column.asc(), ListingView.listingId.asc())
+
+    if 'cursor' not in request.args:
+        total = query.count()
+        views = query.order_by(*order).offset((page - 1) * limit).limit(limit).all()
+        return jsonify({
+            'listings': [view.to_dict() for view in views],
+            'pagination': {
+                'page': page,
+                'limit': limit,
+                'total': total,
+            },
+        }), 200
+
+    if cursor:
+        position = decode_browse_cursor(sort, cursor)
+        if position is None:
+            return error_response(400, 'VALIDATION_ERROR', 'cursor is invalid')
+        value, listing_id = position
+        if descending:
+            query = query.filter(or_(
+                column < value,
+                and_(column == value, ListingView.listingId < listing_id),
+            ))
+        else:
+            query = query.filter(or_(
+                column > value,
+                and_(column == value, ListingView.listingId > listing_id),
+            ))
+    rows = query.order_by(*order).limit(limit + 1).all()
+    views = rows[:limit]
+    return jsonify({
+        'listings': [view.to_dict() for view in views],
+        'pagination': {
+            'limit': limit,
+            'nextCursor': encode_browse_cursor(sort, views[-1]) if len(rows) > limit else None,
         },
     }), 200
 
@@ -226,7 +555,11 @@ def update_listing(listing_id):
           properties:
             status:
               type: string
-              enum: [active, completed, cancelled]
+              enum: [active, pending_transfer, completed, cancelled]
+            fromStatus:
+              type: string
+              enum: [active, pending_transfer, completed, cancelled]
+              description: Only apply the update if the listing is currently in this status
     responses:
       200:
         description: Updated listing
@@ -236,6 +569,8 @@ def update_listing(listing_id):
         description: Invalid status or unsupported fields
       404:
         description: Listing not found
+      409:
+        description: Listing is not in fromStatus
     """
     data = request.get_json(silent=True)
     if not data:
@@ -255,7 +590,168 @@ def update_listing(listing_id):
     if data['status'] not in ALLOWED_STATUSES:
         return error_response(400, 'VALIDATION_ERROR', 'Invalid status value')
 
+    if 'fromStatus' in data:
+        if data['fromStatus'] not in ALLOWED_STATUSES:
+            return error_response(400, 'VALIDATION_ERROR', 'Invalid fromStatus value')
+        updated = transition_status(listing_id, data['fromStatus'], data['status'])
+        if updated is None:
+            db.session.rollback()
+            return error_response(409, 'LISTING_STATUS_CONFLICT', f"Listing is not {data['fromStatus']}")
+        db.session.commit()
+        return jsonify(updated.to_dict()), 200
+
     listing.status = data['status']
+    sync_listing(listing)
+    db.session.commit()
+
+    return jsonify(listing.to_dict()), 200
+
+
+@bp.post('/listings/<listing_id>/claim')
+def claim_listing(listing_id):
+    """
+    Claim an active listing for a transfer
+    ---
+    tags:
+      - Listings
+    description: >
+      Atomically moves the listing from active to pending_transfer. Exactly one
+      concurrent caller succeeds; the rest get 409 and should stop before doing
+      any further work.
+    parameters:
+      - in: path
+        name: listing_id
+        type: string
+        required: true
+    responses:
+      200:
+        description: Listing claimed
+        schema:
+          $ref: '#/definitions/Listing'
+      404:
+        description: Listing not found
+      409:
+        description: Listing is not active
+    """
+    listing = transition_status(listing_id, 'active', 'pending_transfer')
+    if listing is None:
+        db.session.rollback()
+        if not db.session.get(Listing, listing_id):
+            return error_response(404, 'LISTING_NOT_FOUND', 'Listing not found')
+        return error_response(409, 'LISTING_UNAVAILABLE', 'Listing is no longer available')
     db.session.commit()
+    return jsonify(listing.to_dict()), 200
+
 
+@bp.post('/listings/<listing_id>/release')
+def release_listing(listing_id):
+    """
+    Release a claimed listing back to active
+    ---
+    tags:
+      - Listings
+    description: >
+      Called when the claiming transfer is cancelled, rejected, fails or times
+      out. Only a pending_transfer listing is released, so a completed or
+      cancelled listing is never reopened.
+    parameters:
+      - in: path
+        name: listing_id
+        type: string
+        required: true
+    responses:
+      200:
+        description: Listing active again
+        schema:
+          $ref: '#/definitions/Listing'
+      404:
+        description: Listing not found
+      409:
+        description: Listing is not pending_transfer
+    """
+    listing = transition_status(listing_id, 'pending_transfer', 'active')
+    if listing is None:
+        db.session.rollback()
+        if not db.session.get(Listing, listing_id):
+            return error_response(404, 'LISTING_NOT_FOUND', 'Listing not found')
+        return error_response(409, 'LISTING_NOT_CLAIMED', 'Listing is not pending a transfer')
+    db.session.commit()
     return jsonify(listing.to_dict()), 200
+
+
+@bp.get('/listings/<listing_id>/view')
+def get_listing_view(listing_id):
+    """
+    Get the read-model row for a listing
+    ---
+    tags:
+      - Listings
+    parameters:
+      - in: path
+        name: listing_id
+        type: string
+        required: true
+    responses:
+      200:
+        description: Listing view
+        schema:
+          $ref: '#/definitions/ListingView'
+      404:
+        description: Listing not found
+    """
+    view = db.session.get(ListingView, listing_id)
+    if not view:
+        return error_response(404, 'LISTING_NOT_FOUND', 'Listing not found')
+    return jsonify(view.to_dict()), 200
+
+
+@bp.put('/listings/<listing_id>/view')
+def put_listing_view(listing_id):
+    """
+    Set the read-model snapshot for a listing
+    ---
+    tags:
+      - Listings
+    description: >
+      Used to backfill listings created before the read model existed, or whose
+      snapshot was incomplete. Listing columns always come from the listing itself.
+      Every call stamps snapshotAttemptedAt, even when the body fills nothing in.
+    parameters:
+      - in: path
+        name: listing_id
+        type: string
+        required: true
+      - in: body
+        name: body
+        required: true
+        schema:
+          type: object
+          properties:
+            sellerName:
+              type: string
+            event:
+              $ref: '#/definitions/ListingEventSnapshot'
+            seat:
+              $ref: '#/definitions/ListingSeatSnapshot'
+    responses:
+      200:
+        description: Updated listing view
+        schema:
+          $ref: '#/definitions/ListingView'
+      400:
+        description: Request body is required
+      404:
+        description: Listing not found
+    """
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict):
+        return error_response(400, 'VALIDATION_ERROR', 'Request body is required')
+
+    listing = db.session.get(Listing, listing_id)
+    if not listing:
+        return error_response(404, 'LISTING_NOT_FOUND', 'Listing not found')
+
+    view = sync_listing(listing, data)
+    view.snapshotAttemptedAt = datetime.now(UTC)
+    db.session.commit()
+    return jsonify(view.to_dict()), 200
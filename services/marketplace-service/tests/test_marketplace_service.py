@@ -123,3 +123,221 @@ def test_listings_reject_invalid_limit(client):
 
     assert response.status_code == 400
     assert response.get_json()['error']['code'] == 'VALIDATION_ERROR'
+
+
+def test_listings_filter_by_event_and_price(client):
+    client.post('/listings', json={'ticketId': 't-1', 'sellerId': 's-1', 'price': 50, 'eventId': 'evt-1'})
+    client.post('/listings', json={'ticketId': 't-2', 'sellerId': 's-1', 'price': 150, 'eventId': 'evt-1'})
+    client.post('/listings', json={'ticketId': 't-3', 'sellerId': 's-1', 'price': 60, 'eventId': 'evt-2'})
+
+    response = client.get('/listings?eventId=evt-1&maxPrice=100')
+
+    assert response.status_code == 200
+    payload = response.get_json()
+    assert payload['pagination']['total'] == 1
+    assert [listing['ticketId'] for listing in payload['listings']] == ['t-1']
+    assert payload['listings'][0]['eventId'] == 'evt-1'
+
+
+def test_backfill_listing_event_ids_restores_event_filter(app, client):
+    from backfill import backfill_listing_event_ids
+
+    create_listing(client, ticket_id='t-old')
+    create_listing(client, ticket_id='t-gone')
+    assert client.get('/listings?eventId=evt-1').get_json()['listings'] == []
+
+    tickets = {'t-old': {'ticketId': 't-old', 'eventId': 'evt-1'}}
+    updated, unresolved = backfill_listing_event_ids(fetch=tickets.get, batch_size=1)
+
+    assert (updated, unresolved) == (1, 1)
+    listings = client.get('/listings?eventId=evt-1').get_json()['listings']
+    assert [listing['ticketId'] for listing in listings] == ['t-old']
+    # Resolved and unresolved rows alike are skipped by the next run
+    assert backfill_listing_event_ids(fetch=tickets.get) == (0, 0)
+    tickets['t-gone'] = {'ticketId': 't-gone', 'eventId': 'evt-2'}
+    assert backfill_listing_event_ids(fetch=tickets.get, retry_unresolved=True) == (1, 0)
+
+
+def test_listings_keyset_pagination(client):
+    for index in range(5):
+        create_listing(client, ticket_id=f'ticket-{index}')
+
+    seen = []
+    cursor = ''
+    while cursor is not None:
+        response = client.get('/listings', query_string={'limit': 2, 'cursor': cursor})
+        assert response.status_code == 200
+        payload = response.get_json()
+        assert 'total' not in payload['pagination']
+        seen.extend(listing['ticketId'] for listing in payload['listings'])
+        cursor = payload['pagination']['nextCursor']
+
+    assert seen == [f'ticket-{index}' for index in reversed(range(5))]
+
+
+def test_listings_reject_invalid_cursor(client):
+    response = client.get('/listings?cursor=not-a-cursor')
+
+    assert response.status_code == 400
+    assert response.get_json()['error']['code'] == 'VALIDATION_ERROR'
+
+
+def create_listing_with_snapshot(client, ticket_id, price, event_type='concert', event_date='2026-12-01T20:00:00', seller_id='seller-1'):
+    return client.post(
+        '/listings',
+        json={
+            'ticketId': ticket_id,
+            'sellerId': seller_id,
+            'eventId': f'event-{event_type}',
+            'price': price,
+            'sellerName': 'alice',
+            'event': {'eventId': f'event-{event_type}', 'name': 'Show', 'date': event_date, 'type': event_type},
+            'seat': {'inventoryId': f'inv-{ticket_id}', 'seatId': f'seat-{ticket_id}', 'rowNumber': 'A', 'seatNumber': '1'},
+        },
+    ).get_json()
+
+
+def test_browse_returns_denormalized_rows(client):
+    created = create_listing_with_snapshot(client, 'ticket-1', 80)
+
+    response = client.get('/listings/browse')
+
+    assert response.status_code == 200
+    payload = response.get_json()
+    assert payload['pagination'] == {'page': 1, 'limit': 20, 'total': 1}
+    listing = payload['listings'][0]
+    assert listing['listingId'] == created['listingId']
+    assert listing['sellerName'] == 'alice'
+    assert listing['event']['name'] == 'Show'
+    assert listing['event']['date'] == '2026-12-01T20:00:00'
+    assert listing['seat']['seatId'] == 'seat-ticket-1'
+
+
+def test_browse_sorts_by_price_and_filters_event_type(client):
+    create_listing_with_snapshot(client, 'ticket-1', 80)
+    create_listing_with_snapshot(client, 'ticket-2', 40)
+    create_listing_with_snapshot(client, 'ticket-3', 60)
+    create_listing_with_snapshot(client, 'ticket-4', 10, event_type='sports')
+
+    first = client.get('/listings/browse?sort=price_asc&eventType=concert&limit=2&cursor=').get_json()
+    assert [l['price'] for l in first['listings']] == [40, 60]
+    second = client.get(
+        f"/listings/browse?sort=price_asc&eventType=concert&limit=2&cursor={first['pagination']['nextCursor']}"
+    ).get_json()
+    assert [l['price'] for l in second['listings']] == [80]
+    assert second['pagination']['nextCursor'] is None
+
+
+def test_browse_rejects_cursor_from_another_sort(client):
+    create_listing_with_snapshot(client, 'ticket-1', 80)
+    create_listing_with_snapshot(client, 'ticket-2', 40)
+    cursor = client.get('/listings/browse?limit=1&cursor=').get_json()['pagination']['nextCursor']
+
+    response = client.get(f'/listings/browse?sort=price_desc&cursor={cursor}')
+
+    assert response.status_code == 400
+    assert client.get('/listings/browse?sort=cheapest').status_code == 400
+
+
+def test_browse_hides_listings_once_status_changes(client):
+    created = create_listing_with_snapshot(client, 'ticket-1', 80)
+    client.patch(f"/listings/{created['listingId']}", json={'status': 'completed'})
+
+    assert client.get('/listings/browse').get_json()['listings'] == []
+
+
+def test_put_listing_view_backfills_snapshot(client):
+    created = create_listing(client).get_json()
+    assert client.get(f"/listings/{created['listingId']}/view").get_json()['snapshotAttemptedAt'] is None
+
+    response = client.put(
+        f"/listings/{created['listingId']}/view",
+        json={'sellerName': 'bob', 'event': {'eventId': 'event-9', 'name': 'Gala', 'date': '2026-11-01T19:00:00+00:00'}},
+    )
+
+    assert response.status_code == 200
+    payload = response.get_json()
+    assert payload['sellerName'] == 'bob'
+    assert payload['event']['eventId'] == 'event-9'
+    assert payload['snapshotAttemptedAt'] is not None
+    assert client.get(f"/listings/{created['listingId']}/view").get_json() == payload
+    assert client.put('/listings/missing/view', json={}).status_code == 404
+
+
+def test_put_listing_view_records_attempt_with_nothing_to_fill(client):
+    created = create_listing(client).get_json()
+
+    response = client.put(f"/listings/{created['listingId']}/view", json={})
+
+    assert response.status_code == 200
+    payload = response.get_json()
+    assert payload['event'] is None
+    assert payload['snapshotAttemptedAt'] is not None
+
+
+def test_apply_change_refreshes_listing_views(app, client):
+    from projection import apply_change
+
+    create_listing_with_snapshot(client, 'ticket-1', 80)
+
+    assert apply_change({'entity': 'event', 'action': 'updated', 'id': 'event-concert',
+                         'data': {'name': 'Renamed Show', 'date': '2026-12-02T20:00:00Z'}}) == 1
+    assert apply_change({'entity': 'user', 'action': 'updated', 'id': 'seller-1',
+                         'data': {'email': 'alice.new@example.com'}}) == 1
+    assert apply_change({'entity': 'event', 'action': 'updated', 'id': 'unknown', 'data': {}}) == 0
+
+    listing = client.get('/listings/browse').get_json()['listings'][0]
+    assert listing['event']['name'] == 'Renamed Show'
+    assert listing['event']['date'] == '2026-12-02T20:00:00'
+    assert listing['sellerName'] == 'alice.new'
+
+
+def test_claim_listing_succeeds_once(client):
+    created = create_listing(client).get_json()
+
+    first = client.post(f"/listings/{created['listingId']}/claim")
+    second = client.post(f"/listings/{created['listingId']}/claim")
+
+    assert first.status_code == 200
+    assert first.get_json()['status'] == 'pending_transfer'
+    assert second.status_code == 409
+    assert second.get_json()['error']['code'] == 'LISTING_UNAVAILABLE'
+    # A claimed listing drops out of browse
+    assert client.get('/listings').get_json()['listings'] == []
+    assert client.get('/listings/browse').get_json()['listings'] == []
+
+
+def test_claim_missing_listing_returns_404(client):
+    response = client.post('/listings/missing/claim')
+
+    assert response.status_code == 404
+    assert response.get_json()['error']['code'] == 'LISTING_NOT_FOUND'
+
+
+def test_release_only_reopens_claimed_listing(client):
+    created = create_listing(client).get_json()
+    listing_id = created['listingId']
+
+    assert client.post(f'/listings/{listing_id}/release').status_code == 409
+    client.post(f'/listings/{listing_id}/claim')
+
+    response = client.post(f'/listings/{listing_id}/release')
+
+    assert response.status_code == 200
+    assert response.get_json()['status'] == 'active'
+    assert len(client.get('/listings/browse').get_json()['listings']) == 1
+
+    client.patch(f'/listings/{listing_id}', json={'status': 'completed'})
+    assert client.post(f'/listings/{listing_id}/release').status_code == 409
+
+
+def test_patch_listing_with_from_status_is_conditional(client):
+    created = create_listing(client).get_json()
+    listing_id = created['listingId']
+    client.post(f'/listings/{listing_id}/claim')
+
+    response = client.patch(f'/listings/{listing_id}', json={'status': 'cancelled', 'fromStatus': 'active'})
+
+    assert response.status_code == 409
+    assert response.get_json()['error']['code'] == 'LISTING_STATUS_CONFLICT'
+    assert client.get(f'/listings/{listing_id}').get_json()['status'] == 'pending_transfer'
@@ -65,6 +65,7 @@ EVENT_CHANNELS = {
     'purchase_update': 'notifications:purchase_update',
     'user_update': 'notifications:user_update',
     'event_update': 'notifications:event_update',
+    'checkin_update': 'notifications:checkin_update',
 }
 
 
@@ -185,7 +186,7 @@ def broadcast():
           properties:
             type:
               type: string
-              enum: [seat_update, ticket_update, transfer_update, purchase_update, user_update, event_update]
+              enum: [seat_update, ticket_update, transfer_update, purchase_update, user_update, event_update, checkin_update]
             payload:
               type: object
               description: Arbitrary payload to broadcast
@@ -1,5 +1,6 @@
 import json
 import os
+import sys
 import traceback
 import uuid
 from datetime import datetime, timezone
@@ -12,6 +13,9 @@ from werkzeug.exceptions import HTTPException
 
 load_dotenv()
 
+# Add shared directory to path for imports
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..', 'shared'))
+
 
 def _http_error_code(status_code):
     try:
@@ -130,7 +134,7 @@ def create_app(test_config=None):
 
     Swagger(app, template={
         "info": {"title": "OTP Wrapper Service", "version": "1.0.0"},
-        "tags": [{"name": "Health"}, {"name": "OTP"}],
+        "tags": [{"name": "Health"}, {"name": "OTP"}, {"name": "Internal"}],
     })
 
     return app
@@ -2,10 +2,12 @@ from urllib.parse import urljoin
 import logging
 import os
 
-import redis
 import requests
 from flask import Blueprint, current_app, jsonify, request
 
+from outbound_governor import GovernorSaturated, all_stats, governor
+from rate_limiter import RateLimiter
+
 bp = Blueprint('otp_wrapper', __name__)
 logger = logging.getLogger(__name__)
 
@@ -30,79 +32,30 @@ RATE_LIMIT_LOCKOUT_SECONDS = int(os.environ.get('OTP_RATE_LIMIT_LOCKOUT_SECONDS'
 REDIS_URL = os.environ.get('REDIS_URL', 'redis://redis:6379/0')
 
 
-def _get_redis_client():
-    """Get Redis client for rate limiting."""
-    try:
-        client = redis.from_url(
-            REDIS_URL,
-            decode_responses=True,
-            socket_connect_timeout=2,
-            socket_timeout=2,
-        )
-        client.ping()
-        return client
-    except Exception as exc:
-        logger.warning("Redis unavailable for rate limiting: %s", exc)
-        return None
-
-
-def _check_rate_limit(phone_number, ip_address=None):
-    """
-    Check if OTP verification attempts are within rate limits.
-    Returns (allowed, attempts, lock_remaining) tuple.
-    """
-    client = _get_redis_client()
-    if client is None:
-        # Redis unavailable, allow but log
-        return True, 0, 0
-    
-    # Check phone number rate limit
-    phone_key = f"otp:rate:{phone_number}"
-    lock_key = f"otp:lock:{phone_number}"
-    
-    # Check if account is locked
-    is_locked = client.get(lock_key)
-    if is_locked:
-        ttl = client.ttl(lock_key)
-        return False, RATE_LIMIT_ATTEMPTS, ttl
-    
-    # Get current attempt count
-    attempts = client.get(phone_key)
-    attempts = int(attempts) if attempts else 0
-    
-    if attempts >= RATE_LIMIT_ATTEMPTS:
-        # Lock the account
-        client.setex(lock_key, RATE_LIMIT_LOCKOUT_SECONDS, "1")
-        return False, attempts, RATE_LIMIT_LOCKOUT_SECONDS
-    
-    return True, attempts, 0
+otp_limiter = RateLimiter(
+    'otp',
+    limit=RATE_LIMIT_ATTEMPTS,
+    window_seconds=RATE_LIMIT_WINDOW_SECONDS,
+    lockout_seconds=RATE_LIMIT_LOCKOUT_SECONDS,
+    redis_url=REDIS_URL,
+)
 
 
-def _increment_attempt(phone_number):
-    """Increment OTP attempt counter."""
-    client = _get_redis_client()
-    if client is None:
-        return 0
-    
-    phone_key = f"otp:rate:{phone_number}"
-    # Increment and set expiry if new key
-    pipe = client.pipeline()
-    pipe.incr(phone_key)
-    pipe.expire(phone_key, RATE_LIMIT_WINDOW_SECONDS)
-    pipe.execute()
-    
-    return int(client.get(phone_key) or 0)
+# SMU is slow under load; cap how many workers can be waiting on it at once
+smu = governor('smu', max_concurrent=4, rate_per_second=10, queue_timeout_seconds=2)
 
 
-def _reset_attempts(phone_number):
-    """Reset OTP attempt counter on successful verification."""
-    client = _get_redis_client()
-    if client is None:
-        return
-    
-    phone_key = f"otp:rate:{phone_number}"
-    lock_key = f"otp:lock:{phone_number}"
-    client.delete(phone_key, lock_key)
+def provider_busy_response(exc):
+    logger.warning("Rejecting OTP request: %s", exc)
+    response, status_code = error_response(503, 'OTP_PROVIDER_BUSY', 'OTP provider is busy. Try again shortly.')
+    response.headers['Retry-After'] = '1'
+    return response, status_code
+
+
+def rate_limited_response(message, retry_after):
+    response, status_code = error_response(429, 'OTP_RATE_LIMIT_EXCEEDED', message)
+    response.headers['Retry-After'] = str(retry_after)
+    return response, status_code
 
 
 @bp.get('/health')
@@ -125,6 +78,20 @@ def health_check():
     return jsonify({'status': 'ok'}), 200
 
 
+@bp.get('/stats')
+def stats():
+    """
+    Outbound call saturation
+    ---
+    tags:
+      - Internal
+    responses:
+      200:
+        description: Per-dependency in-flight, queued and rejected call counts
+    """
+    return jsonify({'outbound': all_stats()}), 200
+
+
 @bp.post('/otp/send')
 def send_otp():
     """
@@ -159,20 +126,25 @@ def send_otp():
         description: Rate limit exceeded (5 attempts per 15 minutes)
       502:
         description: Upstream SMU API error
+      503:
+        description: SMU is saturated — retry after the Retry-After header
     """
     data = request.get_json(silent=True)
     if not data or 'phoneNumber' not in data:
         return error_response(400, 'VALIDATION_ERROR', 'Missing required field: phoneNumber')
 
     try:
-        response = requests.post(
-            build_smu_url('/SendOTP'),
-            headers=smu_headers(),
-            json={'Mobile': data['phoneNumber']},
-            timeout=10,
-        )
+        with smu.slot():
+            response = requests.post(
+                build_smu_url('/SendOTP'),
+                headers=smu_headers(),
+                json={'Mobile': data['phoneNumber']},
+                timeout=10,
+            )
         response.raise_for_status()
         payload = response.json()
+    except GovernorSaturated as exc:
+        return provider_busy_response(exc)
     except (requests.RequestException, ValueError) as exc:
         return error_response(502, 'OTP_SEND_FAILED', str(exc))
 
@@ -230,6 +202,8 @@ def verify_otp():
         description: Rate limit exceeded
       502:
         description: Upstream SMU API error
+      503:
+        description: SMU is saturated — retry after the Retry-After header
     """
     data = request.get_json(silent=True)
     if not data or 'sid' not in data or 'otp' not in data:
@@ -237,36 +211,39 @@ def verify_otp():
     
     # Extract phone number for rate limiting (from request headers or data)
     phone_number = data.get('phoneNumber', request.headers.get('X-Phone-Number', 'unknown'))
-    ip_address = request.remote_addr
-    
-    # Check rate limit
-    allowed, attempts, lock_remaining = _check_rate_limit(phone_number, ip_address)
-    if not allowed:
-        if lock_remaining > 0:
-            return error_response(429, 'OTP_RATE_LIMIT_EXCEEDED', 
-                                f'Account locked. Try again in {lock_remaining} seconds.')
-        else:
-            return error_response(429, 'OTP_RATE_LIMIT_EXCEEDED',
-                                f'Rate limit exceeded. {RATE_LIMIT_ATTEMPTS - attempts} attempts remaining.')
 
     try:
-        response = requests.post(
-            build_smu_url('/VerifyOTP'),
-            headers=smu_headers(),
-            json={'VerificationSid': data['sid'], 'Code': data['otp']},
-            timeout=10,
-        )
+        # The SMU slot is taken first so a saturated provider does not cost
+        # the user an attempt. Every attempt is then counted before it reaches
+        # SMU, so concurrent guesses cannot slip past the limit; a successful
+        # verification clears the count.
+        with smu.slot():
+            decision = otp_limiter.hit(phone_number)
+            if not decision.allowed:
+                return rate_limited_response(
+                    f'Too many attempts. Try again in {decision.retry_after} seconds.',
+                    decision.retry_after,
+                )
+
+            response = requests.post(
+                build_smu_url('/VerifyOTP'),
+                headers=smu_headers(),
+                json={'VerificationSid': data['sid'], 'Code': data['otp']},
+                timeout=10,
+            )
         if response.status_code == 400:
-            # Invalid OTP - increment attempt counter
-            new_attempts = _increment_attempt(phone_number)
-            
-            if new_attempts >= RATE_LIMIT_ATTEMPTS:
-                return error_response(429, 'OTP_RATE_LIMIT_EXCEEDED',
-                                    f'Maximum attempts reached. Account locked for {RATE_LIMIT_LOCKOUT_SECONDS} seconds.')
-            
+            # Invalid OTP - that was the last attempt in this window
+            if decision.remaining == 0:
+                return rate_limited_response(
+                    f'Maximum attempts reached. Account locked for {RATE_LIMIT_LOCKOUT_SECONDS} seconds.',
+                    RATE_LIMIT_LOCKOUT_SECONDS,
+                )
+
             return jsonify({'verified': False}), 200
         response.raise_for_status()
         payload = response.json()
+    except GovernorSaturated as exc:
+        return provider_busy_response(exc)
     except (requests.RequestException, ValueError) as exc:
         return error_response(502, 'OTP_VERIFY_FAILED', str(exc))
 
@@ -282,6 +259,6 @@ def verify_otp():
 
     if verified:
         # Success - reset attempt counter
-        _reset_attempts(phone_number)
+        otp_limiter.reset(phone_number)
 
     return jsonify({'verified': bool(verified)}), 200
@@ -137,3 +137,143 @@ def test_verify_otp_upstream_failure(client, monkeypatch):
     assert response.status_code == 502
     payload = response.get_json()
     assert payload['error']['code'] == 'OTP_VERIFY_FAILED'
+
+
+class FakeLimiter:
+    def __init__(self, decision):
+        self.decision = decision
+        self.hits = []
+        self.resets = []
+
+    def hit(self, key, cost=1):
+        self.hits.append(key)
+        return self.decision
+
+    def reset(self, key):
+        self.resets.append(key)
+
+
+def test_verify_otp_denied_by_rate_limit(client, monkeypatch):
+    from rate_limiter import Decision
+
+    limiter = FakeLimiter(Decision(False, 0, 900, 5))
+    monkeypatch.setattr('routes.otp_limiter', limiter)
+
+    def fake_post(*args, **kwargs):
+        raise AssertionError('SMU must not be called once the limit is hit')
+
+    monkeypatch.setattr('routes.requests.post', fake_post)
+
+    response = client.post(
+        '/otp/verify', json={'sid': 'sid_123', 'otp': '000000', 'phoneNumber': '+6591234567'}
+    )
+
+    assert response.status_code == 429
+    assert response.headers['Retry-After'] == '900'
+    assert response.get_json()['error']['code'] == 'OTP_RATE_LIMIT_EXCEEDED'
+    assert limiter.hits == ['+6591234567']
+
+
+def test_verify_otp_last_failed_attempt_locks(client, monkeypatch):
+    from rate_limiter import Decision
+
+    limiter = FakeLimiter(Decision(True, 0, 0, 5))
+    monkeypatch.setattr('routes.otp_limiter', limiter)
+    monkeypatch.setattr(
+        'routes.requests.post',
+        lambda *args, **kwargs: FakeResponse({'Errors': ['invalid code']}, status_code=400),
+    )
+
+    response = client.post(
+        '/otp/verify', json={'sid': 'sid_123', 'otp': '000000', 'phoneNumber': '+6591234567'}
+    )
+
+    assert response.status_code == 429
+    assert 'Maximum attempts reached' in response.get_json()['error']['message']
+    assert limiter.resets == []
+
+
+def test_verify_otp_success_resets_attempts(client, monkeypatch):
+    from rate_limiter import Decision
+
+    limiter = FakeLimiter(Decision(True, 3, 0, 2))
+    monkeypatch.setattr('routes.otp_limiter', limiter)
+    monkeypatch.setattr('routes.requests.post', lambda *args, **kwargs: FakeResponse({'Success': True}))
+
+    response = client.post(
+        '/otp/verify', json={'sid': 'sid_123', 'otp': '123456', 'phoneNumber': '+6591234567'}
+    )
+
+    assert response.get_json() == {'verified': True}
+    assert limiter.resets == ['+6591234567']
+
+
+def test_verify_otp_fails_fast_when_smu_saturated(client, monkeypatch):
+    from outbound_governor import OutboundGovernor
+    from rate_limiter import Decision
+
+    busy = OutboundGovernor('smu', max_concurrent=1, queue_timeout_seconds=0)
+    busy.acquire()
+    limiter = FakeLimiter(Decision(True, 4, 0, 1))
+    monkeypatch.setattr('routes.smu', busy)
+    monkeypatch.setattr('routes.otp_limiter', limiter)
+
+    response = client.post(
+        '/otp/verify', json={'sid': 'sid_123', 'otp': '000000', 'phoneNumber': '+6591234567'}
+    )
+
+    assert response.status_code == 503
+    assert response.headers['Retry-After'] == '1'
+    assert response.get_json()['error']['code'] == 'OTP_PROVIDER_BUSY'
+    assert limiter.hits == []
+    assert busy.stats()['rejectedTimeout'] == 1
+
+
+def test_stats_reports_outbound_saturation(client):
+    response = client.get('/stats')
+
+    assert response.status_code == 200
+    smu = response.get_json()['outbound']['smu']
+    assert smu['maxConcurrent'] == 4
+    assert {'inFlight', 'waiting', 'rejectRatio', 'saturation'} <= smu.keys()
+
+
+def test_concurrent_sends_beyond_smu_cap_fail_fast(app, monkeypatch):
+    """Threads past max_concurrent + queue are turned away while SMU is slow."""
+    import threading
+    import time
+    from concurrent.futures import ThreadPoolExecutor
+
+    from outbound_governor import OutboundGovernor
+
+    release = threading.Event()
+    lock = threading.Lock()
+    calls = {'inFlight': 0, 'peak': 0}
+
+    def slow_post(*args, **kwargs):
+        with lock:
+            calls['inFlight'] += 1
+            calls['peak'] = max(calls['peak'], calls['inFlight'])
+        release.wait(5)
+        with lock:
+            calls['inFlight'] -= 1
+        return FakeResponse({'VerificationSid': 'sid_123'})
+
+    smu = OutboundGovernor('smu', max_concurrent=2, max_queue=1, queue_timeout_seconds=5)
+    monkeypatch.setattr('routes.smu', smu)
+    monkeypatch.setattr('routes.requests.post', slow_post)
+
+    def send():
+        return app.test_client().post('/otp/send', json={'phoneNumber': '+6591234567'})
+
+    with ThreadPoolExecutor(max_workers=6) as request_threads:
+        futures = [request_threads.submit(send) for _ in range(6)]
+        # 2 calls in flight, 1 queued; the other 3 are refused without waiting
+        deadline = time.monotonic() + 5
+        while smu.stats()['rejectedQueueFull'] < 3 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        release.set()
+        statuses = sorted(future.result(timeout=5).status_code for future in futures)
+
+    assert statuses == [200, 200, 200, 503, 503, 503]
+    assert calls['peak'] == 2
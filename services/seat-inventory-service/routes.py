@@ -111,6 +111,33 @@ def get_my_hold(event_id):
     return jsonify({'data': hold.to_dict(include_internal=True)}), 200
 
 
+@bp.get('/inventory/<inventory_id>')
+def get_inventory_item(inventory_id):
+    """
+    Get a single seat inventory record
+    ---
+    tags:
+      - Inventory
+    parameters:
+      - in: path
+        name: inventory_id
+        type: string
+        required: true
+    responses:
+      200:
+        description: Seat inventory record
+        schema:
+          $ref: '#/definitions/SeatInventory'
+      404:
+        description: Inventory record not found
+    """
+    item = db.session.get(SeatInventory, inventory_id)
+    if not item:
+        return jsonify({'error': {'code': 'NOT_FOUND', 'message': 'Inventory record not found.'}}), 404
+
+    return jsonify(item.to_dict(include_internal=False)), 200
+
+
 
 def create_inventory_batch():
     """
@@ -24,6 +24,25 @@ def test_list_inventory_by_event(client, seeded_inventory):
     assert payload['inventory'][0]['seatId'] == 'A1'
 
 
+def test_get_inventory_item(client, seeded_inventory):
+    inventory_id, _ = seeded_inventory
+
+    response = client.get(f'/inventory/{inventory_id}')
+
+    assert response.status_code == 200
+    payload = response.get_json()
+    assert payload['inventoryId'] == inventory_id
+    assert payload['seatId'] == 'A1'
+    assert 'holdToken' not in payload
+
+
+def test_get_inventory_item_not_found(client):
+    response = client.get('/inventory/missing')
+
+    assert response.status_code == 404
+    assert response.get_json()['error']['code'] == 'NOT_FOUND'
+
+
 def test_create_inventory_batch(client):
     response = client.post(
         '/inventory/batch',
@@ -1,5 +1,6 @@
 from flask import Blueprint, jsonify
 
+from app import db
 from models import Seat
 
 bp = Blueprint('seats', __name__)
@@ -68,3 +69,29 @@ def list_seats_for_venue(venue_id):
         .all()
     )
     return jsonify({'seats': [seat.to_dict() for seat in seats]}), 200
+
+
+@bp.get('/seats/<seat_id>')
+def get_seat(seat_id):
+    """
+    Get a single seat
+    ---
+    tags:
+      - Seats
+    parameters:
+      - in: path
+        name: seat_id
+        type: string
+        required: true
+    responses:
+      200:
+        description: Seat
+        schema:
+          $ref: '#/definitions/Seat'
+      404:
+        description: Seat not found
+    """
+    seat = db.session.get(Seat, seat_id)
+    if not seat:
+        return jsonify({'error': {'code': 'SEAT_NOT_FOUND', 'message': 'Seat not found.'}}), 404
+    return jsonify(seat.to_dict()), 200
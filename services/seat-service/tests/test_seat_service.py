@@ -59,3 +59,25 @@ def test_get_seats_for_venue_orders_by_row_then_seat_number(client, app):
         ('B', 'B1'),
         ('C', 'C2'),
     ]
+
+
+def test_get_seat_returns_single_seat(client, app):
+    with app.app_context():
+        seat = Seat(venueId='ven_001', seatNumber='A1', rowNumber='A')
+        db.session.add(seat)
+        db.session.commit()
+        seat_id = seat.seatId
+
+    response = client.get(f'/seats/{seat_id}')
+
+    assert response.status_code == 200
+    payload = response.get_json()
+    assert payload['seatId'] == seat_id
+    assert (payload['rowNumber'], payload['seatNumber']) == ('A', 'A1')
+
+
+def test_get_seat_not_found(client):
+    response = client.get('/seats/missing')
+
+    assert response.status_code == 404
+    assert response.get_json()['error']['code'] == 'SEAT_NOT_FOUND'
@@ -1,5 +1,6 @@
 import json
 import os
+import sys
 import traceback
 import uuid
 from datetime import datetime, timezone
@@ -12,6 +13,9 @@ from werkzeug.exceptions import HTTPException
 
 load_dotenv()
 
+# Add shared directory to path for imports
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..', 'shared'))
+
 
 def _http_error_code(status_code):
     try:
@@ -118,6 +122,11 @@ def create_app(test_config=None):
             raise RuntimeError("STRIPE_WEBHOOK_SECRET must be set for stripe-wrapper.")
         app.config["STRIPE_WEBHOOK_SECRET"] = stripe_webhook_secret
 
+    # Point the SDK at a stand-in (scripts/outbound_standin.py) for load tests
+    if os.getenv("STRIPE_API_BASE"):
+        import stripe
+        stripe.api_base = os.getenv("STRIPE_API_BASE")
+
     from routes import bp as stripe_wrapper_bp
 
     app.register_blueprint(stripe_wrapper_bp)
@@ -129,7 +138,7 @@ def create_app(test_config=None):
 
     Swagger(app, template={
         "info": {"title": "Stripe Wrapper Service", "version": "1.0.0"},
-        "tags": [{"name": "Health"}, {"name": "Payments"}, {"name": "Webhooks"}],
+        "tags": [{"name": "Health"}, {"name": "Payments"}, {"name": "Webhooks"}, {"name": "Internal"}],
     })
 
     return app
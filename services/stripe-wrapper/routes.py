@@ -1,13 +1,28 @@
+import logging
+
 from flask import Blueprint, current_app, jsonify, request
 import stripe
 
+from outbound_governor import GovernorSaturated, all_stats, governor
+
 bp = Blueprint('stripe_wrapper', __name__)
+logger = logging.getLogger(__name__)
+
+# Stripe allows ~100 live requests/s per account; keep well under it per worker
+stripe_api = governor('stripe', max_concurrent=8, rate_per_second=25, queue_timeout_seconds=2)
 
 
 def _validation_error(message):
     return jsonify({'error': {'code': 'VALIDATION_ERROR', 'message': message}}), 400
 
 
+def _provider_busy(exc):
+    logger.warning("Rejecting Stripe request: %s", exc)
+    response = jsonify({'error': {'code': 'PAYMENT_PROVIDER_BUSY', 'message': 'Payment provider is busy. Try again shortly.'}})
+    response.headers['Retry-After'] = '1'
+    return response, 503
+
+
 @bp.get('/health')
 def health():
     """
@@ -28,6 +43,20 @@ def health():
     return jsonify({'status': 'ok'}), 200
 
 
+@bp.get('/stats')
+def stats():
+    """
+    Outbound call saturation
+    ---
+    tags:
+      - Internal
+    responses:
+      200:
+        description: Per-dependency in-flight, queued and rejected call counts
+    """
+    return jsonify({'outbound': all_stats()}), 200
+
+
 @bp.post('/stripe/create-payment-intent')
 def create_payment_intent():
     """
@@ -66,6 +95,8 @@ def create_payment_intent():
               description: Credits being purchased
       400:
         description: Missing or invalid fields
+      503:
+        description: Stripe is saturated — retry after the Retry-After header
     """
     payload = request.get_json(silent=True) or {}
     amount = payload.get('amount')
@@ -78,14 +109,18 @@ def create_payment_intent():
         return _validation_error('amount must be a positive integer.')
 
     stripe.api_key = current_app.config['STRIPE_SECRET_KEY']
-    intent = stripe.PaymentIntent.create(
-        amount=amount * 100,
-        currency='sgd',
-        metadata={
-            'userId': str(user_id),
-            'credits': str(amount),
-        },
-    )
+    try:
+        with stripe_api.slot():
+            intent = stripe.PaymentIntent.create(
+                amount=amount * 100,
+                currency='sgd',
+                metadata={
+                    'userId': str(user_id),
+                    'credits': str(amount),
+                },
+            )
+    except GovernorSaturated as exc:
+        return _provider_busy(exc)
 
     return (
         jsonify(
@@ -135,6 +170,8 @@ def retrieve_payment_intent():
               description: Stripe payment status
       400:
         description: Missing paymentIntentId or payment not succeeded
+      503:
+        description: Stripe is saturated — retry after the Retry-After header
     """
     payload = request.get_json(silent=True) or {}
     payment_intent_id = payload.get('paymentIntentId')
@@ -142,7 +179,11 @@ def retrieve_payment_intent():
         return _validation_error('paymentIntentId is required.')
 
     stripe.api_key = current_app.config['STRIPE_SECRET_KEY']
-    intent = stripe.PaymentIntent.retrieve(payment_intent_id)
+    try:
+        with stripe_api.slot():
+            intent = stripe.PaymentIntent.retrieve(payment_intent_id)
+    except GovernorSaturated as exc:
+        return _provider_busy(exc)
 
     if intent.get('status') != 'succeeded':
         return jsonify({'error': {'code': 'PAYMENT_NOT_SUCCEEDED', 'message': 'Payment has not succeeded.'}}), 400
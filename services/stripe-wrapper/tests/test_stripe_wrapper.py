@@ -36,6 +36,27 @@ def test_create_payment_intent_success(client, monkeypatch):
     }
 
 
+def test_create_payment_intent_fails_fast_when_stripe_saturated(client, monkeypatch):
+    from outbound_governor import OutboundGovernor
+
+    busy = OutboundGovernor("stripe", max_concurrent=1, queue_timeout_seconds=0)
+    busy.acquire()
+    monkeypatch.setattr(routes, "stripe_api", busy)
+
+    def fake_create(**kwargs):
+        raise AssertionError("Stripe must not be called while saturated")
+
+    monkeypatch.setattr(routes.stripe.PaymentIntent, "create", fake_create)
+
+    response = client.post(
+        "/stripe/create-payment-intent", json={"amount": 50, "userId": "user-1"}
+    )
+
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == "1"
+    assert response.get_json()["error"]["code"] == "PAYMENT_PROVIDER_BUSY"
+
+
 def test_create_payment_intent_missing_fields(client):
     response = client.post("/stripe/create-payment-intent", json={"amount": 10})
 
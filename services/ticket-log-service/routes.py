@@ -1,3 +1,5 @@
+from datetime import datetime
+
 from flask import Blueprint, jsonify, request
 
 from app import db
@@ -6,6 +8,7 @@ from models import TicketLog
 bp = Blueprint('ticket_logs', __name__)
 
 REQUIRED_FIELDS = ('ticketId', 'staffId', 'status')
+MAX_BATCH_SIZE = 500
 
 
 def error_response(status_code, code, message):
@@ -123,3 +126,128 @@ def get_ticket_logs_by_ticket_id(ticket_id):
     """
     logs = TicketLog.query.filter_by(ticketId=ticket_id).order_by(TicketLog.timestamp.desc()).all()
     return jsonify({'logs': [ticket_log.to_dict() for ticket_log in logs]}), 200
+
+
+@bp.post('/ticket-logs/batch')
+def create_ticket_logs_batch():
+    """
+    Create many ticket log entries in one transaction
+    ---
+    tags:
+      - Ticket Logs
+    parameters:
+      - in: body
+        name: body
+        required: true
+        schema:
+          type: object
+          required: [logs]
+          properties:
+            logs:
+              type: array
+              items:
+                type: object
+                required: [ticketId, staffId, status]
+                properties:
+                  ticketId:
+                    type: string
+                    format: uuid
+                  staffId:
+                    type: string
+                    format: uuid
+                  status:
+                    type: string
+                  timestamp:
+                    type: string
+                    format: date-time
+                    description: Client-side time of the action (defaults to now)
+    responses:
+      201:
+        description: Log entries created, in request order
+        schema:
+          type: object
+          properties:
+            logs:
+              type: array
+              items:
+                $ref: '#/definitions/TicketLog'
+      400:
+        description: Missing required fields or invalid timestamp
+    """
+    data = request.get_json(silent=True) or {}
+    entries = data.get('logs')
+    if not isinstance(entries, list) or not entries:
+        return error_response(400, 'VALIDATION_ERROR', 'logs must be a non-empty list')
+    if len(entries) > MAX_BATCH_SIZE:
+        return error_response(400, 'VALIDATION_ERROR', f'logs cannot exceed {MAX_BATCH_SIZE} entries')
+
+    ticket_logs = []
+    for entry in entries:
+        if not isinstance(entry, dict) or any(field not in entry for field in REQUIRED_FIELDS):
+            return error_response(400, 'VALIDATION_ERROR', 'Missing required fields')
+        ticket_log = TicketLog(
+            ticketId=entry['ticketId'],
+            staffId=entry['staffId'],
+            status=entry['status'],
+        )
+        if entry.get('timestamp'):
+            try:
+                ticket_log.timestamp = datetime.fromisoformat(entry['timestamp'].replace('Z', '+00:00'))
+            except (ValueError, TypeError, AttributeError):
+                return error_response(400, 'INVALID_DATETIME', 'Invalid datetime format')
+        ticket_logs.append(ticket_log)
+
+    db.session.add_all(ticket_logs)
+    db.session.commit()
+
+    return jsonify({'logs': [ticket_log.to_dict() for ticket_log in ticket_logs]}), 201
+
+
+@bp.post('/ticket-logs/ticket/batch')
+def get_ticket_logs_by_ticket_ids():
+    """
+    Get log entries for many tickets in one query
+    ---
+    tags:
+      - Ticket Logs
+    parameters:
+      - in: body
+        name: body
+        required: true
+        schema:
+          type: object
+          required: [ticketIds]
+          properties:
+            ticketIds:
+              type: array
+              items:
+                type: string
+                format: uuid
+            status:
+              type: string
+              description: Only return entries with this status (e.g. checked_in)
+    responses:
+      200:
+        description: Log entries for the requested tickets (most recent first)
+        schema:
+          type: object
+          properties:
+            logs:
+              type: array
+              items:
+                $ref: '#/definitions/TicketLog'
+      400:
+        description: ticketIds missing, not a list, or too large
+    """
+    data = request.get_json(silent=True) or {}
+    ticket_ids = data.get('ticketIds')
+    if not isinstance(ticket_ids, list) or not ticket_ids:
+        return error_response(400, 'VALIDATION_ERROR', 'ticketIds must be a non-empty list')
+    if len(ticket_ids) > MAX_BATCH_SIZE:
+        return error_response(400, 'VALIDATION_ERROR', f'ticketIds cannot exceed {MAX_BATCH_SIZE} entries')
+
+    query = TicketLog.query.filter(TicketLog.ticketId.in_(set(ticket_ids)))
+    if data.get('status'):
+        query = query.filter(TicketLog.status == data['status'])
+    logs = query.order_by(TicketLog.timestamp.desc()).all()
+    return jsonify({'logs': [ticket_log.to_dict() for ticket_log in logs]}), 200
@@ -61,3 +61,36 @@ def test_create_ticket_log_missing_fields_validation(client):
     payload = response.get_json()
     assert payload['error']['code'] == 'VALIDATION_ERROR'
     assert payload['error']['message'] == 'Missing required fields'
+
+
+def test_create_ticket_logs_batch_and_lookup_by_ticket_ids(client):
+    response = client.post(
+        '/ticket-logs/batch',
+        json={'logs': [
+            {'ticketId': 'ticket-a', 'staffId': 'staff-001', 'status': 'checked_in',
+             'timestamp': '2026-01-01T10:00:00Z'},
+            {'ticketId': 'ticket-b', 'staffId': 'staff-001', 'status': 'duplicate'},
+            {'ticketId': 'ticket-c', 'staffId': 'staff-001', 'status': 'checked_in'},
+        ]},
+    )
+
+    assert response.status_code == 201
+    created = response.get_json()['logs']
+    assert [log['ticketId'] for log in created] == ['ticket-a', 'ticket-b', 'ticket-c']
+    assert created[0]['timestamp'].startswith('2026-01-01T10:00:00')
+
+    response = client.post(
+        '/ticket-logs/ticket/batch',
+        json={'ticketIds': ['ticket-a', 'ticket-b'], 'status': 'checked_in'},
+    )
+    assert response.status_code == 200
+    logs = response.get_json()['logs']
+    assert [log['ticketId'] for log in logs] == ['ticket-a']
+
+
+def test_create_ticket_logs_batch_rejects_incomplete_entry(client):
+    response = client.post('/ticket-logs/batch', json={'logs': [{'ticketId': 'ticket-a'}]})
+
+    assert response.status_code == 400
+    assert response.get_json()['error']['code'] == 'VALIDATION_ERROR'
+    assert client.get('/ticket-logs/ticket/ticket-a').get_json() == {'logs': []}
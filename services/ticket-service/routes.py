@@ -2,6 +2,7 @@ import uuid
 from datetime import UTC, datetime
 
 from flask import Blueprint, jsonify, request
+from sqlalchemy import update
 from sqlalchemy.exc import IntegrityError
 
 from app import db
@@ -13,6 +14,7 @@ bp = Blueprint('tickets', __name__)
 REQUIRED_FIELDS = ('inventoryId', 'ownerId', 'venueId', 'eventId', 'price')
 UPDATABLE_FIELDS = {'status', 'ownerId', 'qrHash', 'qrTimestamp'}
 ALLOWED_STATUS_VALUES = {'active', 'listed', 'used', 'pending_transfer'}
+MAX_BATCH_SIZE = 500
 
 
 def error_response(status_code, code, message):
@@ -256,6 +258,113 @@ def get_ticket_by_qr_hash(qr_hash):
     return jsonify(ticket.to_dict()), 200
 
 
+@bp.post('/tickets/qr/batch')
+def get_tickets_by_qr_hashes():
+    """
+    Resolve many QR code hashes in one query
+    ---
+    tags:
+      - Tickets
+    parameters:
+      - in: body
+        name: body
+        required: true
+        schema:
+          type: object
+          required: [qrHashes]
+          properties:
+            qrHashes:
+              type: array
+              items:
+                type: string
+    responses:
+      200:
+        description: Tickets matching the QR hashes (unknown hashes are omitted)
+        schema:
+          type: object
+          properties:
+            tickets:
+              type: array
+              items:
+                $ref: '#/definitions/Ticket'
+      400:
+        description: qrHashes missing, not a list, or too large
+    """
+    data = request.get_json(silent=True) or {}
+    qr_hashes = data.get('qrHashes')
+    if not isinstance(qr_hashes, list) or not qr_hashes:
+        return error_response(400, 'VALIDATION_ERROR', 'qrHashes must be a non-empty list')
+    if len(qr_hashes) > MAX_BATCH_SIZE:
+        return error_response(400, 'VALIDATION_ERROR', f'qrHashes cannot exceed {MAX_BATCH_SIZE} entries')
+
+    tickets = Ticket.query.filter(Ticket.qrHash.in_(set(qr_hashes))).all()
+    return jsonify({'tickets': [ticket.to_dict() for ticket in tickets]}), 200
+
+
+@bp.post('/tickets/batch/status')
+def update_ticket_statuses():
+    """
+    Transition many tickets to a new status in one statement
+    ---
+    tags:
+      - Tickets
+    parameters:
+      - in: body
+        name: body
+        required: true
+        schema:
+          type: object
+          required: [ticketIds, status]
+          properties:
+            ticketIds:
+              type: array
+              items:
+                type: string
+                format: uuid
+            status:
+              type: string
+              enum: [active, listed, used, pending_transfer]
+            fromStatus:
+              type: string
+              enum: [active, listed, used, pending_transfer]
+              description: Only tickets currently in this status are updated
+    responses:
+      200:
+        description: IDs of the tickets that were updated
+        schema:
+          type: object
+          properties:
+            updatedTicketIds:
+              type: array
+              items:
+                type: string
+      400:
+        description: Validation error
+    """
+    data = request.get_json(silent=True) or {}
+    ticket_ids = data.get('ticketIds')
+    status = data.get('status')
+    from_status = data.get('fromStatus')
+
+    if not isinstance(ticket_ids, list) or not ticket_ids:
+        return error_response(400, 'VALIDATION_ERROR', 'ticketIds must be a non-empty list')
+    if len(ticket_ids) > MAX_BATCH_SIZE:
+        return error_response(400, 'VALIDATION_ERROR', f'ticketIds cannot exceed {MAX_BATCH_SIZE} entries')
+    if status not in ALLOWED_STATUS_VALUES:
+        return error_response(400, 'VALIDATION_ERROR', 'Invalid status value')
+    if from_status is not None and from_status not in ALLOWED_STATUS_VALUES:
+        return error_response(400, 'VALIDATION_ERROR', 'Invalid fromStatus value')
+
+    stmt = update(Ticket).where(Ticket.ticketId.in_(set(ticket_ids)))
+    if from_status is not None:
+        stmt = stmt.where(Ticket.status == from_status)
+    result = db.session.execute(stmt.values(status=status).returning(Ticket.ticketId))
+    updated_ids = [row.ticketId for row in result]
+    db.session.commit()
+
+    return jsonify({'updatedTicketIds': updated_ids}), 200
+
+
 @bp.patch('/tickets/<ticket_id>')
 def update_ticket(ticket_id):
     """
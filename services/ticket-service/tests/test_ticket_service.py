@@ -108,3 +108,35 @@ def test_patch_ticket_not_found(client):
     assert response.status_code == 404
     error = response.get_json()['error']
     assert error['code'] == 'TICKET_NOT_FOUND'
+
+
+def test_get_tickets_by_qr_hashes(client):
+    first = client.post('/tickets', json=ticket_data(inventoryId='inv_a')).get_json()
+    second = client.post('/tickets', json=ticket_data(inventoryId='inv_b')).get_json()
+
+    response = client.post(
+        '/tickets/qr/batch',
+        json={'qrHashes': [first['qrHash'], second['qrHash'], 'unknown-hash']},
+    )
+    assert response.status_code == 200
+    ticket_ids = {ticket['ticketId'] for ticket in response.get_json()['tickets']}
+    assert ticket_ids == {first['ticketId'], second['ticketId']}
+
+
+def test_get_tickets_by_qr_hashes_requires_list(client):
+    response = client.post('/tickets/qr/batch', json={'qrHashes': 'abc'})
+    assert response.status_code == 400
+    assert response.get_json()['error']['code'] == 'VALIDATION_ERROR'
+
+
+def test_update_ticket_statuses_respects_from_status(client):
+    active = client.post('/tickets', json=ticket_data(inventoryId='inv_a')).get_json()
+    used = client.post('/tickets', json=ticket_data(inventoryId='inv_b', status='used')).get_json()
+
+    response = client.post(
+        '/tickets/batch/status',
+        json={'ticketIds': [active['ticketId'], used['ticketId']], 'status': 'used', 'fromStatus': 'active'},
+    )
+    assert response.status_code == 200
+    assert response.get_json()['updatedTicketIds'] == [active['ticketId']]
+    assert client.get(f"/tickets/{active['ticketId']}").get_json()['status'] == 'used'
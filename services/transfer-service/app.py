@@ -1,5 +1,7 @@
 import json
 import os
+import sys
+import threading
 import traceback
 import uuid
 from datetime import datetime, timezone
@@ -14,6 +16,9 @@ from werkzeug.exceptions import HTTPException
 
 load_dotenv()
 
+# Add shared directory to path for imports
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..', 'shared'))
+
 db = SQLAlchemy()
 migrate = Migrate()
 
@@ -131,6 +136,11 @@ def create_app(test_config=None):
     app.register_blueprint(transfers_bp)
     _register_error_handlers(app)
 
+    if not app.config.get("TESTING"):
+        from change_consumer import start_change_consumer
+        t = threading.Thread(target=start_change_consumer, args=(app,), daemon=True, name="change-consumer")
+        t.start()
+
     Swagger(app, template={
         "info": {"title": "Transfer Service", "version": "1.0.0"},
         "tags": [{"name": "Health"}, {"name": "Transfers"}],
@@ -0,0 +1,21 @@
+"""
+Entity change consumer.
+
+Keeps transfer display snapshots in step with event and user changes published
+to the shared change exchange (see shared/change_events.py).
+"""
+from change_events import consume_changes
+
+QUEUE = 'transfer_snapshot_queue'
+BINDINGS = ('event.*', 'user.*')
+
+
+def start_change_consumer(app):
+    """Blocking consumer — run in a daemon thread."""
+    from projection import apply_change
+
+    def handle(message):
+        with app.app_context():
+            apply_change(message)
+
+    consume_changes(QUEUE, BINDINGS, handle)
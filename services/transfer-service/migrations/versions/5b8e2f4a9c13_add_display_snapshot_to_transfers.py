@@ -0,0 +1,57 @@
+"""add display snapshot and list indexes to transfers
+
+Revision ID: 5b8e2f4a9c13
+Revises: dd172ee7b2fd
+Create Date: 2026-10-18 14:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5b8e2f4a9c13'
+down_revision = 'dd172ee7b2fd'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('transfers', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('ticketId', sa.String(length=36), nullable=True))
+        batch_op.add_column(sa.Column('eventId', sa.String(length=36), nullable=True))
+        batch_op.add_column(sa.Column('eventName', sa.String(length=255), nullable=True))
+        batch_op.add_column(sa.Column('eventDate', sa.DateTime(), nullable=True))
+        batch_op.add_column(sa.Column('eventImage', sa.String(length=500), nullable=True))
+        batch_op.add_column(sa.Column('venueId', sa.String(length=36), nullable=True))
+        batch_op.add_column(sa.Column('venueName', sa.String(length=255), nullable=True))
+        batch_op.add_column(sa.Column('seatId', sa.String(length=36), nullable=True))
+        batch_op.add_column(sa.Column('seatSection', sa.String(length=50), nullable=True))
+        batch_op.add_column(sa.Column('seatRow', sa.String(length=10), nullable=True))
+        batch_op.add_column(sa.Column('seatNumber', sa.String(length=10), nullable=True))
+        batch_op.add_column(sa.Column('buyerName', sa.String(length=255), nullable=True))
+        batch_op.add_column(sa.Column('sellerName', sa.String(length=255), nullable=True))
+        batch_op.add_column(sa.Column('snapshotUpdatedAt', sa.DateTime(), nullable=True))
+        batch_op.create_index(batch_op.f('ix_transfers_eventId'), ['eventId'], unique=False)
+        batch_op.create_index('ix_transfers_sellerId_createdAt', ['sellerId', 'createdAt', 'transferId'], unique=False)
+        batch_op.create_index('ix_transfers_buyerId_createdAt', ['buyerId', 'createdAt', 'transferId'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('transfers', schema=None) as batch_op:
+        batch_op.drop_index('ix_transfers_buyerId_createdAt')
+        batch_op.drop_index('ix_transfers_sellerId_createdAt')
+        batch_op.drop_index(batch_op.f('ix_transfers_eventId'))
+        batch_op.drop_column('snapshotUpdatedAt')
+        batch_op.drop_column('sellerName')
+        batch_op.drop_column('buyerName')
+        batch_op.drop_column('seatNumber')
+        batch_op.drop_column('seatRow')
+        batch_op.drop_column('seatSection')
+        batch_op.drop_column('seatId')
+        batch_op.drop_column('venueName')
+        batch_op.drop_column('venueId')
+        batch_op.drop_column('eventImage')
+        batch_op.drop_column('eventName')
+        batch_op.drop_column('eventId')
+        batch_op.drop_column('ticketId')
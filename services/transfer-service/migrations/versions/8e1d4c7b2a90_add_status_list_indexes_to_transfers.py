@@ -0,0 +1,28 @@
+"""add role and status list indexes to transfers
+
+Revision ID: 8e1d4c7b2a90
+Revises: 5b8e2f4a9c13
+Create Date: 2026-10-18 15:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8e1d4c7b2a90'
+down_revision = '5b8e2f4a9c13'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('transfers', schema=None) as batch_op:
+        batch_op.create_index('ix_transfers_sellerId_status_createdAt', ['sellerId', 'status', 'createdAt', 'transferId'], unique=False)
+        batch_op.create_index('ix_transfers_buyerId_status_createdAt', ['buyerId', 'status', 'createdAt', 'transferId'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('transfers', schema=None) as batch_op:
+        batch_op.drop_index('ix_transfers_buyerId_status_createdAt')
+        batch_op.drop_index('ix_transfers_sellerId_status_createdAt')
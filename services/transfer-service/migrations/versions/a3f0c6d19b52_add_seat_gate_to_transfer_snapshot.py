@@ -0,0 +1,26 @@
+"""add seat gate to transfer display snapshot
+
+Revision ID: a3f0c6d19b52
+Revises: 8e1d4c7b2a90
+Create Date: 2026-10-19 10:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a3f0c6d19b52'
+down_revision = '8e1d4c7b2a90'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('transfers', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('seatGate', sa.String(length=20), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table('transfers', schema=None) as batch_op:
+        batch_op.drop_column('seatGate')
@@ -0,0 +1,30 @@
+"""add listing, ticket and venue records to transfer display snapshot
+
+Revision ID: e4a7c2d8f615
+Revises: a3f0c6d19b52
+Create Date: 2026-10-19 14:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e4a7c2d8f615'
+down_revision = 'a3f0c6d19b52'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('transfers', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('listing', sa.JSON(), nullable=True))
+        batch_op.add_column(sa.Column('ticket', sa.JSON(), nullable=True))
+        batch_op.add_column(sa.Column('venue', sa.JSON(), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table('transfers', schema=None) as batch_op:
+        batch_op.drop_column('venue')
+        batch_op.drop_column('ticket')
+        batch_op.drop_column('listing')
@@ -3,6 +3,15 @@ from datetime import UTC, datetime, timedelta
 
 from app import db
 
+# Display snapshot columns stored on each transfer so list screens never fan out
+SNAPSHOT_FIELDS = (
+    'ticketId', 'eventId', 'eventName', 'eventDate', 'eventImage',
+    'venueId', 'venueName', 'seatId', 'seatSection', 'seatRow', 'seatNumber', 'seatGate',
+    'buyerName', 'sellerName', 'listing', 'ticket', 'venue',
+)
+# Snapshot fields holding whole records (as enriched transfer responses embed them)
+SNAPSHOT_RECORD_FIELDS = ('listing', 'ticket', 'venue')
+
 
 class Transfer(db.Model):
     __tablename__ = 'transfers'
@@ -21,6 +30,42 @@ class Transfer(db.Model):
     expiresAt = db.Column(db.DateTime, nullable=False, default=lambda: datetime.now(UTC) + timedelta(hours=24))
     createdAt = db.Column(db.DateTime, nullable=False, default=lambda: datetime.now(UTC))
 
+    ticketId = db.Column(db.String(36), nullable=True)
+    eventId = db.Column(db.String(36), nullable=True, index=True)
+    eventName = db.Column(db.String(255), nullable=True)
+    eventDate = db.Column(db.DateTime, nullable=True)
+    eventImage = db.Column(db.String(500), nullable=True)
+    venueId = db.Column(db.String(36), nullable=True)
+    venueName = db.Column(db.String(255), nullable=True)
+    seatId = db.Column(db.String(36), nullable=True)
+    seatSection = db.Column(db.String(50), nullable=True)
+    seatRow = db.Column(db.String(10), nullable=True)
+    seatNumber = db.Column(db.String(10), nullable=True)
+    seatGate = db.Column(db.String(20), nullable=True)
+    buyerName = db.Column(db.String(255), nullable=True)
+    sellerName = db.Column(db.String(255), nullable=True)
+    listing = db.Column(db.JSON, nullable=True)
+    ticket = db.Column(db.JSON, nullable=True)
+    venue = db.Column(db.JSON, nullable=True)
+    snapshotUpdatedAt = db.Column(db.DateTime, nullable=True)
+
+    __table_args__ = (
+        # Transfer lists are "by seller|buyer [AND status IN (...)]
+        # ORDER BY createdAt DESC, transferId DESC"
+        db.Index('ix_transfers_sellerId_createdAt', 'sellerId', 'createdAt', 'transferId'),
+        db.Index('ix_transfers_buyerId_createdAt', 'buyerId', 'createdAt', 'transferId'),
+        db.Index('ix_transfers_sellerId_status_createdAt', 'sellerId', 'status', 'createdAt', 'transferId'),
+        db.Index('ix_transfers_buyerId_status_createdAt', 'buyerId', 'status', 'createdAt', 'transferId'),
+    )
+
+    def snapshot_dict(self):
+        if self.snapshotUpdatedAt is None:
+            return None
+        snapshot = {field: getattr(self, field) for field in SNAPSHOT_FIELDS}
+        snapshot['eventDate'] = self.eventDate.isoformat() if self.eventDate else None
+        snapshot['updatedAt'] = self.snapshotUpdatedAt.isoformat()
+        return snapshot
+
     def to_dict(self):
         return {
             'transferId': self.transferId,
@@ -36,4 +81,5 @@ class Transfer(db.Model):
             'completedAt': self.completedAt.isoformat() if self.completedAt else None,
             'expiresAt': self.expiresAt.isoformat() if self.expiresAt else None,
             'createdAt': self.createdAt.isoformat() if self.createdAt else None,
+            'snapshot': self.snapshot_dict(),
         }
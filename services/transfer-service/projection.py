@@ -0,0 +1,80 @@
+"""
+Transfer display snapshot maintenance.
+
+Each transfer carries the event, venue, seat and buyer/seller display data its
+list screens show, plus the listing, ticket and venue records as of capture. The orchestrator supplies the snapshot when the transfer is
+created or completes (or on first read of an older transfer); entity change
+events keep it fresh afterwards:
+
+  event.updated / event.cancelled  -> event columns, matched by eventId
+  user.updated                     -> buyerName / sellerName, matched by userId
+
+Updates are idempotent overwrites, so redelivered events are harmless.
+"""
+import logging
+from datetime import UTC, datetime
+
+from app import db
+from models import SNAPSHOT_FIELDS, SNAPSHOT_RECORD_FIELDS, Transfer
+
+logger = logging.getLogger(__name__)
+
+
+def _parse_datetime(value):
+    """Parse an ISO timestamp into the naive-UTC form the DateTime columns store."""
+    if not value:
+        return None
+    try:
+        parsed = datetime.fromisoformat(str(value).replace('Z', '+00:00'))
+    except ValueError:
+        return None
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone(UTC).replace(tzinfo=None)
+    return parsed
+
+
+def apply_snapshot(transfer, snapshot):
+    """Overwrite the snapshot columns present in `snapshot`. The caller commits."""
+    for field in SNAPSHOT_FIELDS:
+        if field not in snapshot:
+            continue
+        value = snapshot[field]
+        if field == 'eventDate':
+            value = _parse_datetime(value)
+        elif field in SNAPSHOT_RECORD_FIELDS and not isinstance(value, dict):
+            continue
+        setattr(transfer, field, value)
+    transfer.snapshotUpdatedAt = datetime.now(UTC)
+
+
+def apply_change(message):
+    """Apply one entity change event. Returns the number of transfers touched."""
+    entity = message.get('entity')
+    entity_id = message.get('id')
+    data = message.get('data') or {}
+    if not entity_id:
+        return 0
+
+    touched = 0
+    if entity == 'event':
+        event_fields = {'eventName': data.get('name'), 'eventImage': data.get('image')}
+        for transfer in Transfer.query.filter_by(eventId=entity_id).all():
+            apply_snapshot(transfer, {
+                **{field: value for field, value in event_fields.items() if value is not None},
+                **({'eventDate': data['date']} if data.get('date') else {}),
+            })
+            touched += 1
+    elif entity == 'user' and data.get('email'):
+        for transfer in Transfer.query.filter_by(buyerId=entity_id).all():
+            apply_snapshot(transfer, {'buyerName': data['email']})
+            touched += 1
+        for transfer in Transfer.query.filter_by(sellerId=entity_id).all():
+            apply_snapshot(transfer, {'sellerName': data['email']})
+            touched += 1
+    else:
+        return 0
+
+    db.session.commit()
+    if touched:
+        logger.info('Applied %s.%s for %s to %d transfers', entity, message.get('action'), entity_id, touched)
+    return touched
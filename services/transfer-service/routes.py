@@ -1,9 +1,14 @@
+import base64
+import binascii
+import json
 from datetime import datetime, timezone
 
 from flask import Blueprint, jsonify, request
+from sqlalchemy import and_, or_
 
 from app import db
 from models import Transfer
+from projection import apply_snapshot
 
 bp = Blueprint('transfers', __name__)
 
@@ -15,7 +20,20 @@ UPDATABLE_FIELDS = {
     'buyerVerificationSid',
     'sellerVerificationSid',
     'completedAt',
+    'snapshot',
 }
+TRANSFER_STATUSES = (
+    'pending_seller_acceptance',
+    'seller_accepted',
+    'pending_buyer_otp',
+    'buyer_otp_verified',
+    'pending_seller_otp',
+    'completed',
+    'cancelled',
+    'expired',
+    'failed',
+)
+TRANSFER_ROLES = ('seller', 'buyer', 'any')
 
 def error_response(status_code, code, message):
     return jsonify({'error': {'code': code, 'message': message}}), status_code
@@ -31,6 +49,35 @@ def parse_datetime(value):
     raise ValueError('Invalid datetime format')
 
 
+def parse_statuses(values):
+    """Flatten repeated and comma-separated status params; None if any is unknown."""
+    statuses = []
+    for value in values:
+        for status in value.split(','):
+            status = status.strip()
+            if not status:
+                continue
+            if status not in TRANSFER_STATUSES:
+                return None
+            if status not in statuses:
+                statuses.append(status)
+    return statuses
+
+
+def encode_cursor(transfer):
+    raw = json.dumps([transfer.createdAt.isoformat(), transfer.transferId])
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def decode_cursor(cursor):
+    """Return (createdAt, transferId) from an opaque cursor, or None if malformed."""
+    try:
+        created_at, transfer_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        return datetime.fromisoformat(created_at), str(transfer_id)
+    except (ValueError, TypeError, binascii.Error, json.JSONDecodeError):
+        return None
+
+
 def is_transfer_expired(transfer):
     """Check if a transfer has expired."""
     if transfer.expiresAt is None:
@@ -91,6 +138,8 @@ def create_transfer():
               type: string
             sellerVerificationSid:
               type: string
+            snapshot:
+              $ref: '#/definitions/TransferSnapshot'
     responses:
       201:
         description: Transfer created
@@ -130,7 +179,7 @@ def create_transfer():
             type: number
           status:
             type: string
-            enum: [pending_seller_acceptance, seller_accepted, pending_buyer_otp, buyer_otp_verified, pending_seller_otp, completed, cancelled, expired]
+            enum: [pending_seller_acceptance, seller_accepted, pending_buyer_otp, buyer_otp_verified, pending_seller_otp, completed, cancelled, expired, failed]
           buyerOtpVerified:
             type: boolean
           sellerOtpVerified:
@@ -151,6 +200,53 @@ def create_transfer():
           updatedAt:
             type: string
             format: date-time
+          snapshot:
+            $ref: '#/definitions/TransferSnapshot'
+      TransferSnapshot:
+        type: object
+        description: Display data captured from other services; null until first stored
+        properties:
+          ticketId:
+            type: string
+          eventId:
+            type: string
+          eventName:
+            type: string
+          eventDate:
+            type: string
+            format: date-time
+          eventImage:
+            type: string
+          venueId:
+            type: string
+          venueName:
+            type: string
+          seatId:
+            type: string
+          seatSection:
+            type: string
+          seatRow:
+            type: string
+          seatNumber:
+            type: string
+          seatGate:
+            type: string
+          buyerName:
+            type: string
+          sellerName:
+            type: string
+          listing:
+            type: object
+            description: Listing record as of capture
+          ticket:
+            type: object
+            description: Ticket record as of capture
+          venue:
+            type: object
+            description: Venue record as of capture
+          updatedAt:
+            type: string
+            format: date-time
     """
     data = request.get_json(silent=True)
     if not data or any(field not in data for field in REQUIRED_FIELDS):
@@ -165,6 +261,8 @@ def create_transfer():
         buyerVerificationSid=data.get('buyerVerificationSid'),
         sellerVerificationSid=data.get('sellerVerificationSid'),
     )
+    if isinstance(data.get('snapshot'), dict):
+        apply_snapshot(transfer, data['snapshot'])
 
     db.session.add(transfer)
     db.session.commit()
@@ -190,14 +288,41 @@ def list_transfers():
       - in: query
         name: sellerId
         type: string
-        required: true
+      - in: query
+        name: buyerId
+        type: string
+        description: With sellerId, matches transfers where either side matches
+      - in: query
+        name: userId
+        type: string
+        description: Alternative to sellerId/buyerId; the side is chosen by role
+      - in: query
+        name: role
+        type: string
+        enum: [seller, buyer, any]
+        default: any
+        description: Which side of the transfer userId must be on
       - in: query
         name: status
         type: string
-        enum: [pending_seller_acceptance, seller_accepted, pending_buyer_otp, buyer_otp_verified, pending_seller_otp, completed, cancelled, expired]
+        description: >
+          One or more of pending_seller_acceptance, seller_accepted,
+          pending_buyer_otp, buyer_otp_verified, pending_seller_otp, completed,
+          cancelled, expired, failed. Comma-separate or repeat the parameter.
+      - in: query
+        name: cursor
+        type: string
+        description: >
+          Keyset cursor (pagination.nextCursor from the previous page). Pass an
+          empty value to start paging; without it every match is returned.
+      - in: query
+        name: limit
+        type: integer
+        default: 20
+        description: Page size in keyset mode (max 100)
     responses:
       200:
-        description: List of transfers
+        description: List of transfers, newest first
         schema:
           type: object
           properties:
@@ -205,14 +330,34 @@ def list_transfers():
               type: array
               items:
                 $ref: '#/definitions/Transfer'
+            pagination:
+              type: object
+              description: Keyset mode only
+              properties:
+                limit:
+                  type: integer
+                nextCursor:
+                  type: string
       400:
-        description: Missing buyerId or sellerId
+        description: Missing buyerId, sellerId or userId, or invalid role, status, limit or cursor
     """
     seller_id = request.args.get('sellerId')
     buyer_id = request.args.get('buyerId')
-    status    = request.args.get('status')
+    user_id = request.args.get('userId')
+    role = request.args.get('role', 'any')
+    statuses = parse_statuses(request.args.getlist('status'))
+    if statuses is None:
+        return error_response(400, 'VALIDATION_ERROR', 'status is invalid')
+    if role not in TRANSFER_ROLES:
+        return error_response(400, 'VALIDATION_ERROR', 'role must be one of seller, buyer, any')
+    if user_id:
+        seller_id = user_id if role in ('seller', 'any') else None
+        buyer_id = user_id if role in ('buyer', 'any') else None
     if not seller_id and not buyer_id:
-        return error_response(400, 'VALIDATION_ERROR', 'buyerId or sellerId query param required')
+        return error_response(400, 'VALIDATION_ERROR', 'buyerId, sellerId or userId query param required')
+
+    # Each side is an equality match that leads one of the
+    # (sellerId|buyerId, status, createdAt) indexes
     if seller_id and buyer_id:
         query = Transfer.query.filter(
             ((Transfer.sellerId == seller_id) | (Transfer.buyerId == buyer_id))
@@ -221,10 +366,40 @@ def list_transfers():
         query = Transfer.query.filter_by(sellerId=seller_id)
     else:
         query = Transfer.query.filter_by(buyerId=buyer_id)
-    if status:
-        query = query.filter_by(status=status)
-    transfers = query.order_by(Transfer.createdAt.desc()).all()
-    return jsonify({'transfers': [t.to_dict() for t in transfers]}), 200
+    if len(statuses) == 1:
+        query = query.filter_by(status=statuses[0])
+    elif statuses:
+        query = query.filter(Transfer.status.in_(statuses))
+
+    order = (Transfer.createdAt.desc(), Transfer.transferId.desc())
+    if 'cursor' not in request.args:
+        transfers = query.order_by(*order).all()
+        return jsonify({'transfers': [t.to_dict() for t in transfers]}), 200
+
+    limit = request.args.get('limit', default=20, type=int)
+    if limit is None or limit < 1:
+        return error_response(400, 'VALIDATION_ERROR', 'limit must be an integer greater than or equal to 1')
+    limit = min(limit, 100)
+
+    cursor = request.args.get('cursor')
+    if cursor:
+        position = decode_cursor(cursor)
+        if position is None:
+            return error_response(400, 'VALIDATION_ERROR', 'cursor is invalid')
+        created_at, transfer_id = position
+        query = query.filter(or_(
+            Transfer.createdAt < created_at,
+            and_(Transfer.createdAt == created_at, Transfer.transferId < transfer_id),
+        ))
+    rows = query.order_by(*order).limit(limit + 1).all()
+    transfers = rows[:limit]
+    return jsonify({
+        'transfers': [t.to_dict() for t in transfers],
+        'pagination': {
+            'limit': limit,
+            'nextCursor': encode_cursor(transfers[-1]) if len(rows) > limit else None,
+        },
+    }), 200
 
 
 @bp.get('/transfers/<transfer_id>')
@@ -280,7 +455,7 @@ def patch_transfer(transfer_id):
           properties:
             status:
               type: string
-              enum: [pending_seller_acceptance, seller_accepted, pending_buyer_otp, buyer_otp_verified, pending_seller_otp, completed, cancelled, expired]
+              enum: [pending_seller_acceptance, seller_accepted, pending_buyer_otp, buyer_otp_verified, pending_seller_otp, completed, cancelled, expired, failed]
             buyerOtpVerified:
               type: boolean
             sellerOtpVerified:
@@ -292,6 +467,8 @@ def patch_transfer(transfer_id):
             completedAt:
               type: string
               format: date-time
+            snapshot:
+              $ref: '#/definitions/TransferSnapshot'
     responses:
       200:
         description: Updated transfer
@@ -326,8 +503,14 @@ def patch_transfer(transfer_id):
         except (ValueError, TypeError):
             return error_response(400, 'VALIDATION_ERROR', 'Invalid completedAt format')
 
+    snapshot = data.pop('snapshot', None)
+    if snapshot is not None and not isinstance(snapshot, dict):
+        return error_response(400, 'VALIDATION_ERROR', 'snapshot must be an object')
+
     for field, value in data.items():
         setattr(transfer, field, value)
+    if snapshot:
+        apply_snapshot(transfer, snapshot)
 
     db.session.commit()
     return jsonify(transfer.to_dict()), 200
@@ -122,3 +122,117 @@ def test_list_transfers_by_buyer_id(client):
     payload = response.get_json()['transfers']
     assert len(payload) == 1
     assert payload[0]['transferId'] == first['transferId']
+
+
+def test_list_transfers_multiple_statuses_and_role(client):
+    pending = create_transfer(client, sellerId='seller-multi').get_json()
+    otp = create_transfer(client, sellerId='seller-multi').get_json()
+    client.patch(f"/transfers/{otp['transferId']}", json={'status': 'pending_seller_otp'})
+    done = create_transfer(client, sellerId='seller-multi').get_json()
+    client.patch(f"/transfers/{done['transferId']}", json={'status': 'completed'})
+    create_transfer(client, buyerId='seller-multi', sellerId='someone-else')
+
+    response = client.get('/transfers', query_string={
+        'userId': 'seller-multi',
+        'role': 'seller',
+        'status': 'pending_seller_otp,pending_seller_acceptance',
+    })
+
+    assert response.status_code == 200
+    ids = {t['transferId'] for t in response.get_json()['transfers']}
+    assert ids == {pending['transferId'], otp['transferId']}
+
+    either = client.get('/transfers?userId=seller-multi').get_json()['transfers']
+    assert len(either) == 4
+    repeated = client.get(
+        '/transfers?sellerId=seller-multi&status=completed&status=pending_seller_otp'
+    ).get_json()['transfers']
+    assert {t['transferId'] for t in repeated} == {otp['transferId'], done['transferId']}
+
+    assert client.get('/transfers?userId=seller-multi&role=owner').status_code == 400
+    assert client.get('/transfers?sellerId=seller-multi&status=bogus').status_code == 400
+
+
+def test_list_transfers_by_failed_status(client):
+    failed = create_transfer(client, sellerId='seller-failed').get_json()
+    create_transfer(client, sellerId='seller-failed')
+    client.patch(f"/transfers/{failed['transferId']}", json={'status': 'failed'})
+
+    response = client.get('/transfers?sellerId=seller-failed&status=failed')
+
+    assert response.status_code == 200
+    assert [t['transferId'] for t in response.get_json()['transfers']] == [failed['transferId']]
+
+
+SNAPSHOT = {
+    'ticketId': 'ticket-1',
+    'eventId': 'event-1',
+    'eventName': 'Symphony Night',
+    'eventDate': '2026-06-01T20:00:00+00:00',
+    'venueName': 'Concert Hall',
+    'seatRow': 'A',
+    'seatNumber': '12',
+    'seatGate': 'G3',
+    'buyerName': 'buyer@example.com',
+    'sellerName': 'seller@example.com',
+    'listing': {'listingId': 'listing-1', 'price': 80.0, 'status': 'claimed'},
+    'ticket': {'ticketId': 'ticket-1', 'ownerId': 'seller-1', 'status': 'listed'},
+    'venue': {'venueId': 'venue-1', 'name': 'Concert Hall', 'address': '1 Main St'},
+}
+
+
+def test_transfer_snapshot_stored_on_create_and_patch(client):
+    created = create_transfer(client, snapshot=SNAPSHOT).get_json()
+
+    transfer = client.get(f"/transfers/{created['transferId']}").get_json()
+    assert transfer['snapshot']['eventName'] == 'Symphony Night'
+    assert transfer['snapshot']['eventDate'] == '2026-06-01T20:00:00'
+    assert transfer['snapshot']['seatGate'] == 'G3'
+    assert transfer['snapshot']['listing'] == SNAPSHOT['listing']
+    assert transfer['snapshot']['venue']['address'] == '1 Main St'
+
+    response = client.patch(f"/transfers/{created['transferId']}", json={
+        'status': 'completed',
+        'snapshot': {'seatNumber': '14'},
+    })
+    assert response.status_code == 200
+    assert response.get_json()['snapshot']['seatNumber'] == '14'
+    assert response.get_json()['snapshot']['seatRow'] == 'A'
+    assert response.get_json()['snapshot']['ticket'] == SNAPSHOT['ticket']
+
+
+def test_transfer_without_snapshot_reports_null(client):
+    created = create_transfer(client).get_json()
+
+    assert client.get(f"/transfers/{created['transferId']}").get_json()['snapshot'] is None
+
+
+def test_list_transfers_keyset_pagination(client):
+    ids = [create_transfer(client, sellerId='seller-page').get_json()['transferId'] for _ in range(3)]
+
+    first = client.get('/transfers?sellerId=seller-page&limit=2&cursor=').get_json()
+    second = client.get(
+        f"/transfers?sellerId=seller-page&limit=2&cursor={first['pagination']['nextCursor']}"
+    ).get_json()
+
+    seen = [t['transferId'] for t in first['transfers'] + second['transfers']]
+    assert sorted(seen) == sorted(ids)
+    assert len(first['transfers']) == 2
+    assert second['pagination']['nextCursor'] is None
+    assert client.get('/transfers?sellerId=seller-page&cursor=bogus').status_code == 400
+
+
+def test_apply_change_refreshes_snapshots(app, client):
+    from projection import apply_change
+
+    created = create_transfer(client, buyerId='buyer-9', snapshot=SNAPSHOT).get_json()
+
+    assert apply_change({'entity': 'event', 'action': 'updated', 'id': 'event-1',
+                         'data': {'name': 'Renamed', 'date': '2026-06-02T20:00:00Z'}}) == 1
+    assert apply_change({'entity': 'user', 'action': 'updated', 'id': 'buyer-9',
+                         'data': {'email': 'new@example.com'}}) == 1
+
+    snapshot = client.get(f"/transfers/{created['transferId']}").get_json()['snapshot']
+    assert snapshot['eventName'] == 'Renamed'
+    assert snapshot['eventDate'] == '2026-06-02T20:00:00'
+    assert snapshot['buyerName'] == 'new@example.com'
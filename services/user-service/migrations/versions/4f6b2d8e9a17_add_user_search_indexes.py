@@ -0,0 +1,46 @@
+"""add_user_search_indexes
+
+Revision ID: 4f6b2d8e9a17
+Revises: adb8ba176815
+Create Date: 2026-10-19 10:12:40.118203
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '4f6b2d8e9a17'
+down_revision = 'adb8ba176815'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    if op.get_bind().dialect.name != 'postgresql':
+        op.create_index('ix_users_email_trgm', 'users', ['email'])
+        op.create_index('ix_users_phone_number_trgm', 'users', ['phoneNumber'])
+        op.create_index('ix_users_email_lower_pattern', 'users', [sa.text('lower(email)')])
+        return
+
+    op.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    # Built concurrently so a large users table stays writable meanwhile
+    with op.get_context().autocommit_block():
+        op.execute(
+            'CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_users_email_trgm '
+            'ON users USING gin (email gin_trgm_ops)'
+        )
+        op.execute(
+            'CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_users_phone_number_trgm '
+            'ON users USING gin ("phoneNumber" gin_trgm_ops)'
+        )
+        op.execute(
+            'CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_users_email_lower_pattern '
+            'ON users (lower(email) text_pattern_ops)'
+        )
+
+
+def downgrade():
+    op.drop_index('ix_users_email_lower_pattern', table_name='users')
+    op.drop_index('ix_users_phone_number_trgm', table_name='users')
+    op.drop_index('ix_users_email_trgm', table_name='users')
@@ -0,0 +1,40 @@
+"""add_user_listing_indexes
+
+Revision ID: 7c2e9a4b5d31
+Revises: 4f6b2d8e9a17
+Create Date: 2026-10-19 11:05:12.404117
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '7c2e9a4b5d31'
+down_revision = '4f6b2d8e9a17'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    if op.get_bind().dialect.name != 'postgresql':
+        op.create_index('ix_users_createdAt_userId', 'users', ['createdAt', 'userId'])
+        op.create_index('ix_users_isFlagged_createdAt_userId', 'users', ['isFlagged', 'createdAt', 'userId'])
+        return
+
+    # Keyset pages (ORDER BY createdAt, userId) and the admin isFlagged filter;
+    # built concurrently so a large users table stays writable meanwhile
+    with op.get_context().autocommit_block():
+        op.execute(
+            'CREATE INDEX CONCURRENTLY IF NOT EXISTS "ix_users_createdAt_userId" '
+            'ON users ("createdAt", "userId")'
+        )
+        op.execute(
+            'CREATE INDEX CONCURRENTLY IF NOT EXISTS "ix_users_isFlagged_createdAt_userId" '
+            'ON users ("isFlagged", "createdAt", "userId")'
+        )
+
+
+def downgrade():
+    op.drop_index('ix_users_isFlagged_createdAt_userId', table_name='users')
+    op.drop_index('ix_users_createdAt_userId', table_name='users')
@@ -48,6 +48,26 @@ class User(db.Model):
     )
     createdAt = db.Column(db.DateTime, nullable=False, default=lambda: datetime.now(UTC))
 
+    __table_args__ = (
+        # Admin search: trigram GIN indexes serve ILIKE '%q%' on Postgres,
+        # the lower(email) pattern index serves prefix lookups
+        db.Index(
+            'ix_users_email_trgm', email,
+            postgresql_using='gin', postgresql_ops={'email': 'gin_trgm_ops'},
+        ),
+        db.Index(
+            'ix_users_phone_number_trgm', phoneNumber,
+            postgresql_using='gin', postgresql_ops={'phoneNumber': 'gin_trgm_ops'},
+        ),
+        db.Index(
+            'ix_users_email_lower_pattern', db.func.lower(email).label('email_lower'),
+            postgresql_ops={'email_lower': 'text_pattern_ops'},
+        ),
+        # Keyset listing: ORDER BY createdAt, userId, optionally WHERE isFlagged = ?
+        db.Index('ix_users_createdAt_userId', createdAt, userId),
+        db.Index('ix_users_isFlagged_createdAt_userId', isFlagged, createdAt, userId),
+    )
+
     def to_dict(self, include_sensitive=False):
         payload = {
             'userId': self.userId,
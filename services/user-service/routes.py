@@ -1,20 +1,112 @@
-from flask import Blueprint, jsonify, request
+import base64
+import binascii
+import csv
+import io
+import json
+
+from flask import Blueprint, Response, jsonify, request, stream_with_context
+from sqlalchemy import and_, case, or_
 from sqlalchemy.exc import IntegrityError
 import secrets
 from datetime import datetime, timezone, timedelta
 from typing import Optional, Tuple
 
 from app import db
+from change_events import publish_change
 from models import User, PasswordResetToken
+from user_profile_cache import UserProfileCache
 
 bp = Blueprint('users', __name__)
 
+# Orchestrators cache profiles in Redis; every profile write drops the entry
+profile_cache = UserProfileCache()
+
 
 def error_response(status_code: int, code: str, message: str) -> Tuple[dict, int]:
     return jsonify({'error': {'code': code, 'message': message}}), status_code
 
 
 REQUIRED_FIELDS = ('email', 'password', 'salt', 'phoneNumber')
+SEARCH_MATCH_MODES = ('contains', 'prefix')
+SEARCH_COUNT_MODES = ('exact', 'estimate', 'none')
+# Trigrams need three characters; shorter queries match email prefixes only
+SEARCH_MIN_CONTAINS_LENGTH = 3
+EXPORT_FORMATS = ('ndjson', 'csv')
+EXPORT_FIELDS = (
+    'userId', 'email', 'phoneNumber', 'role', 'isFlagged', 'venueId', 'favoriteEvents', 'createdAt',
+)
+# Rows fetched per round trip when streaming over a server-side cursor
+STREAM_BATCH_SIZE = 500
+LISTING_ORDER = (User.createdAt.asc(), User.userId.asc())
+
+
+def encode_user_cursor(user):
+    raw = json.dumps([user.createdAt.isoformat(), user.userId])
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def decode_user_cursor(cursor):
+    """Return (createdAt, userId) from an opaque cursor, or None if malformed."""
+    try:
+        created_at, user_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        return datetime.fromisoformat(created_at), str(user_id)
+    except (ValueError, TypeError, binascii.Error, json.JSONDecodeError):
+        return None
+
+
+def stream_users(query):
+    """Users in listing order, fetched in batches instead of loaded whole."""
+    return query.order_by(*LISTING_ORDER).yield_per(STREAM_BATCH_SIZE)
+
+
+def _json_array(users):
+    yield '['
+    for index, user in enumerate(users):
+        yield (',' if index else '') + json.dumps(user.to_dict())
+    yield ']'
+
+
+def listing_response(query):
+    """
+    Keyset page when a cursor parameter is present (empty starts paging);
+    otherwise the full list as one JSON array, streamed.
+    """
+    if 'cursor' not in request.args:
+        return Response(stream_with_context(_json_array(stream_users(query))), mimetype='application/json')
+
+    limit = request.args.get('limit', default=100, type=int)
+    if limit is None or limit < 1:
+        return error_response(400, 'VALIDATION_ERROR', 'limit must be an integer greater than or equal to 1')
+    limit = min(limit, 500)
+
+    cursor = request.args.get('cursor')
+    if cursor:
+        position = decode_user_cursor(cursor)
+        if position is None:
+            return error_response(400, 'VALIDATION_ERROR', 'cursor is invalid')
+        created_at, user_id = position
+        query = query.filter(or_(
+            User.createdAt > created_at,
+            and_(User.createdAt == created_at, User.userId > user_id),
+        ))
+    rows = query.order_by(*LISTING_ORDER).limit(limit + 1).all()
+    users = rows[:limit]
+    return jsonify({
+        'users': [u.to_dict() for u in users],
+        'pagination': {
+            'limit': limit,
+            'nextCursor': encode_user_cursor(users[-1]) if len(rows) > limit else None,
+        },
+    }), 200
+
+
+def filter_flagged(query):
+    flagged = request.args.get('flagged')
+    if flagged == 'true':
+        return query.filter_by(isFlagged=True)
+    if flagged == 'false':
+        return query.filter_by(isFlagged=False)
+    return query
 UPDATABLE_FIELDS = {'email', 'password', 'salt', 'phoneNumber', 'role', 'isFlagged', 'venueId'}
 
 
@@ -45,9 +137,22 @@ def list_users():
     ---
     tags:
       - Users
+    parameters:
+      - in: query
+        name: cursor
+        type: string
+        description: >
+          Keyset cursor (pagination.nextCursor from the previous page). Pass an
+          empty value to start paging; without it every user is returned as
+          one streamed array.
+      - in: query
+        name: limit
+        type: integer
+        default: 100
+        description: Page size in keyset mode (max 500)
     responses:
       200:
-        description: Array of users
+        description: Array of users, oldest first (keyset mode returns {users, pagination})
         schema:
           type: array
           items:
@@ -93,8 +198,7 @@ def list_users():
           total:
             type: integer
     """
-    users = User.query.order_by(User.createdAt.asc()).all()
-    return jsonify([user.to_dict() for user in users]), 200
+    return listing_response(User.query)
 
 
 @bp.post('/users')
@@ -190,6 +294,32 @@ def get_user(user_id):
     return jsonify(user.to_dict(include_sensitive=True)), 200
 
 
+@bp.get('/users/<user_id>/profile')
+def get_user_profile(user_id):
+    """
+    Get user profile by ID (no password or salt; the cacheable read)
+    ---
+    tags:
+      - Users
+    parameters:
+      - in: path
+        name: user_id
+        type: string
+        required: true
+    responses:
+      200:
+        description: User without sensitive fields
+        schema:
+          $ref: '#/definitions/User'
+      404:
+        description: User not found
+    """
+    user = db.session.get(User, user_id)
+    if not user:
+        return error_response(404, 'USER_NOT_FOUND', 'User not found')
+    return jsonify(user.to_dict()), 200
+
+
 @bp.patch('/users/<user_id>')
 def update_user(user_id):
     """
@@ -263,6 +393,11 @@ def update_user(user_id):
         db.session.rollback()
         return error_response(409, 'EMAIL_ALREADY_EXISTS', 'Email already registered')
 
+    profile_cache.invalidate(user.userId)
+    if 'email' in data:
+        # Only display fields go on the bus — projections derive names from email
+        publish_change('user', 'updated', user.userId, {'userId': user.userId, 'email': user.email})
+
     return jsonify(user.to_dict(include_sensitive=True)), 200
 
 
@@ -383,6 +518,7 @@ def update_user_favorites(user_id):
 
     user.favoriteEvents = data['eventIds']
     db.session.commit()
+    profile_cache.invalidate(user.userId)
     return jsonify({'data': {'eventIds': user.favoriteEvents}}), 200
 
 
@@ -433,6 +569,7 @@ def admin_flag_user(user_id):
         pass  # Note: could add a flagReason field to User model if needed
 
     db.session.commit()
+    profile_cache.invalidate(user.userId)
     return jsonify(user.to_dict()), 200
 
 
@@ -449,24 +586,91 @@ def admin_list_users():
         type: string
         enum: ['true', 'false']
         description: Filter to flagged or non-flagged users
+      - in: query
+        name: cursor
+        type: string
+        description: >
+          Keyset cursor (pagination.nextCursor from the previous page). Pass an
+          empty value to start paging; without it every user is returned as
+          one streamed array.
+      - in: query
+        name: limit
+        type: integer
+        default: 100
+        description: Page size in keyset mode (max 500)
     responses:
       200:
-        description: Array of users
+        description: Array of users, oldest first (keyset mode returns {users, pagination})
         schema:
           type: array
           items:
             $ref: '#/definitions/User'
     """
-    flagged = request.args.get('flagged')
+    return listing_response(filter_flagged(User.query))
 
-    query = User.query
-    if flagged == 'true':
-        query = query.filter_by(isFlagged=True)
-    elif flagged == 'false':
-        query = query.filter_by(isFlagged=False)
 
-    users = query.order_by(User.createdAt.asc()).all()
-    return jsonify([user.to_dict() for user in users]), 200
+@bp.get('/admin/users/export')
+def admin_export_users():
+    """
+    Export users as NDJSON or CSV (admin)
+    ---
+    tags:
+      - Admin Users
+    produces:
+      - application/x-ndjson
+      - text/csv
+    parameters:
+      - in: query
+        name: format
+        type: string
+        enum: [ndjson, csv]
+        default: ndjson
+      - in: query
+        name: flagged
+        type: string
+        enum: ['true', 'false']
+        description: Filter to flagged or non-flagged users
+    responses:
+      200:
+        description: >
+          One user per line (no password or salt), oldest first, streamed
+          from a server-side cursor
+      400:
+        description: Unsupported format
+    """
+    export_format = request.args.get('format', default='ndjson', type=str)
+    if export_format not in EXPORT_FORMATS:
+        return error_response(400, 'VALIDATION_ERROR', 'format must be one of ndjson, csv')
+
+    users = stream_users(filter_flagged(User.query))
+    if export_format == 'ndjson':
+        body, mimetype = (json.dumps(user.to_dict()) + '\n' for user in users), 'application/x-ndjson'
+    else:
+        body, mimetype = _csv_lines(users), 'text/csv'
+    return Response(
+        stream_with_context(body),
+        mimetype=mimetype,
+        headers={'Content-Disposition': f'attachment; filename=users.{export_format}'},
+    )
+
+
+def _csv_lines(users):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+
+    def flush():
+        line = buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+        return line
+
+    writer.writerow(EXPORT_FIELDS)
+    yield flush()
+    for user in users:
+        row = user.to_dict()
+        row['favoriteEvents'] = ';'.join(row['favoriteEvents'])
+        writer.writerow([row[field] for field in EXPORT_FIELDS])
+        yield flush()
 
 
 # Password reset endpoints
@@ -754,6 +958,7 @@ def admin_unflag_user(user_id: str):
 
     user.isFlagged = False
     db.session.commit()
+    profile_cache.invalidate(user.userId)
 
     return jsonify({
         'message': 'User unflagged successfully',
@@ -788,6 +993,37 @@ def admin_get_user(user_id: str):
     return jsonify(user.to_dict(include_sensitive=True)), 200
 
 
+def escape_like(value):
+    return value.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+
+
+def encode_search_cursor(user, rank):
+    raw = json.dumps([rank, user.email])
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def decode_search_cursor(cursor):
+    """Return (rank, email) from an opaque search cursor, or None if malformed."""
+    try:
+        rank, email = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        return int(rank), str(email)
+    except (ValueError, TypeError, binascii.Error, json.JSONDecodeError):
+        return None
+
+
+def estimate_count(query):
+    """Planner row estimate on Postgres (no scan); an exact count elsewhere."""
+    if db.engine.dialect.name != 'postgresql':
+        return query.count()
+    compiled = query.statement.compile(dialect=db.engine.dialect)
+    plan = db.session.connection().exec_driver_sql(
+        f'EXPLAIN (FORMAT JSON) {compiled}', compiled.params
+    ).scalar()
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]['Plan']['Plan Rows'])
+
+
 @bp.get('/admin/users/search')
 def admin_search_users():
     """
@@ -800,7 +1036,28 @@ def admin_search_users():
         name: q
         type: string
         required: true
-        description: Search by email or phone number
+        description: >
+          Search by email or phone number (case-insensitive). Queries shorter
+          than 3 characters match the start of the email only.
+      - in: query
+        name: match
+        type: string
+        enum: [contains, prefix]
+        default: contains
+        description: prefix matches the start of the email only, the fastest lookup
+      - in: query
+        name: count
+        type: string
+        enum: [exact, estimate, none]
+        description: >
+          How pagination.total is computed. estimate uses the query planner's
+          row estimate on Postgres. Defaults to exact, or none in keyset mode.
+      - in: query
+        name: cursor
+        type: string
+        description: >
+          Keyset cursor (pagination.nextCursor from the previous page). Pass an
+          empty value to start paging; page is ignored in keyset mode.
       - in: query
         name: page
         type: integer
@@ -811,7 +1068,9 @@ def admin_search_users():
         default: 20
     responses:
       200:
-        description: Matching users
+        description: >
+          Matching users, exact email or phone matches first, then email
+          prefix matches, then the rest, each by email
         schema:
           type: object
           properties:
@@ -820,40 +1079,89 @@ def admin_search_users():
               items:
                 $ref: '#/definitions/User'
             pagination:
-              $ref: '#/definitions/Pagination'
+              type: object
+              properties:
+                page:
+                  type: integer
+                limit:
+                  type: integer
+                total:
+                  type: integer
+                totalIsEstimate:
+                  type: boolean
+                nextCursor:
+                  type: string
       400:
-        description: Missing search query
+        description: Missing search query, or invalid match, count, page, limit or cursor
     """
-    query_param = request.args.get('q', default='', type=str)
+    query_param = request.args.get('q', default='', type=str).strip().lower()
+    match = request.args.get('match', default='contains', type=str)
     page = request.args.get('page', default=1, type=int)
     limit = request.args.get('limit', default=20, type=int)
+    keyset = 'cursor' in request.args
+    count_mode = request.args.get('count', default='none' if keyset else 'exact', type=str)
 
     if not query_param:
         return error_response(400, 'VALIDATION_ERROR', 'Search query "q" is required')
+    if match not in SEARCH_MATCH_MODES:
+        return error_response(400, 'VALIDATION_ERROR', 'match must be one of contains, prefix')
+    if count_mode not in SEARCH_COUNT_MODES:
+        return error_response(400, 'VALIDATION_ERROR', 'count must be one of exact, estimate, none')
 
-    if page < 1:
+    if page is None or page < 1:
         return error_response(400, 'VALIDATION_ERROR', 'page must be >= 1')
-    if limit < 1 or limit > 100:
+    if limit is None or limit < 1 or limit > 100:
         return error_response(400, 'VALIDATION_ERROR', 'limit must be between 1 and 100')
 
-    search_term = f"%{query_param.strip()}%"
-    query = User.query.filter(
-        (User.email.ilike(search_term)) | (User.phoneNumber.ilike(search_term))
-    )
-
-    total = query.count()
-    users = (
-        query.order_by(User.createdAt.asc())
-        .offset((page - 1) * limit)
-        .limit(limit)
-        .all()
+    pattern = escape_like(query_param)
+    email = db.func.lower(User.email)
+    email_prefix = email.like(f'{pattern}%', escape='\\')
+    if match == 'prefix' or len(query_param) < SEARCH_MIN_CONTAINS_LENGTH:
+        query = User.query.filter(email_prefix)
+    else:
+        query = User.query.filter(or_(
+            User.email.ilike(f'%{pattern}%', escape='\\'),
+            User.phoneNumber.ilike(f'%{pattern}%', escape='\\'),
+        ))
+
+    total = None
+    if count_mode == 'exact':
+        total = query.count()
+    elif count_mode == 'estimate':
+        total = estimate_count(query)
+
+    # Exact email or phone first, then email prefixes, then everything else
+    rank = case(
+        (or_(email == query_param, User.phoneNumber == query_param), 0),
+        (email_prefix, 1),
+        else_=2,
     )
-
-    return jsonify({
-        'users': [u.to_dict() for u in users],
-        'pagination': {
-            'page': page,
-            'limit': limit,
-            'total': total,
-        },
-    }), 200
+    order = (rank.asc(), User.email.asc())
+
+    if not keyset:
+        users = query.order_by(*order).offset((page - 1) * limit).limit(limit).all()
+        pagination = {'page': page, 'limit': limit, 'total': total}
+        if count_mode == 'estimate':
+            pagination['totalIsEstimate'] = True
+        return jsonify({'users': [u.to_dict() for u in users], 'pagination': pagination}), 200
+
+    cursor = request.args.get('cursor')
+    if cursor:
+        position = decode_search_cursor(cursor)
+        if position is None:
+            return error_response(400, 'VALIDATION_ERROR', 'cursor is invalid')
+        after_rank, after_email = position
+        query = query.filter(or_(
+            rank > after_rank,
+            and_(rank == after_rank, User.email > after_email),
+        ))
+    rows = query.add_columns(rank).order_by(*order).limit(limit + 1).all()
+    page_rows = rows[:limit]
+    pagination = {
+        'limit': limit,
+        'nextCursor': encode_search_cursor(*page_rows[-1]) if len(rows) > limit else None,
+    }
+    if total is not None:
+        pagination['total'] = total
+        pagination['totalIsEstimate'] = count_mode == 'estimate'
+    return jsonify({'users': [u.to_dict() for u, _ in page_rows], 'pagination': pagination}), 200
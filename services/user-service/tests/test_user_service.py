@@ -1,3 +1,8 @@
+import csv
+import io
+import json
+from unittest.mock import patch
+
 from app import create_app, db
 
 
@@ -35,6 +40,38 @@ def test_list_users_returns_created_users(client):
     assert 'salt' not in payload[0]
 
 
+def test_list_users_keyset_pages(client):
+    for index in range(3):
+        create_user(client, email=f'user{index}@example.com')
+
+    first = client.get('/users?cursor=&limit=2').get_json()
+    second = client.get(f"/users?cursor={first['pagination']['nextCursor']}&limit=2").get_json()
+
+    assert [u['email'] for u in first['users'] + second['users']] == [
+        'user0@example.com', 'user1@example.com', 'user2@example.com',
+    ]
+    assert second['pagination']['nextCursor'] is None
+    assert client.get('/users?cursor=junk').status_code == 400
+
+
+def test_admin_export_streams_ndjson_and_csv(client):
+    create_user(client, email='a@example.com')
+    flagged = create_user(client, email='b@example.com').get_json()
+    client.patch(f"/admin/users/{flagged['userId']}/flag", json={'isFlagged': True})
+
+    response = client.get('/admin/users/export')
+    assert response.is_streamed
+    lines = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+    assert [u['email'] for u in lines] == ['a@example.com', 'b@example.com']
+    assert 'password' not in lines[0]
+
+    response = client.get('/admin/users/export?format=csv&flagged=true')
+    assert response.mimetype == 'text/csv'
+    rows = list(csv.DictReader(io.StringIO(response.get_data(as_text=True))))
+    assert [r['email'] for r in rows] == ['b@example.com']
+    assert client.get('/admin/users/export?format=xml').status_code == 400
+
+
 def test_create_user(client):
     response = create_user(client)
 
@@ -84,6 +121,88 @@ def test_patch_user_updates_allowed_fields(client):
     assert payload['salt'] == 'salt-value'
 
 
+def test_email_changes_reuse_one_publisher_connection(client, monkeypatch):
+    import change_events
+
+    connections = []
+
+    class FakeChannel:
+        is_open = True
+
+        def __init__(self):
+            self.published = []
+
+        def exchange_declare(self, **kwargs):
+            pass
+
+        def basic_publish(self, **kwargs):
+            self.published.append(json.loads(kwargs['body']))
+
+    class FakeConnection:
+        is_open = True
+
+        def __init__(self, params):
+            self._channel = FakeChannel()
+            connections.append(self)
+
+        def channel(self):
+            return self._channel
+
+    monkeypatch.setattr(change_events.pika, 'BlockingConnection', FakeConnection)
+    monkeypatch.setattr(change_events, '_publisher', change_events._Publisher())
+    created = create_user(client).get_json()
+
+    for email in ('a@example.com', 'b@example.com'):
+        client.patch(f"/users/{created['userId']}", json={'email': email})
+
+    assert len(connections) == 1
+    assert [m['data'] for m in connections[0].channel().published] == [
+        {'userId': created['userId'], 'email': 'a@example.com'},
+        {'userId': created['userId'], 'email': 'b@example.com'},
+    ]
+
+
+def test_publisher_backs_off_while_broker_is_down(monkeypatch):
+    import change_events
+
+    attempts = []
+
+    def refuse(params):
+        attempts.append(params)
+        raise OSError('connection refused')
+
+    monkeypatch.setattr(change_events.pika, 'BlockingConnection', refuse)
+    publisher = change_events._Publisher()
+
+    assert publisher.publish('user.updated', '{}') is False
+    assert publisher.publish('user.updated', '{}') is False
+    assert len(attempts) == 1
+
+
+def test_get_user_profile_excludes_sensitive_fields(client):
+    created = create_user(client).get_json()
+
+    response = client.get(f"/users/{created['userId']}/profile")
+
+    assert response.status_code == 200
+    payload = response.get_json()
+    assert payload['phoneNumber'] == '+6591234567'
+    assert 'password' not in payload
+    assert 'salt' not in payload
+
+
+def test_profile_writes_invalidate_cached_profile(client):
+    user_id = create_user(client).get_json()['userId']
+
+    with patch('routes.profile_cache') as cache:
+        client.patch(f'/users/{user_id}', json={'phoneNumber': '+6588888888'})
+        client.put(f'/users/{user_id}/favorites', json={'eventIds': ['e1']})
+        client.patch(f'/admin/users/{user_id}/flag', json={'isFlagged': True})
+        client.patch(f'/admin/users/{user_id}/unflag')
+
+    assert [c.args for c in cache.invalidate.call_args_list] == [(user_id,)] * 4
+
+
 def test_get_user_by_email_includes_sensitive_fields(client):
     create_user(client)
 
@@ -95,6 +214,47 @@ def test_get_user_by_email_includes_sensitive_fields(client):
     assert payload['salt'] == 'salt-value'
 
 
+def test_admin_search_ranks_exact_and_prefix_matches_first(client):
+    for email in ('zed.ann@example.com', 'ann@example.com', 'annie@example.com', 'bob@ann.io'):
+        create_user(client, email=email)
+
+    response = client.get('/admin/users/search?q=ANN')
+
+    assert response.status_code == 200
+    payload = response.get_json()
+    assert [u['email'] for u in payload['users']] == [
+        'ann@example.com', 'annie@example.com', 'bob@ann.io', 'zed.ann@example.com',
+    ]
+    assert payload['pagination']['total'] == 4
+
+    prefix = client.get('/admin/users/search?q=ann&match=prefix').get_json()
+    assert [u['email'] for u in prefix['users']] == ['ann@example.com', 'annie@example.com']
+
+    literal = client.get('/admin/users/search?q=a_n').get_json()
+    assert literal['users'] == []
+
+
+def test_admin_search_keyset_pages_with_estimated_count(client):
+    for index in range(5):
+        create_user(client, email=f'user{index}@example.com')
+
+    seen = []
+    cursor = ''
+    while cursor is not None:
+        response = client.get(
+            '/admin/users/search',
+            query_string={'q': 'example', 'limit': 2, 'cursor': cursor, 'count': 'estimate'},
+        )
+        assert response.status_code == 200
+        payload = response.get_json()
+        seen += [u['email'] for u in payload['users']]
+        assert payload['pagination']['total'] == 5
+        cursor = payload['pagination']['nextCursor']
+
+    assert seen == [f'user{index}@example.com' for index in range(5)]
+    assert client.get('/admin/users/search?q=example&cursor=junk').status_code == 400
+
+
 def test_unhandled_errors_hide_stack_trace_by_default():
     app = create_app(
         {
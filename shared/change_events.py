@@ -0,0 +1,185 @@
+"""
+Entity change events for denormalized read models.
+
+Owning services (event, user, ticket) publish a small message to the
+`entity_changes` topic exchange after a committed write. Services that keep
+a projection of that data bind their own durable queue to the routing keys
+they care about and apply the change locally, so hot read paths never fan
+out to the owners.
+
+Routing key: "<entity>.<action>", e.g. "event.updated", "user.updated".
+Message body:
+    {"entity": "event", "action": "updated", "id": "<entityId>",
+     "data": {...}, "occurredAt": "<iso8601>"}
+
+Publishing is best-effort: a RabbitMQ outage never fails the owning write,
+and each process keeps one publisher connection rather than connecting per
+write.
+Projections must therefore tolerate missed events (they are refreshed again
+on the next change and can always be rebuilt from the owners).
+"""
+import json
+import logging
+import os
+import threading
+import time
+from datetime import datetime, timezone
+
+import pika
+
+logger = logging.getLogger(__name__)
+
+EXCHANGE = os.environ.get("CHANGE_EVENTS_EXCHANGE", "entity_changes")
+RECONNECT_BACKOFF_SECONDS = 30
+
+
+def _enabled():
+    return os.environ.get("CHANGE_EVENTS_ENABLED", "true").lower() == "true"
+
+
+def _connection_params(connection_attempts=1, heartbeat=None):
+    return pika.ConnectionParameters(
+        host=os.environ.get("RABBITMQ_HOST", "rabbitmq"),
+        port=int(os.environ.get("RABBITMQ_PORT", "5672")),
+        credentials=pika.PlainCredentials(
+            os.environ.get("RABBITMQ_USER", "guest"),
+            os.environ.get("RABBITMQ_PASS", "guest"),
+        ),
+        connection_attempts=connection_attempts,
+        retry_delay=3,
+        socket_timeout=2,
+        blocked_connection_timeout=2,
+        heartbeat=heartbeat,
+    )
+
+
+def declare_exchange(channel):
+    channel.exchange_declare(exchange=EXCHANGE, exchange_type="topic", durable=True)
+
+
+class _Publisher:
+    """
+    One broker connection per process, reused by every publish.
+
+    pika's BlockingConnection is not thread-safe, so publishes are serialized
+    on a lock (each is a single non-confirmed basic_publish). After a failed
+    connect, publishing is skipped for RECONNECT_BACKOFF_SECONDS so a broker
+    outage costs requests nothing instead of a connect timeout each.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._connection = None
+        self._channel = None
+        self._retry_after = 0.0
+
+    def _get_channel(self):
+        if self._channel is not None and self._channel.is_open:
+            return self._channel
+        self._close()
+        if time.monotonic() < self._retry_after:
+            return None
+        try:
+            # No heartbeats: the connection sits idle between writes and is
+            # never pumped, so the broker would otherwise drop it.
+            self._connection = pika.BlockingConnection(_connection_params(heartbeat=0))
+            self._channel = self._connection.channel()
+            declare_exchange(self._channel)
+            return self._channel
+        except Exception as exc:
+            logger.warning("Change event publisher cannot reach RabbitMQ: %s", exc)
+            self._close()
+            self._retry_after = time.monotonic() + RECONNECT_BACKOFF_SECONDS
+            return None
+
+    def _close(self):
+        if self._connection is not None and self._connection.is_open:
+            try:
+                self._connection.close()
+            except Exception:
+                pass
+        self._connection = None
+        self._channel = None
+
+    def publish(self, routing_key, body):
+        with self._lock:
+            # A connection the broker dropped while idle fails on first use;
+            # reconnect once before giving up.
+            for _ in range(2):
+                channel = self._get_channel()
+                if channel is None:
+                    return False
+                try:
+                    channel.basic_publish(
+                        exchange=EXCHANGE,
+                        routing_key=routing_key,
+                        body=body,
+                        properties=pika.BasicProperties(delivery_mode=2, content_type="application/json"),
+                    )
+                    return True
+                except Exception as exc:
+                    logger.warning("Change event publish on %s failed: %s", routing_key, exc)
+                    self._close()
+            return False
+
+
+_publisher = _Publisher()
+
+
+def publish_change(entity, action, entity_id, data=None):
+    """
+    Publish a committed change. Returns True if the broker accepted it.
+    Call after db.session.commit() so consumers never see uncommitted state.
+    Keep data to the fields some projection reads.
+    """
+    if not _enabled():
+        return False
+
+    message = {
+        "entity": entity,
+        "action": action,
+        "id": entity_id,
+        "data": data or {},
+        "occurredAt": datetime.now(timezone.utc).isoformat(),
+    }
+    published = _publisher.publish(f"{entity}.{action}", json.dumps(message))
+    if not published:
+        logger.warning("Dropped %s.%s change for %s", entity, action, entity_id)
+    return published
+
+
+def consume_changes(queue, bindings, handler, prefetch_count=20):
+    """
+    Blocking consumer — run in a daemon thread.
+
+    Declares `queue` (durable) bound to `bindings` on the change exchange and
+    calls handler(message_dict) for every message. Handlers must be idempotent.
+    A message whose handler raises is dropped, not redelivered (the queue has
+    no dead-letter exchange); its body is logged so the projection row can be
+    repaired by hand or refreshed by the next change.
+    """
+    while True:
+        try:
+            connection = pika.BlockingConnection(_connection_params(connection_attempts=5))
+            channel = connection.channel()
+            declare_exchange(channel)
+            channel.queue_declare(queue=queue, durable=True)
+            for routing_key in bindings:
+                channel.queue_bind(queue=queue, exchange=EXCHANGE, routing_key=routing_key)
+
+            def on_message(ch, method, _properties, body):
+                try:
+                    handler(json.loads(body))
+                    ch.basic_ack(delivery_tag=method.delivery_tag)
+                except Exception as exc:
+                    logger.error("Change handler for %s failed on %s, dropping %s: %s",
+                                 queue, method.routing_key, body, exc)
+                    ch.basic_nack(delivery_tag=method.delivery_tag, requeue=False)
+
+            channel.basic_qos(prefetch_count=prefetch_count)
+            channel.basic_consume(queue=queue, on_message_callback=on_message)
+            logger.info("Change consumer started on %s (%s)", queue, ", ".join(bindings))
+            channel.start_consuming()
+        except Exception as exc:
+            logger.warning("Change consumer %s disconnected: %s — retrying in 5s", queue, exc)
+            time.sleep(5)
@@ -0,0 +1,222 @@
+"""
+Short-TTL Redis cache in front of credit balance reads.
+
+Balance views, purchase confirms and transfers all read the same per-user
+balance. CreditBalanceCache keeps it under credit_balance:{userId} for
+CREDIT_BALANCE_CACHE_TTL_SECONDS and is written through with balanceAfter
+every time an orchestrator posts a ledger entry, so the balance a user sees
+right after spending or topping up is the new one. A value can only be stale
+when two writers race, and then only until the TTL ends; that is safe for
+the pre-checks it feeds because the debit itself is conditional in
+credit-transaction-service.
+
+Concurrent misses for one user within a process share a single fetch
+(single-flight), so a burst of confirms for one buyer makes one upstream
+call. Hits, misses, shared fetches and upstream fetch latency are counted
+in-process; stats() returns them and a summary is logged every
+CREDIT_BALANCE_STATS_LOG_SECONDS.
+
+Caching is best-effort in the same way as saga_journal: without Redis every
+read goes upstream (still single-flighted).
+"""
+import json
+import logging
+import os
+import threading
+import time
+from concurrent.futures import Future
+from concurrent.futures import TimeoutError as FuturesTimeout
+from typing import Optional
+
+import redis
+
+logger = logging.getLogger(__name__)
+
+REDIS_URL = os.environ.get("REDIS_URL", "")
+CACHE_PREFIX = os.environ.get("CREDIT_BALANCE_CACHE_PREFIX", "credit_balance:")
+CACHE_TTL_SECONDS = int(os.environ.get("CREDIT_BALANCE_CACHE_TTL_SECONDS", "15"))
+FETCH_WAIT_SECONDS = float(os.environ.get("CREDIT_BALANCE_FETCH_WAIT_SECONDS", "10"))
+STATS_LOG_SECONDS = int(os.environ.get("CREDIT_BALANCE_STATS_LOG_SECONDS", "60"))
+RECONNECT_BACKOFF_SECONDS = 30
+
+
+class CreditBalanceCache:
+    """
+    fetch(user_id) must return (data, err) like call_service, with the
+    balance in data["creditBalance"]. Cached entries are normalized to
+    {"userId", "creditBalance"}.
+    """
+
+    def __init__(self, fetch, redis_url: Optional[str] = None, ttl_seconds: int = CACHE_TTL_SECONDS):
+        self._fetch = fetch
+        self.redis_url = redis_url if redis_url is not None else REDIS_URL
+        self.ttl_seconds = ttl_seconds
+        self._client = None
+        self._retry_after = 0.0
+        self._inflight = {}
+        self._lock = threading.Lock()
+        self._stats = {
+            "hits": 0,
+            "misses": 0,
+            "shared": 0,
+            "fetchErrors": 0,
+            "fetchSecondsTotal": 0.0,
+            "fetchSecondsMax": 0.0,
+        }
+        self._last_stats_log = time.monotonic()
+
+    def _get_client(self):
+        """Reuse one pooled client; back off for a while after a failed connect."""
+        if self._client is not None:
+            return self._client
+        if not self.redis_url or self.ttl_seconds <= 0 or time.monotonic() < self._retry_after:
+            return None
+        try:
+            client = redis.from_url(
+                self.redis_url,
+                decode_responses=True,
+                socket_connect_timeout=2,
+                socket_timeout=2,
+            )
+            client.ping()
+            self._client = client
+            return client
+        except Exception as exc:
+            logger.warning("Redis unavailable for credit balance cache: %s", exc)
+            self._retry_after = time.monotonic() + RECONNECT_BACKOFF_SECONDS
+            return None
+
+    def _reset_client(self):
+        self._client = None
+        self._retry_after = time.monotonic() + RECONNECT_BACKOFF_SECONDS
+
+    def _read(self, user_id):
+        client = self._get_client()
+        if client is None:
+            return None
+        try:
+            raw = client.get(f"{CACHE_PREFIX}{user_id}")
+        except Exception as exc:
+            logger.warning("Credit balance cache read failed for %s: %s", user_id, exc)
+            self._reset_client()
+            return None
+        return json.loads(raw) if raw else None
+
+    def put(self, user_id, balance):
+        """Write-through after a ledger entry moved the balance. Returns True if cached."""
+        if balance is None:
+            return self.invalidate(user_id)
+        client = self._get_client()
+        if client is None:
+            return False
+        try:
+            client.setex(
+                f"{CACHE_PREFIX}{user_id}",
+                self.ttl_seconds,
+                json.dumps({"userId": user_id, "creditBalance": float(balance)}),
+            )
+            return True
+        except Exception as exc:
+            logger.warning("Credit balance cache write failed for %s: %s", user_id, exc)
+            self._reset_client()
+            return False
+
+    def put_ledger_entry(self, user_id, txn):
+        """
+        Write-through from a credit-transactions POST response. A repeat of an
+        already-recorded entry (created=False) carries the balanceAfter of the
+        original write, so the cached value is dropped instead.
+        """
+        txn = txn or {}
+        if txn.get("created") is False:
+            return self.invalidate(user_id)
+        return self.put(user_id, txn.get("balanceAfter"))
+
+    def invalidate(self, user_id):
+        """Drop a balance whose new value is unknown (e.g. a refused or failed write)."""
+        client = self._get_client()
+        if client is None:
+            return False
+        try:
+            client.delete(f"{CACHE_PREFIX}{user_id}")
+            return True
+        except Exception as exc:
+            logger.warning("Credit balance cache invalidate failed for %s: %s", user_id, exc)
+            self._reset_client()
+            return False
+
+    def get(self, user_id):
+        """(balance, err) for user_id, from cache or one shared upstream fetch."""
+        cached = self._read(user_id)
+        if cached is not None:
+            self._count("hits")
+            return cached, None
+
+        with self._lock:
+            call = self._inflight.get(user_id)
+            leader = call is None
+            if leader:
+                call = self._inflight[user_id] = Future()
+                self._stats["misses"] += 1
+            else:
+                self._stats["shared"] += 1
+
+        if not leader:
+            try:
+                return call.result(timeout=FETCH_WAIT_SECONDS)
+            except FuturesTimeout:
+                return None, "SERVICE_UNAVAILABLE"
+
+        started = time.monotonic()
+        try:
+            data, err = self._fetch(user_id)
+        except Exception as exc:
+            logger.warning("Credit balance fetch failed for %s: %s", user_id, exc)
+            data, err = None, "SERVICE_UNAVAILABLE"
+        self._record_fetch(time.monotonic() - started, err)
+
+        if not err and data is not None:
+            data = {"userId": user_id, "creditBalance": float(data.get("creditBalance") or 0.0)}
+            self.put(user_id, data["creditBalance"])
+        with self._lock:
+            self._inflight.pop(user_id, None)
+        call.set_result((data, err))
+        return data, err
+
+    def _count(self, name):
+        with self._lock:
+            self._stats[name] += 1
+        self._maybe_log_stats()
+
+    def _record_fetch(self, seconds, err):
+        with self._lock:
+            self._stats["fetchSecondsTotal"] += seconds
+            self._stats["fetchSecondsMax"] = max(self._stats["fetchSecondsMax"], seconds)
+            if err:
+                self._stats["fetchErrors"] += 1
+        self._maybe_log_stats()
+
+    def stats(self):
+        """Counters since start, plus the derived hit ratio and mean fetch latency."""
+        with self._lock:
+            snapshot = dict(self._stats)
+        lookups = snapshot["hits"] + snapshot["misses"] + snapshot["shared"]
+        snapshot["hitRatio"] = (snapshot["hits"] + snapshot["shared"]) / lookups if lookups else 0.0
+        snapshot["fetchSecondsMean"] = (
+            snapshot["fetchSecondsTotal"] / snapshot["misses"] if snapshot["misses"] else 0.0
+        )
+        return snapshot
+
+    def _maybe_log_stats(self):
+        now = time.monotonic()
+        with self._lock:
+            if now - self._last_stats_log < STATS_LOG_SECONDS:
+                return
+            self._last_stats_log = now
+        s = self.stats()
+        logger.info(
+            "Credit balance cache: %d hits, %d misses, %d shared, hit ratio %.2f, "
+            "fetch mean %.3fs max %.3fs, %d fetch errors",
+            s["hits"], s["misses"], s["shared"], s["hitRatio"],
+            s["fetchSecondsMean"], s["fetchSecondsMax"], s["fetchErrors"],
+        )
@@ -0,0 +1,216 @@
+"""
+Per-dependency concurrency and rate governor for outbound calls to external APIs.
+
+SMU (OTP), OutSystems (credit balances) and Stripe are slow and rate limited
+on their side. Without a cap, a stall there holds one of our request threads
+per call until every thread is waiting on it. Each OutboundGovernor bounds
+one dependency, per process:
+
+- at most max_concurrent calls in flight;
+- at most rate_per_second calls started, with bursts of up to burst (token
+  bucket; 0 disables the rate);
+- callers that cannot start immediately queue for up to
+  queue_timeout_seconds, and no more than max_queue of them wait at once.
+  Anyone beyond that fails fast with GovernorSaturated instead of tying up
+  a worker.
+
+    smu = governor("smu", max_concurrent=4, rate_per_second=10)
+    try:
+        with smu.slot():
+            response = requests.post(...)
+    except GovernorSaturated:
+        ...  # 503, the dependency is saturated
+
+The limits are per process and only bind across threads: a sync gunicorn
+worker has one request in flight, so it never reaches any cap. Services that
+use a governor therefore run gthread workers (-k gthread --threads 16) with
+max_concurrent below --threads, and the service-wide ceiling is the number
+of processes times max_concurrent. otp-wrapper runs a single process so its
+SMU cap is the global one.
+
+governor(name) returns one shared instance per name; every setting can be
+overridden with OUTBOUND_<NAME>_MAX_CONCURRENT, _RATE_PER_SECOND, _BURST,
+_QUEUE_TIMEOUT_SECONDS and _MAX_QUEUE. stats() reports saturation (in
+flight, queued, rejections, wait and call times) and a summary is logged
+every OUTBOUND_STATS_LOG_SECONDS.
+"""
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+STATS_LOG_SECONDS = int(os.environ.get("OUTBOUND_STATS_LOG_SECONDS", "60"))
+
+
+class GovernorSaturated(Exception):
+    """Raised when a call could not start within the governor's limits."""
+
+    def __init__(self, name, reason):
+        super().__init__(f"Outbound {name} saturated ({reason})")
+        self.name = name
+        self.reason = reason   # "queue_full" or "queue_timeout"
+
+
+class OutboundGovernor:
+    def __init__(
+        self,
+        name: str,
+        max_concurrent: int,
+        rate_per_second: float = 0,
+        burst: int = 0,
+        queue_timeout_seconds: float = 1.0,
+        max_queue: int = 0,
+    ):
+        self.name = name
+        self.max_concurrent = max_concurrent
+        self.rate_per_second = rate_per_second
+        self.burst = burst or max(1, int(rate_per_second))
+        self.queue_timeout_seconds = queue_timeout_seconds
+        self.max_queue = max_queue or max_concurrent
+        self._cond = threading.Condition()
+        self._in_flight = 0
+        self._waiting = 0
+        self._tokens = float(self.burst)
+        self._refilled_at = time.monotonic()
+        self._stats = {
+            "admitted": 0, "rejectedQueueFull": 0, "rejectedTimeout": 0, "inFlightPeak": 0,
+            "waitSecondsTotal": 0.0, "waitSecondsMax": 0.0,
+            "callSecondsTotal": 0.0, "callSecondsMax": 0.0,
+        }
+        self._last_stats_log = time.monotonic()
+
+    # ── Admission ────────────────────────────────────────────────────────────
+
+    def _refill(self, now):
+        if self.rate_per_second > 0:
+            elapsed = now - self._refilled_at
+            self._tokens = min(self.burst, self._tokens + elapsed * self.rate_per_second)
+        self._refilled_at = now
+
+    def _wait_for_token(self):
+        """Seconds until the bucket holds a token (0 when it does or there is no rate)."""
+        if self.rate_per_second <= 0 or self._tokens >= 1:
+            return 0.0
+        return (1 - self._tokens) / self.rate_per_second
+
+    def acquire(self):
+        """Take a slot and a token, queueing up to queue_timeout_seconds."""
+        started = time.monotonic()
+        deadline = started + self.queue_timeout_seconds
+        with self._cond:
+            self._refill(started)
+            if self._in_flight >= self.max_concurrent or self._wait_for_token() > 0:
+                if self._waiting >= self.max_queue:
+                    self._stats["rejectedQueueFull"] += 1
+                    raise GovernorSaturated(self.name, "queue_full")
+            self._waiting += 1
+            try:
+                while True:
+                    now = time.monotonic()
+                    self._refill(now)
+                    token_wait = self._wait_for_token()
+                    if self._in_flight < self.max_concurrent and token_wait == 0:
+                        break
+                    remaining = deadline - now
+                    if remaining <= 0:
+                        self._stats["rejectedTimeout"] += 1
+                        raise GovernorSaturated(self.name, "queue_timeout")
+                    # A free slot is signalled by release(); a token just needs time
+                    if self._in_flight < self.max_concurrent:
+                        remaining = min(remaining, token_wait)
+                    self._cond.wait(remaining)
+            finally:
+                self._waiting -= 1
+            if self.rate_per_second > 0:
+                self._tokens -= 1
+            self._in_flight += 1
+            waited = time.monotonic() - started
+            self._stats["admitted"] += 1
+            self._stats["inFlightPeak"] = max(self._stats["inFlightPeak"], self._in_flight)
+            self._stats["waitSecondsTotal"] += waited
+            self._stats["waitSecondsMax"] = max(self._stats["waitSecondsMax"], waited)
+
+    def release(self, call_seconds: float = 0.0):
+        with self._cond:
+            self._in_flight -= 1
+            self._stats["callSecondsTotal"] += call_seconds
+            self._stats["callSecondsMax"] = max(self._stats["callSecondsMax"], call_seconds)
+            self._cond.notify()
+        self._maybe_log_stats()
+
+    @contextmanager
+    def slot(self):
+        self.acquire()
+        started = time.monotonic()
+        try:
+            yield
+        finally:
+            self.release(time.monotonic() - started)
+
+    # ── Instrumentation ──────────────────────────────────────────────────────
+
+    def stats(self):
+        """Counters since start plus the current saturation."""
+        with self._cond:
+            snapshot = dict(self._stats)
+            snapshot["inFlight"] = self._in_flight
+            snapshot["waiting"] = self._waiting
+        snapshot["maxConcurrent"] = self.max_concurrent
+        snapshot["ratePerSecond"] = self.rate_per_second
+        snapshot["saturation"] = snapshot["inFlight"] / self.max_concurrent if self.max_concurrent else 0.0
+        rejected = snapshot["rejectedQueueFull"] + snapshot["rejectedTimeout"]
+        attempts = snapshot["admitted"] + rejected
+        snapshot["rejectRatio"] = rejected / attempts if attempts else 0.0
+        return snapshot
+
+    def _maybe_log_stats(self):
+        now = time.monotonic()
+        with self._cond:
+            if now - self._last_stats_log < STATS_LOG_SECONDS:
+                return
+            self._last_stats_log = now
+        s = self.stats()
+        logger.info(
+            "Outbound %s: %d/%d in flight (peak %d), %d queued, %d admitted, "
+            "%d rejected (%d queue full, %d timed out), max wait %.2fs, max call %.2fs",
+            self.name, s["inFlight"], s["maxConcurrent"], s["inFlightPeak"], s["waiting"],
+            s["admitted"], s["rejectedQueueFull"] + s["rejectedTimeout"],
+            s["rejectedQueueFull"], s["rejectedTimeout"], s["waitSecondsMax"], s["callSecondsMax"],
+        )
+
+
+_governors = {}
+_governors_lock = threading.Lock()
+
+
+def governor(
+    name: str,
+    max_concurrent: int = 10,
+    rate_per_second: float = 0,
+    burst: int = 0,
+    queue_timeout_seconds: float = 1.0,
+    max_queue: int = 0,
+) -> OutboundGovernor:
+    """The process-wide governor for name; arguments are defaults the environment overrides."""
+    with _governors_lock:
+        if name not in _governors:
+            prefix = f"OUTBOUND_{name.upper()}_"
+            env = os.environ.get
+            _governors[name] = OutboundGovernor(
+                name,
+                max_concurrent=int(env(f"{prefix}MAX_CONCURRENT", max_concurrent)),
+                rate_per_second=float(env(f"{prefix}RATE_PER_SECOND", rate_per_second)),
+                burst=int(env(f"{prefix}BURST", burst)),
+                queue_timeout_seconds=float(env(f"{prefix}QUEUE_TIMEOUT_SECONDS", queue_timeout_seconds)),
+                max_queue=int(env(f"{prefix}MAX_QUEUE", max_queue)),
+            )
+        return _governors[name]
+
+
+def all_stats():
+    with _governors_lock:
+        governors = list(_governors.values())
+    return {g.name: g.stats() for g in governors}
@@ -7,6 +7,10 @@ Declares:
   - seat_hold_dlx (exchange): Dead letter exchange that receives expired hold messages.
   - seat_hold_expired_queue: Bound to the DLX. Consumer releases the seat via gRPC.
   - seller_notification_queue: Notifies seller when a buyer verifies OTP during P2P transfer.
+  - purchase_confirm_queue: Async purchase confirmations awaiting a purchase worker.
+  - credit_topup_queue: Verified Stripe top-ups awaiting a credit-orchestrator top-up worker.
+  - credit_topup_dlq: Paid top-ups that could not be applied, kept for manual reconciliation.
+  - registration_jobs_queue: Post-registration credit account and OTP jobs for auth-orchestrator workers.
 
 Call this module on startup of Ticket Purchase Orchestrator and Transfer Orchestrator:
     python -m shared.queue_setup
@@ -80,11 +84,36 @@ def declare_queues(channel=None):
         durable=True,
     )
 
+    # Async purchase confirmations, completed by ticket-purchase-orchestrator workers
+    channel.queue_declare(
+        queue='purchase_confirm_queue',
+        durable=True,
+    )
+
+    # Verified Stripe top-ups, applied by credit-orchestrator top-up workers
+    channel.queue_declare(
+        queue='credit_topup_queue',
+        durable=True,
+    )
+
+    # Paid top-ups the workers gave up on, for manual reconciliation
+    channel.queue_declare(
+        queue='credit_topup_dlq',
+        durable=True,
+    )
+
+    # Post-registration side effects, run by auth-orchestrator registration workers
+    channel.queue_declare(
+        queue='registration_jobs_queue',
+        durable=True,
+    )
+
     print(
         f'Queue setup complete. '
         f'TTL={hold_ttl_ms}ms, '
         f'DLX=seat_hold_dlx, '
-        f'Queues: seat_hold_ttl_queue, seat_hold_expired_queue, seller_notification_queue, transfer_timeout_queue'
+        f'Queues: seat_hold_ttl_queue, seat_hold_expired_queue, seller_notification_queue, transfer_timeout_queue, '
+        f'purchase_confirm_queue, credit_topup_queue, credit_topup_dlq, registration_jobs_queue'
     )
 
     if close_after:
@@ -0,0 +1,157 @@
+"""
+Sliding-window rate limiter decided in one atomic Redis call.
+
+RateLimiter.hit(key) runs a Lua script that drops entries older than the
+window, checks the lockout and the count, and either records the hit or
+denies it, all inside Redis. Concurrent callers can therefore never both
+take the last slot, and each decision costs a single round trip (EVALSHA
+on a pooled connection; redis-py falls back to EVAL once after a Redis
+restart).
+
+Hits live in a sorted set per key ({prefix}:{key}) scored by Redis server
+time, so the window slides and clock skew between app hosts does not
+matter. With lockout_seconds set, the first denied hit also locks the key
+({prefix}:lock:{key}) for that long, even after the window empties.
+
+Limiting is best-effort in the same way as credit_balance_cache: without
+Redis every hit is allowed (and logged), so a Redis outage never blocks
+sign-ins or purchases.
+
+    otp_limiter = RateLimiter("otp", limit=5, window_seconds=900, lockout_seconds=900)
+    decision = otp_limiter.hit(phone_number)
+    if not decision.allowed:
+        ...  # 429, Retry-After: decision.retry_after
+"""
+import logging
+import os
+import time
+import uuid
+from typing import NamedTuple, Optional
+
+import redis
+
+logger = logging.getLogger(__name__)
+
+REDIS_URL = os.environ.get("REDIS_URL", "")
+KEY_PREFIX = os.environ.get("RATE_LIMIT_KEY_PREFIX", "rate")
+RECONNECT_BACKOFF_SECONDS = 30
+
+# KEYS[1] hit log (sorted set), KEYS[2] lock
+# ARGV: limit, window ms, lockout ms, cost, member id
+# Returns {allowed, remaining, retry_after_ms, count}
+_HIT_SCRIPT = """
+local t = redis.call('TIME')
+local now = tonumber(t[1]) * 1000 + math.floor(tonumber(t[2]) / 1000)
+local limit = tonumber(ARGV[1])
+local window = tonumber(ARGV[2])
+local lockout = tonumber(ARGV[3])
+local cost = tonumber(ARGV[4])
+
+local locked = redis.call('PTTL', KEYS[2])
+if locked > 0 then
+  return {0, 0, locked, limit}
+end
+
+redis.call('ZREMRANGEBYSCORE', KEYS[1], '-inf', now - window)
+local count = redis.call('ZCARD', KEYS[1])
+if count + cost > limit then
+  local retry = 0
+  if lockout > 0 then
+    redis.call('SET', KEYS[2], '1', 'PX', lockout)
+    retry = lockout
+  else
+    local oldest = redis.call('ZRANGE', KEYS[1], 0, 0, 'WITHSCORES')
+    if oldest[2] then
+      retry = tonumber(oldest[2]) + window - now
+    end
+  end
+  return {0, math.max(limit - count, 0), retry, count}
+end
+
+for i = 1, cost do
+  redis.call('ZADD', KEYS[1], now, ARGV[5] .. ':' .. i)
+end
+redis.call('PEXPIRE', KEYS[1], window)
+return {1, limit - count - cost, 0, count + cost}
+"""
+
+
+class Decision(NamedTuple):
+    allowed: bool
+    remaining: int        # hits still allowed in the current window
+    retry_after: int      # seconds until a denied key may try again (0 when allowed)
+    count: int            # hits in the window, including this one when allowed
+
+
+class RateLimiter:
+    def __init__(
+        self,
+        name: str,
+        limit: int,
+        window_seconds: float,
+        lockout_seconds: float = 0,
+        redis_url: Optional[str] = None,
+    ):
+        self.name = name
+        self.limit = limit
+        self.window_ms = int(window_seconds * 1000)
+        self.lockout_ms = int(lockout_seconds * 1000)
+        self.redis_url = redis_url if redis_url is not None else REDIS_URL
+        self._client = None
+        self._script = None
+        self._retry_after = 0.0
+
+    def _get_client(self):
+        """Reuse one pooled client; back off for a while after a failed connect."""
+        if self._client is not None:
+            return self._client
+        if not self.redis_url or time.monotonic() < self._retry_after:
+            return None
+        try:
+            client = redis.from_url(
+                self.redis_url,
+                decode_responses=True,
+                socket_connect_timeout=2,
+                socket_timeout=2,
+            )
+            client.ping()
+            self._script = client.register_script(_HIT_SCRIPT)
+            self._client = client
+            return client
+        except Exception as exc:
+            logger.warning("Redis unavailable for %s rate limiter: %s", self.name, exc)
+            self._retry_after = time.monotonic() + RECONNECT_BACKOFF_SECONDS
+            return None
+
+    def _reset_client(self):
+        self._client = None
+        self._retry_after = time.monotonic() + RECONNECT_BACKOFF_SECONDS
+
+    def _keys(self, key):
+        return [f"{KEY_PREFIX}:{self.name}:{key}", f"{KEY_PREFIX}:{self.name}:lock:{key}"]
+
+    def hit(self, key, cost: int = 1) -> Decision:
+        """Record cost hits for key if they fit in the window; deny otherwise."""
+        if self._get_client() is None:
+            return Decision(True, self.limit, 0, 0)
+        try:
+            allowed, remaining, retry_ms, count = self._script(
+                keys=self._keys(key),
+                args=[self.limit, self.window_ms, self.lockout_ms, cost, uuid.uuid4().hex],
+            )
+        except Exception as exc:
+            logger.warning("%s rate limiter failed for %s, allowing: %s", self.name, key, exc)
+            self._reset_client()
+            return Decision(True, self.limit, 0, 0)
+        return Decision(bool(allowed), int(remaining), -(-int(retry_ms) // 1000), int(count))
+
+    def reset(self, key):
+        """Forget every hit and any lock for key (e.g. after a successful verification)."""
+        client = self._get_client()
+        if client is None:
+            return
+        try:
+            client.delete(*self._keys(key))
+        except Exception as exc:
+            logger.warning("%s rate limiter reset failed for %s: %s", self.name, key, exc)
+            self._reset_client()
@@ -0,0 +1,412 @@
+"""
+Durable saga journal backed by Redis.
+
+Orchestrators that run multi-step sagas (transfer completion, purchase
+confirmation) record every step here as it happens, so a saga interrupted by
+a worker crash or restart can be finished by a background recovery loop
+instead of leaving credits, tickets and listings half-moved.
+
+Keys (per saga type):
+  saga:{type}:{sagaId}         hash   status, inputs, step:<name>, comp:<name>, ...
+  saga:{type}:active           zset   sagaId -> last update (epoch seconds)
+  saga:{type}:lease:{sagaId}   string owner lease; held by the request thread
+                                      while it runs and by recovery when it claims
+  saga:{type}:abandoned        set    sagas that exhausted recovery attempts
+
+A saga is defined as an ordered list of SagaStep(name, action, compensate,
+replayable). Actions raise on failure and may return a dict of outputs, which
+is journaled and merged into the inputs of later steps; compensations return
+an error string or None. Both receive the saga's JSON inputs, so recovery can replay
+them from the journal alone. run_saga() executes inline on the request thread exactly as
+before, journaling each step; recover_stalled_sagas() finds sagas whose lease
+expired while still active and hands them to an orchestrator-specific
+recover(saga) callback, which decides to resume_saga() or compensate_saga().
+
+A worker can die after a step took effect downstream but before step_done
+was journaled, so the journal alone under-reports what happened. Recovery
+callbacks call settle_interrupted_step() first: a replayable step (one whose
+action is idempotent, such as a ledger entry keyed on its referenceId) is
+re-run to find out, and journaled as done if it went through.
+
+Journaling is best-effort in the same way as token_blacklist: when Redis is
+unavailable the saga still runs (and compensates) inline, it just cannot be
+recovered after a crash.
+"""
+import json
+import logging
+import os
+import time
+from collections import namedtuple
+from datetime import datetime, timezone
+from typing import Optional
+
+import redis
+
+logger = logging.getLogger(__name__)
+
+REDIS_URL = os.environ.get("REDIS_URL", "")
+SAGA_PREFIX = os.environ.get("SAGA_JOURNAL_PREFIX", "saga:")
+SAGA_LEASE_SECONDS = int(os.environ.get("SAGA_LEASE_SECONDS", "60"))
+SAGA_RETENTION_SECONDS = int(os.environ.get("SAGA_RETENTION_SECONDS", str(7 * 24 * 3600)))
+SAGA_MAX_RECOVERY_ATTEMPTS = int(os.environ.get("SAGA_MAX_RECOVERY_ATTEMPTS", "5"))
+SAGA_RECOVERY_INTERVAL_SECONDS = int(os.environ.get("SAGA_RECOVERY_INTERVAL_SECONDS", "30"))
+RECONNECT_BACKOFF_SECONDS = 30
+
+RUNNING = "running"
+COMPENSATING = "compensating"
+COMPLETED = "completed"
+COMPENSATED = "compensated"
+COMPENSATION_FAILED = "compensation_failed"
+ABANDONED = "abandoned"
+TERMINAL_STATUSES = (COMPLETED, COMPENSATED, ABANDONED)
+
+SagaStep = namedtuple("SagaStep", ["name", "action", "compensate", "replayable"], defaults=(False,))
+
+
+class StepRefused(RuntimeError):
+    """Raised by an action that was definitively refused, so it took no effect."""
+
+
+class SagaStepError(RuntimeError):
+    """Raised by run_saga/resume_saga after compensation has been attempted."""
+
+    def __init__(self, step, cause, compensation_errors, journaled=True):
+        super().__init__(f"Saga step {step} failed: {cause}")
+        self.step = step
+        self.cause = cause
+        self.compensation_errors = compensation_errors
+        self.journaled = journaled
+
+
+def _now():
+    return datetime.now(timezone.utc).isoformat()
+
+
+class SagaJournal:
+    """Redis-backed step log for one saga type."""
+
+    def __init__(self, saga_type: str, redis_url: Optional[str] = None,
+                 lease_seconds: int = SAGA_LEASE_SECONDS):
+        self.saga_type = saga_type
+        self.redis_url = redis_url if redis_url is not None else REDIS_URL
+        self.lease_seconds = lease_seconds
+        self._client = None
+        self._retry_after = 0.0
+
+    def _get_client(self):
+        """Reuse one pooled client; back off for a while after a failed connect."""
+        if self._client is not None:
+            return self._client
+        if not self.redis_url or time.monotonic() < self._retry_after:
+            return None
+        try:
+            client = redis.from_url(
+                self.redis_url,
+                decode_responses=True,
+                socket_connect_timeout=2,
+                socket_timeout=2,
+            )
+            client.ping()
+            self._client = client
+            return client
+        except Exception as exc:
+            logger.warning("Redis unavailable for %s saga journal: %s", self.saga_type, exc)
+            self._retry_after = time.monotonic() + RECONNECT_BACKOFF_SECONDS
+            return None
+
+    def _reset_client(self):
+        self._client = None
+        self._retry_after = time.monotonic() + RECONNECT_BACKOFF_SECONDS
+
+    def _key(self, suffix):
+        return f"{SAGA_PREFIX}{self.saga_type}:{suffix}"
+
+    def _write(self, saga_id, fields, active=True, extend_lease=True):
+        client = self._get_client()
+        if client is None:
+            return False
+        try:
+            pipe = client.pipeline(transaction=True)
+            pipe.hset(self._key(saga_id), mapping={**fields, "updatedAt": _now()})
+            if active:
+                pipe.zadd(self._key("active"), {saga_id: time.time()})
+            if extend_lease:
+                pipe.expire(self._key(f"lease:{saga_id}"), self.lease_seconds)
+            pipe.execute()
+            return True
+        except Exception as exc:
+            logger.warning("Failed to journal %s saga %s: %s", self.saga_type, saga_id, exc)
+            self._reset_client()
+            return False
+
+    # ── Request-thread API ────────────────────────────────────────────────
+
+    def begin(self, saga_id, inputs):
+        """Record a new saga and take its lease. Returns False if not journaled."""
+        client = self._get_client()
+        if client is None:
+            return False
+        try:
+            client.set(self._key(f"lease:{saga_id}"), "owner", ex=self.lease_seconds)
+        except Exception as exc:
+            logger.warning("Failed to take lease on %s saga %s: %s", self.saga_type, saga_id, exc)
+            self._reset_client()
+            return False
+        return self._write(saga_id, {
+            "sagaId": saga_id,
+            "type": self.saga_type,
+            "status": RUNNING,
+            "inputs": json.dumps(inputs),
+            "attempts": 0,
+            "createdAt": _now(),
+        })
+
+    def step_done(self, saga_id, step, result=None):
+        return self._write(saga_id, {f"step:{step}": json.dumps({"at": _now(), "result": result})})
+
+    def compensating(self, saga_id, failed_step, error):
+        return self._write(saga_id, {
+            "status": COMPENSATING,
+            "failedStep": failed_step,
+            "error": str(error),
+        })
+
+    def compensation_done(self, saga_id, step, error=None):
+        return self._write(saga_id, {
+            f"comp:{step}": json.dumps({"at": _now(), "error": error}),
+        })
+
+    def finish(self, saga_id, status, errors=None):
+        """
+        Close a saga. Terminal sagas leave the active set and expire after the
+        retention period; compensation_failed stays active for recovery.
+        """
+        fields = {"status": status}
+        if errors:
+            fields["errors"] = json.dumps(errors)
+        terminal = status in TERMINAL_STATUSES
+        if not self._write(saga_id, fields, active=not terminal, extend_lease=False):
+            return False
+        client = self._get_client()
+        if client is None:
+            return False
+        try:
+            pipe = client.pipeline(transaction=True)
+            pipe.delete(self._key(f"lease:{saga_id}"))
+            if terminal:
+                pipe.zrem(self._key("active"), saga_id)
+                pipe.expire(self._key(saga_id), SAGA_RETENTION_SECONDS)
+            if status == ABANDONED:
+                pipe.sadd(self._key("abandoned"), saga_id)
+            pipe.execute()
+            return True
+        except Exception as exc:
+            logger.warning("Failed to close %s saga %s: %s", self.saga_type, saga_id, exc)
+            self._reset_client()
+            return False
+
+    # ── Recovery API ──────────────────────────────────────────────────────
+
+    def load(self, saga_id):
+        """Decode a journaled saga into {sagaId, status, inputs, steps, compensations, ...}."""
+        client = self._get_client()
+        if client is None:
+            return None
+        try:
+            raw = client.hgetall(self._key(saga_id))
+        except Exception as exc:
+            logger.warning("Failed to load %s saga %s: %s", self.saga_type, saga_id, exc)
+            self._reset_client()
+            return None
+        if not raw:
+            return None
+
+        saga = {
+            "sagaId": raw.get("sagaId", saga_id),
+            "type": raw.get("type", self.saga_type),
+            "status": raw.get("status"),
+            "inputs": json.loads(raw.get("inputs") or "{}"),
+            "attempts": int(raw.get("attempts") or 0),
+            "failedStep": raw.get("failedStep"),
+            "error": raw.get("error"),
+            "createdAt": raw.get("createdAt"),
+            "updatedAt": raw.get("updatedAt"),
+            "steps": {},
+            "compensations": {},
+        }
+        for field, value in raw.items():
+            if field.startswith("step:"):
+                saga["steps"][field[5:]] = json.loads(value)
+            elif field.startswith("comp:"):
+                saga["compensations"][field[5:]] = json.loads(value)
+        for step in saga["steps"].values():
+            if isinstance(step.get("result"), dict):
+                saga["inputs"].update(step["result"])
+        return saga
+
+    def stalled(self, limit=20):
+        """Active sagas that have not been touched for a full lease period."""
+        client = self._get_client()
+        if client is None:
+            return []
+        try:
+            return client.zrangebyscore(
+                self._key("active"), "-inf", time.time() - self.lease_seconds, start=0, num=limit,
+            )
+        except Exception as exc:
+            logger.warning("Failed to scan stalled %s sagas: %s", self.saga_type, exc)
+            self._reset_client()
+            return []
+
+    def claim(self, saga_id):
+        """Take over a stalled saga if nobody holds its lease. Counts the attempt."""
+        client = self._get_client()
+        if client is None:
+            return False
+        try:
+            if not client.set(self._key(f"lease:{saga_id}"), "recovery", nx=True, ex=self.lease_seconds):
+                return False
+            client.hincrby(self._key(saga_id), "attempts", 1)
+            return True
+        except Exception as exc:
+            logger.warning("Failed to claim %s saga %s: %s", self.saga_type, saga_id, exc)
+            self._reset_client()
+            return False
+
+
+# ── Execution ─────────────────────────────────────────────────────────────
+
+def compensate_saga(journal, saga_id, steps, inputs, done, compensated=()):
+    """
+    Undo completed steps in reverse order, skipping ones already compensated.
+    Records the outcome on the journal and returns the list of errors.
+    """
+    errors = []
+    for step in reversed(steps):
+        if step.name not in done or step.name in compensated or step.compensate is None:
+            continue
+        try:
+            error = step.compensate(inputs)
+        except Exception as exc:
+            error = f"Compensation exception: {exc}"
+        if error:
+            errors.append(f"{step.name}: {error}")
+            logger.error("Compensation for %s saga %s step %s failed: %s",
+                         journal.saga_type, saga_id, step.name, error)
+        else:
+            journal.compensation_done(saga_id, step.name)
+    journal.finish(saga_id, COMPENSATION_FAILED if errors else COMPENSATED, errors)
+    return errors
+
+
+def _run_steps(journal, saga_id, steps, inputs, done, journaled=True, stop_after=None):
+    for step in steps:
+        if step.name in done:
+            continue
+        try:
+            result = step.action(inputs)
+        except Exception as exc:
+            logger.error("%s saga %s failed at %s (%s completed): %s", journal.saga_type, saga_id,
+                         step.name, ", ".join(done) or "nothing", exc)
+            journal.compensating(saga_id, step.name, exc)
+            errors = compensate_saga(journal, saga_id, steps, inputs, done)
+            raise SagaStepError(step.name, exc, errors, journaled) from exc
+        if isinstance(result, dict):
+            # Outputs (e.g. a created ticketId) become inputs to later steps
+            inputs.update(result)
+        done.append(step.name)
+        journal.step_done(saga_id, step.name, result)
+        if step.name == stop_after:
+            return done
+    journal.finish(saga_id, COMPLETED)
+    return done
+
+
+def run_saga(journal, saga_id, steps, inputs, stop_after=None):
+    """
+    Run steps inline, journaling as it goes. Raises SagaStepError on failure.
+    With stop_after, the saga is left open after that step so the caller can
+    resume_saga() the remainder off the request path; if that never happens,
+    recovery picks it up once the lease lapses.
+    """
+    journaled = journal.begin(saga_id, inputs)
+    return _run_steps(journal, saga_id, steps, inputs, [], journaled, stop_after)
+
+
+def resume_saga(journal, saga, steps):
+    """Continue a saga (recovered or deferred) from its first incomplete step."""
+    return _run_steps(journal, saga["sagaId"], steps, saga["inputs"], list(saga["steps"]))
+
+
+def settle_interrupted_step(journal, saga, steps):
+    """
+    Re-run the first step the journal does not show as done, if it is
+    replayable, so recovery decides on what actually happened downstream.
+
+    Success means the step took effect (now, or before the crash); it is
+    journaled as done and its outputs merged into saga["inputs"]. StepRefused
+    means it did not, and the saga is left as it was. Any other error leaves
+    the outcome unknown and propagates, so the saga stays active and is
+    retried on a later recovery pass rather than unwound on a guess.
+    Returns the name of the step settled as done, or None.
+    """
+    if saga["status"] in (COMPENSATING, COMPENSATION_FAILED):
+        return None
+    pending = next((step for step in steps if step.name not in saga["steps"]), None)
+    if pending is None or not pending.replayable:
+        return None
+    try:
+        result = pending.action(saga["inputs"])
+    except StepRefused as exc:
+        logger.info("%s saga %s step %s did not take effect: %s",
+                    journal.saga_type, saga["sagaId"], pending.name, exc)
+        return None
+    if isinstance(result, dict):
+        saga["inputs"].update(result)
+    saga["steps"][pending.name] = {"at": _now(), "result": result}
+    journal.step_done(saga["sagaId"], pending.name, result)
+    logger.info("%s saga %s step %s settled as done on recovery",
+                journal.saga_type, saga["sagaId"], pending.name)
+    return pending.name
+
+
+def recover_stalled_sagas(journal, recover, max_attempts=SAGA_MAX_RECOVERY_ATTEMPTS, on_abandon=None):
+    """
+    One recovery pass: claim each stalled saga and pass it to recover(saga).
+    Sagas that keep failing are parked as abandoned after max_attempts and
+    handed to on_abandon(saga) for manual reconciliation.
+    Returns the number of sagas handled.
+    """
+    handled = 0
+    for saga_id in journal.stalled():
+        if not journal.claim(saga_id):
+            continue
+        saga = journal.load(saga_id)
+        if saga is None:
+            continue
+        handled += 1
+        if saga["attempts"] > max_attempts:
+            logger.error("Abandoning %s saga %s after %d recovery attempts",
+                         journal.saga_type, saga_id, saga["attempts"] - 1)
+            journal.finish(saga_id, ABANDONED)
+            if on_abandon is not None:
+                on_abandon(saga)
+            continue
+        try:
+            recover(saga)
+        except SagaStepError:
+            pass  # already compensated (or left compensation_failed) and journaled
+        except Exception as exc:
+            logger.error("Recovery of %s saga %s failed: %s", journal.saga_type, saga_id, exc)
+    return handled
+
+
+def run_recovery_loop(journal, recover, on_abandon=None, interval_seconds=SAGA_RECOVERY_INTERVAL_SECONDS):
+    """Blocking recovery loop — run in a daemon thread."""
+    logger.info("Saga recovery started for %s (every %ds)", journal.saga_type, interval_seconds)
+    while True:
+        try:
+            recover_stalled_sagas(journal, recover, on_abandon=on_abandon)
+        except Exception as exc:
+            logger.warning("Saga recovery pass for %s failed: %s", journal.saga_type, exc)
+        time.sleep(interval_seconds)
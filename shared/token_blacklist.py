@@ -1,10 +1,32 @@
 """
 Redis-based token blacklist for immediate token revocation.
 Provides functionality to blacklist JWT tokens and check if tokens are revoked.
+
+Redis holds the blacklist; each process also keeps a local copy so the
+common "not revoked" check needs no round-trip. The copy is a bloom filter
+of every revoked jti plus an exact LRU of recent ones. It is kept current
+through the TOKEN_REVOCATION_CHANNEL pub/sub channel, which blacklist_token
+publishes to, and rebuilt from a full SCAN on (re)subscribe and every
+TOKEN_REVOCATION_RESYNC_SECONDS. A jti the bloom filter has never seen is
+answered locally; a bloom hit that is not in the LRU (an evicted entry or a
+false positive) still asks Redis.
+
+While Redis is unreachable no new revocation can be written, so the local
+copy stays authoritative for TOKEN_REVOCATION_MAX_STALE_SECONDS after the
+subscription drops instead of failing open for every token.
+
+Revoking every session of a user is one INCR of token_generation:{userId}.
+Issued tokens carry the generation in their "gen" claim and are rejected
+once it is behind; the per-user value is cached locally and updated over
+TOKEN_GENERATION_CHANNEL.
 """
+import hashlib
 import logging
+import math
 import os
+import threading
 import time
+from collections import OrderedDict
 from typing import Optional
 
 import redis
@@ -15,15 +37,88 @@ logger = logging.getLogger(__name__)
 REDIS_URL = os.environ.get("REDIS_URL", "redis://redis:6379/0")
 BLACKLIST_PREFIX = os.environ.get("TOKEN_BLACKLIST_PREFIX", "token_blacklist:")
 BLACKLIST_TTL_BUFFER = int(os.environ.get("TOKEN_BLACKLIST_TTL_BUFFER", "300"))  # 5 minutes buffer
+REVOCATION_CACHE_ENABLED = os.environ.get("TOKEN_REVOCATION_CACHE_ENABLED", "true").lower() == "true"
+REVOCATION_CHANNEL = os.environ.get("TOKEN_REVOCATION_CHANNEL", "token_revocations")
+REVOCATION_RESYNC_SECONDS = int(os.environ.get("TOKEN_REVOCATION_RESYNC_SECONDS", "300"))
+REVOCATION_MAX_STALE_SECONDS = int(os.environ.get("TOKEN_REVOCATION_MAX_STALE_SECONDS", "300"))
+REVOCATION_BLOOM_CAPACITY = int(os.environ.get("TOKEN_REVOCATION_BLOOM_CAPACITY", "100000"))
+REVOCATION_BLOOM_ERROR_RATE = float(os.environ.get("TOKEN_REVOCATION_BLOOM_ERROR_RATE", "0.01"))
+REVOCATION_LRU_SIZE = int(os.environ.get("TOKEN_REVOCATION_LRU_SIZE", "10000"))
+GENERATION_PREFIX = os.environ.get("TOKEN_GENERATION_PREFIX", "token_generation:")
+GENERATION_CHANNEL = os.environ.get("TOKEN_GENERATION_CHANNEL", "token_generations")
+GENERATION_CACHE_SECONDS = int(os.environ.get("TOKEN_GENERATION_CACHE_SECONDS", "30"))
+GENERATION_CACHE_SIZE = int(os.environ.get("TOKEN_GENERATION_CACHE_SIZE", "10000"))
+# Outside BLACKLIST_PREFIX so the resync SCAN never picks it up
+STATS_KEY = os.environ.get("TOKEN_BLACKLIST_STATS_KEY", "token_blacklist_stats")
+RECONNECT_BACKOFF_SECONDS = 5
+
+
+class _BloomFilter:
+    """Fixed-size bloom filter over strings; no deletes, rebuilt on resync."""
+
+    def __init__(self, capacity: int, error_rate: float):
+        capacity = max(capacity, 1)
+        self.size = max(int(-capacity * math.log(error_rate) / (math.log(2) ** 2)), 8)
+        self.hashes = max(int(round(self.size / capacity * math.log(2))), 1)
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def _positions(self, item: str):
+        digest = hashlib.blake2b(item.encode(), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "big")
+        h2 = int.from_bytes(digest[8:], "big") | 1
+        return ((h1 + i * h2) % self.size for i in range(self.hashes))
+
+    def add(self, item: str) -> None:
+        for pos in self._positions(item):
+            self.bits[pos >> 3] |= 1 << (pos & 7)
+        self.count += 1
+
+    def __contains__(self, item: str) -> bool:
+        return all(self.bits[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(item))
+
+
+class RevocationSet:
+    """Bloom filter of every known revoked jti plus an exact LRU of recent ones."""
+
+    def __init__(self, capacity: int = REVOCATION_BLOOM_CAPACITY, lru_size: int = REVOCATION_LRU_SIZE):
+        self.bloom = _BloomFilter(capacity, REVOCATION_BLOOM_ERROR_RATE)
+        self.recent: OrderedDict = OrderedDict()
+        self.lru_size = lru_size
+
+    def add(self, jti: str) -> None:
+        if jti not in self.recent:
+            self.bloom.add(jti)
+        self.recent[jti] = True
+        self.recent.move_to_end(jti)
+        while len(self.recent) > self.lru_size:
+            self.recent.popitem(last=False)
+
+    def lookup(self, jti: str) -> Optional[bool]:
+        """False = never revoked, True = revoked, None = ask Redis."""
+        if jti not in self.bloom:
+            return False
+        if jti in self.recent:
+            self.recent.move_to_end(jti)
+            return True
+        return None
 
 
 class TokenBlacklist:
     """Redis-based token blacklist for JWT revocation."""
     
-    def __init__(self, redis_url: Optional[str] = None):
+    def __init__(self, redis_url: Optional[str] = None, local_cache: bool = REVOCATION_CACHE_ENABLED):
         self.redis_url = redis_url or REDIS_URL
         self._client: Optional[redis.Redis] = None
         self._connected = False
+        self.local_cache = local_cache
+        self._revoked: Optional[RevocationSet] = None  # None until the first full sync
+        self._generations: OrderedDict = OrderedDict()  # user_id -> (generation, fetched_at)
+        self._live = False
+        self._stale_after = 0.0
+        self._lock = threading.Lock()
+        self._sync_thread: Optional[threading.Thread] = None
+        self._local_stats = {"localAnswers": 0, "redisChecks": 0, "resyncs": 0}
     
     def _get_client(self) -> Optional[redis.Redis]:
         """Get or create Redis client with connection pooling."""
@@ -70,7 +165,16 @@ class TokenBlacklist:
             if ttl <= 0:
                 ttl = BLACKLIST_TTL_BUFFER  # Minimum TTL
             
-            client.setex(key, ttl, "revoked")
+            pipe = client.pipeline()
+            pipe.setex(key, ttl, "revoked")
+            pipe.hincrby(STATS_KEY, "blacklisted_total", 1)
+            pipe.execute()
+            self._remember(jti or token_id)
+            try:
+                client.publish(REVOCATION_CHANNEL, jti or token_id)
+            except Exception as exc:
+                # Other processes pick it up on their next resync
+                logger.warning(f"Failed to publish token revocation: {exc}")
             logger.info(f"Token {jti or token_id} blacklisted successfully")
             return True
         except Exception as exc:
@@ -87,6 +191,11 @@ class TokenBlacklist:
         Returns:
             True if the token is blacklisted, False otherwise.
         """
+        local = self._check_local(token_id)
+        if local is not None:
+            return local
+
+        self._count("redisChecks")
         client = self._get_client()
         if not client:
             # If Redis is unavailable, we can't check the blacklist
@@ -101,49 +210,195 @@ class TokenBlacklist:
             logger.error(f"Failed to check token blacklist: {exc}")
             return False
     
+    # ── Local revocation copy ────────────────────────────────────────────────
+
+    def _count(self, name: str) -> None:
+        with self._lock:
+            self._local_stats[name] += 1
+
+    def _trusted(self) -> bool:
+        return self._revoked is not None and (self._live or time.monotonic() < self._stale_after)
+
+    def _check_local(self, token_id: str) -> Optional[bool]:
+        """Answer from the local copy when it is current; None means ask Redis."""
+        if not self.local_cache:
+            return None
+        self._ensure_sync_thread()
+        with self._lock:
+            if not self._trusted():
+                return None
+            answer = self._revoked.lookup(token_id)
+            if answer is not None:
+                self._local_stats["localAnswers"] += 1
+            return answer
+
+    def _remember(self, token_id: str) -> None:
+        with self._lock:
+            if self._revoked is not None:
+                self._revoked.add(token_id)
+
+    def _on_message(self, channel: str, data: str) -> None:
+        if channel == GENERATION_CHANNEL:
+            user_id, _, generation = data.rpartition(":")
+            self._remember_generation(user_id, int(generation))
+        else:
+            self._remember(data)
+
+    def resync(self, client: redis.Redis) -> int:
+        """Rebuild the local copy from every blacklist key in Redis."""
+        fresh = RevocationSet()
+        start = len(BLACKLIST_PREFIX)
+        for key in client.scan_iter(match=f"{BLACKLIST_PREFIX}*", count=1000):
+            fresh.add(key[start:])
+        with self._lock:
+            self._revoked = fresh
+            # Generation messages may have been missed while unsubscribed
+            self._generations.clear()
+            self._local_stats["resyncs"] += 1
+        return len(fresh.recent)
+
+    def _ensure_sync_thread(self) -> None:
+        if self._sync_thread is not None:
+            return
+        with self._lock:
+            if self._sync_thread is None:
+                self._sync_thread = threading.Thread(
+                    target=self._sync_loop, daemon=True, name="token-revocation-sync",
+                )
+                self._sync_thread.start()
+
+    def _sync_loop(self) -> None:
+        """Subscribe, then full-sync, then apply published revocations; repeat on failure."""
+        while True:
+            pubsub = None
+            try:
+                client = redis.from_url(
+                    self.redis_url,
+                    decode_responses=True,
+                    socket_connect_timeout=2,
+                    socket_timeout=10,
+                )
+                pubsub = client.pubsub(ignore_subscribe_messages=True)
+                # Subscribe before scanning so nothing revoked mid-scan is missed
+                pubsub.subscribe(REVOCATION_CHANNEL, GENERATION_CHANNEL)
+                self.resync(client)
+                self._live = True
+                next_resync = time.monotonic() + REVOCATION_RESYNC_SECONDS
+                while True:
+                    message = pubsub.get_message(timeout=1.0)
+                    if message and message.get("type") == "message":
+                        self._on_message(message["channel"], message["data"])
+                    if time.monotonic() >= next_resync:
+                        self.resync(client)
+                        next_resync = time.monotonic() + REVOCATION_RESYNC_SECONDS
+            except Exception as exc:
+                if self._live:
+                    logger.warning(f"Token revocation subscription lost: {exc}")
+                    self._stale_after = time.monotonic() + REVOCATION_MAX_STALE_SECONDS
+                self._live = False
+            finally:
+                if pubsub is not None:
+                    try:
+                        pubsub.close()
+                    except Exception:
+                        pass
+            time.sleep(RECONNECT_BACKOFF_SECONDS)
+
+    # ── Per-user token generations ───────────────────────────────────────────
+
+    def get_user_generation(self, user_id: str, fresh: bool = False) -> Optional[int]:
+        """
+        Current token generation for a user (0 until their first revoke-all).
+
+        Served from the local cache unless fresh=True; cached values are kept
+        current over TOKEN_GENERATION_CHANNEL while subscribed and otherwise
+        expire after TOKEN_GENERATION_CACHE_SECONDS.
+
+        Returns:
+            The generation, or None if it could not be read.
+        """
+        if not fresh and self.local_cache:
+            self._ensure_sync_thread()
+            with self._lock:
+                cached = self._generations.get(user_id)
+                if cached is not None and (self._live or time.monotonic() - cached[1] < GENERATION_CACHE_SECONDS):
+                    self._generations.move_to_end(user_id)
+                    return cached[0]
+
+        client = self._get_client()
+        if not client:
+            return None
+        try:
+            generation = int(client.get(f"{GENERATION_PREFIX}{user_id}") or 0)
+        except Exception as exc:
+            logger.error(f"Failed to read token generation: {exc}")
+            return None
+        self._remember_generation(user_id, generation)
+        return generation
+
+    def is_generation_current(self, user_id: str, generation: int) -> bool:
+        """
+        Check a token's generation claim against the user's current one.
+
+        Returns:
+            False if the user revoked all sessions after the token was issued.
+            Fails open (True) when the generation cannot be read.
+        """
+        current = self.get_user_generation(user_id)
+        if current is None:
+            logger.warning("Token generation unavailable, failing open")
+            return True
+        return generation >= current
+
+    def _remember_generation(self, user_id: str, generation: int) -> None:
+        if not self.local_cache:
+            return
+        with self._lock:
+            cached = self._generations.get(user_id)
+            if cached is not None and cached[0] > generation:
+                return  # never move backwards on a late message
+            self._generations[user_id] = (generation, time.monotonic())
+            self._generations.move_to_end(user_id)
+            while len(self._generations) > GENERATION_CACHE_SIZE:
+                self._generations.popitem(last=False)
+
     def revoke_all_user_tokens(self, user_id: str) -> bool:
         """
         Revoke all tokens for a specific user.
         This is useful for logout-all-devices functionality.
-        
-        Note: This requires storing a mapping of user_id -> token_ids,
-        which adds complexity. For simplicity, this implementation
-        uses a pattern-based scan which may be slower for large datasets.
-        
+
+        Tokens carry the user's generation when issued (the "gen" claim);
+        bumping it with one INCR invalidates every token issued before.
+
         Args:
             user_id: The user ID whose tokens should be revoked.
-        
+
         Returns:
-            True if revocation was attempted, False on error.
+            True if the generation was bumped, False on error.
         """
         client = self._get_client()
         if not client:
             logger.error("Cannot revoke user tokens: Redis unavailable")
             return False
-        
+
         try:
-            # Scan for all tokens belonging to this user
-            pattern = f"{BLACKLIST_PREFIX}*"
-            cursor = 0
-            revoked_count = 0
-            
-            while True:
-                cursor, keys = client.scan(cursor=cursor, match=pattern, count=100)
-                for key in keys:
-                    # Check if this token belongs to the user
-                    # We'd need to store user_id with the token for efficient lookup
-                    # For now, this is a placeholder for the concept
-                    pass
-                
-                if cursor == 0:
-                    break
-            
-            logger.info(f"Revoked {revoked_count} tokens for user {user_id}")
-            return True
+            pipe = client.pipeline()
+            pipe.incr(f"{GENERATION_PREFIX}{user_id}")
+            pipe.hincrby(STATS_KEY, "revoke_all_total", 1)
+            generation = pipe.execute()[0]
         except Exception as exc:
             logger.error(f"Failed to revoke user tokens: {exc}")
             return False
-    
+
+        self._remember_generation(user_id, generation)
+        try:
+            client.publish(GENERATION_CHANNEL, f"{user_id}:{generation}")
+        except Exception as exc:
+            # Other processes see it once their cached value expires or resyncs
+            logger.warning(f"Failed to publish token generation: {exc}")
+        logger.info(f"Revoked all tokens for user {user_id} (generation {generation})")
+        return True
+
     def cleanup_expired(self) -> int:
         """
         Clean up expired entries from the blacklist.
@@ -158,7 +413,9 @@ class TokenBlacklist:
     
     def get_stats(self) -> dict:
         """
-        Get statistics about the blacklist.
+        Get statistics about the blacklist from counters maintained on
+        each revocation (no keyspace scan). blacklisted_total is cumulative,
+        including entries that have since expired.
         
         Returns:
             Dictionary with blacklist statistics.
@@ -168,25 +425,26 @@ class TokenBlacklist:
             return {"error": "Redis unavailable", "connected": False}
         
         try:
-            # Count keys matching our prefix
-            cursor = 0
-            count = 0
-            pattern = f"{BLACKLIST_PREFIX}*"
-            
-            while True:
-                cursor, keys = client.scan(cursor=cursor, match=pattern, count=100)
-                count += len(keys)
-                if cursor == 0:
-                    break
-            
+            counters = client.hgetall(STATS_KEY)
             return {
                 "connected": True,
-                "blacklisted_count": count,
+                "blacklisted_total": int(counters.get("blacklisted_total", 0)),
+                "revoke_all_total": int(counters.get("revoke_all_total", 0)),
                 "prefix": BLACKLIST_PREFIX,
+                "local": self.local_stats(),
             }
         except Exception as exc:
             return {"error": str(exc), "connected": False}
 
+    def local_stats(self) -> dict:
+        """How the local copy is doing: size, liveness and lookups it answered."""
+        with self._lock:
+            stats = dict(self._local_stats)
+            stats["live"] = self._live
+            stats["trusted"] = self._trusted()
+            stats["size"] = self._revoked.bloom.count if self._revoked is not None else 0
+        return stats
+
 
 # Global instance for use across the application
 _blacklist_instance: Optional[TokenBlacklist] = None
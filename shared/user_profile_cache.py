@@ -0,0 +1,244 @@
+"""
+Read-through cache for user profiles.
+
+/auth/me, every transfer step (buyer and seller phone numbers for OTP),
+marketplace seller names and event dashboard attendee emails all read the
+same profiles from user-service. UserProfileCache answers them from a
+per-process LRU, then Redis (user_profile:{userId}), then user-service's
+GET /users/<id>/profile.
+
+Profiles never carry credentials: password and salt are stripped before
+anything is cached, whatever the fetch returned.
+
+user-service calls invalidate() after every committed write that changes a
+profile, which drops the Redis entry. Per-process copies are not told about
+the write; they are trusted for USER_PROFILE_LOCAL_TTL_SECONDS only, which
+bounds how long another process can answer with the old profile. A Redis
+entry is fresh for USER_PROFILE_CACHE_TTL_SECONDS.
+
+Entries outlive their freshness (Redis keeps them for
+USER_PROFILE_STALE_SECONDS, the LRU until evicted). When a refresh fails
+because user-service is down or erroring, the last known profile is
+returned instead; only a definitive USER_NOT_FOUND is passed through.
+
+Like credit_balance_cache, Redis is best-effort: without it the LRU still
+serves and keeps stale copies.
+"""
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional
+
+import redis
+
+logger = logging.getLogger(__name__)
+
+REDIS_URL = os.environ.get("REDIS_URL", "")
+CACHE_PREFIX = os.environ.get("USER_PROFILE_CACHE_PREFIX", "user_profile:")
+CACHE_TTL_SECONDS = int(os.environ.get("USER_PROFILE_CACHE_TTL_SECONDS", "300"))
+STALE_SECONDS = int(os.environ.get("USER_PROFILE_STALE_SECONDS", "86400"))
+LOCAL_TTL_SECONDS = float(os.environ.get("USER_PROFILE_LOCAL_TTL_SECONDS", "5"))
+LOCAL_MAX_ENTRIES = int(os.environ.get("USER_PROFILE_LOCAL_MAX_ENTRIES", "10000"))
+STATS_LOG_SECONDS = int(os.environ.get("USER_PROFILE_STATS_LOG_SECONDS", "60"))
+RECONNECT_BACKOFF_SECONDS = 30
+
+SENSITIVE_FIELDS = ("password", "salt")
+# Errors that are an answer rather than an outage; never masked with a stale copy
+DEFINITIVE_ERRORS = {"USER_NOT_FOUND"}
+
+
+def public_profile(user):
+    return {key: value for key, value in user.items() if key not in SENSITIVE_FIELDS}
+
+
+class UserProfileCache:
+    """
+    fetch(user_id) must return (data, err) like call_service. It may be None
+    in user-service, which only invalidates.
+    """
+
+    def __init__(
+        self,
+        fetch=None,
+        redis_url: Optional[str] = None,
+        ttl_seconds: int = CACHE_TTL_SECONDS,
+        local_max_entries: int = LOCAL_MAX_ENTRIES,
+    ):
+        self._fetch = fetch
+        self.redis_url = redis_url if redis_url is not None else REDIS_URL
+        self.ttl_seconds = ttl_seconds
+        self.local_max_entries = local_max_entries
+        self._client = None
+        self._retry_after = 0.0
+        self._local = OrderedDict()   # user_id -> (trusted_until, cached_at, profile)
+        self._lock = threading.Lock()
+        self._stats = {"localHits": 0, "hits": 0, "misses": 0, "stale": 0, "fetchErrors": 0}
+        self._last_stats_log = time.monotonic()
+
+    def _get_client(self):
+        """Reuse one pooled client; back off for a while after a failed connect."""
+        if self._client is not None:
+            return self._client
+        if not self.redis_url or time.monotonic() < self._retry_after:
+            return None
+        try:
+            client = redis.from_url(
+                self.redis_url,
+                decode_responses=True,
+                socket_connect_timeout=2,
+                socket_timeout=2,
+            )
+            client.ping()
+            self._client = client
+            return client
+        except Exception as exc:
+            logger.warning("Redis unavailable for user profile cache: %s", exc)
+            self._retry_after = time.monotonic() + RECONNECT_BACKOFF_SECONDS
+            return None
+
+    def _reset_client(self):
+        self._client = None
+        self._retry_after = time.monotonic() + RECONNECT_BACKOFF_SECONDS
+
+    # ── Per-process LRU ──────────────────────────────────────────────────────
+
+    def _local_get(self, user_id):
+        with self._lock:
+            entry = self._local.get(user_id)
+            if entry is not None:
+                self._local.move_to_end(user_id)
+            return entry
+
+    def _local_put(self, user_id, cached_at, profile):
+        if self.local_max_entries <= 0:
+            return
+        with self._lock:
+            self._local[user_id] = (time.time() + LOCAL_TTL_SECONDS, cached_at, profile)
+            self._local.move_to_end(user_id)
+            while len(self._local) > self.local_max_entries:
+                self._local.popitem(last=False)
+
+    # ── Redis ────────────────────────────────────────────────────────────────
+
+    def _read(self, user_id):
+        """(cached_at, profile) from Redis, or None."""
+        client = self._get_client()
+        if client is None:
+            return None
+        try:
+            raw = client.get(f"{CACHE_PREFIX}{user_id}")
+        except Exception as exc:
+            logger.warning("User profile cache read failed for %s: %s", user_id, exc)
+            self._reset_client()
+            return None
+        if not raw:
+            return None
+        entry = json.loads(raw)
+        return entry["cachedAt"], entry["profile"]
+
+    def _write(self, user_id, cached_at, profile):
+        client = self._get_client()
+        if client is None or self.ttl_seconds <= 0:
+            return
+        try:
+            client.setex(
+                f"{CACHE_PREFIX}{user_id}",
+                max(STALE_SECONDS, self.ttl_seconds),
+                json.dumps({"cachedAt": cached_at, "profile": profile}),
+            )
+        except Exception as exc:
+            logger.warning("User profile cache write failed for %s: %s", user_id, exc)
+            self._reset_client()
+
+    def invalidate(self, user_id):
+        """Drop a profile after a committed write. Returns True if Redis was reached."""
+        with self._lock:
+            self._local.pop(user_id, None)
+        client = self._get_client()
+        if client is None:
+            return False
+        try:
+            client.delete(f"{CACHE_PREFIX}{user_id}")
+            return True
+        except Exception as exc:
+            logger.warning("User profile cache invalidate failed for %s: %s", user_id, exc)
+            self._reset_client()
+            return False
+
+    # ── Reads ────────────────────────────────────────────────────────────────
+
+    def get(self, user_id):
+        """(profile, err) for user_id, without password or salt."""
+        now = time.time()
+        local = self._local_get(user_id)
+        if local is not None and now < local[0]:
+            self._count("localHits")
+            return local[2], None
+
+        shared = self._read(user_id)
+        if shared is not None and now - shared[0] < self.ttl_seconds:
+            self._local_put(user_id, shared[0], shared[1])
+            self._count("hits")
+            return shared[1], None
+
+        self._count("misses")
+        try:
+            data, err = self._fetch(user_id)
+        except Exception as exc:
+            logger.warning("User profile fetch failed for %s: %s", user_id, exc)
+            data, err = None, "SERVICE_UNAVAILABLE"
+
+        if not err and data is not None:
+            profile = public_profile(data)
+            self._local_put(user_id, now, profile)
+            self._write(user_id, now, profile)
+            return profile, None
+
+        if err in DEFINITIVE_ERRORS:
+            with self._lock:
+                self._local.pop(user_id, None)
+            return None, err
+
+        self._count("fetchErrors")
+        candidates = [entry for entry in (shared, local and local[1:]) if entry]
+        if not candidates:
+            return None, err or "SERVICE_UNAVAILABLE"
+        cached_at, profile = max(candidates, key=lambda entry: entry[0])
+        logger.warning(
+            "User profile refresh for %s failed (%s); serving copy from %.0fs ago",
+            user_id, err, now - cached_at,
+        )
+        self._count("stale")
+        return profile, None
+
+    # ── Instrumentation ──────────────────────────────────────────────────────
+
+    def _count(self, name):
+        with self._lock:
+            self._stats[name] += 1
+        self._maybe_log_stats()
+
+    def stats(self):
+        """Counters since start, plus the derived hit ratio."""
+        with self._lock:
+            snapshot = dict(self._stats)
+            snapshot["localEntries"] = len(self._local)
+        lookups = snapshot["localHits"] + snapshot["hits"] + snapshot["misses"]
+        snapshot["hitRatio"] = (snapshot["localHits"] + snapshot["hits"]) / lookups if lookups else 0.0
+        return snapshot
+
+    def _maybe_log_stats(self):
+        now = time.monotonic()
+        with self._lock:
+            if now - self._last_stats_log < STATS_LOG_SECONDS:
+                return
+            self._last_stats_log = now
+        s = self.stats()
+        logger.info(
+            "User profile cache: %d local hits, %d hits, %d misses, hit ratio %.2f, "
+            "%d fetch errors, %d served stale",
+            s["localHits"], s["hits"], s["misses"], s["hitRatio"], s["fetchErrors"], s["stale"],
+        )